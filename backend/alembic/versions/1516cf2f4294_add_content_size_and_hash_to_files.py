@@ -0,0 +1,73 @@
+"""add_content_size_and_hash_to_files
+
+Add content_size and content_hash columns to the artifacts and import_files
+tables, so that listing files doesn't need to load their (deferred) content.
+
+The columns are backfilled in batches on PostgreSQL only -- skipped on SQLite
+(dev/test environments), which has no sha256() function.
+
+Revision ID: 1516cf2f4294
+Revises: d18de2b3253f
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+
+import logging
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "1516cf2f4294"
+down_revision = "d18de2b3253f"
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger("alembic.versions.1516cf2f4294")
+
+TABLES = ("artifacts", "import_files")
+BATCH_SIZE = 1000
+
+# The table name is interpolated from TABLES, a trusted internal constant.
+_BACKFILL_BATCH_SQL = """\
+UPDATE {table}
+SET content_size = octet_length(content),
+    content_hash = encode(sha256(content), 'hex')
+WHERE id IN (
+    SELECT id FROM {table}
+    WHERE content IS NOT NULL
+      AND content_size IS NULL
+    LIMIT :batch_size
+)
+"""
+
+
+def upgrade() -> None:
+    for table in TABLES:
+        op.add_column(table, sa.Column("content_size", sa.Integer(), nullable=True))
+        op.add_column(table, sa.Column("content_hash", sa.Text(), nullable=True))
+
+    if op.get_bind().dialect.name != "postgresql":
+        logger.info("Non-PostgreSQL dialect; skipping content_size/content_hash backfill")
+        return
+
+    # Commit the new columns first, then commit each batch on its own so the
+    # backfill doesn't hold a lock on the whole table until it is done.
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+        for table in TABLES:
+            batch_sql = sa.text(_BACKFILL_BATCH_SQL.format(table=table))
+            total_updated = 0
+            while True:
+                batch_count = conn.execute(batch_sql, {"batch_size": BATCH_SIZE}).rowcount
+                total_updated += batch_count
+                if batch_count < BATCH_SIZE:
+                    break
+            logger.info("Backfilled content_size/content_hash for %d %s", total_updated, table)
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.drop_column(table, "content_hash")
+        op.drop_column(table, "content_size")
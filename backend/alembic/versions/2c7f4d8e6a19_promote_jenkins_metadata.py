@@ -0,0 +1,196 @@
+"""promote_jenkins_metadata
+
+Promote the Jenkins job name and build number from the metadata of results and
+runs to real columns, which are indexed, and kept in sync with the metadata by
+triggers. Filters on these fields then use the columns instead of extracting
+the fields from the JSON metadata of every row.
+
+On PostgreSQL the existing rows are backfilled in batches, each in its own
+transaction, and the indexes are created CONCURRENTLY, so that the migration
+doesn't block writes to the tables. The trigger is created first, so rows that
+are written during the backfill are kept in sync too.
+
+Revision ID: 2c7f4d8e6a19
+Revises: 9a4c1e7b2f58
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+
+import logging
+import time
+
+import sqlalchemy as sa
+
+from alembic import context, op
+
+# revision identifiers, used by Alembic.
+revision = "2c7f4d8e6a19"
+down_revision = "9a4c1e7b2f58"
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger("alembic.versions.2c7f4d8e6a19")
+
+TABLES = ["results", "runs"]
+BATCH_SIZE = 5000
+
+# Fail fast on lock waits instead of hanging, like the d18de2b3253f backfill
+_LOCK_TIMEOUT = "30s"
+
+# These match the triggers that ibutsu_server.db.models creates when the tables are created. A
+# build number that isn't an integer that fits in 32 bits is not promoted, and is NULL.
+_PROMOTE_METADATA_FUNCTION = """\
+CREATE OR REPLACE FUNCTION promote_metadata() RETURNS trigger AS $$
+BEGIN
+    NEW.jenkins_job_name := NEW.data->'jenkins'->>'job_name';
+    NEW.jenkins_build_number := CASE
+        WHEN NEW.data->'jenkins'->>'build_number' ~ '^[0-9]{1,9}$'
+        THEN (NEW.data->'jenkins'->>'build_number')::integer
+    END;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql"""
+_PROMOTE_METADATA_TRIGGER = """\
+CREATE TRIGGER {table}_promote_metadata BEFORE INSERT OR UPDATE OF data ON {table}
+FOR EACH ROW EXECUTE FUNCTION promote_metadata()"""
+_SQLITE_PROMOTE_METADATA_TRIGGER = """\
+CREATE TRIGGER {table}_promote_metadata_{name} AFTER {event} ON {table}
+BEGIN
+    UPDATE {table} SET
+        jenkins_job_name = CAST(json_extract(NEW.data, '$.jenkins.job_name') AS TEXT),
+        jenkins_build_number = (
+            SELECT CASE
+                WHEN length(build_number) BETWEEN 1 AND 9 AND build_number NOT GLOB '*[^0-9]*'
+                THEN CAST(build_number AS INTEGER)
+            END
+            FROM (
+                SELECT CAST(json_extract(NEW.data, '$.jenkins.build_number') AS TEXT)
+                AS build_number
+            )
+        )
+    WHERE rowid = NEW.rowid;
+END"""
+_SQLITE_EVENTS = {"insert": "INSERT", "update": "UPDATE OF data"}
+
+# Rows without Jenkins metadata have nothing to backfill, so only the rows that have it are
+# updated. Each batch continues after the highest ID of the previous batch, so rows whose build
+# number can't be promoted are not visited again.
+_BACKFILL_BATCH_SQL = """\
+WITH batch AS (
+    SELECT id FROM {table}
+    WHERE id > CAST(:after_id AS uuid) AND data ? 'jenkins'
+    ORDER BY id
+    LIMIT :batch_size
+)
+UPDATE {table} AS t
+SET jenkins_job_name = t.data->'jenkins'->>'job_name',
+    jenkins_build_number = CASE
+        WHEN t.data->'jenkins'->>'build_number' ~ '^[0-9]{{1,9}}$'
+        THEN (t.data->'jenkins'->>'build_number')::integer
+    END
+FROM batch
+WHERE t.id = batch.id
+RETURNING t.id"""
+_SQLITE_BACKFILL_SQL = (
+    "UPDATE {table} SET data = data WHERE json_extract(data, '$.jenkins') IS NOT NULL"
+)
+
+
+def _log(msg: str, *args: object) -> None:
+    logger.info(msg, *args)
+    for handler in logging.root.handlers:
+        handler.flush()
+
+
+def _add_columns() -> None:
+    for table in TABLES:
+        op.add_column(table, sa.Column("jenkins_job_name", sa.Text(), nullable=True))
+        op.add_column(table, sa.Column("jenkins_build_number", sa.Integer(), nullable=True))
+
+
+def _backfill_batches(conn: sa.Connection, table: str) -> int:
+    """Backfill the promoted columns of a table in batches, returning the number of rows"""
+    # The table names are interpolated from TABLES, a trusted internal constant
+    batch_sql = sa.text(_BACKFILL_BATCH_SQL.format(table=table))
+    total_updated = 0
+    after_id = "00000000-0000-0000-0000-000000000000"
+    batch_num = 0
+    while True:
+        batch_num += 1
+        started = time.monotonic()
+        params = {"after_id": after_id, "batch_size": BATCH_SIZE}
+        ids = conn.execute(batch_sql, params).scalars().all()
+        total_updated += len(ids)
+        _log(
+            "  %s batch %d: %d rows updated in %.2fs (total=%d)",
+            table,
+            batch_num,
+            len(ids),
+            time.monotonic() - started,
+            total_updated,
+        )
+        if len(ids) < BATCH_SIZE:
+            return total_updated
+        after_id = str(max(ids))
+
+
+def _upgrade_sqlite() -> None:
+    _add_columns()
+    for table in TABLES:
+        for name, event in _SQLITE_EVENTS.items():
+            op.execute(_SQLITE_PROMOTE_METADATA_TRIGGER.format(table=table, name=name, event=event))
+        # Rewriting the metadata fires the update trigger, which fills in the columns
+        op.execute(_SQLITE_BACKFILL_SQL.format(table=table))
+        op.create_index(
+            f"ix_{table}_promoted_jenkins", table, ["jenkins_job_name", "jenkins_build_number"]
+        )
+
+
+def upgrade() -> None:
+    if context.is_offline_mode():
+        raise RuntimeError(
+            "This migration requires a live database connection and does not support "
+            "offline SQL generation (alembic upgrade --sql). Run in online mode."
+        )
+
+    if op.get_bind().dialect.name != "postgresql":
+        _upgrade_sqlite()
+        return
+
+    # Adding nullable columns without a default only changes the catalog, so it is quick
+    _add_columns()
+    op.execute(_PROMOTE_METADATA_FUNCTION)
+    for table in TABLES:
+        op.execute(_PROMOTE_METADATA_TRIGGER.format(table=table))
+
+    # Commit the new columns and triggers first, then backfill outside of the migration
+    # transaction, so that each batch only holds its row locks until it is committed
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+        conn.execute(sa.text(f"SET lock_timeout = '{_LOCK_TIMEOUT}'"))
+        for table in TABLES:
+            _log("Backfilling the promoted Jenkins columns of %s ...", table)
+            total_updated = _backfill_batches(conn, table)
+            _log("Backfilled the promoted Jenkins columns of %d %s", total_updated, table)
+            _log("Creating ix_%s_promoted_jenkins CONCURRENTLY ...", table)
+            conn.execute(
+                sa.text(
+                    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_{table}_promoted_jenkins "
+                    f"ON {table} (jenkins_job_name, jenkins_build_number)"
+                )
+            )
+
+
+def downgrade() -> None:
+    is_postgresql = op.get_bind().dialect.name == "postgresql"
+    for table in TABLES:
+        if is_postgresql:
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_promote_metadata ON {table}")
+        else:
+            for name in _SQLITE_EVENTS:
+                op.execute(f"DROP TRIGGER IF EXISTS {table}_promote_metadata_{name}")
+        op.drop_index(f"ix_{table}_promoted_jenkins", table_name=table, if_exists=True)
+        op.drop_column(table, "jenkins_build_number")
+        op.drop_column(table, "jenkins_job_name")
+    if is_postgresql:
+        op.execute("DROP FUNCTION IF EXISTS promote_metadata()")
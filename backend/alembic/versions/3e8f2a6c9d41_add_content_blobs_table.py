@@ -0,0 +1,46 @@
+"""add_content_blobs_table
+
+Add a content_blobs table, which counts the references to every stored file.
+Files are now stored under the hash of their content, so artifacts and import
+files with the same content share a single file, which is only deleted once
+its last reference is deleted. Without a storage backend the content is kept
+on the content_blobs row, rather than on the row of every file.
+
+Files that were stored before this have no row in content_blobs, and are
+deleted along with the row that references them, as before.
+
+Revision ID: 3e8f2a6c9d41
+Revises: 7c41d5e0a9b3
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+from ibutsu_server.db.types import PortableUUID
+
+# revision identifiers, used by Alembic.
+revision = "3e8f2a6c9d41"
+down_revision = "7c41d5e0a9b3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "content_blobs",
+        sa.Column("id", PortableUUID(), nullable=False),
+        sa.Column("key", sa.Text(), nullable=False),
+        sa.Column("content", sa.LargeBinary(), nullable=True),
+        sa.Column("content_size", sa.Integer(), nullable=True),
+        sa.Column("reference_count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("id"),
+    )
+    op.create_index(op.f("ix_content_blobs_key"), "content_blobs", ["key"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_content_blobs_key"), table_name="content_blobs")
+    op.drop_table("content_blobs")
@@ -0,0 +1,34 @@
+"""add_content_encoding_to_files
+
+Add a content_encoding column to the artifacts and import_files tables, with
+the codec that the stored content is compressed with (see
+ARTIFACT_COMPRESSION). Existing files aren't compressed, so no backfill is
+needed.
+
+Revision ID: 5b2d7e9f1c63
+Revises: 3e8f2a6c9d41
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5b2d7e9f1c63"
+down_revision = "3e8f2a6c9d41"
+branch_labels = None
+depends_on = None
+
+TABLES = ("artifacts", "import_files")
+
+
+def upgrade() -> None:
+    for table in TABLES:
+        op.add_column(table, sa.Column("content_encoding", sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.drop_column(table, "content_encoding")
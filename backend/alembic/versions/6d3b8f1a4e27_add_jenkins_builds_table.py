@@ -0,0 +1,85 @@
+"""add_jenkins_builds_table
+
+Add a jenkins_builds table, a rollup of the runs of each Jenkins build, which
+the Jenkins widgets read instead of aggregating the runs. A build is recounted
+whenever one of its runs is updated.
+
+The table is empty after upgrading, and is filled in by the
+backfill_jenkins_builds task, which also runs weekly. Until then the widgets
+aggregate the runs, as before.
+
+Revision ID: 6d3b8f1a4e27
+Revises: 2c7f4d8e6a19
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+from ibutsu_server.db.types import PortableJSON, PortableUUID
+
+# revision identifiers, used by Alembic.
+revision = "6d3b8f1a4e27"
+down_revision = "2c7f4d8e6a19"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "jenkins_builds",
+        sa.Column("id", PortableUUID(), nullable=False),
+        sa.Column("project_id", PortableUUID(), nullable=True),
+        sa.Column("jenkins_job_name", sa.Text(), nullable=False),
+        sa.Column("jenkins_build_number", sa.Integer(), nullable=False),
+        sa.Column("build_url", sa.Text(), nullable=True),
+        sa.Column("env", sa.Text(), nullable=True),
+        sa.Column("source", sa.Text(), nullable=True),
+        sa.Column("run_count", sa.Integer(), nullable=True),
+        sa.Column("xfailures", sa.Integer(), nullable=True),
+        sa.Column("xpasses", sa.Integer(), nullable=True),
+        sa.Column("failures", sa.Integer(), nullable=True),
+        sa.Column("errors", sa.Integer(), nullable=True),
+        sa.Column("skips", sa.Integer(), nullable=True),
+        sa.Column("tests", sa.Integer(), nullable=True),
+        sa.Column("components", PortableJSON(), nullable=True),
+        sa.Column("min_start_time", sa.DateTime(), nullable=True),
+        sa.Column("max_start_time", sa.DateTime(), nullable=True),
+        sa.Column("total_execution_time", sa.Float(), nullable=True),
+        sa.Column("max_duration", sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(["project_id"], ["projects.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("id"),
+    )
+    # NULLs are distinct in a unique index, so the builds without a project have their own index
+    op.create_index(
+        "ix_jenkins_builds_build",
+        "jenkins_builds",
+        ["jenkins_job_name", "jenkins_build_number", "project_id"],
+        unique=True,
+        postgresql_where=sa.text("project_id IS NOT NULL"),
+        sqlite_where=sa.text("project_id IS NOT NULL"),
+    )
+    op.create_index(
+        "ix_jenkins_builds_build_no_project",
+        "jenkins_builds",
+        ["jenkins_job_name", "jenkins_build_number"],
+        unique=True,
+        postgresql_where=sa.text("project_id IS NULL"),
+        sqlite_where=sa.text("project_id IS NULL"),
+    )
+    op.create_index(
+        op.f("ix_jenkins_builds_project_id"), "jenkins_builds", ["project_id"], unique=False
+    )
+    op.create_index(
+        op.f("ix_jenkins_builds_max_start_time"), "jenkins_builds", ["max_start_time"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_jenkins_builds_max_start_time"), table_name="jenkins_builds")
+    op.drop_index(op.f("ix_jenkins_builds_project_id"), table_name="jenkins_builds")
+    op.drop_index("ix_jenkins_builds_build_no_project", table_name="jenkins_builds")
+    op.drop_index("ix_jenkins_builds_build", table_name="jenkins_builds")
+    op.drop_table("jenkins_builds")
@@ -0,0 +1,34 @@
+"""add_storage_key_to_files
+
+Add a storage_key column to the artifacts and import_files tables, for files
+whose content is stored in a storage backend (see ARTIFACT_STORAGE) rather
+than in the content column. Existing files keep their content in the
+database, so no backfill is needed.
+
+Revision ID: 7c41d5e0a9b3
+Revises: 1516cf2f4294
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "7c41d5e0a9b3"
+down_revision = "1516cf2f4294"
+branch_labels = None
+depends_on = None
+
+TABLES = ("artifacts", "import_files")
+
+
+def upgrade() -> None:
+    for table in TABLES:
+        op.add_column(table, sa.Column("storage_key", sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.drop_column(table, "storage_key")
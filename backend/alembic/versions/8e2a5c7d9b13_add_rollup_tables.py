@@ -0,0 +1,72 @@
+"""add_rollup_tables
+
+Add the result_rollups and run_rollups tables, daily rollups of the results and runs of each
+project, which the aggregator widgets read instead of counting the rows. The days of a project are
+recounted by the refresh_rollups task after their results or runs change.
+
+The tables are empty after upgrading, and are filled in by the backfill_rollups task, which also
+runs weekly. Until then the widgets count the rows, as before.
+
+Revision ID: 8e2a5c7d9b13
+Revises: 6d3b8f1a4e27
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+from ibutsu_server.db.types import PortableUUID
+
+# revision identifiers, used by Alembic.
+revision = "8e2a5c7d9b13"
+down_revision = "6d3b8f1a4e27"
+branch_labels = None
+depends_on = None
+
+
+def _create_rollup_table(name: str, *columns: sa.Column) -> None:
+    op.create_table(
+        name,
+        sa.Column("id", PortableUUID(), nullable=False),
+        sa.Column("project_id", PortableUUID(), nullable=True),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("component", sa.Text(), nullable=True),
+        sa.Column("env", sa.Text(), nullable=True),
+        sa.Column("source", sa.Text(), nullable=True),
+        sa.Column("jenkins_job_name", sa.Text(), nullable=True),
+        *columns,
+        sa.ForeignKeyConstraint(["project_id"], ["projects.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("id"),
+    )
+    op.create_index(f"ix_{name}_project_id_day", name, ["project_id", "day"], unique=False)
+    op.create_index(op.f(f"ix_{name}_day"), name, ["day"], unique=False)
+
+
+def upgrade() -> None:
+    _create_rollup_table(
+        "result_rollups",
+        sa.Column("result", sa.Text(), nullable=True),
+        sa.Column("classification", sa.Text(), nullable=True),
+        sa.Column("assignee", sa.Text(), nullable=True),
+        sa.Column("exception_name", sa.Text(), nullable=True),
+        sa.Column("count", sa.Integer(), nullable=True),
+    )
+    _create_rollup_table(
+        "run_rollups",
+        sa.Column("run_count", sa.Integer(), nullable=True),
+        sa.Column("xfailed", sa.Integer(), nullable=True),
+        sa.Column("xpassed", sa.Integer(), nullable=True),
+        sa.Column("failures", sa.Integer(), nullable=True),
+        sa.Column("errors", sa.Integer(), nullable=True),
+        sa.Column("skips", sa.Integer(), nullable=True),
+        sa.Column("tests", sa.Integer(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    for name in ["run_rollups", "result_rollups"]:
+        op.drop_index(op.f(f"ix_{name}_day"), table_name=name)
+        op.drop_index(f"ix_{name}_project_id_day", table_name=name)
+        op.drop_table(name)
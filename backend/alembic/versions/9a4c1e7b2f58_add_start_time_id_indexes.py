@@ -0,0 +1,48 @@
+"""add_start_time_id_indexes
+
+Add composite (start_time, id) indexes to the results and runs tables, for
+keyset (cursor) pagination of the result and run lists.
+
+On PostgreSQL the indexes are created CONCURRENTLY, outside of the migration
+transaction, so that creating them doesn't block writes to the tables.
+
+Revision ID: 9a4c1e7b2f58
+Revises: 5b2d7e9f1c63
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "9a4c1e7b2f58"
+down_revision = "5b2d7e9f1c63"
+branch_labels = None
+depends_on = None
+
+INDEXES = {"results": "ix_results_start_time_id", "runs": "ix_runs_start_time_id"}
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        for table, index_name in INDEXES.items():
+            op.create_index(index_name, table, ["start_time", "id"], unique=False)
+        return
+
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+        for table, index_name in INDEXES.items():
+            # The names are interpolated from INDEXES, a trusted internal constant.
+            conn.execute(
+                sa.text(
+                    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} "
+                    f"ON {table} (start_time, id)"
+                )
+            )
+
+
+def downgrade() -> None:
+    for table, index_name in INDEXES.items():
+        op.drop_index(index_name, table_name=table, if_exists=True)
@@ -62,7 +62,7 @@ import os
 from celery import Celery, signals
 from celery.schedules import crontab
 
-from ibutsu_server.constants import SOCKET_CONNECT_TIMEOUT, SOCKET_TIMEOUT
+from ibutsu_server.constants import SOCKET_CONNECT_TIMEOUT, SOCKET_TIMEOUT, WIDGET_WARMUP_HOUR
 from ibutsu_server.util.celery_task import IbutsuTask, set_flask_app
 
 
@@ -197,7 +197,9 @@ def create_flask_celery_app(app=None, name="ibutsu_server"):
     import ibutsu_server.tasks.importers  # noqa: PLC0415
     import ibutsu_server.tasks.query  # noqa: PLC0415
     import ibutsu_server.tasks.results  # noqa: PLC0415
-    import ibutsu_server.tasks.runs  # noqa: F401, PLC0415
+    import ibutsu_server.tasks.rollups  # noqa: PLC0415
+    import ibutsu_server.tasks.runs  # noqa: PLC0415
+    import ibutsu_server.tasks.widgets  # noqa: F401, PLC0415
 
     celery_app.Task = IbutsuTask
 
@@ -223,6 +225,25 @@ def create_flask_celery_app(app=None, name="ibutsu_server"):
             "schedule": crontab(minute=0, hour=6, day_of_week=6),  # 6 am on Saturday
             "args": (12,),  # delete any runs older than 12 months
         },
+        "backfill-jenkins-builds": {
+            "task": "ibutsu_server.tasks.runs.backfill_jenkins_builds",
+            "schedule": crontab(minute=0, hour=7, day_of_week=6),  # 7 am on Saturday, after pruning
+        },
+        "backfill-rollups": {
+            "task": "ibutsu_server.tasks.rollups.backfill_rollups",
+            "schedule": crontab(minute=0, hour=8, day_of_week=6),  # 8 am on Saturday, after pruning
+        },
+        "refresh-rollups": {
+            "task": "ibutsu_server.tasks.rollups.refresh_rollups",
+            "schedule": 5 * 60,  # this will run every 5 minutes, schedule is in [s]
+        },
+        "warm-widget-cache": {
+            "task": "ibutsu_server.tasks.widgets.warm_widget_cache",
+            # daily, once the nightly CI has imported its results
+            "schedule": crontab(
+                minute=0, hour=app.config.get("WIDGET_WARMUP_HOUR", WIDGET_WARMUP_HOUR)
+            ),
+        },
         "sync-aborted-runs": {
             "task": "ibutsu_server.tasks.runs.sync_aborted_runs",
             "schedule": 0.5 * 60 * 60,  # this will run every 30 minutes, schedule is in [s]
@@ -44,15 +44,75 @@ NUMERIC_FIELDS = [
     "summary.xfailures",
     "summary.xpasses",
 ]
+# fields that results and runs are counted by for each day, and their columns in the rollups, see
+# ibutsu_server.util.rollups
+RESULT_ROLLUP_FIELDS = {
+    "component": "component",
+    "env": "env",
+    "result": "result",
+    "source": "source",
+    "metadata.jenkins.job_name": "jenkins_job_name",
+    "metadata.classification": "classification",
+    "metadata.assignee": "assignee",
+    "metadata.exception_name": "exception_name",
+}
+RUN_ROLLUP_FIELDS = {
+    "component": "component",
+    "env": "env",
+    "source": "source",
+    "metadata.jenkins.job_name": "jenkins_job_name",
+}
 MAX_PAGE_SIZE = 500  # max page size API can return, page_sizes over this are sent to a worker
 HEATMAP_MAX_BUILDS = 40  # max for number of builds that are possible to display in heatmap
+HEATMAP_TREND_WINDOW = 3  # number of builds in the moving averages of the heatmap trends
+HEATMAP_CHANGEPOINT_SHIFT = 20  # shift of the average pass percentage that's a changepoint [%]
 BARCHART_MAX_BUILDS = 150  # max for number of builds possible to display in bar chart
 COUNT_TIMEOUT = 0.5  # timeout for counting the number of documents [s]
 COUNT_ESTIMATE_LIMIT = 1000  # if count estimate < COUNT_ESTIMATE_LIMIT, actually count
+COUNT_CACHE_TTL = 60  # seconds to cache the count of a list query, 0 to not cache counts
+FILTER_CACHE_SIZE = 1024  # number of converted filters to keep, see ibutsu_server.filters
+PERMISSIONS_CACHE_TTL = 30  # seconds to cache the projects of a user, 0 to cache per request
 MAX_DOCUMENTS = 100000  # max documents for pagination, when apply_max=True
 JJV_RUN_LIMIT = 8000  # max runs from which to aggregate Jenkins Jobs
 HEATMAP_RUN_LIMIT = 3000  # max runs from which to determine recent Jenkins builds
 SYNC_RUN_TIME = 3 * 60 * 60  # time for searching through aborted runs, 3 hrs in [s]
+INCREMENTAL_RUN_SUMMARY = False  # apply each new result to its run summary, not a recount
+WIDGET_ROLLUPS = True  # keep daily rollups of results and runs for the aggregator widgets
+ROLLUP_BACKFILL_DAYS = 400  # number of days of results and runs that backfill_rollups recounts
+ROLLUP_REFRESH_BATCH_SIZE = 100  # number of days that refresh_rollups recounts per transaction
+WIDGET_CACHE_TTL = 300  # seconds that cached widget data is fresh for, 0 to not cache widgets
+# the seconds that the cached data of some types of widgets is fresh for, see WIDGET_CACHE_TTL
+WIDGET_CACHE_TTLS = {
+    "importance-component": 900,
+    "jenkins-analysis-view": 900,
+    "jenkins-bar-chart": 900,
+    "jenkins-heatmap": 900,
+    "jenkins-line-chart": 900,
+    "result-summary": 120,
+}
+WIDGET_CACHE_STALE_TTL = 24 * 60 * 60  # seconds that stale widget data is returned while refreshed
+WIDGET_REFRESH_TIMEOUT = 5 * 60  # seconds before another worker can refresh the same widget
+DASHBOARD_RENDER_WORKERS = 4  # number of widgets of a dashboard that are computed at once
+WIDGET_TASK_TIMEOUT = 10 * 60  # statement timeout of widgets that are computed in a worker [s]
+WIDGET_ASYNC_COST = 50  # widgets estimated to cost this much are computed in a worker, 0 to not
+# the estimated cost of computing some types of widgets, which is multiplied by the number of builds
+# that a widget is computed for, see WIDGET_ASYNC_COST
+WIDGET_COSTS = {
+    "compare-runs-view": 10,
+    "importance-component": 5,
+    "filter-heatmap": 2,
+    "jenkins-heatmap": 2,
+}
+WIDGET_WARMUP_HOUR = 6  # hour of the day to precompute widgets, after the nightly CI [UTC]
+WIDGET_WARMUP_WORKERS = 4  # number of widgets that are precomputed at once
+WIDGET_WARMUP_BUDGET = 30 * 60  # seconds after which no more widgets are precomputed
+WIDGET_WARMUP_VIEWED = 100  # number of the most viewed widgets to precompute
+WIDGET_COMPUTE_TIMES_KEPT = 1000  # number of the most expensive widgets to keep compute times of
+IMPORT_BATCH_SIZE = 500  # number of test cases to insert per transaction when importing
+ARCHIVE_IMPORT_CHUNK_SIZE = 500  # number of results per task when importing an archive
+JUNIT_STREAM_THRESHOLD = 10 * 1024 * 1024  # stream-parse JUnit files this large [B]
+ARTIFACT_STORAGE = "database"  # where to store file content: database, filesystem or s3
+ARTIFACT_COMPRESSION = "none"  # how to compress new file content: none, gzip or zstd
 _ADDITIONAL_FILTERS_PARAM = {
     "name": "additional_filters",
     "description": "Comma-separated list of additional filters, cf. "
@@ -60,6 +120,14 @@ _ADDITIONAL_FILTERS_PARAM = {
     "type": "string",
     "required": False,
 }
+_TRENDS_PARAM = {
+    "name": "trends",
+    "description": "Include the trends of each group under 'trends': its slope, moving average, "
+    "volatility and changepoint.",
+    "type": "boolean",
+    "required": False,
+    "default": False,
+}
 WIDGET_TYPES = {
     "compare-runs-view": {
         "id": "compare-runs-view",
@@ -68,10 +136,27 @@ WIDGET_TYPES = {
         "params": [
             {
                 "name": "additional_filters",
-                "description": "List of filters used for comparison",
+                "description": "List of filters used for comparison, one for each run",
                 "type": "list",
                 "required": True,
-            }
+            },
+            {
+                "name": "category",
+                "description": "Only return the tests whose results differ in this way: "
+                "new_failure, fixed, newly_skipped, missing or changed",
+                "type": "string",
+                "required": False,
+            },
+            {
+                "name": "page",
+                "description": "Desired page of tests to return.",
+                "type": "integer",
+            },
+            {
+                "name": "page_size",
+                "description": "Number of tests on each page",
+                "type": "integer",
+            },
         ],
         "type": "view",
     },
@@ -115,6 +200,7 @@ WIDGET_TYPES = {
                 "required": False,
             },
             _ADDITIONAL_FILTERS_PARAM,
+            _TRENDS_PARAM,
         ],
         "type": "widget",
     },
@@ -149,6 +235,7 @@ WIDGET_TYPES = {
                 "type": "string",
                 "required": False,
             },
+            _TRENDS_PARAM,
         ],
         "type": "widget",
     },
@@ -308,6 +395,13 @@ WIDGET_TYPES = {
                 "required": False,
                 "default": False,
             },
+            {
+                "name": "include_results",
+                "description": "Include the IDs of the results of each cell, under 'result_list'.",
+                "type": "boolean",
+                "required": False,
+                "default": False,
+            },
             {
                 "name": "project",
                 "description": "Filter results by a specific project ID",
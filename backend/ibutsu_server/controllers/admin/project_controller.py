@@ -8,6 +8,7 @@ from ibutsu_server.db.base import session
 from ibutsu_server.db.models import Group, Project, User
 from ibutsu_server.filters import convert_filter
 from ibutsu_server.util.admin import validate_admin
+from ibutsu_server.util.projects import invalidate_user_permissions
 from ibutsu_server.util.query import get_offset
 from ibutsu_server.util.uuid import convert_objectid_to_uuid, is_uuid, validate_uuid
 
@@ -40,6 +41,7 @@ def admin_add_project(body=None, token_info=None, user=None):
         project.users.append(requesting_user)
     session.add(project)
     session.commit()
+    invalidate_user_permissions(requesting_user)
     return project.to_dict(), HTTPStatus.CREATED
 
 
@@ -146,23 +148,27 @@ def admin_update_project(id_, project=None, body=None, token_info=None, user=Non
     project_dict.pop("owner", None)
 
     # handle updating users separately
+    changed_users = [project.owner_id]
     for username in project_dict.pop("users", []):
         user_to_add = db.session.execute(
             db.select(User).filter_by(email=username)
         ).scalar_one_or_none()
         if user_to_add and user_to_add not in project.users:
             project.users.append(user_to_add)
+            changed_users.append(user_to_add)
 
     # Make sure the project owner is in the list of users
     if project_dict.get("owner_id"):
         owner = db.session.get(User, project_dict["owner_id"])
         if owner and owner not in project.users:
             project.users.append(owner)
+        changed_users.append(project_dict["owner_id"])
 
     # update the rest of the project info
     project.update(project_dict)
     session.add(project)
     session.commit()
+    invalidate_user_permissions(*changed_users)
     return project.to_dict()
 
 
@@ -176,6 +182,8 @@ def admin_delete_project(id_, token_info=None, user=None):
     project = db.session.get(Project, id_)
     if not project:
         abort(HTTPStatus.NOT_FOUND)
+    changed_users = [project.owner_id, *project.users]
     session.delete(project)
     session.commit()
+    invalidate_user_permissions(*changed_users)
     return HTTPStatus.OK.phrase, HTTPStatus.OK
@@ -8,6 +8,7 @@ from ibutsu_server.db.base import session
 from ibutsu_server.db.models import Project, User
 from ibutsu_server.filters import convert_filter
 from ibutsu_server.util.admin import validate_admin
+from ibutsu_server.util.projects import invalidate_user_permissions
 from ibutsu_server.util.query import get_offset
 from ibutsu_server.util.uuid import validate_uuid
 
@@ -100,6 +101,7 @@ def admin_update_user(id_, body=None, token_info=None, user=None):
     requested_user.projects = [db.session.get(Project, project["id"]) for project in projects]
     session.add(requested_user)
     session.commit()
+    invalidate_user_permissions(requested_user)
     return _hide_sensitive_fields(requested_user.to_dict())
 
 
@@ -131,6 +133,7 @@ def admin_delete_user(id_, token_info=None, user=None):
         # 5. Finally delete the user
         session.delete(user_to_delete)
         session.commit()
+        invalidate_user_permissions(id_, user)
 
         return HTTPStatus.OK.phrase, HTTPStatus.OK
 
@@ -2,14 +2,21 @@ import json
 from datetime import UTC, datetime
 from http import HTTPStatus
 
-import magic
-from flask import make_response, request
+from flask import current_app, request
+from werkzeug.wsgi import wrap_file
 
 from ibutsu_server.db import db
 from ibutsu_server.db.base import session
 from ibutsu_server.db.models import Artifact, Result, Run, User
 from ibutsu_server.util.projects import add_user_filter, project_has_user
 from ibutsu_server.util.query import get_offset
+from ibutsu_server.util.storage import (
+    CONTENT_TYPE_BUFFER_SIZE,
+    delete_stored_content,
+    get_content_type,
+    release_content,
+    store_content,
+)
 from ibutsu_server.util.uuid import is_uuid, validate_uuid
 
 # Maximum file size for uploads (5MB)
@@ -45,17 +52,66 @@ def _get_form_param(form, *keys):
     return None
 
 
-def _build_artifact_response(id_):
-    """Build a response for the artifact"""
-    artifact = db.session.get(Artifact, id_)
-    if not artifact:
-        return HTTPStatus.NOT_FOUND.phrase, HTTPStatus.NOT_FOUND
-    # Create a response with the contents of this file
-    response = make_response(artifact.content, HTTPStatus.OK)
-    # Set the content type and the file name
-    file_type = magic.from_buffer(artifact.content, mime=True)
-    response.headers["Content-Type"] = file_type
-    return artifact, response
+def _get_content_type(artifact):
+    """Get the content type of the artifact, detecting and saving it for older artifacts"""
+    if artifact.data and artifact.data.get("contentType"):
+        return artifact.data["contentType"]
+    with artifact.open_content() as file_object:
+        content_type = get_content_type(file_object.read(CONTENT_TYPE_BUFFER_SIZE))
+    artifact.data = {**(artifact.data or {}), "contentType": content_type}
+    session.add(artifact)
+    session.commit()
+    return content_type
+
+
+def _accepts_stored_encoding(artifact):
+    """Check if the stored content of the artifact can be sent to the client as it is
+
+    Gzipped content is passed through to clients that accept gzip, rather than decompressing it,
+    unless they've asked for a range of the (uncompressed) content.
+    """
+    return (
+        artifact.content_encoding == "gzip"
+        and request.accept_encodings["gzip"] > 0
+        and request.range is None
+    )
+
+
+def _build_artifact_response(artifact):
+    """Build a response that streams the contents of the artifact in chunks
+
+    The response supports range requests, and conditional requests using the hash of the content
+    as the ETag and the upload date as the Last-Modified date.
+    """
+    content_type = _get_content_type(artifact)
+    send_stored_encoding = _accepts_stored_encoding(artifact)
+    file_object = (
+        artifact.open_stored_content() if send_stored_encoding else artifact.open_content()
+    )
+    response = current_app.response_class(
+        wrap_file(request.environ, file_object, buffer_size=CHUNK_SIZE),
+        mimetype=content_type,
+        direct_passthrough=True,
+    )
+    response.last_modified = artifact.upload_date
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    if artifact.content_encoding:
+        response.vary.add("Accept-Encoding")
+    if send_stored_encoding:
+        # The compressed content is a different representation, so it needs its own ETag, and
+        # its length isn't known without reading it
+        response.content_encoding = artifact.content_encoding
+        if artifact.content_hash:
+            response.set_etag(f"{artifact.content_hash}-{artifact.content_encoding}")
+        return response.make_conditional(request.environ)
+    if artifact.content_hash:
+        response.set_etag(artifact.content_hash)
+    if artifact.content_size is not None:
+        response.content_length = artifact.content_size
+    return response.make_conditional(
+        request.environ, accept_ranges=True, complete_length=artifact.content_size
+    )
 
 
 @validate_uuid
@@ -67,12 +123,14 @@ def view_artifact(id_, token_info=None, user=None):
 
     :rtype: file
     """
-    artifact, response = _build_artifact_response(id_)
+    artifact = db.session.get(Artifact, id_)
+    if not artifact:
+        return HTTPStatus.NOT_FOUND.phrase, HTTPStatus.NOT_FOUND
     if (artifact.result and not project_has_user(artifact.result.project, user)) or (
         artifact.run and not project_has_user(artifact.run.project, user)
     ):
         return HTTPStatus.FORBIDDEN.phrase, HTTPStatus.FORBIDDEN
-    return response
+    return _build_artifact_response(artifact)
 
 
 @validate_uuid
@@ -84,9 +142,12 @@ def download_artifact(id_, token_info=None, user=None):
 
     :rtype: file
     """
-    artifact, response = _build_artifact_response(id_)
+    artifact = db.session.get(Artifact, id_)
+    if not artifact:
+        return HTTPStatus.NOT_FOUND.phrase, HTTPStatus.NOT_FOUND
     if not project_has_user(artifact.result.project, user):
         return HTTPStatus.FORBIDDEN.phrase, HTTPStatus.FORBIDDEN
+    response = _build_artifact_response(artifact)
     response.headers["Content-Disposition"] = f"attachment; filename={artifact.filename}"
     return response
 
@@ -308,15 +369,20 @@ def upload_artifact(body=None, token_info=None, user=None):
             if not project_has_user(run.project, user):
                 raise BadRequestError(HTTPStatus.FORBIDDEN.phrase, HTTPStatus.FORBIDDEN)
 
+        # Detect the content type once, rather than every time the artifact is viewed
+        data = _parse_additional_metadata(additional_metadata)
+        content = _read_file_with_size_limit(file_, MAX_UPLOAD_SIZE)
+        data["contentType"] = get_content_type(content)
+
         # Create the artifact with snake_case field names (DB model convention)
         artifact = Artifact(
             filename=filename,
             result_id=result_id,
             run_id=run_id,
-            content=_read_file_with_size_limit(file_, MAX_UPLOAD_SIZE),
             upload_date=datetime.now(UTC),
-            data=_parse_additional_metadata(additional_metadata),
+            data=data,
         )
+        artifact.set_content(store_content(content, Artifact.__tablename__))
 
         session.add(artifact)
         session.commit()
@@ -340,6 +406,8 @@ def delete_artifact(id_, token_info=None, user=None):
         return HTTPStatus.NOT_FOUND.phrase, HTTPStatus.NOT_FOUND
     if not project_has_user(artifact.result.project, user):
         return HTTPStatus.FORBIDDEN.phrase, HTTPStatus.FORBIDDEN
+    unreferenced_keys = release_content([artifact.storage_key])
     session.delete(artifact)
     session.commit()
+    delete_stored_content(unreferenced_keys)
     return HTTPStatus.OK.phrase, HTTPStatus.OK
@@ -1,9 +1,11 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from http import HTTPStatus
 
-from flask import request
+from flask import Response, current_app, request
 from sqlalchemy import update
 
-from ibutsu_server.constants import RESPONSE_JSON_REQ
+from ibutsu_server.constants import DASHBOARD_RENDER_WORKERS, RESPONSE_JSON_REQ, WIDGET_TYPES
+from ibutsu_server.controllers.widget_controller import _compute_widget, _get_widget_params
 from ibutsu_server.db import db
 from ibutsu_server.db.base import session
 from ibutsu_server.db.models import Dashboard, Project, User, WidgetConfig
@@ -11,6 +13,7 @@ from ibutsu_server.filters import convert_filter
 from ibutsu_server.util.projects import project_has_user
 from ibutsu_server.util.query import get_offset
 from ibutsu_server.util.uuid import validate_uuid
+from ibutsu_server.util.widget import share_queries
 
 
 def add_dashboard(body=None, token_info=None, user=None):
@@ -52,6 +55,109 @@ def get_dashboard(id_, token_info=None, user=None):
     return dashboard.to_dict()
 
 
+def _render_widget(widget):
+    """Compute the data of a widget of a dashboard, or the error that it can't be computed with"""
+    rendered = {key: widget[key] for key in ("id", "widget", "title")}
+    if widget["forbidden"]:
+        return {**rendered, "error": HTTPStatus.FORBIDDEN.phrase, "status": HTTPStatus.FORBIDDEN}
+    if widget["widget"] not in WIDGET_TYPES:
+        return {**rendered, "error": "Widget not found", "status": HTTPStatus.NOT_FOUND}
+    params, invalid_params = _get_widget_params(widget["widget"], widget["params"])
+    if invalid_params:
+        return {
+            **rendered,
+            "error": f"Invalid parameters for widget '{widget['widget']}': "
+            f"{', '.join(invalid_params)}",
+            "status": HTTPStatus.BAD_REQUEST,
+        }
+    data, status = _compute_widget(widget["widget"], params)
+    if status != HTTPStatus.OK:
+        return {**rendered, "error": data, "status": status}
+    return {**rendered, "data": data, "status": status}
+
+
+def _render_widgets(widgets):
+    """Compute the widgets of a dashboard concurrently, and iterate over them as they're computed
+
+    Each widget is computed in a thread with its own app context, and so its own database
+    session. The widgets share the queries that are decorated with ``shared_query``.
+
+    The app is looked up before the iterator is returned, because a streamed response is iterated
+    after the app context of the request has been popped.
+    """
+    app = current_app._get_current_object()
+    max_workers = app.config.get("DASHBOARD_RENDER_WORKERS", DASHBOARD_RENDER_WORKERS)
+    context = share_queries()
+
+    def render(widget):
+        with app.app_context():
+            return _render_widget(widget)
+
+    def iter_rendered():
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # A context can only be entered by one thread at a time, but its copies share the
+            # queries
+            futures = [executor.submit(context.copy().run, render, widget) for widget in widgets]
+            for future in as_completed(futures):
+                yield future.result()
+
+    return iter_rendered()
+
+
+@validate_uuid
+def render_dashboard(id_, stream=False, token_info=None, user=None):
+    """Compute the data of all the widgets of a dashboard
+
+    :param id: ID of the dashboard
+    :type id: str
+    :param stream: Stream the widgets as newline-delimited JSON, in the order they're computed
+    :type stream: bool
+
+    :rtype: DashboardRender
+    """
+    dashboard = db.session.get(Dashboard, id_)
+    if not dashboard:
+        return "Dashboard not found", HTTPStatus.NOT_FOUND
+    if dashboard.project and not project_has_user(dashboard.project, user):
+        return HTTPStatus.FORBIDDEN.phrase, HTTPStatus.FORBIDDEN
+    widget_configs = db.session.scalars(
+        db.select(WidgetConfig)
+        .where(WidgetConfig.dashboard_id == dashboard.id, WidgetConfig.type == "widget")
+        .order_by(WidgetConfig.weight.asc())
+    ).all()
+
+    # Check the projects of the widgets once, rather than for each widget
+    has_project = {None: True, dashboard.project_id: True}
+    widgets = []
+    for widget_config in widget_configs:
+        project_id = widget_config.project_id
+        if project_id not in has_project:
+            has_project[project_id] = project_has_user(widget_config.project, user)
+        # Like the dashboard page, widgets are computed for the project of their config
+        params = dict(widget_config.params or {})
+        if project_id:
+            params["project"] = str(project_id)
+        widgets.append(
+            {
+                "id": str(widget_config.id),
+                "widget": widget_config.widget,
+                "title": widget_config.title,
+                "params": params,
+                "forbidden": not has_project[project_id],
+            }
+        )
+
+    if stream:
+        json = current_app.json
+        lines = (json.dumps(widget) + "\n" for widget in _render_widgets(widgets))
+        return Response(lines, mimetype="application/x-ndjson")
+    rendered = {widget["id"]: widget for widget in _render_widgets(widgets)}
+    return {
+        "dashboard_id": str(dashboard.id),
+        "widgets": [rendered[widget["id"]] for widget in widgets],
+    }
+
+
 def get_dashboard_list(
     filter_=None, project_id=None, page=1, page_size=25, token_info=None, user=None
 ):
@@ -12,6 +12,7 @@ from ibutsu_server.filters import convert_filter
 from ibutsu_server.tasks.importers import run_archive_import, run_junit_import
 from ibutsu_server.util.projects import get_project, project_has_user
 from ibutsu_server.util.query import get_offset
+from ibutsu_server.util.storage import store_content
 from ibutsu_server.util.uuid import validate_uuid
 
 
@@ -121,7 +122,8 @@ def add_import(
     )
     session.add(new_import)
     session.commit()
-    new_file = ImportFile(import_id=new_import.id, content=import_file.read())
+    new_file = ImportFile(import_id=new_import.id)
+    new_file.set_content(store_content(import_file.read(), ImportFile.__tablename__))
     session.add(new_file)
     session.commit()
     if import_file.filename.endswith(".xml"):
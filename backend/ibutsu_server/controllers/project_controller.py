@@ -8,7 +8,11 @@ from ibutsu_server.db.base import session
 from ibutsu_server.db.models import Project, Result, User
 from ibutsu_server.filters import convert_filter
 from ibutsu_server.util import flat_dict_keys
-from ibutsu_server.util.projects import add_user_filter, project_has_user
+from ibutsu_server.util.projects import (
+    add_user_filter,
+    invalidate_user_permissions,
+    project_has_user,
+)
 from ibutsu_server.util.query import get_offset
 from ibutsu_server.util.uuid import convert_objectid_to_uuid, is_uuid, validate_uuid
 
@@ -35,6 +39,7 @@ def add_project(body=None, token_info=None, user=None):
         project.users.append(requesting_user)
     session.add(project)
     session.commit()
+    invalidate_user_permissions(requesting_user)
     return project.to_dict(), HTTPStatus.CREATED
 
 
@@ -141,17 +146,22 @@ def update_project(id_, body=None, token_info=None, user=None, **_kwargs):
     # Use body parameter if provided, otherwise get from request
     body_data = body if body is not None else request.get_json()
     updates = body_data.copy()
+    changed_users = [project.owner_id]
     for username in updates.pop("users", []):
         user_to_add = db.session.execute(
             db.select(User).filter_by(email=username)
         ).scalar_one_or_none()
         if user_to_add and user_to_add not in project.users:
             project.users.append(user_to_add)
+            changed_users.append(user_to_add)
 
     # update the rest of the project info
     project.update(updates)
     session.add(project)
     session.commit()
+    # the update may have moved the project to a new owner
+    changed_users.append(project.owner_id)
+    invalidate_user_permissions(*changed_users)
     return project.to_dict()
 
 
@@ -1,18 +1,27 @@
 from datetime import UTC, datetime
 from http import HTTPStatus
 
-from flask import request
+from flask import current_app, request
 
-from ibutsu_server.constants import RESPONSE_JSON_REQ
+from ibutsu_server.constants import INCREMENTAL_RUN_SUMMARY, RESPONSE_JSON_REQ
 from ibutsu_server.db import db
 from ibutsu_server.db.base import session
 from ibutsu_server.db.models import Result, User
 from ibutsu_server.filters import convert_filter, has_project_filter
+from ibutsu_server.tasks.runs import add_result_to_run
 from ibutsu_server.util import merge_dicts
-from ibutsu_server.util.count import get_count_estimate
-from ibutsu_server.util.projects import add_user_filter, get_project, project_has_user
-from ibutsu_server.util.query import get_offset, query_as_task
+from ibutsu_server.util.count import get_cached_count, get_total_count, invalidate_counts
+from ibutsu_server.util.pagination import decode_cursor, get_page
+from ibutsu_server.util.projects import (
+    add_user_filter,
+    get_project,
+    get_user_permissions,
+    project_has_user,
+)
+from ibutsu_server.util.query import count_in_task, get_offset, get_pagination, query_as_task
+from ibutsu_server.util.rollups import mark_rollups_dirty
 from ibutsu_server.util.uuid import validate_uuid
+from ibutsu_server.util.widget_cache import invalidate_widgets
 
 
 def _validate_and_set_project(result, user):
@@ -77,11 +86,25 @@ def add_result(result=None, token_info=None, user=None):
 
     session.add(result)
     session.commit()
+    invalidate_counts("results")
+    mark_rollups_dirty(result.project_id, result.start_time)
+    invalidate_widgets(result.project_id)
+    if result.run_id and current_app.config.get("INCREMENTAL_RUN_SUMMARY", INCREMENTAL_RUN_SUMMARY):
+        add_result_to_run.delay(result.id)
     return result.to_dict(), HTTPStatus.CREATED
 
 
 @query_as_task
-def get_result_list(filter_=None, page=1, page_size=25, estimate=False, token_info=None, user=None):
+def get_result_list(
+    filter_=None,
+    page=1,
+    page_size=25,
+    estimate=False,
+    cursor=None,
+    async_count=False,
+    token_info=None,
+    user=None,
+):
     """Gets all results
 
     The `filter` parameter takes a list of filters to apply in the form of:
@@ -122,6 +145,10 @@ def get_result_list(filter_=None, page=1, page_size=25, estimate=False, token_in
     :param filter: A list of filters to apply
     :param pageSize: Limit the number of results returned, defaults to 25
     :param page: Offset the results list, defaults to 0
+    :param cursor: Start after the cursor of the previous page, from its ``nextCursor``, rather
+                   than at an offset
+    :param async_count: Return straight away if the count isn't cached, and count the items in a
+                        task, whose ID is returned as the ``countTaskId`` of the pagination
     :param apply_max: Avoid counting the total number of documents, which speeds up the query,
                             but has the drawback of only returning the MAX_DOCUMENTS
                             most recent results.
@@ -146,7 +173,7 @@ def get_result_list(filter_=None, page=1, page_size=25, estimate=False, token_in
         # For non-superadmin users without projects, require project filter
         if (
             not requesting_user.is_superadmin
-            and not requesting_user.projects
+            and not get_user_permissions(requesting_user)["project_ids"]
             and not query_has_project_filter
         ):
             return (
@@ -154,34 +181,33 @@ def get_result_list(filter_=None, page=1, page_size=25, estimate=False, token_in
                 HTTPStatus.BAD_REQUEST,
             )
 
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except ValueError:
+            return f"Bad request, invalid cursor: {cursor}", HTTPStatus.BAD_REQUEST
+
     if filter_:
         for filter_string in filter_:
             filter_clause = convert_filter(filter_string, Result)
             if filter_clause is not None:
                 query = query.where(filter_clause)
 
-    if estimate:
-        total_items = get_count_estimate(query)
+    if async_count:
+        total_items = get_cached_count("results", filter_, requesting_user, estimate=estimate)
     else:
-        total_items = db.session.execute(
-            db.select(db.func.count()).select_from(query.subquery())
-        ).scalar()
+        total_items = get_total_count(query, "results", filter_, requesting_user, estimate=estimate)
 
     offset = get_offset(page, page_size)
-    total_pages = (total_items // page_size) + (1 if total_items % page_size > 0 else 0)
-
-    results = db.session.scalars(
-        query.order_by(Result.start_time.desc()).offset(offset).limit(page_size)
-    ).all()
-    return {
-        "results": [result.to_dict() for result in results],
-        "pagination": {
-            "page": page,
-            "pageSize": page_size,
-            "totalItems": total_items,
-            "totalPages": total_pages,
-        },
-    }
+
+    results, next_cursor = get_page(query, Result, page_size, offset=offset, cursor=cursor)
+    if total_items is None and not cursor and not next_cursor and (results or not offset):
+        # This is the last page, so the count is known without counting
+        total_items = offset + len(results)
+    pagination = get_pagination(page, page_size, total_items, next_cursor)
+    if total_items is None:
+        pagination["countTaskId"] = count_in_task("results", filter_, user, estimate=estimate)
+    return {"results": [result.to_dict() for result in results], "pagination": pagination}
 
 
 @validate_uuid
@@ -233,11 +259,16 @@ def update_result(id_, result=None, token_info=None, user=None, **_kwargs):
         return "Result not found", HTTPStatus.NOT_FOUND
     if not project_has_user(result_obj.project, user):
         return HTTPStatus.FORBIDDEN.phrase, HTTPStatus.FORBIDDEN
+    # The result may move to another project or day, so its old day is recounted too
+    mark_rollups_dirty(result_obj.project_id, result_obj.start_time)
+    old_project_id = result_obj.project_id
     result_obj.update(result_data)
     result_obj.env = result_obj.data.get("env") if result_obj.data else None
     result_obj.component = result_obj.data.get("component") if result_obj.data else None
     session.add(result_obj)
     session.commit()
+    mark_rollups_dirty(result_obj.project_id, result_obj.start_time)
+    invalidate_widgets(old_project_id, result_obj.project_id)
     return result_obj.to_dict()
     result.env = result.data.get("env") if result.data else None
     result.component = result.data.get("component") if result.data else None
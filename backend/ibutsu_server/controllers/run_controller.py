@@ -8,17 +8,25 @@ from ibutsu_server.db import db
 from ibutsu_server.db.base import session
 from ibutsu_server.db.models import Run, User
 from ibutsu_server.filters import convert_filter, has_project_filter
-from ibutsu_server.tasks.runs import update_run as update_run_task
+from ibutsu_server.tasks.runs import (
+    get_run_build,
+    refresh_run_builds,
+    update_run as update_run_task,
+)
 from ibutsu_server.util import merge_dicts
-from ibutsu_server.util.count import get_count_estimate
+from ibutsu_server.util.count import get_cached_count, get_total_count, invalidate_counts
+from ibutsu_server.util.pagination import decode_cursor, get_page
 from ibutsu_server.util.projects import (
     add_user_filter,
     get_project,
     get_project_id,
+    get_user_permissions,
     project_has_user,
 )
-from ibutsu_server.util.query import get_offset, query_as_task
+from ibutsu_server.util.query import count_in_task, get_offset, get_pagination, query_as_task
+from ibutsu_server.util.rollups import mark_rollups_dirty
 from ibutsu_server.util.uuid import validate_uuid
+from ibutsu_server.util.widget_cache import invalidate_widgets
 
 
 def _validate_and_get_project(run, user):
@@ -51,7 +59,16 @@ def _validate_and_get_project(run, user):
 
 
 @query_as_task
-def get_run_list(filter_=None, page=1, page_size=25, estimate=False, token_info=None, user=None):
+def get_run_list(
+    filter_=None,
+    page=1,
+    page_size=25,
+    estimate=False,
+    cursor=None,
+    async_count=False,
+    token_info=None,
+    user=None,
+):
     """Get a list of runs
 
     The `filter` parameter takes a list of filters to apply in the form of:
@@ -92,6 +109,10 @@ def get_run_list(filter_=None, page=1, page_size=25, estimate=False, token_info=
     :param page_size: Limit the number of runs returned, defaults to 25
     :param page: Offset the runs list, defaults to 0
     :param estimate: Estimate the count of runs, defaults to False
+    :param cursor: Start after the cursor of the previous page, from its ``nextCursor``, rather
+                   than at an offset
+    :param async_count: Return straight away if the count isn't cached, and count the items in a
+                        task, whose ID is returned as the ``countTaskId`` of the pagination
 
     :rtype: List[Run]
     """
@@ -113,7 +134,7 @@ def get_run_list(filter_=None, page=1, page_size=25, estimate=False, token_info=
         # For non-superadmin users without projects, require project filter
         if (
             not requesting_user.is_superadmin
-            and not requesting_user.projects
+            and not get_user_permissions(requesting_user)["project_ids"]
             and not query_has_project_filter
         ):
             return (
@@ -121,33 +142,32 @@ def get_run_list(filter_=None, page=1, page_size=25, estimate=False, token_info=
                 HTTPStatus.BAD_REQUEST,
             )
 
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except ValueError:
+            return f"Bad request, invalid cursor: {cursor}", HTTPStatus.BAD_REQUEST
+
     if filter_:
         for filter_string in filter_:
             filter_clause = convert_filter(filter_string, Run)
             if filter_clause is not None:
                 query = query.where(filter_clause)
 
-    if estimate:
-        total_items = get_count_estimate(query)
+    if async_count:
+        total_items = get_cached_count("runs", filter_, requesting_user, estimate=estimate)
     else:
-        total_items = db.session.execute(
-            db.select(db.func.count()).select_from(query.subquery())
-        ).scalar()
+        total_items = get_total_count(query, "runs", filter_, requesting_user, estimate=estimate)
 
     offset = get_offset(page, page_size)
-    total_pages = (total_items // page_size) + (1 if total_items % page_size > 0 else 0)
-    runs = db.session.scalars(
-        query.order_by(Run.start_time.desc()).offset(offset).limit(page_size)
-    ).all()
-    return {
-        "runs": [run.to_dict() for run in runs],
-        "pagination": {
-            "page": page,
-            "pageSize": page_size,
-            "totalItems": total_items,
-            "totalPages": total_pages,
-        },
-    }
+    runs, next_cursor = get_page(query, Run, page_size, offset=offset, cursor=cursor)
+    if total_items is None and not cursor and not next_cursor and (runs or not offset):
+        # This is the last page, so the count is known without counting
+        total_items = offset + len(runs)
+    pagination = get_pagination(page, page_size, total_items, next_cursor)
+    if total_items is None:
+        pagination["countTaskId"] = count_in_task("runs", filter_, user, estimate=estimate)
+    return {"runs": [run.to_dict() for run in runs], "pagination": pagination}
 
 
 @validate_uuid
@@ -195,6 +215,7 @@ def add_run(body=None, token_info=None, user=None):
 
     session.add(run)
     session.commit()
+    invalidate_counts("runs")
     update_run_task.apply_async((run.id,), countdown=5)
     return run.to_dict(), HTTPStatus.CREATED
 
@@ -223,9 +244,15 @@ def update_run(id_, body=None, token_info=None, user=None):
         return HTTPStatus.FORBIDDEN.phrase, HTTPStatus.FORBIDDEN
     if not run:
         return "Run not found", HTTPStatus.NOT_FOUND
+    # The run may move to another project, day or Jenkins build, so its old ones are recounted too
+    mark_rollups_dirty(run.project_id, run.start_time)
+    old_project_id = run.project_id
+    old_build = get_run_build(run)
     run.update(body_data)
     session.add(run)
     session.commit()
+    refresh_run_builds(old_build, get_run_build(run))
+    invalidate_widgets(old_project_id, run.project_id)
     update_run_task.apply_async((id_,), countdown=5)
     return run.to_dict()
 
@@ -270,13 +297,24 @@ def bulk_update(filter_=None, page_size=1, body=None, token_info=None, user=None
         return f"No runs found with {filter_}", HTTPStatus.NOT_FOUND
 
     model_runs = []
+    project_ids = set()
+    builds = []
     for run_json in runs:
         run = db.session.get(Run, run_json.get("id"))
+        mark_rollups_dirty(run.project_id, run.start_time)
+        project_ids.add(run.project_id)
+        builds.append(get_run_build(run))
         # update the json dict of the run with the new metadata
         merge_dicts(run_dict, run_json)
         run.update(run_json)
         session.add(run)
         model_runs.append(run)
     session.commit()
+    for run in model_runs:
+        mark_rollups_dirty(run.project_id, run.start_time)
+        project_ids.add(run.project_id)
+        builds.append(get_run_build(run))
+    refresh_run_builds(*builds)
+    invalidate_widgets(*project_ids)
 
     return [run.to_dict() for run in model_runs]
@@ -1,50 +1,32 @@
 import logging
 from http import HTTPStatus
+from uuid import uuid4
 
-from flask import request
+from flask import current_app, request
 from sqlalchemy.exc import OperationalError
 
-from ibutsu_server.constants import ALLOWED_TRUE_BOOLEANS, WIDGET_TYPES
-from ibutsu_server.controllers.widget_config_controller import _validate_widget_params
-from ibutsu_server.widgets.accessibility_analysis import (
-    get_accessibility_analysis_view,
-    get_accessibility_bar_chart,
-)
-from ibutsu_server.widgets.accessibility_dashboard_view import (
-    get_accessibility_dashboard_view,
+from ibutsu_server.constants import (
+    ALLOWED_TRUE_BOOLEANS,
+    WIDGET_ASYNC_COST,
+    WIDGET_COSTS,
+    WIDGET_TYPES,
 )
-from ibutsu_server.widgets.compare_runs_view import get_comparison_data
-from ibutsu_server.widgets.filter_heatmap import get_filter_heatmap
-from ibutsu_server.widgets.importance_component import get_importance_component
-from ibutsu_server.widgets.jenkins_heatmap import get_jenkins_heatmap
-from ibutsu_server.widgets.jenkins_job_analysis import (
-    get_jenkins_analysis_data,
-    get_jenkins_bar_chart,
-    get_jenkins_line_chart,
+from ibutsu_server.controllers.widget_config_controller import _validate_widget_params
+from ibutsu_server.tasks.widgets import compute_widget, refresh_widget
+from ibutsu_server.util.widget_cache import (
+    cache_widget,
+    claim_widget_refresh,
+    get_cached_widget,
+    get_widget_generation,
+    get_widget_ttl,
+    record_compute_time,
+    record_widget_view,
+    register_widget_task,
 )
-from ibutsu_server.widgets.jenkins_job_view import get_jenkins_job_view
-from ibutsu_server.widgets.result_aggregator import get_recent_result_data
-from ibutsu_server.widgets.result_summary import get_result_summary
-from ibutsu_server.widgets.run_aggregator import get_recent_run_data
+from ibutsu_server.widgets import WIDGET_METHODS
 
 logger = logging.getLogger(__name__)
 
-WIDGET_METHODS = {
-    "compare-runs-view": get_comparison_data,
-    "accessibility-dashboard-view": get_accessibility_dashboard_view,
-    "accessibility-analysis-view": get_accessibility_analysis_view,
-    "accessibility-bar-chart": get_accessibility_bar_chart,
-    "jenkins-analysis-view": get_jenkins_analysis_data,
-    "jenkins-bar-chart": get_jenkins_bar_chart,
-    "jenkins-heatmap": get_jenkins_heatmap,
-    "filter-heatmap": get_filter_heatmap,
-    "importance-component": get_importance_component,
-    "jenkins-job-view": get_jenkins_job_view,
-    "jenkins-line-chart": get_jenkins_line_chart,
-    "run-aggregator": get_recent_run_data,
-    "result-summary": get_result_summary,
-    "result-aggregator": get_recent_result_data,
-}
 RESERVED_PARAMS = {"filter": "filter_"}
 
 
@@ -81,7 +63,12 @@ def _typecast_params(widget_id, params):
             params[param] = params[param][0]
         if param in param_types and param_types[param] == "integer":
             params[param] = int(params[param])
-        elif param in param_types and param_types[param] == "boolean":
+        elif (
+            param in param_types
+            and param_types[param] == "boolean"
+            and isinstance(params[param], str)
+        ):
+            # The parameters of widget configs are already booleans
             params[param] = params[param].lower()[0] in ALLOWED_TRUE_BOOLEANS
         elif param in param_types and param_types[param] == "float":
             params[param] = float(params[param])
@@ -94,6 +81,55 @@ def _typecast_params(widget_id, params):
     return params
 
 
+def _is_expensive(id_, params):
+    """Estimate whether a widget is too expensive to compute in a request, see WIDGET_COSTS"""
+    async_cost = current_app.config.get("WIDGET_ASYNC_COST", WIDGET_ASYNC_COST)
+    if not async_cost:
+        return False
+    cost = current_app.config.get("WIDGET_COSTS", WIDGET_COSTS).get(id_, 0)
+    return cost * params.get("builds", 1) >= async_cost
+
+
+def _start_widget_task(id_, params):
+    """Compute a widget in a task, or get the task that's computing it already"""
+    task_id = str(uuid4())
+    running_task_id = register_widget_task(id_, params, task_id)
+    if running_task_id == task_id:
+        compute_widget.apply_async((id_, params), task_id=task_id)
+    return {
+        "task_id": running_task_id,
+        "message": f"Widget '{id_}' is being computed in a task. Once complete, its data can be "
+        f"found under 'data' by performing a GET on /task/{running_task_id}",
+        "query_endpoint": f"/task/{running_task_id}",
+    }
+
+
+def _get_widget_data(id_, params, in_task=False):
+    """Get the data of a widget from the cache, or compute and cache it if it isn't cached
+
+    Stale data is returned as well, while a worker computes the widget again.
+
+    :param in_task: Compute the widget in a task if it isn't cached
+    :return: The data and an OK status, or the task that computes it and an ACCEPTED status
+    """
+    ttl = get_widget_ttl(id_)
+    record_widget_view(id_, params)
+    cached = get_cached_widget(id_, params) if ttl else None
+    if cached is not None:
+        data, is_fresh = cached
+        if not is_fresh and claim_widget_refresh(id_, params):
+            refresh_widget.delay(id_, params)
+        return data, HTTPStatus.OK
+    if in_task:
+        return _start_widget_task(id_, params), HTTPStatus.ACCEPTED
+    generation = get_widget_generation(params) if ttl else None
+    with record_compute_time(id_, params):
+        data = WIDGET_METHODS[id_](**params)
+    if ttl:
+        cache_widget(id_, params, data, generation)
+    return data, HTTPStatus.OK
+
+
 def get_widget_types(type_=None):
     """Get the types of widgets that are available
 
@@ -114,35 +150,28 @@ def get_widget_types(type_=None):
     }
 
 
-def get_widget(id_):
-    """Get dashboard widget data
-
-    :param id: The ID of the widget
-    :type id: str
+def _get_widget_params(id_, params):
+    """Convert the parameters of a widget from a request or a widget config, and validate them
 
-    :rtype: object
+    :return: The valid parameters, and the names of the parameters that aren't valid
     """
-    if id_ not in WIDGET_TYPES:
-        return "Widget not found", HTTPStatus.NOT_FOUND
-    params = {}
-    for key in request.args:
-        params[key] = request.args.getlist(key)
     params = _pre_process_params(params, id_)
     params = _typecast_params(id_, params)
 
     # Validate against the central schema in WIDGET_TYPES[id_]["params"]
     validated_params = _validate_widget_params(id_, params)
+    return validated_params, set(params.keys()) - set(validated_params.keys())
 
-    # Check if any invalid parameters were provided
-    invalid_params = set(params.keys()) - set(validated_params.keys())
-    if invalid_params:
-        return (
-            f"Invalid parameters for widget '{id_}': {', '.join(invalid_params)}",
-            HTTPStatus.BAD_REQUEST,
-        )
 
+def _compute_widget(id_, params, in_task=False):
+    """Get the data of a widget, with the status of the response
+
+    :param in_task: Compute the widget in a task if it isn't cached
+    :return: The data and an OK status, the task that computes it and an ACCEPTED status, or an
+        error message and the status of the error
+    """
     try:
-        return WIDGET_METHODS[id_](**validated_params)
+        return _get_widget_data(id_, params, in_task)
     except TypeError as e:
         # Handle any remaining parameter issues
         return f"Parameter error for widget '{id_}': {e!s}", HTTPStatus.BAD_REQUEST
@@ -153,3 +182,36 @@ def get_widget(id_):
         # Handle any runtime errors in widget processing
         logger.exception(f"Error processing widget '{id_}': {e!s}")
         return f"Error processing widget '{id_}': {e!s}", HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+def get_widget(id_, async_=False):
+    """Get dashboard widget data
+
+    Widgets that are estimated to be expensive, or all widgets with ``async_``, are computed in a
+    task if they aren't cached, with a longer timeout than requests have.
+
+    :param id: The ID of the widget
+    :type id: str
+    :param async_: Compute the widget in a task if it isn't cached
+    :type async_: bool
+
+    :rtype: object
+    """
+    if id_ not in WIDGET_TYPES:
+        return "Widget not found", HTTPStatus.NOT_FOUND
+    params = {}
+    for key in request.args:
+        if key != "async":
+            params[key] = request.args.getlist(key)
+    validated_params, invalid_params = _get_widget_params(id_, params)
+
+    # Check if any invalid parameters were provided
+    if invalid_params:
+        return (
+            f"Invalid parameters for widget '{id_}': {', '.join(invalid_params)}",
+            HTTPStatus.BAD_REQUEST,
+        )
+
+    in_task = async_ or _is_expensive(id_, validated_params)
+    data, status = _compute_widget(id_, validated_params, in_task)
+    return data if status == HTTPStatus.OK else (data, status)
@@ -5,6 +5,7 @@ session = db.session
 Model = db.Model
 Boolean = db.Boolean
 Column = db.Column
+Date = db.Date
 DateTime = db.DateTime
 Float = db.Float
 ForeignKey = db.ForeignKey
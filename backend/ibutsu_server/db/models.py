@@ -1,22 +1,29 @@
 from datetime import datetime
+from io import BytesIO
 from uuid import uuid4
 
 # SQLAlchemy 2.0+ imports
 from sqlalchemy import (
+    DDL,
+    FetchedValue,
+    Index,
     Text as sa_text,  # noqa: N813
     cast as sa_cast,
     delete as sqlalchemy_delete,
+    event,
     func,
+    text,
     update as sqlalchemy_update,
 )
 from sqlalchemy.ext.hybrid import hybrid_property
-from sqlalchemy.orm import backref
+from sqlalchemy.orm import backref, mapped_column, validates
 from sqlalchemy_json import mutable_json_type
 
 from ibutsu_server.auth import check_password_hash, generate_password_hash
 from ibutsu_server.db.base import (
     Boolean,
     Column,
+    Date,
     DateTime,
     Float,
     ForeignKey,
@@ -30,6 +37,12 @@ from ibutsu_server.db.base import (
 )
 from ibutsu_server.db.types import PortableJSON, PortableUUID
 from ibutsu_server.util import merge_dicts
+from ibutsu_server.util.storage import (
+    get_content_metadata,
+    get_stored_content,
+    open_decompressed,
+    open_stored_content,
+)
 
 
 def _gen_uuid():
@@ -46,9 +59,15 @@ users_projects = Table(
 
 class ModelMixin:
     id = Column(PortableUUID(), primary_key=True, default=_gen_uuid, unique=True, nullable=False)
+    # Columns that the database derives from other columns, which are left out of the dict
+    derived_columns = ()
 
     def to_dict(self):
-        record_dict = {c.key: getattr(self, c.key) for c in inspect(self).mapper.column_attrs}
+        record_dict = {
+            c.key: getattr(self, c.key)
+            for c in inspect(self).mapper.column_attrs
+            if c.key not in self.derived_columns
+        }
         # when outputting info, translate data to metadata
         if "data" in record_dict:
             record_dict["metadata"] = record_dict.pop("data") or {}
@@ -91,11 +110,72 @@ class ModelMixin:
 
 
 class FileMixin(ModelMixin):
-    content = Column(LargeBinary)
+    """A model with file content
+
+    The content is stored under ``storage_key``, either on the ``ContentBlob`` that's shared by
+    every file with the same content, or in a storage backend. Files that were stored before that
+    have their content in the deferred ``content`` column, so it is only loaded when it's
+    accessed. The size and hash of the content are stored alongside it, so they are available
+    without loading it. If the content is compressed, the codec is stored in
+    ``content_encoding``, and the size and hash are those of the uncompressed content.
+
+    Content from ``store_content`` is set with ``set_content``, along with its metadata. Content
+    that's assigned to ``content`` directly is taken to be uncompressed.
+    """
+
+    content = mapped_column(LargeBinary, deferred=True)
+    content_size = Column(Integer)
+    content_hash = Column(Text)
+    content_encoding = Column(Text)
+    storage_key = Column(Text)
+
+    @validates("content")
+    def _set_content_metadata(self, _key, content):
+        # Cleared content keeps the metadata of the file that was uploaded
+        if content is not None:
+            self.content_encoding = None
+            self.storage_key = None
+            for key, value in get_content_metadata(content).items():
+                setattr(self, key, value)
+        return content
+
+    def set_content(self, values):
+        """Set the content of the file, and its metadata, from the column values of stored content
+
+        :param values: The column values that ``store_content`` returned
+        """
+        self.content = values.get("content")
+        # The metadata is set after the content, so that it's that of the uncompressed content
+        self.content_encoding = values.get("content_encoding")
+        self.storage_key = values.get("storage_key")
+        self.content_size = values["content_size"]
+        self.content_hash = values["content_hash"]
+
+    def open_stored_content(self):
+        """Open the content of the file as it's stored, i.e. still compressed if it is"""
+        if self.storage_key:
+            return open_stored_content(self.storage_key)
+        return BytesIO(self.content or b"")
+
+    def open_content(self):
+        """Open the content of the file as a binary file object, wherever it's stored"""
+        return open_decompressed(self.open_stored_content(), self.content_encoding)
+
+    def read_content(self):
+        """Get the content of the file, wherever it's stored"""
+        if self.content_encoding:
+            with self.open_content() as file_object:
+                return file_object.read()
+        if self.storage_key:
+            return get_stored_content(self.storage_key)
+        return self.content
 
     def to_dict(self):
-        record_dict = {c.key: getattr(self, c.key) for c in inspect(self).mapper.column_attrs}
-        record_dict.pop("content")
+        record_dict = {
+            c.key: getattr(self, c.key)
+            for c in inspect(self).mapper.column_attrs
+            if c.key not in ("content", "content_encoding", "storage_key")
+        }
         if "data" in record_dict:
             record_dict["additional_metadata"] = record_dict.pop("data") or {}
         return record_dict
@@ -110,6 +190,19 @@ class Artifact(Model, FileMixin):
     upload_date = Column(DateTime, default=func.now(), nullable=False, index=True)
 
 
+class ContentBlob(Model, ModelMixin):
+    """A stored file, which is shared by every file row with the same content
+
+    Without a storage backend the file's content is kept in the deferred ``content`` column.
+    """
+
+    __tablename__ = "content_blobs"
+    key = Column(Text, unique=True, nullable=False, index=True)
+    content = mapped_column(LargeBinary, deferred=True)
+    content_size = Column(Integer)
+    reference_count = Column(Integer, nullable=False, default=0)
+
+
 class Dashboard(Model, ModelMixin):
     __tablename__ = "dashboards"
     title = Column(Text, index=True)
@@ -145,6 +238,56 @@ class ImportFile(Model, FileMixin):
     )
 
 
+class JenkinsBuild(Model, ModelMixin):
+    """The runs of a Jenkins build in a project, summed up for the Jenkins widgets
+
+    Each row is recounted from the runs of the build when one of them is updated, see
+    ibutsu_server.tasks.runs.refresh_jenkins_build. The job name and build number columns are
+    named like the promoted columns of runs, so the same filters apply to both.
+    """
+
+    __tablename__ = "jenkins_builds"
+    # NULLs are distinct in a unique index, so the builds without a project have their own index
+    __table_args__ = (
+        Index(
+            "ix_jenkins_builds_build",
+            "jenkins_job_name",
+            "jenkins_build_number",
+            "project_id",
+            unique=True,
+            postgresql_where=text("project_id IS NOT NULL"),
+            sqlite_where=text("project_id IS NOT NULL"),
+        ),
+        Index(
+            "ix_jenkins_builds_build_no_project",
+            "jenkins_job_name",
+            "jenkins_build_number",
+            unique=True,
+            postgresql_where=text("project_id IS NULL"),
+            sqlite_where=text("project_id IS NULL"),
+        ),
+    )
+    project_id = Column(PortableUUID(), ForeignKey("projects.id"), index=True)
+    jenkins_job_name = Column(Text, nullable=False)
+    jenkins_build_number = Column(Integer, nullable=False)
+    build_url = Column(Text)
+    env = Column(Text)
+    source = Column(Text)
+    run_count = Column(Integer)
+    xfailures = Column(Integer)
+    xpasses = Column(Integer)
+    failures = Column(Integer)
+    errors = Column(Integer)
+    skips = Column(Integer)
+    tests = Column(Integer)
+    # The counts and pass percentage of each component of the build
+    components = Column(mutable_json_type(dbtype=PortableJSON()))
+    min_start_time = Column(DateTime)
+    max_start_time = Column(DateTime, index=True)
+    total_execution_time = Column(Float)
+    max_duration = Column(Float)
+
+
 class Project(Model, ModelMixin):
     __tablename__ = "projects"
     name = Column(Text, index=True)
@@ -192,7 +335,22 @@ class Project(Model, ModelMixin):
             setattr(self, key, value)
 
 
-class Result(Model, ModelMixin):
+class PromotedMetadataMixin:
+    """A model with metadata fields that are promoted to real columns
+
+    Filtering and grouping by a field in the JSON metadata can't use the ordinary indexes, and
+    extracts the field from every row, so the fields that are used the most (see _PROMOTED_FIELDS
+    in ibutsu_server.filters) are copied into columns of their own. The database keeps them in
+    sync with the metadata with a trigger, so they are never written directly. A build number that
+    isn't an integer is NULL.
+    """
+
+    derived_columns = ("jenkins_job_name", "jenkins_build_number")
+    jenkins_job_name = Column(Text, FetchedValue(), server_onupdate=FetchedValue())
+    jenkins_build_number = Column(Integer, FetchedValue(), server_onupdate=FetchedValue())
+
+
+class Result(Model, PromotedMetadataMixin, ModelMixin):
     """
     Result model representing individual test results.
 
@@ -216,9 +374,17 @@ class Result(Model, ModelMixin):
     - ix_results_result_satver_project_id_run_id_snapver: Composite with JSON fields
     - ix_results_requirements: GIN index on data->'requirements'
     - ix_results_tags: GIN index on data->'tags'
+
+    The Jenkins job name and build number are promoted from the metadata to real columns, which
+    are kept in sync with the metadata by a trigger (see PromotedMetadataMixin).
     """
 
     __tablename__ = "results"
+    __table_args__ = (
+        # For keyset pagination, see ibutsu_server.util.pagination
+        Index("ix_results_start_time_id", "start_time", "id"),
+        Index("ix_results_promoted_jenkins", "jenkins_job_name", "jenkins_build_number"),
+    )
     artifacts = relationship("Artifact")
     component = Column(Text, index=True)
     # this is metadata but it is a reserved attr
@@ -235,7 +401,30 @@ class Result(Model, ModelMixin):
     artifacts = relationship("Artifact", backref="result")
 
 
-class Run(Model, ModelMixin):
+class ResultRollup(Model, ModelMixin):
+    """The number of results of a project on a day, for each combination of RESULT_ROLLUP_FIELDS
+
+    The aggregator widgets read these instead of counting the results, see
+    ibutsu_server.util.rollups. Each day of a project is recounted from the results after they
+    are added or changed, so the rows of a day are replaced rather than updated.
+    """
+
+    __tablename__ = "result_rollups"
+    __table_args__ = (Index("ix_result_rollups_project_id_day", "project_id", "day"),)
+    project_id = Column(PortableUUID(), ForeignKey("projects.id"))
+    day = Column(Date, nullable=False, index=True)
+    component = Column(Text)
+    env = Column(Text)
+    result = Column(Text)
+    source = Column(Text)
+    jenkins_job_name = Column(Text)
+    classification = Column(Text)
+    assignee = Column(Text)
+    exception_name = Column(Text)
+    count = Column(Integer)
+
+
+class Run(Model, PromotedMetadataMixin, ModelMixin):
     """
     Run model representing a collection of test results.
 
@@ -255,9 +444,17 @@ class Run(Model, ModelMixin):
     - ix_runs_summary: GIN index on summary JSONB field
     - ix_runs_tags: GIN index on data->'tags'
     - ix_runs_pass_percent: Expression index on ((summary->>'pass_percent')::int)
+
+    The Jenkins job name and build number are promoted from the metadata to real columns, which
+    are kept in sync with the metadata by a trigger (see PromotedMetadataMixin).
     """
 
     __tablename__ = "runs"
+    __table_args__ = (
+        # For keyset pagination, see ibutsu_server.util.pagination
+        Index("ix_runs_start_time_id", "start_time", "id"),
+        Index("ix_runs_promoted_jenkins", "jenkins_job_name", "jenkins_build_number"),
+    )
     artifacts = relationship("Artifact")
     component = Column(Text, index=True)
     created = Column(DateTime, default=func.now(), nullable=False, index=True)
@@ -273,6 +470,87 @@ class Run(Model, ModelMixin):
     artifacts = relationship("Artifact", backref="run")
 
 
+class RunRollup(Model, ModelMixin):
+    """The runs of a project on a day, summed up for each combination of RUN_ROLLUP_FIELDS
+
+    The counts are the sums of the same summary fields as the run aggregator widget reads, see
+    ibutsu_server.util.rollups. Like ResultRollup, the rows of a day are replaced when the runs of
+    the day are recounted.
+    """
+
+    __tablename__ = "run_rollups"
+    __table_args__ = (Index("ix_run_rollups_project_id_day", "project_id", "day"),)
+    project_id = Column(PortableUUID(), ForeignKey("projects.id"))
+    day = Column(Date, nullable=False, index=True)
+    component = Column(Text)
+    env = Column(Text)
+    source = Column(Text)
+    jenkins_job_name = Column(Text)
+    run_count = Column(Integer)
+    xfailed = Column(Integer)
+    xpassed = Column(Integer)
+    failures = Column(Integer)
+    errors = Column(Integer)
+    skips = Column(Integer)
+    tests = Column(Integer)
+
+
+# The triggers that keep the promoted columns in sync with the metadata. These are also created by
+# the 2c7f4d8e6a19 migration, which backfills the columns of existing rows.
+_PROMOTE_METADATA_FUNCTION = """\
+CREATE OR REPLACE FUNCTION promote_metadata() RETURNS trigger AS $$
+BEGIN
+    NEW.jenkins_job_name := NEW.data->'jenkins'->>'job_name';
+    NEW.jenkins_build_number := CASE
+        WHEN NEW.data->'jenkins'->>'build_number' ~ '^[0-9]{1,9}$'
+        THEN (NEW.data->'jenkins'->>'build_number')::integer
+    END;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql"""
+_PROMOTE_METADATA_TRIGGER = """\
+CREATE TRIGGER {table}_promote_metadata BEFORE INSERT OR UPDATE OF data ON {table}
+FOR EACH ROW EXECUTE FUNCTION promote_metadata()"""
+# SQLite triggers can't modify the new row, so they update it after it's written
+_SQLITE_PROMOTE_METADATA_TRIGGER = """\
+CREATE TRIGGER {table}_promote_metadata_{name} AFTER {event} ON {table}
+BEGIN
+    UPDATE {table} SET
+        jenkins_job_name = CAST(json_extract(NEW.data, '$.jenkins.job_name') AS TEXT),
+        jenkins_build_number = (
+            SELECT CASE
+                WHEN length(build_number) BETWEEN 1 AND 9 AND build_number NOT GLOB '*[^0-9]*'
+                THEN CAST(build_number AS INTEGER)
+            END
+            FROM (
+                SELECT CAST(json_extract(NEW.data, '$.jenkins.build_number') AS TEXT)
+                AS build_number
+            )
+        )
+    WHERE rowid = NEW.rowid;
+END"""
+
+event.listen(
+    Model.metadata,
+    "before_create",
+    DDL(_PROMOTE_METADATA_FUNCTION).execute_if(dialect="postgresql"),
+)
+for _table in (Result.__table__, Run.__table__):
+    event.listen(
+        _table,
+        "after_create",
+        DDL(_PROMOTE_METADATA_TRIGGER.format(table=_table.name)).execute_if(dialect="postgresql"),
+    )
+    for _name, _event in (("insert", "INSERT"), ("update", "UPDATE OF data")):
+        event.listen(
+            _table,
+            "after_create",
+            DDL(
+                _SQLITE_PROMOTE_METADATA_TRIGGER.format(table=_table.name, name=_name, event=_event)
+            ).execute_if(dialect="sqlite"),
+        )
+
+
 class WidgetConfig(Model, ModelMixin):
     __tablename__ = "widget_configs"
     navigable = Column(Boolean, index=True)
@@ -1,10 +1,11 @@
 import re
 from contextlib import suppress
+from functools import lru_cache
 
-from sqlalchemy import Text, cast
+from sqlalchemy import Integer, Text, cast
 from sqlalchemy.dialects.postgresql import array
 
-from ibutsu_server.constants import ARRAY_FIELDS, NUMERIC_FIELDS
+from ibutsu_server.constants import ARRAY_FIELDS, FILTER_CACHE_SIZE, NUMERIC_FIELDS
 from ibutsu_server.db.types import PortableUUID
 
 # gte/lte each have two operator spellings, and both are actively used (not
@@ -51,6 +52,18 @@ _OPERATOR_PATTERN = "|".join(
 FILTER_RE = re.compile(r"(" + FIELD_RE_PATTERN + r")(" + _OPERATOR_PATTERN + r")(.*)")
 FLOAT_RE = re.compile(r"[+-]?(\d+(\.\d*)?|\.\d+)([eE][+-]?\d+)?")
 VERSION_RE = re.compile("([0-9].*[0-9])")
+# The metadata fields that are promoted to indexed columns of results and runs, and their columns.
+# This isn't configurable: the columns are defined by PromotedMetadataMixin, and are filled in by
+# the triggers in ibutsu_server.db.models and the 2c7f4d8e6a19 migration, which all have to be
+# changed along with it.
+_PROMOTED_FIELDS = {
+    "jenkins.job_name": "jenkins_job_name",
+    "jenkins.build_number": "jenkins_build_number",
+}
+# Operators that can be used with promoted integer columns, which are otherwise compared as strings
+INTEGER_OPERATORS = {"=", "!", ">=", "<=", ">", ")", "<", "(", "*"}
+# The triggers that fill the promoted integer columns only promote integers that fit in 32 bits
+PROMOTED_INTEGER_RE = re.compile("[0-9]{1,9}")
 
 
 def _to_int_or_float(value):
@@ -66,6 +79,17 @@ def _to_int_or_float(value):
     return value
 
 
+def _to_promoted_integer(oper, value):
+    """Convert a filter value for a promoted integer column, or None if it can't be converted"""
+    if oper not in INTEGER_OPERATORS:
+        return None
+    values = value.split(";") if oper == "*" else [value]
+    if not all(PROMOTED_INTEGER_RE.fullmatch(item) for item in values):
+        return None
+    values = [int(item) for item in values]
+    return values if oper == "*" else values[0]
+
+
 def _null_compare(column, value):
     """To reduce cognitive complexity"""
     if value[0].lower() in ["y", "t", "1"]:
@@ -82,14 +106,32 @@ def _array_compare(oper, column, value):
     return None
 
 
-def string_to_column(field, model):
+def get_promoted_name(field):
+    """Get the name of the column that a metadata field is promoted to, if it is promoted"""
+    prefix, _, path = field.partition(".")
+    if prefix not in ["data", "metadata"]:
+        return None
+    return _PROMOTED_FIELDS.get(path)
+
+
+def string_to_column(field, model, promoted=True):
+    """Get the column for a field, which can be a path into the metadata or summary
+
+    :param promoted: Whether to use the column that a metadata field is promoted to, if the model
+                     has one, rather than extracting the field from the metadata
+    """
     field_parts = field.split(".")
 
     # For subqueries, access columns directly via .c
     column_ref = model if not hasattr(model, "c") else model.c
 
-    if field_parts[0] in ["data", "metadata", "summary"]:
-        column = column_ref.summary if field_parts[0] == "summary" else column_ref.data
+    promoted_name = get_promoted_name(field) if promoted else None
+    if promoted_name and hasattr(column_ref, promoted_name):
+        column = getattr(column_ref, promoted_name)
+    elif field_parts[0] in ["data", "metadata", "summary"]:
+        column = getattr(column_ref, "summary" if field_parts[0] == "summary" else "data", None)
+        if column is None:
+            return None
 
         for idx, part in enumerate(field_parts):
             if idx == 0:
@@ -137,6 +179,23 @@ def has_project_filter(filter_list):
 
 
 def convert_filter(filter_string, model):
+    """Convert a filter string into a SQLAlchemy clause, or None if it isn't a valid filter
+
+    The same few filters are used over and over, e.g. by widgets, so the clauses for models are
+    cached. A clause only holds its bound values, so it can be reused in any number of queries.
+    Subqueries are built for each query, so there's no point caching their clauses.
+    """
+    if hasattr(model, "c"):
+        return _convert_filter(filter_string, model)
+    return _convert_model_filter(filter_string, model)
+
+
+@lru_cache(maxsize=FILTER_CACHE_SIZE)
+def _convert_model_filter(filter_string, model):
+    return _convert_filter(filter_string, model)
+
+
+def _convert_filter(filter_string, model):
     match = FILTER_RE.match(filter_string)
     if not match:
         return None
@@ -145,6 +204,12 @@ def convert_filter(filter_string, model):
     value = match.group(3).strip('"')
     is_version = VERSION_RE.match(value) is not None
     column = string_to_column(field, model)
+    if column is not None and isinstance(column.type, Integer) and get_promoted_name(field):
+        integer_value = _to_promoted_integer(oper, value)
+        if integer_value is not None:
+            return OPER_COMPARE[oper](column, integer_value)
+        # e.g. a build number that isn't an integer, which is only in the metadata
+        column = string_to_column(field, model, promoted=False)
     if column is None:
         # Unknown/invalid field -- return None so apply_filters skips the
         # clause instead of producing a 500 or an accidental boolean filter.
@@ -157,8 +222,9 @@ def convert_filter(filter_string, model):
     if oper == "*":
         value = value.split(";")
     elif field in NUMERIC_FIELDS or (not is_version and "build_number" not in field):
-        # Always convert for numeric fields; version-like strings and Jenkins build numbers
-        # are kept as strings because they need string comparison semantics.
+        # Always convert for numeric fields. Version-like strings are compared as strings, and so
+        # are the build numbers that aren't compared as integers with a promoted column above,
+        # e.g. non-integer build numbers, or the build numbers in the metadata of a subquery.
         value = _to_int_or_float(value)
     if is_array_field:
         return _array_compare(oper, column, value)
@@ -2,13 +2,44 @@ import logging
 from datetime import UTC, datetime, timedelta
 
 from ibutsu_server.db import db
-from ibutsu_server.db.models import Artifact, Import, ImportFile, Project, Result, Run, User
+from ibutsu_server.db.models import (
+    Artifact,
+    Import,
+    ImportFile,
+    JenkinsBuild,
+    Project,
+    Result,
+    ResultRollup,
+    Run,
+    RunRollup,
+    User,
+)
 from ibutsu_server.tasks import shared_task
+from ibutsu_server.tasks.runs import refresh_jenkins_build
+from ibutsu_server.util.count import invalidate_counts
+from ibutsu_server.util.projects import invalidate_user_permissions
+from ibutsu_server.util.rollups import mark_rollups_dirty
+from ibutsu_server.util.storage import delete_stored_content, release_content
 
 logger = logging.getLogger(__name__)
 DAYS_IN_MONTH = 30
 
 
+def _prune_rollups(rollup, max_date):
+    """Delete the rollups of the days that were pruned, and return the projects of the last day
+
+    The last day was only partly pruned, so it has to be recounted once the pruning is committed.
+    """
+    db.session.execute(rollup.__table__.delete().where(rollup.day < max_date.date()))
+    return (
+        db.session.execute(
+            db.select(rollup.project_id).where(rollup.day == max_date.date()).distinct()
+        )
+        .scalars()
+        .all()
+    )
+
+
 @shared_task
 def prune_old_files(months=5):
     """Delete artifact files older than specified months (here defined as 30 days)."""
@@ -22,9 +53,21 @@ def prune_old_files(months=5):
 
         max_date = datetime.now(UTC) - timedelta(days=months * DAYS_IN_MONTH)
         # delete artifact files older than max_date
-        delete_statement = Artifact.__table__.delete().where(Artifact.upload_date < max_date)
+        old_artifacts = Artifact.upload_date < max_date
+        storage_keys = (
+            db.session.execute(
+                db.select(Artifact.storage_key).where(
+                    old_artifacts, Artifact.storage_key.is_not(None)
+                )
+            )
+            .scalars()
+            .all()
+        )
+        delete_statement = Artifact.__table__.delete().where(old_artifacts)
         db.session.execute(delete_statement)
+        unreferenced_keys = release_content(storage_keys)
         db.session.commit()
+        delete_stored_content(unreferenced_keys)
     except Exception:
         # we don't want to continually retry this task
         return
@@ -50,7 +93,11 @@ def prune_old_results(months=6):
         # delete artifact files older than max_date
         delete_statement = Result.__table__.delete().where(Result.start_time < max_date)
         db.session.execute(delete_statement)
+        project_ids = _prune_rollups(ResultRollup, max_date)
         db.session.commit()
+        invalidate_counts("results")
+        for project_id in project_ids:
+            mark_rollups_dirty(project_id, max_date)
     except Exception:
         # we don't want to continually retry this task
         return
@@ -76,7 +123,25 @@ def prune_old_runs(months=12):
         # delete artifact files older than max_date
         delete_statement = Run.__table__.delete().where(Run.start_time < max_date)
         db.session.execute(delete_statement)
+        # and the builds that only had those runs, while the builds that had some of them are
+        # recounted from the runs that are left
+        db.session.execute(
+            JenkinsBuild.__table__.delete().where(JenkinsBuild.max_start_time < max_date)
+        )
+        pruned_builds = db.session.execute(
+            db.select(
+                JenkinsBuild.project_id,
+                JenkinsBuild.jenkins_job_name,
+                JenkinsBuild.jenkins_build_number,
+            ).where(JenkinsBuild.min_start_time < max_date)
+        ).all()
+        for build in pruned_builds:
+            refresh_jenkins_build(*build)
+        project_ids = _prune_rollups(RunRollup, max_date)
         db.session.commit()
+        invalidate_counts("runs")
+        for project_id in project_ids:
+            mark_rollups_dirty(project_id, max_date)
     except Exception:
         # we don't want to continually retry this task
         return
@@ -113,11 +178,23 @@ def prune_old_import_files(days=7):
     max_date = datetime.now(UTC) - timedelta(days=days)
 
     # Delete import records older than max_date
-    # The ON DELETE CASCADE foreign key constraint automatically removes associated import_files
+    # The ON DELETE CASCADE foreign key constraint automatically removes associated import_files,
+    # but any of their content that's in a storage backend has to be deleted separately
+    storage_keys = (
+        db.session.execute(
+            db.select(ImportFile.storage_key)
+            .join(Import, Import.id == ImportFile.import_id)
+            .where(Import.created < max_date, ImportFile.storage_key.is_not(None))
+        )
+        .scalars()
+        .all()
+    )
     delete_statement = Import.__table__.delete().where(Import.created < max_date)
     result = db.session.execute(delete_statement)
     deleted_count = result.rowcount
+    unreferenced_keys = release_content(storage_keys)
     db.session.commit()
+    delete_stored_content(unreferenced_keys)
 
     return f"Deleted {deleted_count} import records older than {days} days"
 
@@ -143,16 +220,31 @@ def clear_import_file_content(import_id):
         if import_record.status not in ("done", "error"):
             return f"Import {import_id} status is {import_record.status}, not clearing content"
 
-        # Find and clear the import file content
+        # Find the size of the import file content, without loading the content itself
+        has_content = db.and_(
+            ImportFile.import_id == import_id,
+            db.or_(
+                ImportFile.storage_key.is_not(None),
+                db.and_(ImportFile.content.is_not(None), db.func.length(ImportFile.content) > 0),
+            ),
+        )
         import_file = db.session.execute(
-            db.select(ImportFile).where(ImportFile.import_id == import_id)
-        ).scalar_one_or_none()
-
-        if import_file and import_file.content:
-            content_size = len(import_file.content)
-            import_file.content = None
-            db.session.add(import_file)
+            db.select(
+                db.func.coalesce(ImportFile.content_size, db.func.length(ImportFile.content)),
+                ImportFile.storage_key,
+            ).where(has_content)
+        ).one_or_none()
+
+        if import_file:
+            content_size, storage_key = import_file
+            db.session.execute(
+                db.update(ImportFile)
+                .where(has_content)
+                .values(content=None, content_encoding=None, storage_key=None)
+            )
+            unreferenced_keys = release_content([storage_key])
             db.session.commit()
+            delete_stored_content(unreferenced_keys)
             return f"Cleared {content_size} bytes from import_file for import {import_id}"
 
         return f"No content to clear for import {import_id}"
@@ -208,6 +300,7 @@ def seed_users(projects):
                 print(f"Project with name {project_name} not found.")
                 continue
 
+            changed_users = [project.owner_id]
             # create/set the project owner
             if project_info.get("owner"):
                 project_owner = db.session.execute(
@@ -237,7 +330,9 @@ def seed_users(projects):
                     user.projects.append(project)
 
                 db.session.add(user)
+                changed_users.append(user)
             db.session.commit()
+            invalidate_user_permissions(*changed_users, project.owner_id)
 
     except Exception as e:
         # we don't want to continually retry this task
@@ -2,19 +2,31 @@ import json
 import re
 import tarfile
 from datetime import UTC, datetime
-from io import BytesIO
+from uuid import uuid4
 
+from celery import chord
 from celery.utils.log import get_task_logger
 from dateutil import parser
-from lxml import objectify
-
+from flask import current_app
+from lxml import etree, objectify
+from sqlalchemy.orm import undefer
+
+from ibutsu_server.constants import (
+    ARCHIVE_IMPORT_CHUNK_SIZE,
+    IMPORT_BATCH_SIZE,
+    JUNIT_STREAM_THRESHOLD,
+)
 from ibutsu_server.db import db
 from ibutsu_server.db.models import Artifact, Import, ImportFile, Result, Run
 from ibutsu_server.tasks import shared_task
 from ibutsu_server.tasks.db import clear_import_file_content
-from ibutsu_server.tasks.runs import update_run
+from ibutsu_server.tasks.runs import get_run_build, refresh_run_builds, update_run
+from ibutsu_server.util.count import invalidate_counts
 from ibutsu_server.util.projects import get_project_id
+from ibutsu_server.util.rollups import mark_run_rollups_dirty
+from ibutsu_server.util.storage import get_content_type, store_content
 from ibutsu_server.util.uuid import is_uuid
+from ibutsu_server.util.widget_cache import invalidate_widgets
 
 log = get_task_logger(__name__)
 uuid_pattern = re.compile(
@@ -23,45 +35,153 @@ uuid_pattern = re.compile(
 )
 
 
+def _build_archive_result(run_id, result, project_id=None, metadata=None):
+    """Build a new result from a ``result.json`` in an archive, used in the archive importer
+
+    The ID of the result is the one it's imported with, see ``run_archive_import``.
+    """
+    result["run_id"] = run_id
+    if project_id:
+        result["project_id"] = project_id
+    if metadata:
+        result["metadata"] = result.get("metadata", {})
+        result["metadata"].update(metadata)
+    # promote user_properties to the level of metadata
+    if "user_properties" in result.get("metadata", {}):
+        user_properties = result["metadata"].pop("user_properties")
+        result["metadata"].update(user_properties)
+    result["env"] = result.get("metadata", {}).get("env")
+    result["component"] = result.get("metadata", {}).get("component")
+    return Result.from_dict(**result)
+
+
+def _get_import_file(import_id):
+    """Get the file of an import, with its content"""
+    return db.session.execute(
+        db.select(ImportFile)
+        .where(ImportFile.import_id == import_id)
+        .options(undefer(ImportFile.content))
+    ).scalar_one_or_none()
+
+
+def _iter_archive_members(import_id, names):
+    """Stream the archive of an import, and yield the members with the given names and contents
+
+    The archive is only read as far as the last of the members, and never loaded as a whole.
+    """
+    remaining = set(names)
+    if not remaining:
+        return
+    import_file = _get_import_file(import_id)
+    with (
+        import_file.open_content() as file_object,
+        tarfile.open(fileobj=file_object, mode="r|*") as tar,
+    ):
+        for member in tar:
+            if member.name not in remaining:
+                continue
+            yield member, tar.extractfile(member).read()
+            remaining.discard(member.name)
+            if not remaining:
+                return
+
+
+def _add_archive_artifact(name, content, result_id=None, run_id=None):
+    """Add an artifact of a result or a run from an archive import"""
+    data = {"contentType": get_content_type(content)}
+    if result_id:
+        data["resultId"] = result_id
+    if run_id:
+        data["runId"] = run_id
+    artifact = Artifact(filename=name.split("/")[-1], result_id=result_id, run_id=run_id, data=data)
+    artifact.set_content(store_content(content, Artifact.__tablename__))
+    db.session.add(artifact)
+
+
 @shared_task
-def _create_result(tar, run_id, result, artifacts, project_id=None, metadata=None):
-    """Create a result with artifacts, used in the archive importer"""
-    old_id = None
-    result_id = result.get("id")
-    result_record = db.session.get(Result, result_id) if is_uuid(result_id) else None
-    if result_record:
-        result_record.run_id = run_id
-    else:
-        old_id = result["id"]
-        if "id" in result:
-            result.pop("id")
-        result["run_id"] = run_id
-        if project_id:
-            result["project_id"] = project_id
-        if metadata:
-            result["metadata"] = result.get("metadata", {})
-            result["metadata"].update(metadata)
-        # promote user_properties to the level of metadata
-        if "user_properties" in result.get("metadata", {}):
-            user_properties = result["metadata"].pop("user_properties")
-            result["metadata"].update(user_properties)
-        result["env"] = result.get("metadata", {}).get("env")
-        result["component"] = result.get("metadata", {}).get("component")
-        result_record = Result.from_dict(**result)
-    db.session.add(result_record)
-    db.session.commit()
-    result = result_record.to_dict()
-    for artifact in artifacts:
-        db.session.add(
-            Artifact(
-                filename=artifact.name.split("/")[-1],
-                result_id=result["id"],
-                data={"contentType": "text/plain", "resultId": result["id"]},
-                content=tar.extractfile(artifact).read(),
-            )
-        )
+def _import_archive_chunk(import_id, run_id, members, project_id=None, metadata=None):
+    """Import a chunk of the results of an archive import, and their artifacts, in one transaction
+
+    Each chunk streams the archive itself, and only reads its own members. Results that already
+    exist keep their ID and are moved to the run, the rest get a new ID.
+
+    :param members: The names of the archive members of this chunk, which are the ``result.json``
+        of each of its results, their artifacts, and in the first chunk the run's artifacts
+    :return: The number of results in the chunk
+    """
+    archive_ids = {name.split("/")[1] for name in members if name.count("/") == 2}
+    existing = {
+        str(result.id): result
+        for result in db.session.scalars(db.select(Result).where(Result.id.in_(archive_ids)))
+    }
+    result_ids = {
+        archive_id: archive_id if archive_id in existing else str(uuid4())
+        for archive_id in archive_ids
+    }
+    added = set(existing)
+    # The artifacts of a new result have to wait for its result.json, if they come before it
+    waiting = {}
+    count = 0
+    for member, content in _iter_archive_members(import_id, members):
+        _run_id, rest = member.name.split("/", 1)
+        if "/" not in rest:
+            _add_archive_artifact(member.name, content, run_id=run_id)
+            continue
+        archive_id = rest.split("/")[0]
+        if not member.name.endswith("result.json"):
+            if archive_id in added:
+                _add_archive_artifact(member.name, content, result_id=result_ids[archive_id])
+            else:
+                waiting.setdefault(archive_id, []).append((member.name, content))
+            continue
+        count += 1
+        if archive_id in existing:
+            existing[archive_id].run_id = run_id
+        else:
+            result = json.loads(content)
+            result["id"] = result_ids[archive_id]
+            db.session.add(_build_archive_result(run_id, result, project_id, metadata))
+        added.add(archive_id)
+        for name, artifact_content in waiting.pop(archive_id, []):
+            _add_archive_artifact(name, artifact_content, result_id=result_ids[archive_id])
     db.session.commit()
-    return old_id
+    return count
+
+
+def _invalidate_archive_import(run_id):
+    """Invalidate the counts, rollups and widgets that an archive import changed"""
+    invalidate_counts("results", "runs")
+    if run_id:
+        run = db.session.get(Run, run_id)
+        mark_run_rollups_dirty(run_id)
+        invalidate_widgets(run.project_id if run else None)
+        update_run.delay(run_id)
+
+
+@shared_task
+def _finish_archive_import(_chunk_counts, import_id, run_id):
+    """Finish an archive import once all of its chunks are done"""
+    import_record = db.session.get(Import, import_id)
+    log.info("Setting import status to done")
+    _update_import_status(import_record, "done")
+    _invalidate_archive_import(run_id)
+
+    # Clear the import file content to save database space
+    # The import record is kept for audit/history, but the large binary content is removed
+    clear_import_file_content.delay(import_id)
+
+
+@shared_task
+def _fail_archive_import(import_id, run_id):
+    """Mark an archive import as failed, when one of its chunks failed to import
+
+    The results that were imported are kept, so the run is still updated from them.
+    """
+    log.error(f"Archive import {import_id} failed")
+    import_record = db.session.get(Import, import_id)
+    _update_import_status(import_record, "error")
+    _invalidate_archive_import(run_id)
+    clear_import_file_content.delay(import_id)
 
 
 @shared_task
@@ -113,39 +233,43 @@ def _process_result(result_dict, testcase):
     return result_dict, traceback
 
 
-@shared_task
-def _add_artifacts(result, testcase, traceback):
-    """To reduce cognitive complexity"""
+def _get_testcase_artifacts(result_id, testcase, traceback):
+    """Build the artifact rows for a testcase, ready for a bulk insert"""
+    files = []
     if traceback:
-        db.session.add(
-            Artifact(
-                filename="traceback.log",
-                result_id=result.id,
-                data={"contentType": "text/plain", "resultId": result.id},
-                content=traceback,
-            )
-        )
+        files.append(("traceback.log", traceback))
     if testcase.find("system-out") is not None:
-        system_out = bytes(str(testcase["system-out"]), "utf8")
-        db.session.add(
-            Artifact(
-                filename="system-out.log",
-                result_id=result.id,
-                data={"contentType": "text/plain", "resultId": result.id},
-                content=system_out,
-            )
-        )
+        files.append(("system-out.log", bytes(str(testcase["system-out"]), "utf8")))
     if testcase.find("system-err") is not None:
-        system_err = bytes(str(testcase["system-err"]), "utf8")
-        db.session.add(
-            Artifact(
-                filename="system-err.log",
-                result_id=result.id,
-                data={"contentType": "text/plain", "resultId": result.id},
-                content=system_err,
-            )
-        )
+        files.append(("system-err.log", bytes(str(testcase["system-err"]), "utf8")))
+    return [
+        {
+            "filename": filename,
+            "result_id": result_id,
+            "data": {"contentType": "text/plain", "resultId": result_id},
+            **store_content(content, Artifact.__tablename__),
+        }
+        for filename, content in files
+    ]
+
+
+@shared_task
+def _add_artifacts(result, testcase, traceback):
+    """To reduce cognitive complexity"""
+    if artifacts := _get_testcase_artifacts(result.id, testcase, traceback):
+        db.session.execute(db.insert(Artifact), artifacts)
+    db.session.commit()
+
+
+def _flush_import_batch(results, artifacts):
+    """Bulk insert the buffered results and artifacts, and commit them as a single transaction"""
+    if results:
+        db.session.execute(db.insert(Result), results)
+    if artifacts:
+        db.session.execute(db.insert(Artifact), artifacts)
     db.session.commit()
+    results.clear()
+    artifacts.clear()
 
 
 def _get_properties(xml_element: objectify.Element) -> dict:
@@ -210,22 +334,73 @@ def _get_test_name_path(testcase):
     return test_name, backup_fspath
 
 
-@shared_task
-def run_junit_import(import_):  # noqa: PLR0912
-    """Import a test run from a JUnit file"""
-    # Update the status of the import
-    import_record = db.session.get(Import, import_["id"])
-    _update_import_status(import_record, "running")
-    # Fetch the file contents
-    import_file = db.session.execute(
-        db.select(ImportFile).where(ImportFile.import_id == import_["id"])
-    ).scalar_one_or_none()
-    if not import_file:
-        _update_import_status(import_record, "error")
-        return
-    # Parse the XML and create a run object(s)
-    tree = objectify.fromstring(import_file.content)
-    import_record.data["run_id"] = []
+def _iter_junit_tree(tree):
+    """Yield ``(event, element)`` pairs for a fully parsed JUnit tree
+
+    The events are ``"run"`` for the root element, ``"testsuite"`` for every test suite and
+    ``"testcase"`` for every test case in that suite, in document order.
+    """
+    yield "run", tree
+    # Handle structures where testsuite is/isn't the top level tag
+    for ts in _get_ts_element(tree):
+        yield "testsuite", ts
+        for testcase in ts.iterchildren(tag="testcase"):
+            yield "testcase", testcase
+
+
+def _detach_processed(element):
+    """Clear an element we're done with and drop it, and its older siblings, from the tree"""
+    element.clear(keep_tail=True)
+    parent = element.getparent()
+    if parent is not None:
+        while (previous := element.getprevious()) is not None:
+            parent.remove(previous)
+
+
+def _iterparse_junit(source):
+    """Incrementally parse a JUnit XML file, yielding the same events as ``_iter_junit_tree``
+
+    The root and testsuite elements are yielded as soon as their leading ``<properties>`` have
+    been parsed, and each testcase once its closing tag has been seen. Testcases and testsuites
+    are cleared and detached once they've been processed, so memory use stays roughly constant
+    regardless of the size of the file.
+    """
+    context = etree.iterparse(
+        source, events=("start", "end"), remove_blank_text=True, huge_tree=True
+    )
+    context.set_element_class_lookup(objectify.ObjectifyElementClassLookup())
+    root = suite = None
+    pending = []
+    for event, element in context:
+        parent = element.getparent()
+        if event == "start":
+            if root is None:
+                root = element
+                pending.append(("run", root))
+                if root.tag == "testsuite":
+                    suite = root
+                    pending.append(("testsuite", suite))
+            elif element.tag != "properties" and (parent is root or parent is suite):
+                # Everything before the first child has been parsed, so the properties are ready
+                yield from pending
+                pending.clear()
+                if parent is root and suite is None and element.tag == "testsuite":
+                    suite = element
+                    pending.append(("testsuite", suite))
+        elif element.tag == "testcase" and suite is not None and parent is suite:
+            yield "testcase", element
+            _detach_processed(element)
+        elif element is suite or element is root:
+            yield from pending
+            pending.clear()
+            if element is suite:
+                suite = None
+                if element is not root:
+                    _detach_processed(element)
+
+
+def _create_junit_run(tree, import_record):
+    """Create the run from the root element of a JUnit XML file"""
     # Use current time as start time if no start time is present
     start_time = parser.parse(tree.get("timestamp")) if tree.get("timestamp") else datetime.now(UTC)
     run_dict = {
@@ -274,9 +449,93 @@ def run_junit_import(import_):  # noqa: PLR0912
     run = Run.from_dict(**run_dict)
     db.session.add(run)
     db.session.commit()
-    run_dict = run.to_dict()
     import_record.run_id = run.id
     import_record.data["run_id"].append(run.id)
+    return run, run.to_dict(), metadata
+
+
+def _add_testsuite_totals(run_data, ts):
+    """Add the counts from a testsuite element to the run totals"""
+    run_data["duration"] += float(ts.get("time", 0.0))
+    run_data["errors"] += int(ts.get("errors", 0))
+    run_data["failures"] += int(ts.get("failures", 0))
+    run_data["skips"] += int(ts.get("skipped", 0))
+    run_data["xfailures"] += int(ts.get("xfailures", 0))
+    run_data["xpasses"] += int(ts.get("xpasses", 0))
+    run_data["tests"] += int(ts.get("tests", 0))
+
+
+def _import_testcase(run_dict, import_data, metadata, ts_info, testcase, batch):
+    """Buffer a result, and its artifacts, from a testcase element into the batch
+
+    This only works with plain values rather than ORM objects, as those are expired by every
+    batch commit and would otherwise be reloaded from the database for each test case.
+    """
+    test_name, backup_fspath = _get_test_name_path(testcase)
+    result_dict = {
+        "test_id": test_name,
+        "start_time": run_dict["start_time"],
+        "duration": float(testcase.get("time") or 0),
+        "run_id": run_dict["id"],
+        "metadata": {
+            "run": run_dict["id"],
+            "fspath": ts_info["fspath"] or testcase.get("file") or backup_fspath,
+            "line": testcase.get("line"),
+        },
+        "params": {},
+        "source": ts_info["source"],
+    }
+
+    # If there are any properties set by the importer, overwrite with those
+    if import_data.get("project_id"):
+        result_dict["project_id"] = import_data["project_id"]
+    if import_data.get("source"):
+        result_dict["source"] = import_data["source"]
+
+    # If the JUnit XML has a properties object, add those properties in
+    result_properties = {}
+    result_properties.update(metadata)
+    result_properties.update(ts_info["properties"])
+    result_properties.update(_get_properties(testcase))
+
+    _populate_result_metadata(run_dict, result_dict, result_properties)
+    result_dict, traceback = _process_result(result_dict, testcase)
+
+    # Generate the ID up front, so that the artifacts can reference it before it's inserted
+    result_dict["id"] = str(uuid4())
+    result_dict["data"] = result_dict.pop("metadata")
+    batch["results"].append(result_dict)
+    batch["artifacts"].extend(_get_testcase_artifacts(result_dict["id"], testcase, traceback))
+
+
+@shared_task
+def run_junit_import(import_):  # noqa: PLR0912
+    """Import a test run from a JUnit file
+
+    Files of ``JUNIT_STREAM_THRESHOLD`` bytes or more are parsed incrementally instead of being
+    loaded into a single XML tree, to keep the worker's memory use bounded. Results and artifacts
+    are inserted in batches of ``IMPORT_BATCH_SIZE`` test cases, with one commit per batch.
+    """
+    # Update the status of the import
+    import_record = db.session.get(Import, import_["id"])
+    _update_import_status(import_record, "running")
+    # Fetch the file contents
+    import_file = db.session.execute(
+        db.select(ImportFile)
+        .where(ImportFile.import_id == import_["id"])
+        .options(undefer(ImportFile.content))
+    ).scalar_one_or_none()
+    if not import_file:
+        _update_import_status(import_record, "error")
+        return
+    # Parse the XML, either all at once or as a stream of elements
+    source = import_file.open_content()
+    if (import_file.content_size or 0) >= JUNIT_STREAM_THRESHOLD:
+        log.info(f"Streaming JUnit import for import record {import_record.id}")
+        events = _iterparse_junit(source)
+    else:
+        events = _iter_junit_tree(objectify.parse(source).getroot())
+    import_record.data["run_id"] = []
 
     # If the top level "testsuites" element doesn't have these, we'll need to build them manually
     run_data = {
@@ -289,87 +548,27 @@ def run_junit_import(import_):  # noqa: PLR0912
         "tests": 0,
     }
 
-    # Handle structures where testsuite is/isn't the top level tag
-    testsuites = _get_ts_element(tree)
-
     # Run through the test suites and import all the test results
-    for ts in testsuites:
-        run_data["duration"] += float(ts.get("time", 0.0))
-        run_data["errors"] += int(ts.get("errors", 0))
-        run_data["failures"] += int(ts.get("failures", 0))
-        run_data["skips"] += int(ts.get("skipped", 0))
-        run_data["xfailures"] += int(ts.get("xfailures", 0))
-        run_data["xpasses"] += int(ts.get("xpasses", 0))
-        run_data["tests"] += int(ts.get("tests", 0))
-        fspath = ts.get("file")
-        run_properties = _get_properties(ts)
-
-        for testcase in ts.iterchildren(tag="testcase"):
-            test_name, backup_fspath = _get_test_name_path(testcase)
-            result_dict = {
-                "test_id": test_name,
-                "start_time": run_dict["start_time"],
-                "duration": float(testcase.get("time") or 0),
-                "run_id": run.id,
-                "metadata": {
-                    "run": run.id,
-                    "fspath": fspath or testcase.get("file") or backup_fspath,
-                    "line": testcase.get("line"),
-                },
-                "params": {},
-                "source": ts.get("name"),
+    batch_size = current_app.config.get("IMPORT_BATCH_SIZE", IMPORT_BATCH_SIZE)
+    batch = {"results": [], "artifacts": []}
+    import_data = dict(import_record.data)
+    run = run_dict = metadata = ts_info = None
+    for event, element in events:
+        if event == "run":
+            run, run_dict, metadata = _create_junit_run(element, import_record)
+        elif event == "testsuite":
+            _add_testsuite_totals(run_data, element)
+            ts_info = {
+                "fspath": element.get("file"),
+                "source": element.get("name"),
+                "properties": _get_properties(element),
             }
-
-            # If there are any properties set by the importer, overwrite with those
-            if import_record.data.get("project_id"):
-                result_dict["project_id"] = import_record.data["project_id"]
-            if import_record.data.get("source"):
-                result_dict["source"] = import_record.data["source"]
-
-            # If the JUnit XML has a properties object, add those properties in
-            result_properties = {}
-            result_properties.update(metadata)
-            result_properties.update(run_properties)
-            result_properties.update(_get_properties(testcase))
-
-            _populate_result_metadata(run_dict, result_dict, result_properties)
-            result_dict, traceback = _process_result(result_dict, testcase)
-
-            result = Result.from_dict(**result_dict)
-            db.session.add(result)
-            db.session.commit()
-            _add_artifacts(result, testcase, traceback)
-
-            if traceback:
-                db.session.add(
-                    Artifact(
-                        filename="traceback.log",
-                        result_id=result.id,
-                        data={"contentType": "text/plain", "resultId": result.id},
-                        content=traceback,
-                    )
-                )
-            if testcase.find("system-out") is not None:
-                system_out = bytes(str(testcase["system-out"]), "utf8")
-                db.session.add(
-                    Artifact(
-                        filename="system-out.log",
-                        result_id=result.id,
-                        data={"contentType": "text/plain", "resultId": result.id},
-                        content=system_out,
-                    )
-                )
-            if testcase.find("system-err") is not None:
-                system_err = bytes(str(testcase["system-err"]), "utf8")
-                db.session.add(
-                    Artifact(
-                        filename="system-err.log",
-                        result_id=result.id,
-                        data={"contentType": "text/plain", "resultId": result.id},
-                        content=system_err,
-                    )
-                )
-            db.session.commit()
+        else:
+            _import_testcase(run_dict, import_data, metadata, ts_info, element, batch)
+            if len(batch["results"]) >= batch_size:
+                _flush_import_batch(batch["results"], batch["artifacts"])
+    _flush_import_batch(batch["results"], batch["artifacts"])
+    source.close()
 
     # Check if we need to update the run
     if not run.duration:
@@ -388,9 +587,14 @@ def run_junit_import(import_):  # noqa: PLR0912
         run.summary["tests"] = run_data["tests"]
     db.session.add(run)
     db.session.commit()
+    # The run's summary is complete, so the rollup of its Jenkins build can be recounted from it
+    refresh_run_builds(get_run_build(run))
 
     # Update the status of the import, now that we're all done
     _update_import_status(import_record, "done")
+    invalidate_counts("results", "runs")
+    mark_run_rollups_dirty(run.id)
+    invalidate_widgets(run.project_id)
 
     # Clear the import file content to save database space
     # The import record is kept for audit/history, but the large binary content is removed
@@ -399,7 +603,15 @@ def run_junit_import(import_):  # noqa: PLR0912
 
 @shared_task
 def run_archive_import(import_):  # noqa: PLR0912
-    """Import a test run from an Ibutsu archive file"""
+    """Import a test run from an Ibutsu archive file
+
+    The archive is streamed, never loaded as a whole. This task reads the run and the start times
+    of the results in one pass over it, and then the results are imported in chunks of
+    ``ARCHIVE_IMPORT_CHUNK_SIZE``, each of which reads its own results and their artifacts from the
+    archive. When there's more than one chunk, they're imported in parallel by a Celery chord, and
+    the import is finished off by the chord's callback once every chunk is done. If a chunk fails,
+    the import is marked as failed instead.
+    """
     # Update the status of the import
     import_record = db.session.get(Import, str(import_["id"]))
     log.info(f"Starting archive import for import record {import_record.id}")
@@ -410,22 +622,21 @@ def run_archive_import(import_):  # noqa: PLR0912
     log.info("Setting import status to running")
     _update_import_status(import_record, "running")
     # Fetch the file contents
-    import_file = db.session.execute(
-        db.select(ImportFile).where(ImportFile.import_id == import_["id"])
-    ).scalar_one_or_none()
+    import_file = _get_import_file(import_["id"])
     if not import_file:
         _update_import_status(import_record, "error")
         return
 
-    # First open the tarball and pull in the results
+    # First stream the tarball and find the run, and the members of each result
     run = None
     run_artifacts = []
-    results = []
-    result_artifacts = {}
+    result_members = {}
     start_time = None
-    file_object = BytesIO(import_file.content)
-    with tarfile.open(fileobj=file_object) as tar:
-        for member in tar.getmembers():
+    with (
+        import_file.open_content() as file_object,
+        tarfile.open(fileobj=file_object, mode="r|*") as tar,
+    ):
+        for member in tar:
             # We don't care about directories, skip them
             if member.isdir():
                 continue
@@ -438,78 +649,80 @@ def run_archive_import(import_):  # noqa: PLR0912
                 if member.name.endswith("run.json"):
                     run = json.loads(tar.extractfile(member).read())
                 else:
-                    run_artifacts.append(member)
+                    run_artifacts.append(member.name)
                 continue
             result_id, _file_name = rest.split("/")
             if not is_uuid(result_id):
                 msg = f"Invalid result ID {result_id} in archive import"
                 raise ValueError(msg)
+            result_members.setdefault(result_id, {"result": None, "artifacts": []})
             if member.name.endswith("result.json"):
-                result = json.loads(tar.extractfile(member).read())
-                result_start_time = result.get("start_time")
+                result_start_time = json.loads(tar.extractfile(member).read()).get("start_time")
                 if not start_time or start_time > result_start_time:
                     start_time = result_start_time
-                results.append(result)
+                result_members[result_id]["result"] = member.name
             else:
-                try:
-                    result_artifacts[result_id].append(member)
-                except KeyError:
-                    result_artifacts[result_id] = [member]
-        run_dict = run or {
-            "duration": 0,
-            "summary": {
-                "errors": 0,
-                "failures": 0,
-                "skips": 0,
-                "xfailures": 0,
-                "xpasses": 0,
-                "tests": 0,
-            },
-        }
-        # patch things up a bit, if necessary
-        run_dict["metadata"] = run_dict.get("metadata", {})
-        run_dict["metadata"].update(metadata)
-        _populate_metadata(run_dict, import_record)
-        _populate_created_times(run_dict, start_time)
-
-        # If this run has a valid ID, check if this run exists
-        if is_uuid(run_dict.get("id")):
-            run = db.session.get(Run, run_dict["id"])
-        if run:
-            run.update(run_dict)
-        else:
-            run = Run.from_dict(**run_dict)
-        db.session.add(run)
-        db.session.commit()
-        import_record.run_id = run.id
-        import_record.data["run_id"] = [run.id]
-        # Loop through any artifacts associated with the run and upload them
-        for artifact in run_artifacts:
-            db.session.add(
-                Artifact(
-                    filename=artifact.name.split("/")[-1],
-                    run_id=run.id,
-                    data={"contentType": "text/plain", "runId": run.id},
-                    content=tar.extractfile(artifact).read(),
-                )
-            )
-        # Now loop through all the results, and create or update them
-        for result in results:
-            artifacts = result_artifacts.get(result["id"], [])
-            _create_result(
-                tar,
-                run.id,
-                result,
-                artifacts,
-                project_id=run_dict.get("project_id") or import_record.data.get("project_id"),
-                metadata=metadata,
-            )
-    # Update the import record
-    log.info("Setting import status to done")
-    _update_import_status(import_record, "done")
+                result_members[result_id]["artifacts"].append(member.name)
+
+    run_dict = run or {
+        "duration": 0,
+        "summary": {
+            "errors": 0,
+            "failures": 0,
+            "skips": 0,
+            "xfailures": 0,
+            "xpasses": 0,
+            "tests": 0,
+        },
+    }
+    # patch things up a bit, if necessary
+    run_dict["metadata"] = run_dict.get("metadata", {})
+    run_dict["metadata"].update(metadata)
+    _populate_metadata(run_dict, import_record)
+    _populate_created_times(run_dict, start_time)
+
+    # If this run has a valid ID, check if this run exists
+    if is_uuid(run_dict.get("id")):
+        run = db.session.get(Run, run_dict["id"])
     if run:
-        update_run.delay(run.id)
+        run.update(run_dict)
+    else:
+        run = Run.from_dict(**run_dict)
+    db.session.add(run)
+    db.session.commit()
+    import_record.run_id = run.id
+    import_record.data["run_id"] = [run.id]
+    # The run has to be committed before any of the chunks try to add results to it
+    db.session.commit()
 
-    # Clear the import file content to save database space
-    # The import record is kept for audit/history, but the large binary content is removed
-    clear_import_file_content.delay(import_record.id)
+    # Now split the results up into chunks of member names, the run's artifacts go in the first
+    project_id = run_dict.get("project_id") or import_record.data.get("project_id")
+    chunk_size = current_app.config.get("ARCHIVE_IMPORT_CHUNK_SIZE", ARCHIVE_IMPORT_CHUNK_SIZE)
+    results = [members for members in result_members.values() if members["result"]]
+    chunks = [
+        [
+            name
+            for members in results[index : index + chunk_size]
+            for name in [members["result"], *members["artifacts"]]
+        ]
+        for index in range(0, len(results), chunk_size)
+    ] or [[]]
+    chunks[0][:0] = run_artifacts
+    chunks = [(import_record.id, run.id, chunk, project_id, metadata) for chunk in chunks]
+    if len(chunks) > 1:
+        log.info(f"Importing {len(results)} results in {len(chunks)} chunks")
+        chord(_import_archive_chunk.si(*chunk) for chunk in chunks)(
+            _finish_archive_import.s(import_record.id, run.id).on_error(
+                _fail_archive_import.si(import_record.id, run.id)
+            )
+        )
+        return
+
+    # Not worth farming out to other workers, just import it here
+    try:
+        chunk_counts = [_import_archive_chunk(*chunk) for chunk in chunks]
+        _finish_archive_import(chunk_counts, import_record.id, run.id)
+    except Exception:
+        db.session.rollback()
+        _fail_archive_import(import_record.id, run.id)
+        raise
@@ -1,14 +1,18 @@
 from ibutsu_server.db import db
-from ibutsu_server.db.models import Result, Run
+from ibutsu_server.db.models import Result, Run, User
 from ibutsu_server.filters import convert_filter
 from ibutsu_server.tasks import shared_task
-from ibutsu_server.util.count import get_count_estimate
+from ibutsu_server.util.count import get_count_estimate, get_total_count
+from ibutsu_server.util.pagination import get_page
+from ibutsu_server.util.projects import add_user_filter
 
 TABLENAME_TO_MODEL = {"results": Result, "runs": Run}
 
 
 @shared_task
-def query_task(filter_=None, page=1, page_size=25, estimate=False, tablename="results"):
+def query_task(
+    filter_=None, page=1, page_size=25, estimate=False, tablename="results", cursor=None
+):
     """
     Run a large query as a task.
     """
@@ -32,11 +36,7 @@ def query_task(filter_=None, page=1, page_size=25, estimate=False, tablename="re
     offset = (page * page_size) - page_size
     total_pages = (total_items // page_size) + (1 if total_items % page_size > 0 else 0)
 
-    data = (
-        db.session.execute(query.order_by(model.start_time.desc()).offset(offset).limit(page_size))
-        .scalars()
-        .all()
-    )
+    data, next_cursor = get_page(query, model, page_size, offset=offset, cursor=cursor)
     return {
         tablename: [datum.to_dict() for datum in data],
         "pagination": {
@@ -44,5 +44,28 @@ def query_task(filter_=None, page=1, page_size=25, estimate=False, tablename="re
             "pageSize": page_size,
             "totalItems": total_items,
             "totalPages": total_pages,
+            "nextCursor": next_cursor,
         },
     }
+
+
+@shared_task
+def count_task(tablename="results", filter_=None, user_id=None, estimate=False):
+    """
+    Count the items of a list query as a task, and cache the count for the list endpoint.
+    """
+    model = TABLENAME_TO_MODEL[tablename]
+    user = db.session.get(User, user_id) if user_id else None
+    query = db.select(model)
+    if user:
+        query = add_user_filter(query, user, model=model)
+    if filter_:
+        for filter_string in filter_:
+            filter_clause = convert_filter(filter_string, model)
+            if filter_clause is not None:
+                query = query.where(filter_clause)
+
+    total_items = get_total_count(
+        query, tablename, filter_=filter_, user=user, estimate=estimate, refresh=True
+    )
+    return {"pagination": {"totalItems": total_items}}
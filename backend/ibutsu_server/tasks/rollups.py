@@ -0,0 +1,123 @@
+from datetime import UTC, datetime, timedelta
+
+from celery.utils.log import get_task_logger
+from flask import current_app
+from redis.exceptions import LockError
+
+from ibutsu_server.constants import ROLLUP_BACKFILL_DAYS, ROLLUP_REFRESH_BATCH_SIZE
+from ibutsu_server.db import db
+from ibutsu_server.db.models import Result, ResultRollup, Run, RunRollup
+from ibutsu_server.filters import string_to_column
+from ibutsu_server.tasks import shared_task
+from ibutsu_server.util.redis_lock import lock
+from ibutsu_server.util.rollups import (
+    ROLLUP_FIELDS,
+    get_day_period,
+    mark_rollups_dirty,
+    pop_dirty_days,
+    set_rollups_since,
+    to_day,
+)
+from ibutsu_server.util.widget import create_basic_summary_columns
+
+log = get_task_logger(__name__)
+
+
+def _rollup_columns(model, rollup) -> list:
+    return [
+        string_to_column(field, model).label(column_name)
+        for field, column_name in ROLLUP_FIELDS[rollup].items()
+    ]
+
+
+def _count_columns(rollup) -> list:
+    if rollup is ResultRollup:
+        return [db.func.count(Result.id).label("count")]
+    return [
+        db.func.count(Run.id).label("run_count"),
+        *create_basic_summary_columns(Run, use_alternate_names=True).values(),
+    ]
+
+
+def refresh_rollups_of_day(project_id, day) -> None:
+    """Recount the rollups of the results and runs of a project on a day, without committing"""
+    day_start, day_end = get_day_period(day)
+    for model, rollup in [(Result, ResultRollup), (Run, RunRollup)]:
+        columns = _rollup_columns(model, rollup)
+        rows = db.session.execute(
+            db.select(*columns, *_count_columns(rollup))
+            .where(
+                model.project_id == project_id if project_id else model.project_id.is_(None),
+                model.start_time >= day_start,
+                model.start_time < day_end,
+            )
+            .group_by(*columns)
+        ).all()
+        db.session.execute(
+            db.delete(rollup).where(
+                rollup.project_id == project_id if project_id else rollup.project_id.is_(None),
+                rollup.day == day,
+            )
+        )
+        if rows:
+            db.session.execute(
+                db.insert(rollup),
+                [{**row._asdict(), "project_id": project_id, "day": day} for row in rows],
+            )
+
+
+def _refresh_days(days) -> None:
+    for project_id, day in days:
+        try:
+            with lock(f"refresh-rollup-lock-{project_id}-{day}"):
+                refresh_rollups_of_day(project_id, day)
+                db.session.commit()
+        except LockError:
+            # The day is being recounted already, recount it again once that's done
+            log.warning(f"The rollups of {project_id} on {day} are locked, retrying later")
+            mark_rollups_dirty(project_id, day)
+
+
+@shared_task
+def refresh_rollups() -> None:
+    """Recount the rollups of the days that were marked when their results or runs changed"""
+    batch_size = current_app.config.get("ROLLUP_REFRESH_BATCH_SIZE", ROLLUP_REFRESH_BATCH_SIZE)
+    while days := pop_dirty_days(batch_size):
+        try:
+            _refresh_days(days)
+        except Exception:
+            # Don't lose the days that weren't recounted
+            db.session.rollback()
+            for project_id, day in days:
+                mark_rollups_dirty(project_id, day)
+            raise
+
+
+@shared_task
+def backfill_rollups(days: int = ROLLUP_BACKFILL_DAYS) -> None:
+    """Recount the rollups of every project for the last ``days`` days
+
+    This fills in the rollups after upgrading, and fixes any drift between the rollups and the
+    rows, e.g. when the days couldn't be marked while Redis was unavailable. Once every day is
+    recounted, the widgets read the rollups for any period after the first day.
+    """
+    first_day = datetime.now(UTC).date() - timedelta(days=days)
+    cutoff, _ = get_day_period(first_day)
+    project_days = set()
+    for model, rollup in [(Result, ResultRollup), (Run, RunRollup)]:
+        project_days.update(
+            (project_id, to_day(day))
+            for project_id, day in db.session.execute(
+                db.select(model.project_id, db.func.date(model.start_time))
+                .where(model.start_time >= cutoff)
+                .distinct()
+            )
+        )
+        # Recounting a day that no longer has any rows removes it from the rollup
+        project_days.update(
+            db.session.execute(
+                db.select(rollup.project_id, rollup.day).where(rollup.day >= first_day).distinct()
+            ).all()
+        )
+    _refresh_days(sorted(project_days, key=lambda project_day: (project_day[1], str(project_day))))
+    set_rollups_since(first_day)
@@ -1,16 +1,23 @@
 import logging
 from datetime import UTC, datetime, timedelta
 
+from celery import group
 from redis.exceptions import LockError
+from sqlalchemy.exc import IntegrityError
 
 from ibutsu_server.constants import SYNC_RUN_TIME
 from ibutsu_server.db import db
-from ibutsu_server.db.models import Result, Run
+from ibutsu_server.db.models import JenkinsBuild, Result, Run
+from ibutsu_server.filters import string_to_column
 from ibutsu_server.tasks import shared_task
 from ibutsu_server.util.redis_lock import is_locked, lock
+from ibutsu_server.util.rollups import mark_rollups_dirty
+from ibutsu_server.util.widget import create_time_columns
+from ibutsu_server.util.widget_cache import invalidate_widgets
 
 METADATA_TO_COPY = ["jenkins", "tags"]
 COLUMNS_TO_COPY = ["start_time", "env", "component", "project_id", "source"]
+BUILD_COUNTS = ["xfailures", "xpasses", "failures", "errors", "skips", "tests"]
 
 
 def _copy_result_metadata(result: Result, metadata: dict, key: str) -> None:
@@ -54,9 +61,152 @@ def compute_pass_percent(passes: int, tests: int) -> int:
     return max(min((passes * 100) // tests, 100), 0)
 
 
+def _new_summary(collected: int = 0) -> dict:
+    return {
+        "errors": 0,
+        "failures": 0,
+        "skips": 0,
+        "tests": 0,
+        "xpasses": 0,
+        "xfailures": 0,
+        "collected": collected,
+    }
+
+
+def _apply_result_counts(summary: dict, counts) -> float:
+    """Add ``(status, count, duration)`` rows to a run summary and return their total duration"""
+    duration = 0.0
+    for status, count, status_duration in counts:
+        key = _status_to_summary(status)
+        if key in summary:
+            summary[key] = summary.get(key, 0) + count
+        # update the number of tests that actually ran
+        summary["tests"] += count
+        if status_duration:
+            duration += status_duration
+    return duration
+
+
+def _finish_summary(summary: dict) -> dict:
+    """Fill in the summary fields that are derived from the result counts"""
+    # determine the number of passes
+    summary["passes"] = summary["tests"] - (
+        summary["errors"]
+        + summary["xpasses"]
+        + summary["xfailures"]
+        + summary["failures"]
+        + summary["skips"]
+    )
+    summary["pass_percent"] = compute_pass_percent(summary["passes"], summary["tests"])
+    # determine the number of tests that didn't run
+    summary["not_run"] = max(summary["collected"] - summary["tests"], 0)
+    return summary
+
+
+def _copy_first_result(result, run: Run, metadata: dict) -> None:
+    """Copy columns and metadata from a result to the run, where the run doesn't have them"""
+    for column in COLUMNS_TO_COPY:
+        _copy_column(result, run, column)
+
+    for key in METADATA_TO_COPY:
+        _copy_result_metadata(result, metadata, key)
+
+
+def _build_counts() -> list:
+    return [
+        db.func.coalesce(db.func.sum(Run.summary[key].as_integer()), 0).label(key)
+        for key in BUILD_COUNTS
+    ]
+
+
+def refresh_jenkins_build(project_id, job_name: str, build_number: int) -> None:
+    """Recount the rollup of a Jenkins build from its runs, without committing
+
+    The runs of a build are found with the promoted Jenkins columns, so this only reads the runs
+    of the build. A build that has no runs left is removed from the rollup.
+    """
+    build_runs = [
+        Run.jenkins_job_name == job_name,
+        Run.jenkins_build_number == build_number,
+        Run.project_id == project_id if project_id else Run.project_id.is_(None),
+    ]
+    totals = db.session.execute(
+        db.select(
+            db.func.count(Run.id).label("run_count"),
+            db.func.min(string_to_column("metadata.jenkins.build_url", Run)).label("build_url"),
+            db.func.min(Run.env).label("env"),
+            db.func.min(Run.source).label("source"),
+            *_build_counts(),
+            *create_time_columns(Run).values(),
+        ).where(*build_runs)
+    ).one()
+    build = db.session.execute(
+        db.select(JenkinsBuild).where(
+            JenkinsBuild.jenkins_job_name == job_name,
+            JenkinsBuild.jenkins_build_number == build_number,
+            JenkinsBuild.project_id == project_id
+            if project_id
+            else JenkinsBuild.project_id.is_(None),
+        )
+    ).scalar_one_or_none()
+    if not totals.run_count:
+        if build:
+            db.session.delete(build)
+        return
+
+    components = {}
+    for row in db.session.execute(
+        db.select(Run.component, *_build_counts())
+        .where(*build_runs, Run.component.is_not(None))
+        .group_by(Run.component)
+    ):
+        passes = row.tests - (row.errors + row.failures + row.skips + row.xfailures + row.xpasses)
+        components[row.component] = {
+            "tests": row.tests,
+            "passes": passes,
+            "pass_percent": compute_pass_percent(passes, row.tests),
+        }
+
+    if not build:
+        build = JenkinsBuild(
+            project_id=project_id, jenkins_job_name=job_name, jenkins_build_number=build_number
+        )
+        db.session.add(build)
+    for key, value in totals._mapping.items():
+        setattr(build, key, value)
+    build.components = components
+
+
+def get_run_build(run: Run) -> tuple | None:
+    """Get the project ID, job name and build number of the Jenkins build of a run, if any"""
+    if not run.jenkins_job_name or run.jenkins_build_number is None:
+        return None
+    return (run.project_id, run.jenkins_job_name, run.jenkins_build_number)
+
+
+def refresh_run_builds(*builds: tuple | None) -> None:
+    """Refresh the rollups of some builds, e.g. the builds of a run before and after it changed
+
+    The builds are from ``get_run_build``, and each one is recounted and committed once.
+    """
+    for build in dict.fromkeys(build for build in builds if build):
+        try:
+            refresh_jenkins_build(*build)
+            db.session.commit()
+        except IntegrityError:
+            # Another run of the build added the build to the rollup at the same time, so recount
+            db.session.rollback()
+            refresh_jenkins_build(*build)
+            db.session.commit()
+
+
 @shared_task(max_retries=1000)
 def update_run(run_id: str) -> None:
-    """Update the run summary from the results, this task will retry 1000 times"""
+    """Update the run summary from the results, this task will retry 1000 times
+
+    The counts and durations are aggregated in the database, so no results are loaded other than
+    the columns of the first one, which are copied to the run.
+    """
     # Check this before touching Redis at all: a missing run is a plain DB
     # read, so there's no reason to pay for a lock round-trip (or block
     # waiting on one) for a run_id that doesn't exist.
@@ -71,62 +221,38 @@ def update_run(run_id: str) -> None:
 
     try:
         with lock(lock_name):
+            # the first result may move the run to another project, day or Jenkins build
+            old_day = (run.project_id, run.start_time)
+            old_build = get_run_build(run)
             # initialize some necessary variables
-            summary = {
-                "errors": 0,
-                "failures": 0,
-                "skips": 0,
-                "tests": 0,
-                "xpasses": 0,
-                "xfailures": 0,
-                "collected": run.summary.get("collected", 0) if run.summary else 0,
-            }
-            run.duration = 0.0
+            summary = _new_summary(run.summary.get("collected", 0) if run.summary else 0)
             metadata = run.data or {}
 
-            # Fetch all the results for the runs and calculate the summary
-            results = (
-                db.session.execute(
-                    db.select(Result)
-                    .where(Result.run_id == run_id)
-                    .order_by(Result.start_time.asc())
-                )
-                .scalars()
-                .all()
-            )
+            # on the first result, copy over some metadata
+            first_result = db.session.execute(
+                db.select(*[getattr(Result, column) for column in COLUMNS_TO_COPY], Result.data)
+                .where(Result.run_id == run_id)
+                .order_by(Result.start_time.asc())
+                .limit(1)
+            ).first()
+            if first_result:
+                _copy_first_result(first_result, run, metadata)
 
-            for i, result in enumerate(results):
-                if i == 0:
-                    # on the first result, copy over some metadata
-                    for column in COLUMNS_TO_COPY:
-                        _copy_column(result, run, column)
-
-                    for key in METADATA_TO_COPY:
-                        _copy_result_metadata(result, metadata, key)
-
-                key = _status_to_summary(result.result)
-                if key in summary:
-                    summary[key] = summary.get(key, 0) + 1
-                # update the number of tests that actually ran
-                summary["tests"] += 1
-                if result.duration:
-                    run.duration += result.duration
-
-            # determine the number of passes
-            summary["passes"] = summary["tests"] - (
-                summary["errors"]
-                + summary["xpasses"]
-                + summary["xfailures"]
-                + summary["failures"]
-                + summary["skips"]
-            )
-            summary["pass_percent"] = compute_pass_percent(summary["passes"], summary["tests"])
-            # determine the number of tests that didn't run
-            summary["not_run"] = max(summary["collected"] - summary["tests"], 0)
+            # Count the results and sum up their durations for each status
+            counts = db.session.execute(
+                db.select(Result.result, db.func.count(Result.id), db.func.sum(Result.duration))
+                .where(Result.run_id == run_id)
+                .group_by(Result.result)
+            ).all()
+            run.duration = _apply_result_counts(summary, counts)
 
-            run.update({"summary": summary, "data": metadata})
+            run.update({"summary": _finish_summary(summary), "metadata": metadata})
             db.session.add(run)
             db.session.commit()
+            refresh_run_builds(old_build, get_run_build(run))
+            mark_rollups_dirty(*old_day)
+            mark_rollups_dirty(run.project_id, run.start_time)
+            invalidate_widgets(old_day[0], run.project_id)
     except LockError:
         # Lost a race to acquire the lock after the is_locked() check above --
         # another update_run for this run is already in progress. Discard rather
@@ -134,6 +260,58 @@ def update_run(run_id: str) -> None:
         logging.warning(f"{lock_name}: Lock acquisition failed, discarding.")
 
 
+@shared_task(bind=True, max_retries=1000)
+def add_result_to_run(self, result_id: str) -> None:
+    """Apply a single new result to its run's summary, rather than recounting the whole run
+
+    This is used instead of ``update_run`` when ``INCREMENTAL_RUN_SUMMARY`` is enabled. Unlike
+    ``update_run`` a delta can't just be discarded when the run is locked, so it is retried
+    instead, up to ``max_retries`` times, after which the run is recounted. Any drift between the
+    summary and the results, e.g. from a delta that's applied after a full recount that already
+    included the result, is fixed by ``sync_aborted_runs``.
+    """
+    result = db.session.execute(
+        db.select(
+            Result.run_id,
+            Result.result,
+            Result.duration,
+            *[getattr(Result, column) for column in COLUMNS_TO_COPY],
+            Result.data,
+        ).where(Result.id == result_id)
+    ).first()
+    if not result or not result.run_id:
+        return
+    run = db.session.get(Run, result.run_id)
+    if not run:
+        return
+
+    try:
+        with lock(f"update-run-lock-{run.id}"):
+            summary = {**_new_summary(), **(run.summary or {})}
+            metadata = run.data or {}
+            old_day = (run.project_id, run.start_time)
+            old_build = get_run_build(run)
+            if not summary["tests"]:
+                _copy_first_result(result, run, metadata)
+            run.duration = (run.duration or 0.0) + _apply_result_counts(
+                summary, [(result.result, 1, result.duration)]
+            )
+            run.update({"summary": _finish_summary(summary), "metadata": metadata})
+            db.session.add(run)
+            db.session.commit()
+            refresh_run_builds(old_build, get_run_build(run))
+            mark_rollups_dirty(*old_day)
+            mark_rollups_dirty(run.project_id, run.start_time)
+            invalidate_widgets(old_day[0], run.project_id)
+    except LockError:
+        if self.request.retries >= self.max_retries:
+            logging.warning(f"update-run-lock-{run.id}: Run is still locked, recounting it instead")
+            update_run.delay(run.id)
+            return
+        logging.warning(f"update-run-lock-{run.id}: Run is locked, retrying result {result_id}")
+        raise self.retry(countdown=1) from None
+
+
 @shared_task(max_retries=1)
 def sync_aborted_runs() -> None:
     """
@@ -142,28 +320,62 @@ def sync_aborted_runs() -> None:
     Run in the database.
 
     This periodic task will search through recent runs and compare 'summary.tests' to the actual
-    number of results. If there is a mismatch, it will run the 'update_run' task on the Run.id.
+    number of results in a single query. The 'update_run' tasks for the mismatched runs are then
+    sent as one group, so the cost of this task depends on the number of mismatches.
     """
-    # fetch recent runs
-    runs = db.session.execute(
-        db.select(Run).where(
-            Run.start_time > (datetime.now(UTC) - timedelta(seconds=SYNC_RUN_TIME))
+    recent_runs = Run.start_time > (datetime.now(UTC) - timedelta(seconds=SYNC_RUN_TIME))
+
+    # count the results of all the recent runs in one go
+    result_counts = (
+        db.select(Result.run_id, db.func.count(Result.id).label("result_count"))
+        .join(Run, Run.id == Result.run_id)
+        .where(recent_runs)
+        .group_by(Result.run_id)
+        .subquery()
+    )
+
+    # only fetch the runs where 'summary.tests' doesn't match the number of results, treating a
+    # missing summary or count as 0
+    mismatched_run_ids = db.session.execute(
+        db.select(Run.id)
+        .outerjoin(result_counts, result_counts.c.run_id == Run.id)
+        .where(recent_runs)
+        .where(
+            db.func.coalesce(Run.summary["tests"].as_integer(), 0)
+            != db.func.coalesce(result_counts.c.result_count, 0)
         )
     ).scalars()
 
-    # for each run, check if the result count matches 'summary.tests'
-    # if it doesn't, run the update_run task
-    for run in runs:
-        result_count = (
-            db.session.execute(
-                db.select(db.func.count()).select_from(
-                    db.select(Result).where(Result.run_id == run.id).subquery()
-                )
-            ).scalar()
-            or 0
-        )
+    # skip any runs that are already being updated, update_run would discard them anyway
+    run_ids = {
+        str(run_id) for run_id in mismatched_run_ids if not is_locked(f"update-run-lock-{run_id}")
+    }
+    if run_ids:
+        group(update_run.si(run_id) for run_id in sorted(run_ids)).apply_async(countdown=5)
+
 
-        # Handle runs with None or incomplete summary
-        summary_tests = run.summary.get("tests", 0) if run.summary else 0
-        if summary_tests != result_count:
-            update_run.apply_async((run.id,), countdown=5)
+@shared_task
+def backfill_jenkins_builds(batch_size: int = 1000) -> None:
+    """Recount the rollup of every Jenkins build from its runs
+
+    This fills in the rollup after upgrading, and fixes any drift between the rollup and the runs,
+    e.g. after old runs are pruned. The builds are recounted in batches, which are each committed.
+    """
+    run_builds = db.session.execute(
+        db.select(Run.project_id, Run.jenkins_job_name, Run.jenkins_build_number)
+        .where(Run.jenkins_job_name.is_not(None), Run.jenkins_build_number.is_not(None))
+        .distinct()
+    ).all()
+    rollup_builds = db.session.execute(
+        db.select(
+            JenkinsBuild.project_id,
+            JenkinsBuild.jenkins_job_name,
+            JenkinsBuild.jenkins_build_number,
+        )
+    ).all()
+    # Recounting a build that no longer has any runs removes it from the rollup
+    builds = sorted(set(run_builds) | set(rollup_builds), key=str)
+    for start in range(0, len(builds), batch_size):
+        for build in builds[start : start + batch_size]:
+            refresh_jenkins_build(*build)
+        db.session.commit()
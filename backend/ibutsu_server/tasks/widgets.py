@@ -0,0 +1,162 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from celery.utils.log import get_task_logger
+from flask import current_app
+from sqlalchemy import text
+
+from ibutsu_server.constants import (
+    WIDGET_CACHE_TTL,
+    WIDGET_TASK_TIMEOUT,
+    WIDGET_WARMUP_BUDGET,
+    WIDGET_WARMUP_VIEWED,
+    WIDGET_WARMUP_WORKERS,
+)
+from ibutsu_server.db import db
+from ibutsu_server.db.models import Project, WidgetConfig
+from ibutsu_server.tasks import shared_task
+from ibutsu_server.util.widget import share_queries
+from ibutsu_server.util.widget_cache import (
+    cache_widget,
+    decay_widget_views,
+    get_cached_widget,
+    get_most_viewed_widgets,
+    get_widget_cache_key,
+    get_widget_compute_times,
+    get_widget_generation,
+    record_compute_time,
+    release_widget_refresh,
+    release_widget_task,
+)
+from ibutsu_server.widgets import WIDGET_METHODS
+
+log = get_task_logger(__name__)
+
+
+def _extend_statement_timeout() -> None:
+    # The workers connect with the statement timeout of the API, which heavy widgets exceed
+    if db.engine.dialect.name == "postgresql":
+        timeout = int(current_app.config.get("WIDGET_TASK_TIMEOUT", WIDGET_TASK_TIMEOUT) * 1000)
+        db.session.execute(text(f"SET LOCAL statement_timeout = {timeout}"))
+
+
+@shared_task
+def refresh_widget(widget_id: str, params: dict) -> None:
+    """Compute a widget again and cache it, after its cached data became stale"""
+    try:
+        _extend_statement_timeout()
+        generation = get_widget_generation(params)
+        with record_compute_time(widget_id, params):
+            data = WIDGET_METHODS[widget_id](**params)
+        cache_widget(widget_id, params, data, generation)
+    except Exception:
+        # The stale data is returned until it expires, so there's no need to retry this task
+        log.exception(f"Unable to refresh widget {widget_id}")
+    finally:
+        release_widget_refresh(widget_id, params)
+
+
+@shared_task
+def compute_widget(widget_id: str, params: dict) -> dict:
+    """Compute a widget that's too expensive to compute in a request, and cache it
+
+    The data is the result of the task, under "data", for the client that polls /task/{id}.
+    """
+    try:
+        _extend_statement_timeout()
+        generation = get_widget_generation(params)
+        with record_compute_time(widget_id, params):
+            data = WIDGET_METHODS[widget_id](**params)
+        cache_widget(widget_id, params, data, generation)
+        # Serialize the data like the responses are
+        return {"data": json.loads(current_app.json.dumps(data))}
+    finally:
+        release_widget_task(widget_id, params)
+
+
+def _get_dashboard_widgets() -> list[tuple[str, dict]]:
+    """Get the types and parameters of the widgets of the default dashboards of the projects"""
+    from ibutsu_server.controllers.widget_controller import _get_widget_params  # noqa: PLC0415
+
+    widget_configs = db.session.scalars(
+        db.select(WidgetConfig)
+        .join(Project, Project.default_dashboard_id == WidgetConfig.dashboard_id)
+        .where(WidgetConfig.type == "widget")
+        .order_by(WidgetConfig.weight.asc())
+    ).all()
+    widgets = []
+    for widget_config in widget_configs:
+        if widget_config.widget not in WIDGET_METHODS:
+            continue
+        # Like the dashboard page, widgets are computed for the project of their config
+        params = dict(widget_config.params or {})
+        if widget_config.project_id:
+            params["project"] = str(widget_config.project_id)
+        params, invalid_params = _get_widget_params(widget_config.widget, params)
+        if not invalid_params:
+            widgets.append((widget_config.widget, params))
+    return widgets
+
+
+def _warm_widget(widget_id: str, params: dict, deadline: float) -> str:
+    """Compute a widget and cache it, unless it's fresh in the cache or the time is up"""
+    if time.monotonic() > deadline:
+        return "skipped"
+    try:
+        cached = get_cached_widget(widget_id, params)
+        if cached is not None and cached[1]:
+            return "fresh"
+        _extend_statement_timeout()
+        generation = get_widget_generation(params)
+        with record_compute_time(widget_id, params):
+            data = WIDGET_METHODS[widget_id](**params)
+        cache_widget(widget_id, params, data, generation)
+    except Exception:
+        log.exception(f"Unable to precompute widget {widget_id}")
+        return "failed"
+    return "computed"
+
+
+@shared_task
+def warm_widget_cache() -> None:
+    """Precompute the widgets of the default dashboards, and the most viewed widgets, into the cache
+
+    This runs after the nightly CI, so that the first views of the day are cached. The widgets are
+    computed concurrently, in WIDGET_WARMUP_WORKERS threads, until WIDGET_WARMUP_BUDGET seconds
+    have passed. The views of the widgets decay each time, so the most viewed are the recent ones.
+    """
+    config = current_app.config
+    if not config.get("WIDGET_CACHE_TTL", WIDGET_CACHE_TTL):
+        return
+    widgets = {}
+    most_viewed = get_most_viewed_widgets(config.get("WIDGET_WARMUP_VIEWED", WIDGET_WARMUP_VIEWED))
+    for widget_id, params in [*_get_dashboard_widgets(), *most_viewed]:
+        if widget_id in WIDGET_METHODS:
+            widgets.setdefault(get_widget_cache_key(widget_id, params), (widget_id, params))
+
+    app = current_app._get_current_object()
+    deadline = time.monotonic() + config.get("WIDGET_WARMUP_BUDGET", WIDGET_WARMUP_BUDGET)
+    context = share_queries()
+
+    def warm(widget_id, params):
+        with app.app_context():
+            return _warm_widget(widget_id, params, deadline)
+
+    max_workers = config.get("WIDGET_WARMUP_WORKERS", WIDGET_WARMUP_WORKERS)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # A context can only be entered by one thread at a time, but its copies share the queries
+        outcomes = list(
+            executor.map(
+                lambda widget: context.copy().run(warm, *widget),
+                widgets.values(),
+            )
+        )
+    decay_widget_views()
+
+    log.info(
+        f"Precomputed widgets: {outcomes.count('computed')} computed, {outcomes.count('fresh')} "
+        f"fresh, {outcomes.count('failed')} failed, {outcomes.count('skipped')} out of time"
+    )
+    for widget_id, params, seconds in get_widget_compute_times(10):
+        log.info(f"Widget {widget_id} took {seconds:.1f}s to compute with {params}")
@@ -0,0 +1,75 @@
+"""A cache of computed values in Redis, which is shared by the server and the workers
+
+Caching is best effort: if Redis can't be reached, the values are computed as if they weren't
+cached, rather than failing the request.
+
+Rather than deleting every cached value that depends on some data when it changes, cache keys
+include a generation number for that data, which is incremented when it changes. The values that
+were cached for older generations are no longer used, and expire on their own.
+"""
+
+import json
+import logging
+from typing import Any
+
+from flask import current_app
+from redis import Redis
+from redis.exceptions import RedisError
+
+from ibutsu_server.util.redis_lock import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+
+def get_client() -> Redis:
+    # Keep the client around, so that its connection pool is reused
+    app = current_app._get_current_object()
+    if "ibutsu_redis" not in app.extensions:
+        app.extensions["ibutsu_redis"] = get_redis_client(app=app)
+    return app.extensions["ibutsu_redis"]
+
+
+def get_cached(key: str) -> Any | None:
+    """Get a cached value, or None if it isn't cached"""
+    try:
+        value = get_client().get(key)
+    except RedisError:
+        logger.warning(f"Unable to get {key} from the cache", exc_info=True)
+        return None
+    return None if value is None else json.loads(value)
+
+
+def set_cached(key: str, value: Any, ttl: int) -> None:
+    """Cache a value, which can be serialized to JSON, for ``ttl`` seconds"""
+    try:
+        get_client().set(key, json.dumps(value), ex=ttl)
+    except RedisError:
+        logger.warning(f"Unable to cache {key}", exc_info=True)
+
+
+def delete_cached(*keys: str) -> None:
+    """Delete some cached values, when the data they were computed from changes"""
+    try:
+        get_client().delete(*keys)
+    except RedisError:
+        logger.warning(f"Unable to delete {', '.join(keys)} from the cache", exc_info=True)
+
+
+def get_generation(name: str) -> int:
+    """Get the current generation number of some data, to include in cache keys"""
+    try:
+        return int(get_client().get(f"ibutsu:generation:{name}") or 0)
+    except RedisError:
+        logger.warning(f"Unable to get the cache generation of {name}", exc_info=True)
+        return 0
+
+
+def bump_generation(*names: str) -> None:
+    """Increment the generation numbers of some data, when it changes"""
+    try:
+        with get_client().pipeline() as pipeline:
+            for name in names:
+                pipeline.incr(f"ibutsu:generation:{name}")
+            pipeline.execute()
+    except RedisError:
+        logger.warning(f"Unable to bump the cache generation of {', '.join(names)}", exc_info=True)
@@ -1,13 +1,18 @@
 """Utility functions for counting rows in large tables"""
 
+import json
 from contextlib import contextmanager
+from hashlib import sha256
 
+from flask import current_app
 from sqlalchemy import text
 
-from ibutsu_server.constants import COUNT_ESTIMATE_LIMIT, COUNT_TIMEOUT
+from ibutsu_server.constants import COUNT_CACHE_TTL, COUNT_ESTIMATE_LIMIT, COUNT_TIMEOUT
 from ibutsu_server.db import db
 from ibutsu_server.db.base import session
 from ibutsu_server.db.util import Explain
+from ibutsu_server.util.cache import bump_generation, get_cached, get_generation, set_cached
+from ibutsu_server.util.projects import get_user_permissions
 
 
 def _get_count_from_explain(query):
@@ -32,6 +37,61 @@ def get_count_estimate(query, no_filter=False, **kwargs):
     return estimate
 
 
+def get_count_cache_key(tablename, filter_=None, user=None, estimate=False):
+    """Get the cache key of the count of a list query
+
+    The key is made from the filters, regardless of their order, and the projects the user can
+    see, which are what the query is filtered by.
+    """
+    permissions = get_user_permissions(user) if user else None
+    scope = (
+        None if not permissions or permissions["superadmin"] else sorted(permissions["project_ids"])
+    )
+    query_key = json.dumps([sorted(set(filter_ or [])), scope, bool(estimate)])
+    generation = get_generation(tablename)
+    return f"ibutsu:count:{tablename}:{generation}:{sha256(query_key.encode()).hexdigest()}"
+
+
+def get_cached_count(tablename, filter_=None, user=None, estimate=False):
+    """Get the cached count of a list query, or None if it isn't cached"""
+    if not current_app.config.get("COUNT_CACHE_TTL", COUNT_CACHE_TTL):
+        return None
+    return get_cached(get_count_cache_key(tablename, filter_, user, estimate))
+
+
+def get_total_count(query, tablename, filter_=None, user=None, estimate=False, refresh=False):
+    """Count the items of a list query, using the cached count if there is one
+
+    :param query: The query to count the items of
+    :param tablename: The table that's queried, whose changes invalidate the cached count
+    :param filter_: The filters the query is filtered by
+    :param user: The user the query is filtered by, if any
+    :param estimate: Estimate the count, rather than counting every item
+    :param refresh: Count the items even if the count is cached
+    """
+    ttl = current_app.config.get("COUNT_CACHE_TTL", COUNT_CACHE_TTL)
+    cache_key = get_count_cache_key(tablename, filter_, user, estimate) if ttl else None
+    if cache_key and not refresh:
+        total_items = get_cached(cache_key)
+        if total_items is not None:
+            return total_items
+    if estimate:
+        total_items = get_count_estimate(query)
+    else:
+        total_items = db.session.execute(
+            db.select(db.func.count()).select_from(query.subquery())
+        ).scalar()
+    if cache_key:
+        set_cached(cache_key, total_items, ttl)
+    return total_items
+
+
+def invalidate_counts(*tablenames):
+    """Invalidate the cached counts of list queries on some tables, after items are added"""
+    if current_app.config.get("COUNT_CACHE_TTL", COUNT_CACHE_TTL):
+        bump_generation(*tablenames)
+
+
 @contextmanager
 def time_limited_db_operation(timeout=None):
     """
@@ -0,0 +1,62 @@
+"""Keyset (cursor) pagination
+
+Lists of results and runs are ordered by ``start_time`` and then ``id``, newest first. Instead of
+skipping ``OFFSET`` rows, which gets slower the further into the list a page is, a page can start
+after the last item of the previous page. The position of that item is passed around as an opaque
+cursor, and the query seeks to it using the ``(start_time, id)`` index.
+"""
+
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from datetime import datetime
+
+from ibutsu_server.db import db
+from ibutsu_server.util.uuid import is_uuid
+
+
+def encode_cursor(item) -> str:
+    """Encode the position of an item in a list as a cursor"""
+    position = json.dumps([item.start_time.isoformat(), str(item.id)])
+    return urlsafe_b64encode(position.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    """Decode a cursor into the start time and ID of the item it points to
+
+    :raises ValueError: If the cursor isn't valid
+    """
+    try:
+        start_time, id_ = json.loads(urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        start_time = datetime.fromisoformat(start_time)
+    except (BinasciiError, TypeError, ValueError) as e:
+        msg = f"Invalid cursor: {cursor}"
+        raise ValueError(msg) from e
+    if not isinstance(id_, str) or not is_uuid(id_):
+        msg = f"Invalid cursor: {cursor}"
+        raise ValueError(msg)
+    return start_time, id_
+
+
+def get_page(query, model, page_size: int, offset: int = 0, cursor: str | None = None):
+    """Get a page of items from a query, newest first
+
+    :param query: The query to get the items from
+    :param model: The model of the items, which has ``start_time`` and ``id`` columns
+    :param page_size: The number of items in a page
+    :param offset: The number of items to skip, if there's no cursor
+    :param cursor: The cursor of the last item of the previous page
+
+    :returns: The items, and the cursor of the next page, or None if this is the last page
+    :raises ValueError: If the cursor isn't valid
+    """
+    query = query.order_by(model.start_time.desc(), model.id.desc())
+    if cursor:
+        query = query.where(db.tuple_(model.start_time, model.id) < decode_cursor(cursor))
+    elif offset:
+        query = query.offset(offset)
+    # Get one more item than is needed, to know whether there's a next page
+    items = db.session.scalars(query.limit(page_size + 1)).all()
+    if len(items) <= page_size:
+        return items, None
+    return items[:page_size], encode_cursor(items[page_size - 1])
@@ -1,5 +1,17 @@
+"""Utility functions for projects, and for the projects a user can see
+
+Whether a user is a superadmin, and the IDs of the projects they're a member or the owner of, are
+cached for the request, and for PERMISSIONS_CACHE_TTL seconds in Redis, so that checking them is a
+set lookup rather than loading the user and their projects each time. The cache of a user has to be
+invalidated with invalidate_user_permissions when their projects or superadmin flag change.
+"""
+
+from flask import current_app, g, has_request_context
+
+from ibutsu_server.constants import PERMISSIONS_CACHE_TTL
 from ibutsu_server.db import db
-from ibutsu_server.db.models import Project, User
+from ibutsu_server.db.models import Project, User, users_projects
+from ibutsu_server.util.cache import delete_cached, get_cached, set_cached
 from ibutsu_server.util.uuid import is_uuid
 
 
@@ -20,27 +32,97 @@ def get_project_id(project_name):
     return str(project.id) if project else None
 
 
+def _get_user_id(user):
+    return str(user.id) if isinstance(user, User) else str(user)
+
+
+def _get_permissions_cache_key(user_id):
+    return f"ibutsu:permissions:{user_id}"
+
+
+def get_user_permissions(user):
+    """Get whether a user is a superadmin, and the projects they're a member or the owner of
+
+    :param user: The user, or their ID
+    :return: {"superadmin": bool, "project_ids": set, "owned_project_ids": set}, with the IDs of
+        the projects as strings
+    """
+    user_id = _get_user_id(user)
+    request_cache = g.setdefault("user_permissions", {}) if has_request_context() else {}
+    if user_id in request_cache:
+        return request_cache[user_id]
+
+    ttl = current_app.config.get("PERMISSIONS_CACHE_TTL", PERMISSIONS_CACHE_TTL)
+    cached = get_cached(_get_permissions_cache_key(user_id)) if ttl else None
+    if cached is None:
+        cached = {
+            "superadmin": bool(
+                db.session.execute(db.select(User.is_superadmin).where(User.id == user_id)).scalar()
+            ),
+            "project_ids": [
+                str(project_id)
+                for project_id in db.session.scalars(
+                    db.select(users_projects.c.project_id).where(
+                        users_projects.c.user_id == user_id
+                    )
+                )
+            ],
+            "owned_project_ids": [
+                str(project_id)
+                for project_id in db.session.scalars(
+                    db.select(Project.id).where(Project.owner_id == user_id)
+                )
+            ],
+        }
+        if ttl:
+            set_cached(_get_permissions_cache_key(user_id), cached, ttl)
+    permissions = {
+        "superadmin": cached["superadmin"],
+        "project_ids": set(cached["project_ids"]),
+        "owned_project_ids": set(cached["owned_project_ids"]),
+    }
+    request_cache[user_id] = permissions
+    return permissions
+
+
+def invalidate_user_permissions(*users):
+    """Invalidate the cached permissions of some users, after their projects or roles changed
+
+    :param users: The users, or their IDs, any of which can be None
+    """
+    user_ids = {_get_user_id(user) for user in users if user is not None}
+    if not user_ids:
+        return
+    if has_request_context():
+        for user_id in user_ids:
+            g.get("user_permissions", {}).pop(user_id, None)
+    if current_app.config.get("PERMISSIONS_CACHE_TTL", PERMISSIONS_CACHE_TTL):
+        delete_cached(*(_get_permissions_cache_key(user_id) for user_id in sorted(user_ids)))
+
+
 def project_has_user(project, user):
-    """A helper method to check if a user exists in the project"""
-    if isinstance(user, str):
-        user = db.session.get(User, user)
-    if user.is_superadmin:
+    """A helper method to check if a user exists in the project, or is its owner"""
+    permissions = get_user_permissions(user)
+    if permissions["superadmin"]:
         return True
     if isinstance(project, str):
-        project = get_project(project)
-    return user in project.users or project.owner.id == user.id
+        project_id = project if is_uuid(project) else get_project_id(project)
+    else:
+        project_id = str(project.id) if project else None
+    return project_id is not None and (
+        project_id in permissions["project_ids"] or project_id in permissions["owned_project_ids"]
+    )
 
 
 def add_user_filter(query, user, model=None):
     """Filter a list of projects by user"""
-    if isinstance(user, str):
-        user = db.session.get(User, user)
-    if user.is_superadmin:
+    permissions = get_user_permissions(user)
+    if permissions["superadmin"]:
         return query
     # filter the query by the list of user projects
     if model:
         attr = "id" if model == Project else "project_id"
         # SQLAlchemy 2.0+ pattern: use .where() instead of .filter()
-        query = query.where(getattr(model, attr).in_([p.id for p in user.projects]))
+        query = query.where(getattr(model, attr).in_(sorted(permissions["project_ids"])))
 
     return query
@@ -4,7 +4,8 @@ import re
 from http import HTTPStatus
 
 from ibutsu_server.constants import MAX_PAGE_SIZE
-from ibutsu_server.tasks.query import query_task
+from ibutsu_server.tasks.query import count_task, query_task
+from ibutsu_server.util.pagination import decode_cursor
 
 
 def get_offset(page, page_size):
@@ -15,6 +16,33 @@ def get_offset(page, page_size):
     return 0 if offset < 0 else offset
 
 
+def get_pagination(page, page_size, total_items, next_cursor=None):
+    """
+    Get the pagination of a list response
+    """
+    if total_items is None:
+        total_pages = None
+    else:
+        total_pages = (total_items // page_size) + (1 if total_items % page_size > 0 else 0)
+    return {
+        "page": page,
+        "pageSize": page_size,
+        "totalItems": total_items,
+        "totalPages": total_pages,
+        "nextCursor": next_cursor,
+    }
+
+
+def count_in_task(tablename, filter_=None, user_id=None, estimate=False):
+    """
+    Count the items of a list query in a task, and return the ID of the task.
+
+    Once the task is complete, the count can be found by performing a GET on /task/{id}, and it's
+    cached for the list endpoint to return.
+    """
+    return count_task.apply_async((tablename, filter_, user_id, estimate)).id
+
+
 def query_as_task(function):
     """
     Depending on page_size, runs a query as a task.
@@ -26,6 +54,14 @@ def query_as_task(function):
 
     def query(**kwargs):
         if kwargs.get("page_size", 25) > MAX_PAGE_SIZE:
+            if kwargs.get("cursor"):
+                try:
+                    decode_cursor(kwargs["cursor"])
+                except ValueError:
+                    return (
+                        f"Bad request, invalid cursor: {kwargs['cursor']}",
+                        HTTPStatus.BAD_REQUEST,
+                    )
             async_result = query_task.apply_async(
                 (
                     kwargs.get("filter_"),
@@ -33,7 +69,8 @@ def query_as_task(function):
                     kwargs.get("page_size", 25),
                     kwargs.get("estimate", False),
                     tablename,
-                )
+                ),
+                {"cursor": kwargs.get("cursor")},
             )
             response = {
                 "task_id": async_result.id,
@@ -0,0 +1,171 @@
+"""Daily rollups of results and runs, which the aggregator widgets read instead of the rows
+
+The results and runs of each project are counted for each day, by the fields that the widgets
+group and filter by the most (RESULT_ROLLUP_FIELDS and RUN_ROLLUP_FIELDS). When results or runs
+are added or changed, their days are marked in Redis, and the refresh_rollups task recounts the
+marked days from the rows. The backfill_rollups task recounts every day, and records the first
+day that the rollups are complete from.
+
+A widget only reads the rollups if it groups and filters by their fields alone, and its time
+period starts after that day. The whole days of the period are read from the rollups, and the
+partial days at either end, including today, are counted from the rows, so the counts are the
+same as counting the rows of the whole period.
+"""
+
+import logging
+from datetime import UTC, date, datetime, time, timedelta
+
+from flask import current_app
+from redis.exceptions import RedisError
+
+from ibutsu_server.constants import RESULT_ROLLUP_FIELDS, RUN_ROLLUP_FIELDS, WIDGET_ROLLUPS
+from ibutsu_server.db import db
+from ibutsu_server.db.models import Result, ResultRollup, Run, RunRollup
+from ibutsu_server.filters import FILTER_RE, convert_filter
+from ibutsu_server.util.cache import get_client
+
+logger = logging.getLogger(__name__)
+
+DIRTY_KEY = "ibutsu:rollups:dirty"
+SINCE_KEY = "ibutsu:rollups:since"
+ROLLUP_FIELDS = {ResultRollup: RESULT_ROLLUP_FIELDS, RunRollup: RUN_ROLLUP_FIELDS}
+
+
+def rollups_enabled() -> bool:
+    return current_app.config.get("WIDGET_ROLLUPS", WIDGET_ROLLUPS)
+
+
+def to_day(value: date | datetime | str) -> date:
+    """Get the day of a time, or of a date that the database returns as a string"""
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def _midnight(day: date) -> datetime:
+    # The start times are stored as naive UTC times
+    return datetime.combine(day, time())
+
+
+def get_day_period(day: date) -> tuple[datetime, datetime]:
+    """Get the start and end of a day, to select the rows that are counted for it"""
+    return _midnight(day), _midnight(day + timedelta(days=1))
+
+
+def mark_rollups_dirty(project_id, *days: date | datetime | str | None) -> None:
+    """Mark some days of a project to be recounted by the refresh_rollups task"""
+    if not rollups_enabled():
+        return
+    members = {f"{project_id or ''}/{to_day(day).isoformat()}" for day in days if day}
+    if not members:
+        return
+    try:
+        get_client().sadd(DIRTY_KEY, *members)
+    except RedisError:
+        logger.warning(f"Unable to mark {', '.join(sorted(members))} for a rollup", exc_info=True)
+
+
+def mark_run_rollups_dirty(run_id) -> None:
+    """Mark the days of a run, and of all of its results, to be recounted"""
+    if not rollups_enabled():
+        return
+    run = db.session.get(Run, run_id)
+    if run:
+        mark_rollups_dirty(run.project_id, run.start_time)
+    result_days = db.session.execute(
+        db.select(Result.project_id, db.func.date(Result.start_time))
+        .where(Result.run_id == run_id)
+        .distinct()
+    ).all()
+    for project_id, day in result_days:
+        mark_rollups_dirty(project_id, day)
+
+
+def pop_dirty_days(count: int) -> list[tuple[str | None, date]]:
+    """Take up to ``count`` of the days that are marked to be recounted"""
+    members = get_client().spop(DIRTY_KEY, count) or []
+    days = []
+    for member in members:
+        project_id, _, day = (member.decode() if isinstance(member, bytes) else member).partition(
+            "/"
+        )
+        days.append((project_id or None, date.fromisoformat(day)))
+    return days
+
+
+def get_rollups_since() -> date | None:
+    """Get the first day that the rollups are complete from, if they have been backfilled"""
+    try:
+        since = get_client().get(SINCE_KEY)
+    except RedisError:
+        logger.warning("Unable to get the first day of the rollups", exc_info=True)
+        return None
+    return to_day(since.decode() if isinstance(since, bytes) else since) if since else None
+
+
+def set_rollups_since(day: date) -> None:
+    get_client().set(SINCE_KEY, day.isoformat())
+
+
+def get_rollup_period(start_time: datetime) -> tuple[date, date] | None:
+    """Get the whole days of a period, from ``start_time`` until now, to read from the rollups
+
+    :return: The first whole day and today, or None if the rollups don't cover the period
+    """
+    if not rollups_enabled():
+        return None
+    first_day = to_day(start_time.astimezone(UTC)) + timedelta(days=1)
+    today = datetime.now(UTC).date()
+    # A period that's no longer than a couple of days is counted from the rows anyway
+    if first_day >= today:
+        return None
+    since = get_rollups_since()
+    if not since or first_day < since:
+        return None
+    return first_day, today
+
+
+def filter_partial_days(column, start_time: datetime, period: tuple[date, date]):
+    """Filter the rows of a period that aren't counted by the rollups, at either end of it"""
+    first_day, today = period
+    start_time = start_time.astimezone(UTC).replace(tzinfo=None)
+    return db.or_(
+        db.and_(column > start_time, column < _midnight(first_day)),
+        column >= _midnight(today),
+    )
+
+
+def get_rollup_column(field: str, rollup):
+    """Get the column of a rollup for a field, or None if the field isn't rolled up"""
+    prefix, _, path = field.partition(".")
+    if prefix == "data":
+        field = f"metadata.{path}"
+    column_name = ROLLUP_FIELDS[rollup].get(field)
+    return getattr(rollup, column_name) if column_name else None
+
+
+def convert_rollup_filters(filters: list[str], rollup, period: tuple[date, date]) -> list | None:
+    """Convert the filters of a widget to clauses on a rollup, for the whole days of a period
+
+    :return: The clauses, or None if some of the filters can't be applied to the rollup
+    """
+    first_day, today = period
+    clauses = [rollup.day >= first_day, rollup.day < today]
+    for filter_string in filters:
+        match = FILTER_RE.match(filter_string)
+        if not match:
+            return None
+        field = match.group(1)
+        if field == "project_id":
+            column_name = field
+        elif (column := get_rollup_column(field, rollup)) is not None:
+            column_name = column.key
+        else:
+            return None
+        clause = convert_filter(column_name + filter_string[match.end(1) :], rollup)
+        if clause is None:
+            return None
+        clauses.append(clause)
+    return clauses
@@ -0,0 +1,385 @@
+"""Storage backends for artifact and import file content
+
+By default file content is stored in the database, in the ``content`` column of the
+content_blobs table, which is shared by every artifact and import file with the same content.
+Setting ``ARTIFACT_STORAGE`` to ``filesystem`` or ``s3`` stores the content in a storage backend
+instead. Either way, the file's row only keeps its storage key, size and hash. Files that are
+already in the database, whether on their own row or on a content_blobs row, stay readable
+whichever backend is configured.
+
+The storage key is relative to the configured backend, so moving to a different backend requires
+the existing files to be copied over as well.
+
+Setting ``ARTIFACT_COMPRESSION`` to ``gzip`` or ``zstd`` compresses new file content before it's
+stored, wherever it's stored. The codec is kept in the ``content_encoding`` column of the file's
+row, and the content is decompressed as it's read. The size and hash are those of the
+uncompressed content.
+"""
+
+import gzip
+import logging
+from collections import Counter
+from collections.abc import Iterable
+from hashlib import sha256
+from io import BytesIO
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import BinaryIO
+
+import magic
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from ibutsu_server.constants import ARTIFACT_COMPRESSION, ARTIFACT_STORAGE
+from ibutsu_server.db.base import db
+
+logger = logging.getLogger(__name__)
+
+# The number of bytes to detect the content type of a file from
+CONTENT_TYPE_BUFFER_SIZE = 64 * 1024
+# Content that's smaller than this isn't worth compressing
+COMPRESSION_MIN_SIZE = 1024
+
+
+class StorageBackend:
+    """The interface for storage backends"""
+
+    name = None
+
+    def put(self, key: str, content: bytes) -> None:
+        """Store the content under the given key"""
+        raise NotImplementedError
+
+    def open(self, key: str) -> BinaryIO:
+        """Open the content stored under the given key as a binary file object"""
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        """Delete the content stored under the given key, if it exists"""
+        raise NotImplementedError
+
+    def get(self, key: str) -> bytes:
+        """Get the content stored under the given key"""
+        with self.open(key) as file_object:
+            return file_object.read()
+
+
+class FilesystemStorage(StorageBackend):
+    """Store files in a directory, e.g. a volume that's shared by the server and the workers"""
+
+    name = "filesystem"
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if not path.is_relative_to(self.root.resolve()):
+            msg = f"Storage key {key} is outside of the storage directory"
+            raise ValueError(msg)
+        return path
+
+    def put(self, key: str, content: bytes) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first, so that a partially written file is never visible
+        with NamedTemporaryFile(dir=path.parent, delete=False) as temp_file:
+            temp_file.write(content)
+        Path(temp_file.name).replace(path)
+
+    def open(self, key: str) -> BinaryIO:
+        return self._path(key).open("rb")
+
+    def delete(self, key: str) -> None:
+        self._path(key).unlink(missing_ok=True)
+
+
+class S3Storage(StorageBackend):
+    """Store files in an S3-compatible object store, e.g. AWS S3 or MinIO
+
+    This needs ``boto3``, which can be installed with the ``s3`` extra. Credentials are read by
+    ``boto3`` in the usual ways, e.g. from the ``AWS_ACCESS_KEY_ID`` and ``AWS_SECRET_ACCESS_KEY``
+    environment variables.
+    """
+
+    name = "s3"
+
+    def __init__(self, bucket: str, endpoint_url: str | None = None, region: str | None = None):
+        try:
+            import boto3  # noqa: PLC0415
+        except ImportError as e:
+            msg = "The s3 artifact storage needs boto3, install ibutsu_server[s3]"
+            raise RuntimeError(msg) from e
+        self.bucket = bucket
+        self.client = boto3.client("s3", endpoint_url=endpoint_url, region_name=region)
+
+    def put(self, key: str, content: bytes) -> None:
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=content)
+
+    def open(self, key: str) -> BinaryIO:
+        return self.client.get_object(Bucket=self.bucket, Key=key)["Body"]
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+
+class _GzipReader(gzip.GzipFile):
+    """Decompress a gzip file object as it's read, closing the file object along with it"""
+
+    def __init__(self, file_object: BinaryIO):
+        super().__init__(fileobj=file_object, mode="rb")
+        self._source = file_object
+
+    def close(self) -> None:
+        try:
+            super().close()
+        finally:
+            self._source.close()
+
+
+def _import_zstandard():
+    try:
+        import zstandard  # noqa: PLC0415
+    except ImportError as e:
+        msg = "The zstd artifact compression needs zstandard, install ibutsu_server[zstd]"
+        raise RuntimeError(msg) from e
+    return zstandard
+
+
+def compress_content(content: bytes, codec: str | None) -> tuple[bytes, str | None]:
+    """Compress some content with the given codec, if that makes it smaller
+
+    :param content: The content to compress
+    :param codec: The codec to compress it with: none, gzip or zstd
+
+    :returns: The content to store, and the codec it's compressed with, or None if it isn't
+    """
+    if codec in (None, "none") or len(content) < COMPRESSION_MIN_SIZE:
+        return content, None
+    if codec == "gzip":
+        compressed = gzip.compress(content, mtime=0)
+    elif codec == "zstd":
+        compressed = _import_zstandard().ZstdCompressor().compress(content)
+    else:
+        msg = f"Unknown ARTIFACT_COMPRESSION codec: {codec}"
+        raise ValueError(msg)
+    # Files that are already compressed, e.g. images or archives, don't get any smaller
+    if len(compressed) >= len(content):
+        return content, None
+    return compressed, codec
+
+
+def open_decompressed(file_object: BinaryIO, encoding: str | None) -> BinaryIO:
+    """Wrap a file object of stored content, so that it's decompressed as it's read
+
+    :param file_object: The file object of the stored content
+    :param encoding: The codec the content is compressed with, or None if it isn't
+    """
+    if encoding is None:
+        return file_object
+    if encoding == "gzip":
+        return _GzipReader(file_object)
+    if encoding == "zstd":
+        return _import_zstandard().ZstdDecompressor().stream_reader(file_object, closefd=True)
+    msg = f"Unknown content encoding: {encoding}"
+    raise ValueError(msg)
+
+
+def _create_storage(config) -> StorageBackend | None:
+    backend = config.get("ARTIFACT_STORAGE", ARTIFACT_STORAGE)
+    if backend == "database":
+        return None
+    if backend == FilesystemStorage.name:
+        return FilesystemStorage(config["ARTIFACT_STORAGE_PATH"])
+    if backend == S3Storage.name:
+        return S3Storage(
+            config["ARTIFACT_STORAGE_S3_BUCKET"],
+            endpoint_url=config.get("ARTIFACT_STORAGE_S3_ENDPOINT_URL"),
+            region=config.get("ARTIFACT_STORAGE_S3_REGION"),
+        )
+    msg = f"Unknown ARTIFACT_STORAGE backend: {backend}"
+    raise ValueError(msg)
+
+
+def get_storage() -> StorageBackend | None:
+    """Get the configured storage backend, or None if files are stored in the database"""
+    config = current_app.config
+    cache_key = tuple(
+        config.get(key)
+        for key in (
+            "ARTIFACT_STORAGE",
+            "ARTIFACT_STORAGE_PATH",
+            "ARTIFACT_STORAGE_S3_BUCKET",
+            "ARTIFACT_STORAGE_S3_ENDPOINT_URL",
+            "ARTIFACT_STORAGE_S3_REGION",
+        )
+    )
+    # Keep the backend around, so that e.g. the S3 client isn't created for every file
+    cached = current_app.extensions.get("ibutsu_storage")
+    if not cached or cached[0] != cache_key:
+        cached = current_app.extensions["ibutsu_storage"] = (cache_key, _create_storage(config))
+    return cached[1]
+
+
+def get_content_metadata(content: bytes) -> dict:
+    """Get the size and SHA256 hash of some content"""
+    return {"content_size": len(content), "content_hash": sha256(content).hexdigest()}
+
+
+def get_content_type(content: bytes) -> str:
+    """Detect the content type of a file from its first ``CONTENT_TYPE_BUFFER_SIZE`` bytes"""
+    return magic.from_buffer(content[:CONTENT_TYPE_BUFFER_SIZE], mime=True)
+
+
+def _add_reference(key: str, content_size: int, content: bytes | None = None) -> bool:
+    """Add a reference to a stored file, and return True if it's a new file
+
+    This is done in the caller's transaction, so that the reference is only kept if the row that
+    references the file is committed too.
+
+    :param content: The content to keep on the content_blobs row, when there's no storage backend
+    """
+    from ibutsu_server.db.models import ContentBlob  # noqa: PLC0415
+
+    add_reference = (
+        db.update(ContentBlob)
+        .where(ContentBlob.key == key)
+        .values(reference_count=ContentBlob.reference_count + 1)
+    )
+    if content is None:
+        existing = add_reference
+    else:
+        # A file that was put in a storage backend doesn't have its content on its row
+        existing = add_reference.where(ContentBlob.content.is_not(None))
+    if db.session.execute(existing).rowcount:
+        return False
+    try:
+        with db.session.begin_nested():
+            db.session.add(
+                ContentBlob(key=key, content_size=content_size, content=content, reference_count=1)
+            )
+    except IntegrityError:
+        # The same content was stored at the same time by another transaction, or was stored in
+        # a storage backend before
+        if content is not None:
+            add_reference = add_reference.values(
+                content=db.func.coalesce(ContentBlob.content, content)
+            )
+        db.session.execute(add_reference)
+        return False
+    return True
+
+
+def _get_blob_content(key: str) -> bytes | None:
+    """Get the content of a stored file from its content_blobs row, if it's kept there"""
+    from ibutsu_server.db.models import ContentBlob  # noqa: PLC0415
+
+    return db.session.execute(
+        db.select(ContentBlob.content).where(ContentBlob.key == key)
+    ).scalar_one_or_none()
+
+
+def get_stored_content(key: str) -> bytes:
+    """Get the content of a stored file, from the database or from the storage backend"""
+    content = _get_blob_content(key)
+    if content is None:
+        content = get_storage().get(key)
+    return content
+
+
+def open_stored_content(key: str) -> BinaryIO:
+    """Open a stored file, from the database or from the storage backend"""
+    content = _get_blob_content(key)
+    if content is None:
+        return get_storage().open(key)
+    return BytesIO(content)
+
+
+def store_content(content: bytes, prefix: str) -> dict:
+    """Store some file content, and return the column values for the file's database row
+
+    The content is stored under its hash, so that files with the same content are only stored
+    once, on a content_blobs row or in the storage backend. Their references are counted, see
+    ``release_content``. The content is compressed first if ``ARTIFACT_COMPRESSION`` is set. The
+    values are set on the row with ``FileMixin.set_content``.
+
+    :param content: The content of the file
+    :param prefix: The prefix of the storage key, e.g. the name of the table
+    """
+    values = get_content_metadata(content)
+    codec = current_app.config.get("ARTIFACT_COMPRESSION", ARTIFACT_COMPRESSION)
+    stored_content, encoding = compress_content(content, codec)
+    if encoding:
+        values["content_encoding"] = encoding
+    content_hash = values["content_hash"]
+    values["storage_key"] = f"{prefix}/{content_hash[:2]}/{content_hash}"
+    if encoding:
+        values["storage_key"] += f".{encoding}"
+    storage = get_storage()
+    if storage is None:
+        _add_reference(values["storage_key"], len(stored_content), stored_content)
+    elif _add_reference(values["storage_key"], len(stored_content)):
+        storage.put(values["storage_key"], stored_content)
+    return values
+
+
+def release_content(keys: Iterable[str | None]) -> list[str]:
+    """Release the references to stored files, e.g. when the rows that reference them are deleted
+
+    This should be done in the same transaction as deleting the rows. Files in the database are
+    deleted along with their content_blobs row once they're no longer referenced. The files in the
+    storage backend that are no longer referenced are returned, so they can be deleted with
+    ``delete_stored_content`` once the transaction is committed.
+
+    :param keys: The storage keys of the deleted rows, once for every row
+    """
+    from ibutsu_server.db.models import ContentBlob  # noqa: PLC0415
+
+    counts = Counter(key for key in keys if key)
+    unreferenced = []
+    for key, count in counts.items():
+        released = db.session.execute(
+            db.update(ContentBlob)
+            .where(ContentBlob.key == key)
+            .values(reference_count=ContentBlob.reference_count - count)
+        )
+        if not released.rowcount:
+            # Files that were stored before their references were counted aren't shared
+            unreferenced.append(key)
+    if counts:
+        unused_blobs = db.session.execute(
+            db.select(ContentBlob.key, ContentBlob.content.is_(None)).where(
+                ContentBlob.key.in_(counts), ContentBlob.reference_count <= 0
+            )
+        ).all()
+        if unused_blobs:
+            unused_keys = [key for key, _ in unused_blobs]
+            db.session.execute(db.delete(ContentBlob).where(ContentBlob.key.in_(unused_keys)))
+        unreferenced.extend(key for key, in_storage in unused_blobs if in_storage)
+    return unreferenced
+
+
+def delete_stored_content(keys: Iterable[str | None]) -> None:
+    """Delete stored files that are no longer referenced, logging rather than raising any errors
+
+    This is called after the database rows have been deleted, so a failure only leaves behind an
+    orphaned file rather than a row without its content. Files that have been referenced again in
+    the meantime, i.e. that were stored again since ``release_content``, are kept.
+    """
+    from ibutsu_server.db.models import ContentBlob  # noqa: PLC0415
+
+    keys = {key for key in keys if key}
+    if not keys:
+        return
+    storage = get_storage()
+    if storage is None:
+        logger.warning(f"Unable to delete {len(keys)} stored files, there's no storage backend")
+        return
+    keys -= set(
+        db.session.execute(db.select(ContentBlob.key).where(ContentBlob.key.in_(keys))).scalars()
+    )
+    for key in sorted(keys):
+        try:
+            storage.delete(key)
+        except Exception:
+            logger.exception(f"Unable to delete the stored file {key}")
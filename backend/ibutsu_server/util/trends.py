@@ -0,0 +1,170 @@
+"""Trends of the pass percentages of the groups of the heatmap widgets
+
+The pass percentages of all of the groups of a heatmap are analyzed at once, as the rows of one
+NumPy array. Series of different lengths are aligned on their last build, and padded with NaN
+before their first one. A build without a pass percentage, like a build whose plugins failed to
+start, is NaN as well, and is left out of the calculations.
+"""
+
+import numpy as np
+
+from ibutsu_server.constants import HEATMAP_CHANGEPOINT_SHIFT, HEATMAP_TREND_WINDOW
+
+STABLE_SLOPE = 100  # the slope of a series that always passed, which the frontend shows as stable
+
+
+def to_array(series_list):
+    """Convert some series of pass percentages to one array, aligned on their last build
+
+    :param series_list: The pass percentages of each group in chronological order, with None or a
+        string for a build without a pass percentage, e.g. [[98, 54, 97, 99], [100, None]]
+    """
+    length = max((len(series) for series in series_list), default=0)
+    array = np.full((len(series_list), length), np.nan)
+    for row, series in zip(array, series_list, strict=True):
+        if not series:
+            continue
+        try:
+            # None is converted to NaN
+            row[length - len(series) :] = series
+        except ValueError:
+            row[length - len(series) :] = [
+                x if isinstance(x, int | float) else np.nan for x in series
+            ]
+    return array
+
+
+def _calculate_slopes(array):
+    # Regress the pass percentages on their positions, so the slope is the change per build
+    valid = ~np.isnan(array)
+    counts = valid.sum(axis=1)
+    positions = np.where(valid, np.arange(array.shape[1], dtype=float), 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        position_deviations = np.where(
+            valid, positions - (positions.sum(axis=1) / counts)[:, None], 0
+        )
+        # Σ((x-x̄)(y-ȳ)) = Σ((x-x̄)y), because Σ(x-x̄) = 0
+        slopes = (position_deviations * np.where(valid, array, 0)).sum(axis=1) / (
+            position_deviations**2
+        ).sum(axis=1)
+    stable = np.where(valid, array == 100, True).all(axis=1)
+    return np.select([counts < 2, stable], [0, STABLE_SLOPE], slopes)
+
+
+def _calculate_moving_averages(array, window):
+    # The average of the pass percentages of each build and the builds before it in the window
+    valid = ~np.isnan(array)
+    sums = np.pad(np.cumsum(np.where(valid, array, 0), axis=1), ((0, 0), (1, 0)))
+    counts = np.pad(np.cumsum(valid, axis=1), ((0, 0), (1, 0)))
+    ends = np.arange(1, array.shape[1] + 1)
+    starts = np.maximum(ends - window, 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        averages = (sums[:, ends] - sums[:, starts]) / (counts[:, ends] - counts[:, starts])
+    return np.where(valid, averages, np.nan)
+
+
+def _calculate_volatilities(array):
+    # The average change of the pass percentage from one build to the next
+    changes = np.abs(np.diff(array, axis=1))
+    valid = ~np.isnan(changes)
+    counts = valid.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        volatilities = np.where(valid, changes, 0).sum(axis=1) / counts
+    return np.where(counts > 0, volatilities, 0)
+
+
+def _find_changepoints(array):
+    # The build where the average pass percentage shifts the most, comparing the builds before it
+    # to the builds from it
+    valid = ~np.isnan(array)
+    sums = np.cumsum(np.where(valid, array, 0), axis=1)
+    counts = np.cumsum(valid, axis=1)
+    before_sums, before_counts = sums[:, :-1], counts[:, :-1]
+    after_sums = sums[:, -1:] - before_sums
+    after_counts = counts[:, -1:] - before_counts
+    with np.errstate(divide="ignore", invalid="ignore"):
+        shifts = after_sums / after_counts - before_sums / before_counts
+    # Only the builds with a pass percentage can be changepoints
+    shifts = np.where(valid[:, 1:] & (before_counts > 0), shifts, np.nan)
+    magnitudes = np.where(np.isnan(shifts), -1, np.abs(shifts))
+    if not magnitudes.size:
+        return np.zeros(len(array), dtype=int), np.full(len(array), np.nan)
+    positions = magnitudes.argmax(axis=1)
+    return positions + 1, np.take_along_axis(shifts, positions[:, None], axis=1)[:, 0]
+
+
+def _to_numbers(array):
+    # Round an array for the response, with None for NaN
+    numbers = np.round(array, 2).astype(object)
+    numbers[np.isnan(array)] = None
+    return numbers
+
+
+def calculate_slopes(series_list):
+    """Calculate the trend slope of each of some series of pass percentages, by linear regression
+
+    The slope is the change of the pass percentage per build. A series that always passed has a
+    slope of STABLE_SLOPE, and a series with fewer than two pass percentages has a slope of 0.
+
+    :param series_list: The pass percentages of each group in chronological order, see to_array
+    :return: The slope of each series
+    """
+    return _calculate_slopes(to_array(series_list)).tolist()
+
+
+def calculate_slope(series):
+    """Calculate the trend slope of a series of pass percentages, see calculate_slopes"""
+    return calculate_slopes([series])[0]
+
+
+def analyze_trends(series_list, window=HEATMAP_TREND_WINDOW, min_shift=HEATMAP_CHANGEPOINT_SHIFT):
+    """Analyze the trends of some series of pass percentages, all at once
+
+    Each series gets:
+
+    - its slope, see calculate_slopes
+    - the moving average of its last ``window`` builds at each of its builds, or None for a build
+      without a pass percentage
+    - its volatility, the average change of its pass percentage from one build to the next, which
+      is high for a flaky group
+    - its changepoint, the index of the build where its average pass percentage shifted by at least
+      ``min_shift`` percentage points, and the shift, or None if it didn't shift that much
+
+    :param series_list: The pass percentages of each group in chronological order, see to_array
+    :return: The trends of each series
+    """
+    array = to_array(series_list)
+    slopes = _calculate_slopes(array)
+    moving_averages = _calculate_moving_averages(array, window)
+    volatilities = _calculate_volatilities(array)
+    changepoints, shifts = _find_changepoints(array)
+
+    is_changepoint = np.abs(np.nan_to_num(shifts)) >= min_shift
+    changepoints = np.where(is_changepoint, changepoints, -1).tolist()
+    shifts = _to_numbers(shifts).tolist()
+    moving_averages = _to_numbers(moving_averages)
+    volatilities = np.round(volatilities, 2).tolist()
+    trends = []
+    for row, (series, slope) in enumerate(zip(series_list, slopes.tolist(), strict=True)):
+        padding = array.shape[1] - len(series)
+        trends.append(
+            {
+                "slope": slope,
+                "moving_average": moving_averages[row, padding:].tolist(),
+                "volatility": volatilities[row],
+                "changepoint": changepoints[row] - padding if changepoints[row] >= 0 else None,
+                "changepoint_shift": shifts[row] if changepoints[row] >= 0 else None,
+            }
+        )
+    return trends
+
+
+def get_heatmap_trends(heatmap):
+    """Analyze the trends of the groups of a heatmap, see analyze_trends
+
+    The moving averages are aligned with the builds of the groups, after their slopes.
+
+    :param heatmap: The slope and builds of each group, e.g. {"group": [[slope, 0], *builds]}
+    """
+    series_list = [[build[0] for build in builds[1:]] for builds in heatmap.values()]
+    return dict(zip(heatmap, analyze_trends(series_list), strict=True))
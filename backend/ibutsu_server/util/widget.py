@@ -6,9 +6,20 @@ across different widget modules, reducing code duplication and ensuring
 consistent query patterns.
 """
 
+import logging
+from concurrent.futures import Future
+from contextvars import Context, ContextVar, copy_context
+from functools import wraps
+from threading import Lock
+
 from sqlalchemy import func
 
-from ibutsu_server.db.base import Integer
+from ibutsu_server.db.base import Integer, Text
+
+logger = logging.getLogger(__name__)
+
+# The queries that are shared by the widgets of a dashboard while it's rendered
+_shared_queries = ContextVar("shared_queries", default=None)
 
 
 def create_summary_columns(data_source, cast_type=Integer, label_prefix=""):
@@ -61,13 +72,79 @@ def create_jenkins_columns(data_source):
 
     return {
         "job_name": string_to_column("metadata.jenkins.job_name", data_source),
-        "build_number": string_to_column("metadata.jenkins.build_number", data_source),
+        # Build numbers are promoted to an integer column, but are returned as in the metadata
+        "build_number": string_to_column("metadata.jenkins.build_number", data_source).cast(Text),
         "build_url": string_to_column("metadata.jenkins.build_url", data_source),
         "annotations": string_to_column("metadata.annotations", data_source),
         "env": string_to_column("env", data_source),
     }
 
 
+def select_jenkins_builds(filters):
+    """Select the Jenkins builds that match some run filters from the rollup of the builds
+
+    The builds are summed up by job and build, with the same labels as ``create_jenkins_columns``
+    and ``create_summary_columns``, so they can be used in place of an aggregation of the runs.
+    Only filters on the project, job name and build number can be applied to the rollup.
+
+    :param filters: The run filters
+    :return: The query, or None if some of the filters can't be applied to the rollup
+    """
+    from ibutsu_server.db import db  # noqa: PLC0415
+    from ibutsu_server.db.models import JenkinsBuild  # noqa: PLC0415
+    from ibutsu_server.filters import FILTER_RE, convert_filter, get_promoted_name  # noqa: PLC0415
+
+    clauses = []
+    for filter_string in filters:
+        match = FILTER_RE.match(filter_string)
+        if not match or (match.group(1) != "project_id" and not get_promoted_name(match.group(1))):
+            return None
+        clause = convert_filter(filter_string, JenkinsBuild)
+        if clause is None:
+            return None
+        clauses.append(clause)
+
+    return (
+        db.select(
+            JenkinsBuild.jenkins_job_name.label("job_name"),
+            JenkinsBuild.jenkins_build_number.cast(Text).label("build_number"),
+            func.min(JenkinsBuild.build_url).label("build_url"),
+            func.min(JenkinsBuild.env).label("env"),
+            func.min(JenkinsBuild.source).label("source"),
+            *[
+                func.sum(getattr(JenkinsBuild, key)).label(key)
+                for key in ["xfailures", "xpasses", "failures", "errors", "skips", "tests"]
+            ],
+            func.min(JenkinsBuild.min_start_time).label("min_start_time"),
+            func.max(JenkinsBuild.max_start_time).label("max_start_time"),
+            func.sum(JenkinsBuild.total_execution_time).label("total_execution_time"),
+            func.max(JenkinsBuild.max_duration).label("max_duration"),
+        )
+        .where(*clauses)
+        .group_by(JenkinsBuild.jenkins_job_name, JenkinsBuild.jenkins_build_number)
+    )
+
+
+def log_jenkins_builds_fallback(widget, filters, query, rows):
+    """Log that a widget aggregated the runs instead of reading the rollup of the Jenkins builds
+
+    This is expected when the filters can't be applied to the rollup. When they can, but only the
+    runs have builds that match them, the rollup is missing builds, so that's a warning.
+
+    :param widget: The name of the widget
+    :param filters: The run filters
+    :param query: The query from ``select_jenkins_builds``, or None
+    :param rows: The rows that the runs were aggregated into
+    """
+    if query is None:
+        logger.debug(f"{widget}: aggregating the runs, the rollup can't be filtered by {filters}")
+    elif rows:
+        logger.warning(
+            f"{widget}: aggregating the runs, the rollup of the Jenkins builds has no builds that "
+            f"match {filters}, but the runs do, so it may need a backfill-jenkins-builds"
+        )
+
+
 def create_basic_summary_columns(data_source, cast_type=Integer, use_alternate_names=False):
     """Create basic summary columns without time/duration fields
 
@@ -122,3 +199,42 @@ def create_time_columns(data_source):
         "total_execution_time": func.sum(duration_ref).label("total_execution_time"),
         "max_duration": func.max(duration_ref).label("max_duration"),
     }
+
+
+def share_queries() -> Context:
+    """Get a copy of the current context that shares the queries decorated with ``shared_query``
+
+    The widgets that are computed in the context, or in copies of it, share the queries.
+    """
+    context = copy_context()
+    context.run(_shared_queries.set, ({}, Lock()))
+    return context
+
+
+def shared_query(func_):
+    """Compute a query once for the same arguments, for all the widgets of a dashboard
+
+    Outside of a context from ``share_queries`` the query is computed each time. The widgets share
+    the result, so they must not change it.
+    """
+
+    @wraps(func_)
+    def wrapper(*args, **kwargs):
+        shared = _shared_queries.get()
+        if shared is None:
+            return func_(*args, **kwargs)
+        results, lock = shared
+        key = (func_.__module__, func_.__qualname__, repr(args), repr(sorted(kwargs.items())))
+        with lock:
+            future = results.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = results[key] = Future()
+        if is_owner:
+            try:
+                future.set_result(func_(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+        return future.result()
+
+    return wrapper
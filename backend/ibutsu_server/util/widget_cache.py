@@ -0,0 +1,236 @@
+"""A cache of the data of widgets in Redis, see ibutsu_server.util.cache
+
+The data is cached for the type and parameters of a widget. Widgets are computed from their
+parameters alone, which include the project they're for, so the same data is cached for every
+user. Each project has a generation number, which is bumped when results or runs of the project
+are added or changed, and a widget without a project uses a generation that's bumped for any
+project.
+
+Cached data is fresh until the generation changes or its TTL passes, and then it's stale. Stale
+data is still returned, so that a dashboard never waits for a widget that's already cached, while
+a worker computes the widget again. Stale data expires after WIDGET_CACHE_STALE_TTL.
+
+The views of widgets are counted, and the time it takes to compute them recorded, in sorted sets.
+The warm_widget_cache task precomputes the most viewed widgets, and the compute times show which
+widgets are the most expensive.
+"""
+
+import json
+import logging
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from hashlib import sha256
+from typing import Any
+
+from flask import current_app
+from redis.exceptions import RedisError
+
+from ibutsu_server.constants import (
+    WIDGET_CACHE_STALE_TTL,
+    WIDGET_CACHE_TTL,
+    WIDGET_CACHE_TTLS,
+    WIDGET_COMPUTE_TIMES_KEPT,
+    WIDGET_REFRESH_TIMEOUT,
+    WIDGET_TASK_TIMEOUT,
+)
+from ibutsu_server.util.cache import bump_generation, get_client, get_generation
+from ibutsu_server.util.uuid import is_uuid
+
+logger = logging.getLogger(__name__)
+
+VIEWS_KEY = "ibutsu:widget:views"
+COMPUTE_TIMES_KEY = "ibutsu:widget:compute-times"
+
+
+def get_widget_ttl(widget_id: str) -> int:
+    """Get the seconds that the cached data of a type of widget is fresh for, 0 to not cache it"""
+    ttl = current_app.config.get("WIDGET_CACHE_TTL", WIDGET_CACHE_TTL)
+    if not ttl:
+        return 0
+    return current_app.config.get("WIDGET_CACHE_TTLS", WIDGET_CACHE_TTLS).get(widget_id, ttl)
+
+
+def get_widget_cache_key(widget_id: str, params: dict) -> str:
+    """Get the cache key of a widget, from its parameters regardless of their order"""
+    params_key = json.dumps(params, sort_keys=True, default=str)
+    return f"ibutsu:widget:{widget_id}:{sha256(params_key.encode()).hexdigest()}"
+
+
+def _get_widget_member(widget_id: str, params: dict) -> str:
+    return json.dumps([widget_id, params], sort_keys=True, default=str)
+
+
+def _parse_widget_member(member: bytes | str) -> tuple[str, dict]:
+    widget_id, params = json.loads(member)
+    return widget_id, params
+
+
+def _get_generation_name(params: dict) -> str:
+    project = params.get("project")
+    return f"widgets:{project}" if project and is_uuid(project) else "widgets"
+
+
+def get_widget_generation(params: dict) -> int:
+    """Get the generation of the data of a widget, before computing it"""
+    return get_generation(_get_generation_name(params))
+
+
+def get_cached_widget(widget_id: str, params: dict) -> tuple[Any, bool] | None:
+    """Get the cached data of a widget, and whether it's fresh, or None if it isn't cached"""
+    ttl = get_widget_ttl(widget_id)
+    if not ttl:
+        return None
+    try:
+        with get_client().pipeline() as pipeline:
+            pipeline.get(get_widget_cache_key(widget_id, params))
+            pipeline.get(f"ibutsu:generation:{_get_generation_name(params)}")
+            cached, generation = pipeline.execute()
+    except RedisError:
+        logger.warning(f"Unable to get widget {widget_id} from the cache", exc_info=True)
+        return None
+    if cached is None:
+        return None
+    cached = json.loads(cached)
+    is_fresh = (
+        cached["generation"] == int(generation or 0) and time.time() - cached["computed"] < ttl
+    )
+    return cached["data"], is_fresh
+
+
+def cache_widget(widget_id: str, params: dict, data: Any, generation: int) -> None:
+    """Cache the data of a widget, which was computed for a generation of its data"""
+    if not get_widget_ttl(widget_id):
+        return
+    # Serialize the data like the responses are, so cached data is returned unchanged
+    value = json.dumps(
+        {
+            "data": json.loads(current_app.json.dumps(data)),
+            "generation": generation,
+            "computed": time.time(),
+        }
+    )
+    stale_ttl = current_app.config.get("WIDGET_CACHE_STALE_TTL", WIDGET_CACHE_STALE_TTL)
+    try:
+        get_client().set(get_widget_cache_key(widget_id, params), value, ex=stale_ttl)
+    except RedisError:
+        logger.warning(f"Unable to cache widget {widget_id}", exc_info=True)
+
+
+def claim_widget_refresh(widget_id: str, params: dict) -> bool:
+    """Claim the refresh of a stale widget, so that only one worker computes it at a time"""
+    timeout = current_app.config.get("WIDGET_REFRESH_TIMEOUT", WIDGET_REFRESH_TIMEOUT)
+    try:
+        key = f"{get_widget_cache_key(widget_id, params)}:refresh"
+        return bool(get_client().set(key, 1, ex=timeout, nx=True))
+    except RedisError:
+        logger.warning(f"Unable to claim the refresh of widget {widget_id}", exc_info=True)
+        return False
+
+
+def release_widget_refresh(widget_id: str, params: dict) -> None:
+    try:
+        get_client().delete(f"{get_widget_cache_key(widget_id, params)}:refresh")
+    except RedisError:
+        logger.warning(f"Unable to release the refresh of widget {widget_id}", exc_info=True)
+
+
+def register_widget_task(widget_id: str, params: dict, task_id: str) -> str:
+    """Register the task that computes a widget, unless another task is computing it already
+
+    :return: The ID of the task that computes the widget, which is ``task_id`` if it's registered
+    """
+    timeout = current_app.config.get("WIDGET_TASK_TIMEOUT", WIDGET_TASK_TIMEOUT)
+    key = f"{get_widget_cache_key(widget_id, params)}:task"
+    try:
+        client = get_client()
+        if client.set(key, task_id, ex=timeout, nx=True):
+            return task_id
+        running_task_id = client.get(key)
+    except RedisError:
+        logger.warning(f"Unable to register the task of widget {widget_id}", exc_info=True)
+        return task_id
+    if isinstance(running_task_id, bytes):
+        running_task_id = running_task_id.decode()
+    # The other task may have just finished
+    return running_task_id or task_id
+
+
+def release_widget_task(widget_id: str, params: dict) -> None:
+    try:
+        get_client().delete(f"{get_widget_cache_key(widget_id, params)}:task")
+    except RedisError:
+        logger.warning(f"Unable to release the task of widget {widget_id}", exc_info=True)
+
+
+def invalidate_widgets(*project_ids) -> None:
+    """Make the cached widgets of some projects stale, after their results or runs change"""
+    if not current_app.config.get("WIDGET_CACHE_TTL", WIDGET_CACHE_TTL):
+        return
+    project_names = {f"widgets:{project_id}" for project_id in project_ids if project_id}
+    bump_generation("widgets", *project_names)
+
+
+def record_widget_view(widget_id: str, params: dict) -> None:
+    """Count a view of a widget, so that the most viewed widgets can be precomputed"""
+    if not current_app.config.get("WIDGET_CACHE_TTL", WIDGET_CACHE_TTL):
+        return
+    try:
+        get_client().zincrby(VIEWS_KEY, 1, _get_widget_member(widget_id, params))
+    except RedisError:
+        logger.warning(f"Unable to count a view of widget {widget_id}", exc_info=True)
+
+
+def get_most_viewed_widgets(count: int) -> list[tuple[str, dict]]:
+    """Get the types and parameters of the most viewed widgets, the most viewed first"""
+    try:
+        members = get_client().zrevrange(VIEWS_KEY, 0, count - 1)
+    except RedisError:
+        logger.warning("Unable to get the most viewed widgets", exc_info=True)
+        return []
+    return [_parse_widget_member(member) for member in members]
+
+
+def decay_widget_views() -> None:
+    """Halve the views of every widget, so that recent views count the most
+
+    Widgets that haven't been viewed for a while are forgotten.
+    """
+    try:
+        with get_client().pipeline() as pipeline:
+            pipeline.zunionstore(VIEWS_KEY, {VIEWS_KEY: 0.5})
+            pipeline.zremrangebyscore(VIEWS_KEY, 0, 0.1)
+            pipeline.execute()
+    except RedisError:
+        logger.warning("Unable to decay the views of widgets", exc_info=True)
+
+
+@contextmanager
+def record_compute_time(widget_id: str, params: dict) -> Iterator[None]:
+    """Record the seconds that computing a widget takes, when it's computed successfully"""
+    start = time.monotonic()
+    yield
+    if not current_app.config.get("WIDGET_CACHE_TTL", WIDGET_CACHE_TTL):
+        return
+    kept = current_app.config.get("WIDGET_COMPUTE_TIMES_KEPT", WIDGET_COMPUTE_TIMES_KEPT)
+    try:
+        with get_client().pipeline() as pipeline:
+            pipeline.zadd(
+                COMPUTE_TIMES_KEY,
+                {_get_widget_member(widget_id, params): time.monotonic() - start},
+            )
+            # Only keep the most expensive widgets
+            pipeline.zremrangebyrank(COMPUTE_TIMES_KEY, 0, -kept - 1)
+            pipeline.execute()
+    except RedisError:
+        logger.warning(f"Unable to record the compute time of widget {widget_id}", exc_info=True)
+
+
+def get_widget_compute_times(count: int) -> list[tuple[str, dict, float]]:
+    """Get the widgets that took the longest to compute the last time, with their seconds"""
+    try:
+        members = get_client().zrevrange(COMPUTE_TIMES_KEY, 0, count - 1, withscores=True)
+    except RedisError:
+        logger.warning("Unable to get the compute times of widgets", exc_info=True)
+        return []
+    return [(*_parse_widget_member(member), seconds) for member, seconds in members]
@@ -0,0 +1,40 @@
+"""The widgets of dashboards, and the functions that compute their data"""
+
+from ibutsu_server.widgets.accessibility_analysis import (
+    get_accessibility_analysis_view,
+    get_accessibility_bar_chart,
+)
+from ibutsu_server.widgets.accessibility_dashboard_view import (
+    get_accessibility_dashboard_view,
+)
+from ibutsu_server.widgets.compare_runs_view import get_comparison_data
+from ibutsu_server.widgets.filter_heatmap import get_filter_heatmap
+from ibutsu_server.widgets.importance_component import get_importance_component
+from ibutsu_server.widgets.jenkins_heatmap import get_jenkins_heatmap
+from ibutsu_server.widgets.jenkins_job_analysis import (
+    get_jenkins_analysis_data,
+    get_jenkins_bar_chart,
+    get_jenkins_line_chart,
+)
+from ibutsu_server.widgets.jenkins_job_view import get_jenkins_job_view
+from ibutsu_server.widgets.result_aggregator import get_recent_result_data
+from ibutsu_server.widgets.result_summary import get_result_summary
+from ibutsu_server.widgets.run_aggregator import get_recent_run_data
+
+# The function that computes the data of each type of widget, from its parameters
+WIDGET_METHODS = {
+    "compare-runs-view": get_comparison_data,
+    "accessibility-dashboard-view": get_accessibility_dashboard_view,
+    "accessibility-analysis-view": get_accessibility_analysis_view,
+    "accessibility-bar-chart": get_accessibility_bar_chart,
+    "jenkins-analysis-view": get_jenkins_analysis_data,
+    "jenkins-bar-chart": get_jenkins_bar_chart,
+    "jenkins-heatmap": get_jenkins_heatmap,
+    "filter-heatmap": get_filter_heatmap,
+    "importance-component": get_importance_component,
+    "jenkins-job-view": get_jenkins_job_view,
+    "jenkins-line-chart": get_jenkins_line_chart,
+    "run-aggregator": get_recent_run_data,
+    "result-summary": get_result_summary,
+    "result-aggregator": get_recent_result_data,
+}
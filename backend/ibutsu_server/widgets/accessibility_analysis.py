@@ -1,4 +1,5 @@
 import yaml
+from sqlalchemy.orm import undefer
 
 from ibutsu_server.db import db
 from ibutsu_server.db.models import Artifact
@@ -11,9 +12,9 @@ def get_accessibility_bar_chart(run_list, _filters=None):
     """
     query_data = (
         db.session.execute(
-            db.select(Artifact).where(
-                Artifact.run_id.in_(run_list), Artifact.filename == "axe_run_data.yaml"
-            )
+            db.select(Artifact)
+            .where(Artifact.run_id.in_(run_list), Artifact.filename == "axe_run_data.yaml")
+            .options(undefer(Artifact.content))
         )
         .scalars()
         .all()
@@ -21,7 +22,7 @@ def get_accessibility_bar_chart(run_list, _filters=None):
 
     axe_datas = []
     for datum in query_data:
-        axe_datas.append(yaml.safe_load(datum.content))
+        axe_datas.append(yaml.safe_load(datum.read_content()))
     # parse the data for the frontend
     # this format is specific to the patternfly donut chart
     axe_data = None
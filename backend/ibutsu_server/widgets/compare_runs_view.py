@@ -1,76 +1,107 @@
+"""Compare the results of the latest runs that match some filters, test by test
+
+The results of each run are keyed by their test, its fspath and test ID, and joined on it in a hash
+table, from only the columns that are compared. Each test whose results differ between the runs is
+categorized by how the runs differ from the first run, and only the results of the page of
+differences are loaded in full.
+"""
+
 from ibutsu_server.db import db
 from ibutsu_server.db.models import Result
 from ibutsu_server.filters import convert_filter
 
+FAILED_RESULTS = {"failed", "error"}
+PASSED_RESULTS = {"passed", "xpassed"}
+SKIPPED_RESULTS = {"skipped", "xfailed"}
+COMPARISON_CATEGORIES = ["new_failure", "fixed", "newly_skipped", "missing", "changed"]
 
-def _get_comparison_data(additional_filters):
-    """Count occurrences of distinct fields within results."""
-    if not additional_filters:
-        return {
-            "results": [],
-            "pagination": {
-                "totalItems": 0,
-            },
-        }
-
-    queries = []
-    for _ in additional_filters:
-        queries.append(db.select(Result))
-
-    # Create DB ready filter strings
-    if additional_filters:
-        for i, filter in enumerate(additional_filters):
-            filters = filter.split(",")
-            for filter_string in filters:
-                filter_clause = convert_filter(filter_string, Result)
-                if filter_clause is not None:
-                    queries[i] = queries[i].where(filter_clause)
-
-    # Find run IDs for each filter
-    # Extract the ID value from the result row tuple
-    run_id_1 = db.session.execute(
-        queries[0].with_only_columns(Result.run_id).order_by(Result.start_time.desc()).limit(1)
-    ).scalar()
-    run_id_2 = db.session.execute(
-        queries[1].with_only_columns(Result.run_id).order_by(Result.start_time.desc()).limit(1)
+
+def _get_run_results(filter_string):
+    """Get the ID and result of each test of the latest run with results that match the filters
+
+    :return: The ID and result of the tests, keyed by their fspath and test ID
+    """
+    clauses = [
+        clause
+        for clause in (convert_filter(filter_, Result) for filter_ in filter_string.split(","))
+        if clause is not None
+    ]
+    run_id = db.session.execute(
+        db.select(Result.run_id).where(*clauses).order_by(Result.start_time.desc()).limit(1)
     ).scalar()
+    if not run_id:
+        return {}
+    rows = db.session.execute(
+        db.select(Result.data["fspath"].as_string(), Result.test_id, Result.id, Result.result)
+        .where(*clauses, Result.run_id == run_id)
+        .order_by(Result.start_time.asc())
+    )
+    # A test that ran more than once is compared by its last result
+    return {(fspath, test_id): (id_, result) for fspath, test_id, id_, result in rows}
+
 
-    # Get list of tests matching our filters and run IDs
-    results_1 = []
-    results_2 = []
-    if run_id_1:
-        results_1 = db.session.scalars(
-            queries[0].where(Result.run_id == run_id_1).order_by(Result.data["fspath"])
-        ).all()
-    if run_id_2:
-        results_2 = db.session.scalars(
-            queries[1].where(Result.run_id == run_id_2).order_by(Result.data["fspath"])
-        ).all()
-
-    # Build matrix by matching results
-    # Could revisit this if loading is taking too long
-    results = []
-    for result_1_obj in results_1:
-        result_1 = result_1_obj.to_dict()
-        for result_2_obj in results_2:
-            result_2 = result_2_obj.to_dict()
-            if (
-                result_1["metadata"]["fspath"] == result_2["metadata"]["fspath"]
-                and result_1["test_id"] == result_2["test_id"]
-                and result_1["result"] != result_2["result"]
-            ):
-                results.append((result_1, result_2))
-                break
-
-    total_items = len(results)
+def _categorize(tests):
+    """Categorize how the results of a test in the runs differ from its result in the first run
 
+    :param tests: The ID and result of the test in each run, or None if it's missing from a run
+    """
+    first, *others = tests
+    results = {test[1] for test in others if test is not None}
+    categories = []
+    if first is not None:
+        if first[1] not in FAILED_RESULTS and results & FAILED_RESULTS:
+            categories.append("new_failure")
+        if first[1] in FAILED_RESULTS and results & PASSED_RESULTS:
+            categories.append("fixed")
+        if first[1] not in SKIPPED_RESULTS and results & SKIPPED_RESULTS:
+            categories.append("newly_skipped")
+    if None in tests:
+        categories.append("missing")
+    return categories or ["changed"]
+
+
+def _get_comparison_data(additional_filters, category=None, page=1, page_size=25):
+    """Compare the results of the latest runs that match each of the filters, see the module"""
+    pagination = {"page": page, "pageSize": page_size, "totalItems": 0, "totalPages": 0}
+    summary = dict.fromkeys(COMPARISON_CATEGORIES, 0)
+    if not additional_filters:
+        return {"results": [], "categories": [], "summary": summary, "pagination": pagination}
+
+    runs = [_get_run_results(filter_string) for filter_string in additional_filters]
+    differences = []
+    for key in sorted(set().union(*runs), key=lambda key: (key[0] or "", key[1] or "")):
+        tests = [run.get(key) for run in runs]
+        if None not in tests and len({test[1] for test in tests}) < 2:
+            continue
+        categories = _categorize(tests)
+        for test_category in categories:
+            summary[test_category] += 1
+        if not category or category in categories:
+            differences.append((tests, categories))
+
+    pagination["totalItems"] = len(differences)
+    pagination["totalPages"] = (len(differences) + page_size - 1) // page_size
+    offset = (page - 1) * page_size
+    differences = differences[offset : offset + page_size]
+
+    # Only load the results of the page in full
+    result_ids = [test[0] for tests, _ in differences for test in tests if test is not None]
+    results = {
+        result.id: result.to_dict()
+        for result in db.session.scalars(db.select(Result).where(Result.id.in_(result_ids)))
+    }
     return {
-        "results": [(result_1, result_2) for result_1, result_2 in results],
-        "pagination": {
-            "totalItems": total_items,
-        },
+        "results": [
+            [results[test[0]] if test is not None else None for test in tests]
+            for tests, _ in differences
+        ],
+        "categories": [categories for _, categories in differences],
+        "summary": summary,
+        "pagination": pagination,
     }
 
 
-def get_comparison_data(additional_filters=None):
-    return _get_comparison_data(additional_filters=additional_filters)
+def get_comparison_data(additional_filters=None, category=None, page=1, page_size=25):
+    return _get_comparison_data(
+        additional_filters=additional_filters, category=category, page=page, page_size=page_size
+    )
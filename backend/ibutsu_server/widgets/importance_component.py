@@ -3,46 +3,79 @@ from collections import defaultdict
 from sqlalchemy import desc
 
 from ibutsu_server.db import db
+from ibutsu_server.db.base import Text
 from ibutsu_server.db.models import Result
 from ibutsu_server.filters import string_to_column
 from ibutsu_server.util.uuid import is_uuid
 
+IMPORTANCES = ["critical", "high", "medium", "low"]
+FAILED_RESULTS = ["error", "failed", "xpassed", "xfailed"]
 
-def _get_results(job_name, builds, components, project):
-    if project is None:
-        return []
-    if not is_uuid(project):
-        raise ValueError(f"Invalid project ID format: {project}")
-    mdat = string_to_column("metadata.importance", Result).label("importance")
-    bnumdat = string_to_column("metadata.jenkins.build_number", Result).label("build_number")
-    jnamedat = string_to_column("metadata.jenkins.job_name", Result).label("job_name")
+
+def _get_columns():
+    importance = string_to_column("metadata.importance", Result).label("importance")
+    # Build numbers are promoted to an integer column, but are returned as in the metadata
+    bnumcol = string_to_column("metadata.jenkins.build_number", Result)
+    bnumdat = bnumcol.cast(Text).label("build_number")
+    return importance, bnumcol, bnumdat
+
+
+def _get_filters(job_name, builds, components, project):
+    """Filter the results of the last ``builds`` builds of a Jenkins job, for some components"""
+    _, bnumcol, _ = _get_columns()
+    jnamedat = string_to_column("metadata.jenkins.job_name", Result)
     # Get the last 'builds' runs from a specific Jenkins Job
     # Pass select() directly to in_() instead of calling .subquery() to avoid coercion warning
     build_numbers_select = (
-        db.select(bnumdat)
+        db.select(bnumcol)
         .where(jnamedat == job_name, Result.project_id == project)
-        .group_by(bnumdat)
-        .order_by(desc(bnumdat))
+        .group_by(bnumcol)
+        .order_by(desc(bnumcol))
         .limit(builds)
     )
-    # Actually filter the results based on build_numbers, job_name, project_id and component.
+    return [
+        bnumcol.in_(build_numbers_select),
+        jnamedat == job_name,
+        Result.component.in_(components.split(",")),
+        Result.project_id == project,
+    ]
+
+
+def _get_results(job_name, builds, components, project):
+    """Count the results of each component, build, importance and result in the database"""
+    if project is None:
+        return []
+    if not is_uuid(project):
+        raise ValueError(f"Invalid project ID format: {project}")
+    importance, _, bnumdat = _get_columns()
     return db.session.execute(
         db.select(
             Result.component,
-            Result.id,
-            Result.result,
-            mdat,
             bnumdat,
-        ).where(
-            bnumdat.in_(build_numbers_select),
-            jnamedat == job_name,
-            Result.component.in_(components.split(",")),
-            Result.project_id == project,
+            importance,
+            Result.result,
+            db.func.count(Result.id).label("count"),
         )
+        .where(*_get_filters(job_name, builds, components, project))
+        .group_by(Result.component, bnumdat, importance, Result.result)
     ).all()
 
 
-def get_importance_component(  # noqa: PLR0912
+def _get_result_ids(job_name, builds, components, project):
+    """Get the IDs of the results of each component, build and importance"""
+    importance, _, bnumdat = _get_columns()
+    result_ids = defaultdict(list)
+    rows = db.session.execute(
+        db.select(Result.component, bnumdat, importance, Result.id).where(
+            *_get_filters(job_name, builds, components, project)
+        )
+    )
+    for component, build_number, result_importance, result_id in rows:
+        result_ids[(component, build_number, result_importance)].append(result_id)
+    return result_ids
+
+
+def get_importance_component(
     _env="prod",
     _group_field="component",
     job_name="",
@@ -50,100 +83,61 @@ def get_importance_component(  # noqa: PLR0912
     components="",
     project=None,
     count_skips=False,
+    include_results=False,
 ):
-    result_data = _get_results(job_name, builds, components, project)
+    """Get the pass percentage of the results of each component, build and importance
 
+    The results are counted in the database. Their IDs are only returned with ``include_results``,
+    otherwise the results of a cell can be found by filtering the results by its component, build
+    number and importance.
     """
-    This starts a (probably) over complicated bit of data maniplation
-    to get sdatdict in a proper state to be broken down into
-    sdatret, which is the format we need for the widget.
-    """
-    sdatdict = {}
-    bnums = set()
-    importances = ["critical", "high", "medium", "low"]
-    for datum in result_data:
-        # getting the components from the results
-        if datum.component not in sdatdict:
-            sdatdict[datum.component] = {}
-
-        # getting the build numbers from the results
-        if datum.build_number not in sdatdict[datum.component]:
-            bnums.add(datum.build_number)
-            sdatdict[datum.component][datum.build_number] = {}
-
-        # Adding all importances from our constant
-        if datum.importance not in sdatdict[datum.component][datum.build_number]:
-            sdatdict[datum.component][datum.build_number][datum.importance] = []
-        # adding the result value
-        sdatdict[datum.component][datum.build_number][datum.importance].append(
-            {"result": datum.result, "result_id": datum.id}
-        )
+    counts = _get_results(job_name, builds, components, project)
+    result_ids = (
+        _get_result_ids(job_name, builds, components, project) if include_results and counts else {}
+    )
+    failed_results = [*FAILED_RESULTS, "skipped"] if count_skips else FAILED_RESULTS
 
-    # This adds the extra importance values that didn't appear in the results
-    for _component, component_data in sdatdict.items():
-        for bnum in component_data:
-            for importance in importances:
-                if importance not in component_data[bnum]:
-                    component_data[bnum][importance] = []
-
-    # this is to change result values into numbers
-    for _component, component_data in sdatdict.items():
-        for bnum, bnum_data in component_data.items():
-            for importance, importance_data in bnum_data.items():
-                results_dict = defaultdict(int)
-                total = 0
-                res_list = []
-                for item in importance_data:
-                    total += 1
-                    results_dict[item["result"]] += 1
-                    res_list.append(item["result_id"])
-
-                if total != 0:
-                    if count_skips:
-                        passed = total - (
-                            results_dict["error"]
-                            + results_dict["skipped"]
-                            + results_dict["failed"]
-                            + results_dict["xpassed"]
-                            + results_dict["xfailed"]
-                        )
-                    else:
-                        passed = total - (
-                            results_dict["error"]
-                            + results_dict["failed"]
-                            + results_dict["xpassed"]
-                            + results_dict["xfailed"]
-                        )
-                    component_data[bnum][importance] = {
-                        "percentage": round(passed / total, 2),
-                        "result_list": res_list,
-                    }
-                else:
-                    component_data[bnum][importance] = {
-                        "percentage": "N/A",
-                        "result_list": res_list,
-                    }
+    # Count the results, and the results that didn't pass, of each cell
+    totals = defaultdict(lambda: defaultdict(lambda: defaultdict(lambda: [0, 0])))
+    bnums = set()
+    for datum in counts:
+        bnums.add(datum.build_number)
+        cell = totals[datum.component][datum.build_number][datum.importance]
+        cell[0] += datum.count
+        if datum.result in failed_results:
+            cell[1] += datum.count
 
-        for bnum in bnums:
-            if bnum not in component_data:
-                component_data[bnum] = {}
-                for importance in importances:
-                    component_data[bnum][importance] = {
-                        "percentage": "NA",
-                        "result_list": [],
-                    }
-
-    # Need this broken down more for the table
     table_data = []
-    for key, value in sdatdict.items():
+    for component, component_totals in totals.items():
+        component_data = {}
+        for bnum in bnums:
+            if bnum not in component_totals:
+                # This component has no results in this build
+                component_data[bnum] = {
+                    importance: {"percentage": "NA", "count": 0} for importance in IMPORTANCES
+                }
+                continue
+            # Importances that don't appear in the results of the build are empty
+            bnum_totals = {importance: [0, 0] for importance in IMPORTANCES}
+            bnum_totals.update(component_totals[bnum])
+            component_data[bnum] = {
+                importance: {
+                    "percentage": round((total - failed) / total, 2) if total else "N/A",
+                    "count": total,
+                }
+                for importance, (total, failed) in bnum_totals.items()
+            }
+        if include_results:
+            for bnum, bnum_data in component_data.items():
+                for importance, cell in bnum_data.items():
+                    cell["result_list"] = result_ids.get((component, bnum, importance), [])
         table_data.append(
             {
-                "component": key,
+                "component": component,
                 "bnums": sorted(bnums),
-                "importances": importances,
-                "data": value,
+                "importances": IMPORTANCES,
+                "data": component_data,
             }
         )
 
-    # return data, for sanity
     return {"table_data": table_data}
@@ -4,98 +4,78 @@ from ibutsu_server.db import db
 from ibutsu_server.db.base import Float, Integer
 from ibutsu_server.db.models import Run
 from ibutsu_server.filters import apply_filters, string_to_column
+from ibutsu_server.util.trends import calculate_slopes, get_heatmap_trends
 from ibutsu_server.util.uuid import is_uuid
 from ibutsu_server.util.widget import (
     create_jenkins_columns,
     create_summary_columns,
+    log_jenkins_builds_fallback,
+    select_jenkins_builds,
+    shared_query,
 )
 
 NO_RUN_TEXT = "None"
 NO_PASS_RATE_TEXT = "Build failed"  # noqa: S105
 
 
-def _calculate_slope(pass_percentages):
-    """Calculate the trend slope of the data using linear regression
-
-    :param pass_percentages: A list of pass percentages in chronological order,
-        e.g. [98, 54, 97, 99]
-    :type pass_percentages: list
-
-    :rtype float:
-    """
-    if not pass_percentages or len(pass_percentages) < 2:
-        return 0
-
-    # Special case: if all values are 100%, return 100 for stable trend
-    if all(x == 100 for x in pass_percentages):
-        return 100
-
-    # Use time sequence as x-values (independent variable)
-    # Pass percentages as y-values (dependent variable)
-    x_values = list(range(len(pass_percentages)))  # [0, 1, 2, 3, ...]
-    y_values = pass_percentages  # [98, 54, 97, 99]
+def _get_build_filters(job_name, project=None, additional_filters=None):
+    """Get the filters for the builds of a job"""
+    filters = [f"metadata.jenkins.job_name={job_name}"]
+    if additional_filters:
+        filters.extend(additional_filters.split(","))
+    if project and is_uuid(project):
+        filters.append(f"project_id={project}")
+    return filters
 
-    n = len(x_values)
-    x_avg = sum(x_values) / n
-    y_avg = sum(y_values) / n
 
-    try:
-        # Linear regression slope formula: slope = Σ((x-x̄)(y-ȳ)) / Σ((x-x̄)²)
-        numerator = sum((x - x_avg) * (y - y_avg) for x, y in zip(x_values, y_values, strict=False))
-        denominator = sum((x - x_avg) ** 2 for x in x_values)
+@shared_query
+def _get_builds(job_name, builds, project=None, additional_filters=None):
+    """Get available builds for the given job
 
-        if denominator == 0:
-            return 0
+    The builds are read from the rollup of the Jenkins builds if the filters can be applied to it,
+    otherwise, or if nothing in the rollup matches them, the runs are aggregated.
+    """
+    filters = _get_build_filters(job_name, project, additional_filters)
+    build_results = []
+    query = select_jenkins_builds(filters)
+    if query is not None:
+        build_results = db.session.execute(
+            query.order_by(desc("min_start_time")).limit(builds)
+        ).all()
+    if not build_results:
+        build_results = _aggregate_builds(filters, builds)
+        log_jenkins_builds_fallback("jenkins-heatmap", filters, query, build_results)
 
-        return numerator / denominator
+    if not build_results:
+        return None, []
 
-        # Scale the slope to be more interpretable for the frontend
-        # Positive slope = upward trend, negative slope = downward trend
+    build_numbers = [str(result.build_number) for result in build_results]
+    min_start_time = min(result.min_start_time for result in build_results)
 
-    except ZeroDivisionError:
-        return 0
+    return min_start_time, build_numbers
 
 
-def _get_builds(job_name, builds, project=None, additional_filters=None):
-    """Get available builds for the given job"""
-    filters = [
-        f"metadata.jenkins.job_name={job_name}",
-        "metadata.jenkins.build_number@y",
-    ]
-    if additional_filters:
-        filters.extend(additional_filters.split(","))
-    if project and is_uuid(project):
-        filters.append(f"project_id={project}")
+def _aggregate_builds(filters, builds):
+    """Aggregate the runs that match the filters by build"""
+    filters = [*filters, "metadata.jenkins.build_number@y"]
 
-    # Generate the build number column reference
+    # Generate the build number column reference, which is the promoted integer column
     build_number_col = string_to_column("metadata.jenkins.build_number", Run)
 
     # Create a single query to get recent builds with their min start times
     query = db.select(
         func.min(Run.start_time).label("min_start_time"),
-        build_number_col.cast(Integer).label("build_number"),
+        build_number_col.label("build_number"),
     ).select_from(Run)
 
     # Apply filters
     query = apply_filters(query, filters, Run)
 
     # Group and order to get the most recent builds
-    query = (
-        query.group_by(build_number_col.cast(Integer))
-        .order_by(desc("min_start_time"))
-        .limit(builds)
-    )
+    query = query.group_by(build_number_col).order_by(desc("min_start_time")).limit(builds)
 
     # Execute the query and extract results
-    build_results = db.session.execute(query).all()
-
-    if not build_results:
-        return None, []
-
-    build_numbers = [str(result.build_number) for result in build_results]
-    min_start_time = min(result.min_start_time for result in build_results)
-
-    return min_start_time, build_numbers
+    return db.session.execute(query).all()
 
 
 def _get_heatmap(job_name, builds, group_field, count_skips, project=None, additional_filters=None):
@@ -122,6 +102,7 @@ def _get_heatmap(job_name, builds, group_field, count_skips, project=None, addit
 
     # Get column references using helper function
     jenkins_cols = create_jenkins_columns(Run)
+    build_number_col = string_to_column("metadata.jenkins.build_number", Run)
     group_field_col = string_to_column(group_field, Run)
 
     if group_field_col is None:
@@ -134,7 +115,7 @@ def _get_heatmap(job_name, builds, group_field, count_skips, project=None, addit
         jenkins_cols["annotations"].label("annotations"),
         group_field_col.label("group_field"),
         jenkins_cols["job_name"].label("job_name"),
-        jenkins_cols["build_number"].cast(Integer).label("build_number"),
+        build_number_col.label("build_number"),
         Run.summary["failures"].cast(Float).label("failures"),
         Run.summary["errors"].cast(Float).label("errors"),
         Run.summary["skips"].cast(Float).label("skips"),
@@ -174,12 +155,13 @@ def _get_heatmap(job_name, builds, group_field, count_skips, project=None, addit
             ]
         )
 
-    # Add slope information using dictionary comprehension (Python 3.9 compatible)
-    data_with_slope = {}
-    for key, value in data.items():
-        slope_info = _calculate_slope([item[0] for item in value])
-        # Insert slope as a single item at the beginning
-        data_with_slope[key] = [[slope_info, 0], *value]
+    # Add the slope of each group, in the order of the builds, as the first item
+    for value in data.values():
+        value.sort(key=lambda item: int(item[3]))
+    slopes = calculate_slopes([[item[0] for item in value] for value in data.values()])
+    data_with_slope = {
+        key: [[slope, 0], *value] for (key, value), slope in zip(data.items(), slopes, strict=True)
+    }
 
     return data_with_slope, build_numbers
 
@@ -215,6 +197,7 @@ def get_jenkins_heatmap(
     count_skips=False,
     project=None,
     additional_filters=None,
+    trends=False,
 ):
     """Generate JSON data for a heatmap of Jenkins runs"""
     heatmap, builds_in_db = _get_heatmap(
@@ -222,25 +205,15 @@ def get_jenkins_heatmap(
     )
     # do some postprocessing -- fill runs in which plugins failed to start with null
     heatmap = _pad_heatmap(heatmap, builds_in_db)
+    if trends:
+        # The builds that failed are left out of the trends, which are aligned with the heatmap
+        return {"heatmap": heatmap, "trends": get_heatmap_trends(heatmap)}
     return {"heatmap": heatmap}
 
 
-def get_jenkins_summary(
-    job_name,
-    builds,
-    project=None,
-    additional_filters=None,
-    run_limit=None,
-):
-    """Generate JSON data for a summary of Jenkins runs"""
-    filters = [
-        f"metadata.jenkins.job_name={job_name}",
-        "metadata.jenkins.build_number@y",
-    ]
-    if additional_filters:
-        filters.extend(additional_filters.split(","))
-    if project and is_uuid(project):
-        filters.append(f"project_id={project}")
+def _summarize_builds(filters, builds):
+    """Aggregate the runs that match the filters by job and build"""
+    filters = [*filters, "metadata.jenkins.build_number@y"]
 
     # Use shared utility functions for consistent column creation
     jenkins_cols = create_jenkins_columns(Run)
@@ -275,8 +248,30 @@ def get_jenkins_summary(
         .limit(builds)
     )
 
-    # Execute query and convert results to list of dictionaries
-    result = db.session.execute(query).all()
+    return db.session.execute(query).all()
+
+
+def get_jenkins_summary(
+    job_name,
+    builds,
+    project=None,
+    additional_filters=None,
+    run_limit=None,
+):
+    """Generate JSON data for a summary of Jenkins runs
+
+    The builds are read from the rollup of the Jenkins builds if the filters can be applied to it,
+    otherwise, or if nothing in the rollup matches them, the runs are aggregated.
+    """
+    filters = _get_build_filters(job_name, project, additional_filters)
+    result = []
+    query = select_jenkins_builds(filters)
+    if query is not None:
+        result = db.session.execute(query.order_by(desc("max_start_time")).limit(builds)).all()
+    if not result:
+        result = _summarize_builds(filters, builds)
+        log_jenkins_builds_fallback("jenkins-summary", filters, query, result)
+
     summary_data = [
         {
             "job_name": row.job_name,
@@ -6,25 +6,18 @@ from ibutsu_server.db.base import Integer, Text
 from ibutsu_server.db.models import Run
 from ibutsu_server.filters import apply_filters
 from ibutsu_server.util.uuid import is_uuid
-from ibutsu_server.util.widget import create_jenkins_columns, create_summary_columns
+from ibutsu_server.util.widget import (
+    create_jenkins_columns,
+    create_summary_columns,
+    log_jenkins_builds_fallback,
+    select_jenkins_builds,
+    shared_query,
+)
 
 
-def _get_jenkins_aggregation(
-    additional_filters=None, project=None, page=1, page_size=25, run_limit=JJV_RUN_LIMIT
-):
-    """Get a list of Jenkins jobs"""
-    offset = (page * page_size) - page_size
-
-    # first create the filters
-    query_filters = ["metadata.jenkins.build_number@y", "metadata.jenkins.job_name@y"]
-    if additional_filters:
-        for idx, filter in enumerate(additional_filters):
-            if "job_name" in filter or "build_number" in filter:
-                additional_filters[idx] = f"metadata.jenkins.{filter}"
-        query_filters.extend(additional_filters)
-    if project and is_uuid(project):
-        query_filters.append(f"project_id={project}")
-    filters = query_filters
+def _aggregate_runs(filters, run_limit):
+    """Aggregate the runs that match the filters by Jenkins job and build"""
+    filters = ["metadata.jenkins.build_number@y", "metadata.jenkins.job_name@y", *filters]
 
     # get the runs on which to run the aggregation, we select from a subset of runs to improve
     # performance, otherwise we'd be aggregating over ALL runs
@@ -65,13 +58,45 @@ def _get_jenkins_aggregation(
     if run_limit is None:
         query = apply_filters(query, filters, run_ref)
 
-    query = query.group_by(jenkins_cols["job_name"], jenkins_cols["build_number"]).order_by(
-        desc("max_start_time")
-    )
+    return query.group_by(jenkins_cols["job_name"], jenkins_cols["build_number"])
+
 
-    # form a count query
-    count_query = query.subquery()
-    total_count = db.session.execute(db.select(func.count()).select_from(count_query)).scalar()
+def _get_jenkins_aggregation(
+    additional_filters=None, project=None, page=1, page_size=25, run_limit=JJV_RUN_LIMIT
+):
+    """Get a list of Jenkins jobs
+
+    The builds are read from the rollup of the Jenkins builds, which doesn't need a run limit. The
+    runs are only aggregated if the filters can't be applied to the rollup, or if nothing in the
+    rollup matches them, e.g. before it is backfilled.
+    """
+    offset = (page * page_size) - page_size
+
+    # first create the filters
+    filters = []
+    if additional_filters:
+        for idx, filter in enumerate(additional_filters):
+            if "job_name" in filter or "build_number" in filter:
+                additional_filters[idx] = f"metadata.jenkins.{filter}"
+        filters.extend(additional_filters)
+    if project and is_uuid(project):
+        filters.append(f"project_id={project}")
+
+    query = select_jenkins_builds(filters)
+    total_count = 0
+    if query is not None:
+        total_count = db.session.execute(
+            db.select(func.count()).select_from(query.subquery())
+        ).scalar()
+    if not total_count:
+        rollup_query = query
+        query = _aggregate_runs(filters, run_limit)
+        # form a count query
+        total_count = db.session.execute(
+            db.select(func.count()).select_from(query.subquery())
+        ).scalar()
+        log_jenkins_builds_fallback("jenkins-job-view", filters, rollup_query, total_count)
+    query = query.order_by(desc("max_start_time"))
 
     # apply pagination and get data
     query_data = db.session.execute(query.offset(offset).limit(page_size)).all()
@@ -120,6 +145,7 @@ def _get_jenkins_aggregation(
     return data
 
 
+@shared_query
 def get_jenkins_job_view(
     additional_filters=None, project=None, page=1, page_size=25, run_limit=None
 ):
@@ -1,26 +1,37 @@
 import time
+from collections import Counter
 from datetime import UTC, datetime, timedelta
 
 from sqlalchemy import desc, func
 
 from ibutsu_server.db import db
-from ibutsu_server.db.models import Result
+from ibutsu_server.db.models import Result, ResultRollup
 from ibutsu_server.filters import apply_filters, string_to_column
+from ibutsu_server.util.rollups import (
+    convert_rollup_filters,
+    filter_partial_days,
+    get_rollup_column,
+    get_rollup_period,
+)
 from ibutsu_server.util.uuid import is_uuid
 
 # Default limit for filter mode to prevent excessive results
 FILTER_MODE_LIMIT = 200
 
 
+def _get_start_time(days):
+    delta = timedelta(days=days).total_seconds()
+    current_time = time.time()
+    time_period_in_sec = current_time - delta
+    return datetime.fromtimestamp(time_period_in_sec, UTC)
+
+
 def _build_filters(group_field, days, project, run_id, additional_filters):
     """Build filter list for the query."""
     filters = [f"{group_field}@y"]
 
     if days:
-        delta = timedelta(days=days).total_seconds()
-        current_time = time.time()
-        time_period_in_sec = current_time - delta
-        filters.append(f"start_time>{datetime.fromtimestamp(time_period_in_sec, UTC)}")
+        filters.append(f"start_time>{_get_start_time(days)}")
     if additional_filters:
         filters.extend(additional_filters.split(","))
     if project and is_uuid(project):
@@ -52,8 +63,50 @@ def _get_distinct_values(group_field, filters, limit=FILTER_MODE_LIMIT):
     return [{"_id": _id} for _id in query_data]
 
 
+def _get_rollup_result_data(group_field, days, project, run_id, additional_filters):
+    """Count occurrences of distinct fields from the daily rollups of the results
+
+    Only the partial days at either end of the period are counted from the results themselves.
+
+    :return: The counts, or None if the rollups don't cover the query, see
+             ibutsu_server.util.rollups
+    """
+    rollup_column = get_rollup_column(group_field, ResultRollup)
+    if not days or rollup_column is None:
+        return None
+    start_time = _get_start_time(days)
+    period = get_rollup_period(start_time)
+    if not period:
+        return None
+    filters = _build_filters(group_field, None, project, run_id, additional_filters)
+    clauses = convert_rollup_filters(filters, ResultRollup, period)
+    if clauses is None:
+        return None
+
+    rollup_query = (
+        db.select(rollup_column, func.sum(ResultRollup.count))
+        .where(*clauses)
+        .group_by(rollup_column)
+    )
+    counts = Counter(dict(db.session.execute(rollup_query).all()))
+
+    group_field_column = string_to_column(group_field, Result)
+    query = (
+        db.select(group_field_column, func.count(Result.id))
+        .select_from(Result)
+        .where(filter_partial_days(Result.start_time, start_time, period))
+        .group_by(group_field_column)
+    )
+    counts.update(dict(db.session.execute(apply_filters(query, filters, Result)).all()))
+    return [{"_id": _id, "count": count} for _id, count in counts.most_common()]
+
+
 def _get_recent_result_data(group_field, days, project=None, run_id=None, additional_filters=None):
     """Count occurrences of distinct fields within results."""
+    rollup_data = _get_rollup_result_data(group_field, days, project, run_id, additional_filters)
+    if rollup_data is not None:
+        return rollup_data
+
     filters = _build_filters(group_field, days, project, run_id, additional_filters)
 
     # generate the group field
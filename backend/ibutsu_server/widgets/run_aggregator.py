@@ -1,14 +1,82 @@
 import time
 from datetime import UTC, datetime, timedelta
 
+from sqlalchemy import func
+
 from ibutsu_server.db import db
 from ibutsu_server.db.base import Float
-from ibutsu_server.db.models import Run
+from ibutsu_server.db.models import Run, RunRollup
 from ibutsu_server.filters import apply_filters, string_to_column
+from ibutsu_server.util.rollups import (
+    convert_rollup_filters,
+    filter_partial_days,
+    get_rollup_column,
+    get_rollup_period,
+)
 from ibutsu_server.util.uuid import is_uuid
 from ibutsu_server.util.widget import create_basic_summary_columns
 
 
+def _select_run_counts(group_column):
+    # Use shared utility for consistent summary columns
+    summary_cols = create_basic_summary_columns(Run, cast_type=Float, use_alternate_names=True)
+    return (
+        db.select(
+            group_column.label("group"),
+            summary_cols["failures"].label("failed"),
+            summary_cols["errors"].label("error"),
+            summary_cols["skips"].label("skipped"),
+            summary_cols["tests"].label("total"),
+            summary_cols["xpassed"],
+            summary_cols["xfailed"],
+        )
+        .select_from(Run)
+        .group_by(group_column)
+    )
+
+
+def _get_rollup_run_counts(start_time, group_field, filters):
+    """Sum up the runs by a field from the daily rollups of the runs
+
+    Only the partial days at either end of the period are summed up from the runs themselves.
+
+    :return: The sums of each group, or None if the rollups don't cover the query, see
+             ibutsu_server.util.rollups
+    """
+    rollup_column = get_rollup_column(group_field, RunRollup)
+    period = get_rollup_period(start_time) if rollup_column is not None else None
+    if not period:
+        return None
+    clauses = convert_rollup_filters(filters, RunRollup, period)
+    if clauses is None:
+        return None
+
+    rollup_query = (
+        db.select(
+            rollup_column,
+            *[
+                func.sum(getattr(RunRollup, key))
+                for key in ["failures", "errors", "skips", "tests", "xpassed", "xfailed"]
+            ],
+        )
+        .where(*clauses)
+        .group_by(rollup_column)
+    )
+    query = _select_run_counts(string_to_column(group_field, Run)).where(
+        filter_partial_days(Run.start_time, start_time, period)
+    )
+    totals = {}
+    for group, *counts in [
+        *db.session.execute(rollup_query),
+        *db.session.execute(apply_filters(query, filters, Run)),
+    ]:
+        group_totals = totals.get(group, [0] * len(counts))
+        totals[group] = [
+            total + (count or 0) for total, count in zip(group_totals, counts, strict=True)
+        ]
+    return [(group, *counts) for group, counts in totals.items()]
+
+
 def _get_recent_run_data(weeks, group_field, project=None, additional_filters=None):
     """Get all the data from the time period and aggregate the results"""
     data = {
@@ -22,56 +90,31 @@ def _get_recent_run_data(weeks, group_field, project=None, additional_filters=No
     delta = timedelta(weeks=weeks).total_seconds()
     current_time = time.time()
     time_period_in_sec = current_time - delta
+    start_time = datetime.fromtimestamp(time_period_in_sec, UTC)
 
-    # create filters for start time and that the group_field exists
-    filters = [
-        f"start_time>{datetime.fromtimestamp(time_period_in_sec, UTC)}",
-        f"{group_field}@y",
-    ]
+    # create filters for that the group_field exists
+    filters = [f"{group_field}@y"]
     if additional_filters:
         filters.extend(additional_filters.split(","))
     if project and is_uuid(project):
         filters.append(f"project_id={project}")
 
     # generate the group field
-    group_field = string_to_column(group_field, Run)
+    group_column = string_to_column(group_field, Run)
 
-    if group_field is None:
+    if group_column is None:
         return data
 
-    # Use shared utility for consistent summary columns
-    summary_cols = create_basic_summary_columns(Run, cast_type=Float, use_alternate_names=True)
-
-    # create the query
-    query = (
-        db.select(
-            group_field.label("group"),
-            summary_cols["failures"].label("failed"),
-            summary_cols["errors"].label("error"),
-            summary_cols["skips"].label("skipped"),
-            summary_cols["tests"].label("total"),
-            summary_cols["xpassed"],
-            summary_cols["xfailed"],
-        )
-        .select_from(Run)
-        .group_by(group_field)
-    )
-
-    # filter the query
-    query = apply_filters(query, filters, Run)
-
-    # make the query
-    query_data = db.session.execute(query).all()
+    query_data = _get_rollup_run_counts(start_time, group_field, filters)
+    if query_data is None:
+        # filter the query for the start time, and make the query
+        query = _select_run_counts(group_column)
+        query = apply_filters(query, [f"start_time>{start_time}", *filters], Run)
+        query_data = db.session.execute(query).all()
 
     # parse the data
-    for row in query_data:
-        group = row.group
-        failed = row.failed or 0
-        error = row.error or 0
-        skipped = row.skipped or 0
-        total = row.total or 0
-        xpassed = row.xpassed or 0
-        xfailed = row.xfailed or 0
+    for group, *counts in query_data:
+        failed, error, skipped, total, xpassed, xfailed = (count or 0 for count in counts)
 
         # Skip groups with zero total tests to avoid division by zero
         if not total or total == 0:
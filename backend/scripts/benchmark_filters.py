@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+"""
+Benchmark the conversion of filters into SQLAlchemy clauses.
+
+This script converts the filters of a typical widget over and over, once without the cache of
+converted filters and once with it, and reports the time per filter. See ``convert_filter`` in
+``ibutsu_server/filters.py``.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from ibutsu_server.db.models import Result
+from ibutsu_server.filters import _convert_filter, _convert_model_filter, convert_filter
+
+FILTERS = [
+    "result=passed",
+    "metadata.component=frontend",
+    "metadata.jenkins.job_name=nightly-tests",
+    "env*prod;stage",
+    "duration>10.5",
+    "metadata.tags=smoke",
+    "project_id~a1b2",
+    "metadata.jenkins.build_number=123",
+]
+
+
+def benchmark(name, convert, iterations):
+    """Convert the filters a number of times and print the time per filter."""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for filter_string in FILTERS:
+            convert(filter_string, Result)
+    elapsed = (time.perf_counter() - start) / (iterations * len(FILTERS))
+    print(f"{name:>8}: {elapsed * 1e6:.1f}us per filter")
+    return elapsed
+
+
+def main():
+    """Run the benchmark and print the results."""
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument(
+        "--iterations", type=int, default=1000, help="number of times to convert the filters"
+    )
+    args = arg_parser.parse_args()
+
+    print(f"Converting {len(FILTERS)} filters {args.iterations} times")
+    uncached = benchmark("uncached", _convert_filter, args.iterations)
+    _convert_model_filter.cache_clear()
+    cached = benchmark("cached", convert_filter, args.iterations)
+    print(f"The cache is {uncached / cached:.0f}x faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+"""
+Benchmark the JUnit importer.
+
+This script generates a synthetic JUnit XML file, imports it with ``run_junit_import`` once for
+each requested ``IMPORT_BATCH_SIZE``, and reports the import throughput in tests per second.
+A batch size of 1 commits after every test case, which approximates the importer's behaviour
+before results and artifacts were inserted in batches.
+
+By default the benchmark uses a throwaway SQLite database. Set ``SQLALCHEMY_DATABASE_URI`` to
+benchmark against PostgreSQL instead; the tables must already exist in that database.
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+from unittest.mock import patch
+
+from flask import Flask
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from ibutsu_server.db.base import db
+from ibutsu_server.db.models import Import, ImportFile, Result
+from ibutsu_server.tasks.importers import run_junit_import
+
+
+def generate_junit_xml(tests, failure_rate=0.1):
+    """Generate a JUnit XML file with the given number of test cases."""
+    failures = int(tests * failure_rate)
+    testcases = []
+    for i in range(tests):
+        children = f"<system-out>Output from test {i}</system-out>"
+        if i < failures:
+            children += f'<failure message="assert False">Traceback for test {i}</failure>'
+        testcases.append(
+            f'<testcase name="test_{i}" classname="tests.test_benchmark" time="0.01">'
+            f"{children}</testcase>"
+        )
+    return (
+        f'<testsuite name="benchmark" tests="{tests}" failures="{failures}">'
+        f"{''.join(testcases)}</testsuite>"
+    ).encode()
+
+
+def create_app(database_uri):
+    """Create a minimal Flask app that only has the database configured.
+
+    There is no Redis either, so the count and widget caches and the rollups that an import
+    invalidates are disabled.
+    """
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = database_uri
+    app.config["COUNT_CACHE_TTL"] = 0
+    app.config["WIDGET_CACHE_TTL"] = 0
+    app.config["WIDGET_ROLLUPS"] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def benchmark_import(app, content, batch_size):
+    """Import the JUnit XML with the given batch size and return the elapsed time in seconds."""
+    app.config["IMPORT_BATCH_SIZE"] = batch_size
+    with app.app_context():
+        import_record = Import(
+            filename="benchmark.xml",
+            format="junit",
+            status="pending",
+            data={},
+            created=datetime.now(UTC),
+        )
+        db.session.add(import_record)
+        db.session.commit()
+        db.session.add(ImportFile(import_id=import_record.id, content=content))
+        db.session.commit()
+        import_id = import_record.id
+
+        # The cleanup task would need a Celery broker, and isn't part of the import itself
+        with patch("ibutsu_server.tasks.importers.clear_import_file_content"):
+            start = time.perf_counter()
+            run_junit_import({"id": import_id})
+            elapsed = time.perf_counter() - start
+
+        run_id = db.session.get(Import, import_id).run_id
+        imported = db.session.execute(
+            db.select(db.func.count(Result.id)).where(Result.run_id == run_id)
+        ).scalar()
+        db.session.remove()
+    return elapsed, imported
+
+
+def main():
+    """Run the benchmark and print the results."""
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--tests", type=int, default=5000, help="number of test cases")
+    arg_parser.add_argument(
+        "--batch-sizes",
+        type=int,
+        nargs="+",
+        default=[1, 500],
+        help="the IMPORT_BATCH_SIZE values to benchmark",
+    )
+    args = arg_parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        database_uri = os.environ.get(
+            "SQLALCHEMY_DATABASE_URI", f"sqlite:///{Path(tmp_dir) / 'benchmark.db'}"
+        )
+        app = create_app(database_uri)
+        content = generate_junit_xml(args.tests)
+        print(f"Importing {args.tests} tests ({len(content)} bytes) into {database_uri}")
+        for batch_size in args.batch_sizes:
+            elapsed, imported = benchmark_import(app, content, batch_size)
+            print(
+                f"batch size {batch_size:>6}: {imported} tests in {elapsed:.2f}s, "
+                f"{imported / elapsed:.0f} tests/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""
+Benchmark the trend analytics of the heatmap widgets.
+
+This script generates random pass percentages for many groups, and times ``calculate_slopes`` and
+``analyze_trends`` on all of them at once. For comparison, it also times the slopes calculated one
+group at a time in pure Python, which is how the heatmap widgets calculated them before.
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from ibutsu_server.constants import HEATMAP_MAX_BUILDS
+from ibutsu_server.util.trends import STABLE_SLOPE, analyze_trends, calculate_slopes
+
+MIN_BUILDS = 2  # the number of builds that a slope needs
+
+
+def generate_series(groups, builds, seed=0):
+    """Generate the pass percentages of some groups, some of which lack their first builds"""
+    rng = random.Random(seed)  # noqa: S311
+    return [
+        [round(rng.uniform(50, 100), 2) for _ in range(rng.randint(1, builds))]
+        for _ in range(groups)
+    ]
+
+
+def calculate_slope_in_python(pass_percentages):
+    """Calculate the slope of one group in pure Python, like the widgets did before."""
+    if len(pass_percentages) < MIN_BUILDS:
+        return 0
+    if all(x == STABLE_SLOPE for x in pass_percentages):
+        return STABLE_SLOPE
+    x_values = list(range(len(pass_percentages)))
+    x_avg = sum(x_values) / len(x_values)
+    y_avg = sum(pass_percentages) / len(pass_percentages)
+    numerator = sum(
+        (x - x_avg) * (y - y_avg) for x, y in zip(x_values, pass_percentages, strict=True)
+    )
+    denominator = sum((x - x_avg) ** 2 for x in x_values)
+    return numerator / denominator
+
+
+def benchmark(name, function, repeat):
+    """Run a function a few times and print the best elapsed time."""
+    elapsed = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed.append(time.perf_counter() - start)
+    print(f"{name:>24}: {min(elapsed) * 1000:.1f}ms")
+
+
+def main():
+    """Run the benchmark and print the results."""
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--groups", type=int, default=10000, help="number of groups")
+    arg_parser.add_argument(
+        "--builds", type=int, default=HEATMAP_MAX_BUILDS, help="max number of builds of a group"
+    )
+    arg_parser.add_argument("--repeat", type=int, default=5, help="number of times to run each")
+    args = arg_parser.parse_args()
+
+    series_list = generate_series(args.groups, args.builds)
+    print(f"Analyzing {args.groups} groups of up to {args.builds} builds")
+    benchmark(
+        "slopes, one at a time",
+        lambda: [calculate_slope_in_python(series) for series in series_list],
+        args.repeat,
+    )
+    benchmark("calculate_slopes", lambda: calculate_slopes(series_list), args.repeat)
+    benchmark("analyze_trends", lambda: analyze_trends(series_list), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,16 @@
 import json
+from datetime import UTC, datetime
+from hashlib import sha256
 from io import BytesIO
 
 import pytest
+from sqlalchemy import inspect
 
 from ibutsu_server.controllers.artifact_controller import upload_artifact
 from ibutsu_server.db import db
 from ibutsu_server.db.base import session
 from ibutsu_server.db.models import Artifact, User
+from ibutsu_server.util.storage import store_content
 
 
 def test_delete_artifact(flask_app, artifact_test_hierarchy, auth_headers):
@@ -97,6 +101,30 @@ def test_get_artifact(flask_app, artifact_test_hierarchy, auth_headers):
     response_data = response.json()
     assert response_data["filename"] == "test.log"
     assert response_data["result_id"] == result_id
+    assert response_data["content_size"] == len(b"test content")
+    assert response_data["content_hash"] == sha256(b"test content").hexdigest()
+    assert "content" not in response_data
+
+
+def test_artifact_content_is_deferred(flask_app, artifact_test_hierarchy):
+    """Test that artifact content is only loaded when it's accessed"""
+    client, _ = flask_app
+    result_id = str(artifact_test_hierarchy["result"].id)
+
+    with client.application.app_context():
+        session.add(Artifact(filename="test.log", content=b"test content", result_id=result_id))
+        session.commit()
+        session.expunge_all()
+
+        artifact = db.session.execute(
+            db.select(Artifact).where(Artifact.result_id == result_id)
+        ).scalar_one()
+        artifact_dict = artifact.to_dict()
+        assert "content" in inspect(artifact).unloaded
+        assert artifact_dict["content_size"] == len(b"test content")
+
+        assert artifact.content == b"test content"
+        assert "content" not in inspect(artifact).unloaded
 
 
 def test_get_artifact_list(flask_app, artifact_test_hierarchy, auth_headers):
@@ -165,6 +193,60 @@ def test_upload_artifact(flask_app, artifact_test_hierarchy, auth_headers):
         assert "id" in response_data
 
 
+def test_upload_artifact_to_storage(flask_app, artifact_test_hierarchy, auth_headers, tmp_path):
+    """Test uploading, viewing and deleting an artifact in a filesystem storage backend"""
+    client, jwt_token = flask_app
+    result = artifact_test_hierarchy["result"]
+    client.application.config["ARTIFACT_STORAGE"] = "filesystem"
+    client.application.config["ARTIFACT_STORAGE_PATH"] = str(tmp_path)
+
+    with client.application.test_request_context(
+        "/api/artifact",
+        method="POST",
+        content_type="multipart/form-data",
+        data={
+            "resultId": str(result.id),
+            "filename": "log.txt",
+            "file": (BytesIO(b"filecontent"), "log.txt"),
+        },
+    ):
+        test_user = User.query.filter_by(email="test@example.com").first()
+        response_data, status_code = upload_artifact(user=test_user)
+        assert status_code == 201, f"Response: {response_data}"
+        artifact = db.session.get(Artifact, response_data["id"])
+        assert artifact.content is None
+        assert artifact.content_size == len(b"filecontent")
+        stored_file = tmp_path / artifact.storage_key
+        assert stored_file.read_bytes() == b"filecontent"
+
+    headers = auth_headers(jwt_token)
+    response = client.get(f"/api/artifact/{response_data['id']}/view", headers=headers)
+    assert response.status_code == 200, f"Response body: {response.text}"
+    assert response.content == b"filecontent"
+
+    response = client.delete(f"/api/artifact/{response_data['id']}", headers=headers)
+    assert response.status_code == 200, f"Response body: {response.text}"
+    assert not stored_file.exists()
+
+
+def test_view_artifact_in_database(flask_app, artifact_test_hierarchy, auth_headers, tmp_path):
+    """Test that artifacts stored in the database stay readable with a storage backend"""
+    client, jwt_token = flask_app
+    result = artifact_test_hierarchy["result"]
+
+    with client.application.app_context():
+        artifact = Artifact(filename="test.txt", content=b"in the database", result_id=result.id)
+        session.add(artifact)
+        session.commit()
+        artifact_id = artifact.id
+
+    client.application.config["ARTIFACT_STORAGE"] = "filesystem"
+    client.application.config["ARTIFACT_STORAGE_PATH"] = str(tmp_path)
+    response = client.get(f"/api/artifact/{artifact_id}/view", headers=auth_headers(jwt_token))
+    assert response.status_code == 200, f"Response body: {response.text}"
+    assert response.content == b"in the database"
+
+
 def test_view_artifact(flask_app, artifact_test_hierarchy, auth_headers):
     """Test case for view_artifact - streaming artifact to browser"""
     client, jwt_token = flask_app
@@ -195,6 +277,123 @@ def test_view_artifact(flask_app, artifact_test_hierarchy, auth_headers):
     assert "Content-Type" in response.headers
 
 
+def test_view_artifact_range_and_conditional(flask_app, artifact_test_hierarchy, auth_headers):
+    """Test view_artifact supports range requests, and conditional requests on ETag/date"""
+    client, jwt_token = flask_app
+    result = artifact_test_hierarchy["result"]
+    content = b"0123456789" * 100
+
+    with client.application.app_context():
+        artifact = Artifact(
+            filename="test.log",
+            content=content,
+            result_id=result.id,
+            data={"contentType": "text/x-log"},
+            upload_date=datetime(2026, 1, 2, 3, 4, 5, tzinfo=UTC),
+        )
+        session.add(artifact)
+        session.commit()
+        artifact_id = artifact.id
+
+    headers = auth_headers(jwt_token)
+    url = f"/api/artifact/{artifact_id}/view"
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200, f"Response body: {response.text}"
+    assert response.content == content
+    # The stored content type is used, rather than detecting it again
+    assert response.headers["Content-Type"].startswith("text/x-log")
+    assert response.headers["Accept-Ranges"] == "bytes"
+    assert response.headers["ETag"] == f'"{sha256(content).hexdigest()}"'
+    assert response.headers["Last-Modified"] == "Fri, 02 Jan 2026 03:04:05 GMT"
+
+    response = client.get(url, headers={**headers, "Range": "bytes=10-19"})
+    assert response.status_code == 206, f"Response body: {response.text}"
+    assert response.content == content[10:20]
+    assert response.headers["Content-Range"] == f"bytes 10-19/{len(content)}"
+
+    response = client.get(url, headers={**headers, "If-None-Match": response.headers["ETag"]})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    response = client.get(
+        url, headers={**headers, "If-Modified-Since": "Fri, 02 Jan 2026 03:04:05 GMT"}
+    )
+    assert response.status_code == 304
+
+
+def test_view_artifact_compressed(flask_app, artifact_test_hierarchy, auth_headers):
+    """Test gzipped artifacts are passed through to clients that accept gzip"""
+    client, jwt_token = flask_app
+    result = artifact_test_hierarchy["result"]
+    content = b"some log output\n" * 1000
+
+    with client.application.app_context():
+        client.application.config["ARTIFACT_COMPRESSION"] = "gzip"
+        artifact = Artifact(
+            filename="test.log",
+            result_id=result.id,
+            data={"contentType": "text/plain"},
+        )
+        artifact.set_content(store_content(content, Artifact.__tablename__))
+        session.add(artifact)
+        session.commit()
+        artifact_id = artifact.id
+        assert artifact.content_encoding == "gzip"
+        assert len(artifact.open_stored_content().read()) < len(content)
+
+    headers = auth_headers(jwt_token)
+    url = f"/api/artifact/{artifact_id}/view"
+    response = client.get(url, headers={**headers, "Accept-Encoding": "gzip"})
+    assert response.status_code == 200, f"Response body: {response.text}"
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["ETag"] == f'"{sha256(content).hexdigest()}-gzip"'
+    assert "Accept-Encoding" in response.headers["Vary"]
+    # The test client decompresses the content
+    assert response.content == content
+
+    response = client.get(url, headers={**headers, "Accept-Encoding": "identity"})
+    assert response.status_code == 200, f"Response body: {response.text}"
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["ETag"] == f'"{sha256(content).hexdigest()}"'
+    assert response.content == content
+
+    # Ranges are of the uncompressed content
+    response = client.get(url, headers={**headers, "Accept-Encoding": "gzip", "Range": "bytes=5-7"})
+    assert response.status_code == 206, f"Response body: {response.text}"
+    assert "Content-Encoding" not in response.headers
+    assert response.content == b"log"
+
+
+def test_view_artifact_detects_missing_content_type(
+    flask_app, artifact_test_hierarchy, auth_headers
+):
+    """Test the content type of older artifacts is detected on the first view, and saved"""
+    client, jwt_token = flask_app
+    result = artifact_test_hierarchy["result"]
+
+    with client.application.app_context():
+        artifact = Artifact(filename="test.txt", content=b"plain text", result_id=result.id)
+        session.add(artifact)
+        session.commit()
+        artifact_id = artifact.id
+
+    response = client.get(f"/api/artifact/{artifact_id}/view", headers=auth_headers(jwt_token))
+    assert response.status_code == 200, f"Response body: {response.text}"
+    assert response.headers["Content-Type"].startswith("text/plain")
+    with client.application.app_context():
+        assert db.session.get(Artifact, artifact_id).data["contentType"] == "text/plain"
+
+
+def test_view_artifact_not_found(flask_app, auth_headers):
+    """Test view_artifact returns a 404 for an artifact that doesn't exist"""
+    client, jwt_token = flask_app
+    response = client.get(
+        "/api/artifact/00000000-0000-0000-0000-000000000000/view",
+        headers=auth_headers(jwt_token),
+    )
+    assert response.status_code == 404
+
+
 def test_view_artifact_with_run_id(flask_app, make_project, make_run, auth_headers):
     """Test view_artifact for artifact attached to run (not result)"""
     client, jwt_token = flask_app
@@ -519,5 +718,6 @@ def test_upload_artifact_via_http(
     with client.application.app_context():
         artifact = db.session.get(Artifact, artifact_id)
         assert artifact is not None
-        assert artifact.content == file_content
-        assert artifact.data == metadata
+        assert artifact.read_content() == file_content
+        # The content type is detected when the artifact is uploaded
+        assert artifact.data == {**metadata, "contentType": "text/plain"}
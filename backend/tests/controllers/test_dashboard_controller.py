@@ -1,4 +1,7 @@
+import json
+
 import pytest
+from flask import has_app_context
 
 from ibutsu_server.db import db
 from ibutsu_server.db.base import session
@@ -472,3 +475,122 @@ def test_add_dashboard_without_project_id(flask_app, auth_headers):
     )
     # Should succeed - project_id is optional
     assert response.status_code == 201
+
+
+def test_render_dashboard(
+    flask_app, make_project, make_dashboard, make_widget_config, make_run, auth_headers
+):
+    """Test case for render_dashboard - the widgets are computed for the project of their config"""
+    client, jwt_token = flask_app
+
+    project = make_project(name="test-project")
+    dashboard = make_dashboard(title="Test Dashboard", project_id=project.id)
+    make_run(project_id=project.id, summary={"tests": 3, "failures": 1, "errors": 0, "skips": 0})
+    # Runs of other projects aren't counted
+    make_run(
+        project_id=make_project(name="other-project").id,
+        summary={"tests": 5, "failures": 5, "errors": 0, "skips": 0},
+    )
+    summary = make_widget_config(
+        dashboard_id=dashboard.id,
+        project_id=project.id,
+        widget="result-summary",
+        title="Summary",
+        weight=1,
+    )
+    invalid = make_widget_config(
+        dashboard_id=dashboard.id,
+        project_id=project.id,
+        widget="run-aggregator",
+        params={"weeks": 4, "group_field": "component", "unknown": "value"},
+        weight=0,
+    )
+    # Views aren't rendered with the dashboard
+    make_widget_config(dashboard_id=dashboard.id, widget="compare-runs-view", type="view")
+
+    response = client.get(f"/api/dashboard/{dashboard.id}/render", headers=auth_headers(jwt_token))
+    assert response.status_code == 200, f"Response body is : {response.text}"
+
+    response_data = response.json()
+    assert response_data["dashboard_id"] == str(dashboard.id)
+    assert [widget["id"] for widget in response_data["widgets"]] == [invalid.id, summary.id]
+    invalid_data, summary_data = response_data["widgets"]
+    assert invalid_data["status"] == 400
+    assert "unknown" in invalid_data["error"]
+    assert summary_data["status"] == 200
+    assert summary_data["title"] == "Summary"
+    assert summary_data["data"]["passed"] == 2
+    assert summary_data["data"]["failed"] == 1
+
+
+def test_render_dashboard_stream(flask_app, make_project, make_dashboard, make_widget_config):
+    """Test case for render_dashboard - the widgets are streamed as lines of JSON"""
+    client, jwt_token = flask_app
+
+    project = make_project(name="test-project")
+    dashboard = make_dashboard(title="Test Dashboard", project_id=project.id)
+    widget_ids = {
+        make_widget_config(
+            dashboard_id=dashboard.id, project_id=project.id, widget="result-summary"
+        ).id
+        for _ in range(3)
+    }
+
+    response = client.get(
+        f"/api/dashboard/{dashboard.id}/render",
+        headers={"Authorization": f"Bearer {jwt_token}"},
+        params={"stream": True},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    widgets = [json.loads(line) for line in response.text.splitlines()]
+    assert {widget["id"] for widget in widgets} == widget_ids
+    assert all(widget["status"] == 200 for widget in widgets)
+
+
+def test_render_dashboard_stream_without_app_context(flask_app):
+    """Test case for render_dashboard - the widgets are streamed after the request's app context
+
+    The make_* fixtures keep an app context pushed, which would hide a streamed response that
+    needs it, so the dashboard is created in an app context of its own.
+    """
+    client, jwt_token = flask_app
+
+    with client.application.app_context():
+        project = Project(name="test-project")
+        session.add(project)
+        session.commit()
+        dashboard = Dashboard(title="Test Dashboard", project_id=project.id)
+        session.add(dashboard)
+        session.commit()
+        widget_config = WidgetConfig(
+            type="widget",
+            widget="result-summary",
+            dashboard_id=dashboard.id,
+            project_id=project.id,
+            params={},
+        )
+        session.add(widget_config)
+        session.commit()
+        dashboard_id, widget_id = str(dashboard.id), str(widget_config.id)
+    assert not has_app_context()
+
+    response = client.get(
+        f"/api/dashboard/{dashboard_id}/render",
+        headers={"Authorization": f"Bearer {jwt_token}"},
+        params={"stream": True},
+    )
+    assert response.status_code == 200
+    widgets = [json.loads(line) for line in response.text.splitlines()]
+    assert [(widget["id"], widget["status"]) for widget in widgets] == [(widget_id, 200)]
+
+
+def test_render_dashboard_not_found(flask_app, auth_headers):
+    """Test case for render_dashboard - dashboard not found"""
+    client, jwt_token = flask_app
+
+    response = client.get(
+        "/api/dashboard/12345678-1234-1234-1234-123456789012/render",
+        headers=auth_headers(jwt_token),
+    )
+    assert response.status_code == 404
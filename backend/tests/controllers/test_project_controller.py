@@ -1,3 +1,5 @@
+from unittest.mock import patch
+
 import pytest
 
 from ibutsu_server.db import db
@@ -323,6 +325,30 @@ def test_update_project_as_superadmin(flask_app, make_project, make_user, auth_h
     assert response_data["title"] == "Updated by superadmin"
 
 
+@pytest.mark.integration
+def test_update_project_change_owner(flask_app, make_project, make_user, auth_headers):
+    """Test update_project invalidates the permissions of both the old and the new owner"""
+    client, jwt_token = flask_app
+    client.application.config["PERMISSIONS_CACHE_TTL"] = 30
+
+    old_owner = make_user(email="old-owner@example.com")
+    new_owner = make_user(email="new-owner@example.com")
+    project = make_project(name="moved-project", owner_id=old_owner.id)
+
+    headers = auth_headers(jwt_token)
+    with patch("ibutsu_server.util.projects.delete_cached") as mock_delete:
+        response = client.put(
+            f"/api/project/{project.id}",
+            headers=headers,
+            json={"owner_id": str(new_owner.id)},
+        )
+    assert response.status_code == 200
+    assert response.json()["owner_id"] == str(new_owner.id)
+    mock_delete.assert_called_once_with(
+        *sorted(f"ibutsu:permissions:{user.id}" for user in (old_owner, new_owner))
+    )
+
+
 @pytest.mark.integration
 def test_get_project_list_with_name_filter(flask_app, make_project, auth_headers):
     """Test get_project_list with name filter"""
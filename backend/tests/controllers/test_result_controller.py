@@ -1,3 +1,6 @@
+from datetime import UTC, datetime, timedelta
+from unittest.mock import patch
+
 import pytest
 
 from ibutsu_server.db import db
@@ -105,6 +108,90 @@ def test_get_result_list(
     assert response_data["pagination"]["pageSize"] == page_size
 
 
+def test_get_result_list_cursor(flask_app, make_project, make_run, make_result, auth_headers):
+    """Test case for get_result_list, paging through the results with cursors"""
+    client, jwt_token = flask_app
+    project = make_project(name="test-project")
+    run = make_run(project_id=project.id)
+    start_time = datetime(2026, 1, 1, tzinfo=UTC)
+    # Some of the results start at the same time, so they're ordered by their IDs
+    results = [
+        make_result(run_id=run.id, project_id=project.id, start_time=start_time + timedelta(i // 2))
+        for i in range(7)
+    ]
+    expected_ids = [
+        str(result.id)
+        for result in sorted(results, key=lambda r: (r.start_time, str(r.id)), reverse=True)
+    ]
+
+    headers = auth_headers(jwt_token)
+    result_ids = []
+    query_string = [("pageSize", 3), ("filter", f"project_id={project.id}")]
+    response = client.get("/api/result", headers=headers, params=query_string)
+    while True:
+        assert response.status_code == 200, f"Response body is : {response.text}"
+        response_data = response.json()
+        result_ids.extend(result["id"] for result in response_data["results"])
+        next_cursor = response_data["pagination"]["nextCursor"]
+        if not next_cursor:
+            break
+        response = client.get(
+            "/api/result", headers=headers, params=[*query_string, ("cursor", next_cursor)]
+        )
+
+    assert result_ids == expected_ids
+
+
+def test_get_result_list_async_count(flask_app, make_project, make_run, make_result, auth_headers):
+    """Test case for get_result_list, counting the results in a task"""
+    client, jwt_token = flask_app
+    project = make_project(name="test-project")
+    run = make_run(project_id=project.id)
+    for _ in range(5):
+        make_result(run_id=run.id, project_id=project.id)
+
+    headers = auth_headers(jwt_token)
+    query_string = [("filter", f"project_id={project.id}"), ("asyncCount", True)]
+    with patch("ibutsu_server.util.query.count_task") as mock_count_task:
+        mock_count_task.apply_async.return_value.id = "count-task-id"
+        response = client.get(
+            "/api/result", headers=headers, params=[*query_string, ("pageSize", 3)]
+        )
+        assert response.status_code == 200, f"Response body is : {response.text}"
+        pagination = response.json()["pagination"]
+        assert pagination["totalItems"] is None
+        assert pagination["totalPages"] is None
+        assert pagination["countTaskId"] == "count-task-id"
+        mock_count_task.apply_async.assert_called_once()
+        assert mock_count_task.apply_async.call_args.args[0][0] == "results"
+
+        # The count is known on the last page, without counting
+        mock_count_task.reset_mock()
+        response = client.get(
+            "/api/result",
+            headers=headers,
+            params=[*query_string, ("pageSize", 3), ("page", 2)],
+        )
+        pagination = response.json()["pagination"]
+        assert pagination["totalItems"] == 5
+        assert pagination["totalPages"] == 2
+        assert "countTaskId" not in pagination
+        mock_count_task.apply_async.assert_not_called()
+
+
+def test_get_result_list_invalid_cursor(flask_app, make_project, auth_headers):
+    """Test case for get_result_list with a cursor that isn't valid"""
+    client, jwt_token = flask_app
+    project = make_project(name="test-project")
+
+    response = client.get(
+        "/api/result",
+        headers=auth_headers(jwt_token),
+        params=[("filter", f"project_id={project.id}"), ("cursor", "not-a-cursor")],
+    )
+    assert response.status_code == 400, f"Response body is : {response.text}"
+
+
 @pytest.mark.integration
 def test_get_result_list_filter_by_result_status(
     flask_app, make_project, make_run, make_result, auth_headers
@@ -269,6 +356,30 @@ def test_get_result_list_with_project_filter_for_superadmin(
 
 
 @pytest.mark.integration
+def test_add_result_incremental_run_summary(flask_app, make_project, make_run, auth_headers):
+    """Test add_result queues the result for the run summary when INCREMENTAL_RUN_SUMMARY is set"""
+    client, jwt_token = flask_app
+    project = make_project(name="test-project")
+    run = make_run(project_id=project.id)
+    result_data = {
+        "result": "passed",
+        "test_id": "test.example",
+        "metadata": {"run": str(run.id)},
+        "project_id": str(project.id),
+    }
+
+    with patch("ibutsu_server.controllers.result_controller.add_result_to_run") as mock_task:
+        client.application.config["INCREMENTAL_RUN_SUMMARY"] = True
+        try:
+            response = client.post("/api/result", headers=auth_headers(jwt_token), json=result_data)
+        finally:
+            client.application.config["INCREMENTAL_RUN_SUMMARY"] = False
+        client.post("/api/result", headers=auth_headers(jwt_token), json=result_data)
+
+    assert response.status_code == 201, f"Response body is : {response.text}"
+    mock_task.delay.assert_called_once_with(response.json()["id"])
+
+
 def test_add_result_with_invalid_project(flask_app, make_run, auth_headers):
     """Test add_result with invalid project ID"""
     client, jwt_token = flask_app
@@ -1,10 +1,11 @@
-from datetime import UTC, datetime
+from datetime import UTC, datetime, timedelta
 from unittest.mock import patch
 
 import pytest
 
 from ibutsu_server.db import db
-from ibutsu_server.db.models import Run
+from ibutsu_server.db.models import JenkinsBuild, Run
+from ibutsu_server.tasks.runs import get_run_build, refresh_run_builds
 
 
 @patch("ibutsu_server.controllers.run_controller.update_run_task")
@@ -268,6 +269,31 @@ def test_get_run_list_pagination_metadata(flask_app, make_project, make_run, aut
     assert response_data["pagination"]["totalPages"] == 2
 
 
+def test_get_run_list_cursor(flask_app, make_project, make_run, auth_headers):
+    """Test case for get_run_list, getting the next page with a cursor"""
+    client, jwt_token = flask_app
+    project = make_project(name="test-project")
+    start_time = datetime(2026, 1, 1, tzinfo=UTC)
+    runs = [make_run(project_id=project.id, start_time=start_time + timedelta(i)) for i in range(5)]
+
+    headers = auth_headers(jwt_token)
+    query_string = [("filter", f"project_id={project.id}"), ("pageSize", 3)]
+    response = client.get("/api/run", headers=headers, params=query_string)
+    assert response.status_code == 200, f"Response body is : {response.text}"
+    first_page = response.json()
+    assert [run["id"] for run in first_page["runs"]] == [str(run.id) for run in runs[:1:-1]]
+
+    response = client.get(
+        "/api/run",
+        headers=headers,
+        params=[*query_string, ("cursor", first_page["pagination"]["nextCursor"])],
+    )
+    assert response.status_code == 200, f"Response body is : {response.text}"
+    second_page = response.json()
+    assert [run["id"] for run in second_page["runs"]] == [str(runs[1].id), str(runs[0].id)]
+    assert second_page["pagination"]["nextCursor"] is None
+
+
 @pytest.mark.parametrize(
     ("run_data_builder", "needs_project", "expected_error_fragment"),
     [
@@ -353,6 +379,38 @@ def test_update_run_change_project(
     assert response_data["project_id"] == str(project2.id)
 
 
+@patch("ibutsu_server.controllers.run_controller.update_run_task")
+def test_update_run_change_jenkins_build(
+    mock_update_run_task, flask_app, make_project, make_run, auth_headers
+):
+    """Test update_run recounts both the old and the new Jenkins build of the run"""
+    client, jwt_token = flask_app
+
+    project = make_project(name="test-project")
+    run = make_run(
+        project_id=project.id,
+        summary={"tests": 10},
+        metadata={"jenkins": {"job_name": "nightly", "build_number": "1"}},
+    )
+    with client.application.app_context():
+        refresh_run_builds(get_run_build(db.session.get(Run, run.id)))
+
+    update_data = {"metadata": {"jenkins": {"job_name": "nightly", "build_number": "2"}}}
+    headers = auth_headers(jwt_token)
+    response = client.put(
+        f"/api/run/{run.id}",
+        headers=headers,
+        json=update_data,
+    )
+    assert response.status_code == 200
+
+    with client.application.app_context():
+        builds = db.session.execute(
+            db.select(JenkinsBuild.jenkins_build_number, JenkinsBuild.run_count)
+        ).all()
+        assert builds == [(2, 1)]
+
+
 def test_get_run_list_filter_by_duration(flask_app, make_project, make_run, auth_headers):
     """Test get_run_list with duration filter"""
     client, jwt_token = flask_app
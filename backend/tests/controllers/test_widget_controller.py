@@ -1,5 +1,6 @@
 from datetime import UTC, datetime, timedelta
 from http import HTTPStatus
+from unittest.mock import patch
 
 import pytest
 
@@ -165,6 +166,31 @@ def test_get_widget_invalid_id(flask_app, auth_headers):
     assert response.status_code == 400
 
 
+def test_get_widget_async(flask_app, make_project, auth_headers):
+    """Test a widget is computed in a task with async, and the response points at the task"""
+    client, jwt_token = flask_app
+    project = make_project(name="widget-test")
+
+    with (
+        patch(
+            "ibutsu_server.controllers.widget_controller.register_widget_task",
+            side_effect=lambda _id, _params, task_id: task_id,
+        ),
+        patch("ibutsu_server.controllers.widget_controller.compute_widget") as mock_compute,
+    ):
+        response = client.get(
+            f"/api/widget/result-summary?project={project.id}&async=true",
+            headers=auth_headers(jwt_token),
+        )
+
+    assert response.status_code == 202, f"Response body is : {response.text}"
+    task_id = response.json()["task_id"]
+    assert response.json()["query_endpoint"] == f"/task/{task_id}"
+    mock_compute.apply_async.assert_called_once_with(
+        ("result-summary", {"project": str(project.id)}), task_id=task_id
+    )
+
+
 @pytest.mark.integration
 def test_widget_endpoints_with_query_params(flask_app, make_project, make_run, auth_headers):
     """Test that widget endpoints accept query parameters without UUID validation errors.
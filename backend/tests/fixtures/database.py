@@ -84,6 +84,11 @@ def flask_app():
         "KEYCLOAK_AUTH_PATH": "auth",
         "CELERY_BROKER_URL": "redis://localhost:6379/0",
         "CELERY_RESULT_BACKEND": "redis://localhost:6379/0",
+        # There's no Redis server for the caches of counts, permissions and widgets, or rollup days
+        "COUNT_CACHE_TTL": 0,
+        "PERMISSIONS_CACHE_TTL": 0,
+        "WIDGET_CACHE_TTL": 0,
+        "WIDGET_ROLLUPS": False,
     }
     connexion_app = get_app(**extra_config)
     flask_app = connexion_app.app
@@ -5,7 +5,7 @@ This module provides fixtures for HTTP headers, pagination test cases,
 and other common testing utilities.
 """
 
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
 import pytest
 
@@ -65,6 +65,28 @@ def mocked_celery():
         yield mock
 
 
+@pytest.fixture
+def rollup_redis(flask_app):
+    """
+    Enable the daily rollups, with a mocked Redis client that keeps the values it's given.
+
+    The locks of the rollup tasks are mocked too, so the tasks can be called directly.
+    """
+    client, _ = flask_app
+    client.application.config["WIDGET_ROLLUPS"] = True
+    redis_client = MagicMock()
+    values = {}
+    redis_client.get.side_effect = values.get
+    redis_client.set.side_effect = values.__setitem__
+    redis_client.spop.return_value = []
+    with (
+        client.application.app_context(),
+        patch("ibutsu_server.util.rollups.get_client", return_value=redis_client),
+        patch("ibutsu_server.tasks.rollups.lock"),
+    ):
+        yield redis_client
+
+
 # ============================================================================
 # CONNEXION 3 HELPERS - Working with httpx responses
 # ============================================================================
@@ -8,7 +8,17 @@ import pytest
 
 from ibutsu_server.db import db
 from ibutsu_server.db.base import session
-from ibutsu_server.db.models import Artifact, Import, ImportFile, Project, Result, Run, User
+from ibutsu_server.db.models import (
+    Artifact,
+    ContentBlob,
+    Import,
+    ImportFile,
+    JenkinsBuild,
+    Project,
+    Result,
+    Run,
+    User,
+)
 from ibutsu_server.tasks.db import (
     clear_import_file_content,
     prune_old_files,
@@ -17,6 +27,8 @@ from ibutsu_server.tasks.db import (
     prune_old_runs,
     seed_users,
 )
+from ibutsu_server.tasks.runs import get_run_build, refresh_run_builds
+from ibutsu_server.util.storage import store_content
 
 
 @pytest.fixture
@@ -49,6 +61,33 @@ def test_prune_old_files(make_artifact, app_ctx):
     assert recent_artifact_id in artifact_ids
 
 
+def test_prune_old_files_shared_content(make_artifact, app_ctx, monkeypatch, tmp_path):
+    """Test prune_old_files only deletes shared content once its last artifact is deleted."""
+    monkeypatch.setitem(app_ctx.application.config, "ARTIFACT_STORAGE", "filesystem")
+    monkeypatch.setitem(app_ctx.application.config, "ARTIFACT_STORAGE_PATH", str(tmp_path))
+    old_date = datetime.now(UTC) - timedelta(days=180)
+    for _ in range(2):
+        make_artifact(upload_date=old_date, **store_content(b"shared", "artifacts"))
+    recent_artifact = make_artifact(
+        upload_date=datetime.now(UTC) - timedelta(days=30),
+        **store_content(b"shared", "artifacts"),
+    )
+    stored_file = tmp_path / recent_artifact.storage_key
+    assert ContentBlob.query.one().reference_count == 3
+
+    prune_old_files(months=5)
+
+    assert stored_file.read_bytes() == b"shared"
+    assert ContentBlob.query.one().reference_count == 1
+
+    recent_artifact.upload_date = old_date
+    session.commit()
+    prune_old_files(months=5)
+
+    assert not stored_file.exists()
+    assert ContentBlob.query.count() == 0
+
+
 def test_prune_old_files_minimum_months(make_artifact, app_ctx):
     """Test prune_old_files doesn't delete files if months < 2."""
     old_date = datetime.now(UTC) - timedelta(days=180)
@@ -128,6 +167,26 @@ def test_prune_old_runs(make_run, app_ctx):
     assert recent_run_id in run_ids
 
 
+def test_prune_old_runs_recounts_jenkins_builds(make_project, make_run, app_ctx):
+    """Test prune_old_runs recounts the Jenkins builds that some of the pruned runs were in."""
+    project = make_project(name="test-project")
+    for days, build_number in [(400, 1), (400, 2), (30, 2)]:
+        run = make_run(
+            project_id=project.id,
+            start_time=datetime.now(UTC) - timedelta(days=days),
+            summary={"tests": 1},
+            metadata={"jenkins": {"job_name": "nightly", "build_number": build_number}},
+        )
+    refresh_run_builds((project.id, "nightly", 1), get_run_build(run))
+
+    prune_old_runs(months=12)
+
+    builds = db.session.execute(
+        db.select(JenkinsBuild.jenkins_build_number, JenkinsBuild.run_count)
+    ).all()
+    assert builds == [(2, 1)]
+
+
 def test_prune_old_runs_minimum_months(make_run, app_ctx):
     """Test prune_old_runs doesn't delete if months < 10."""
     old_date = datetime.now(UTC) - timedelta(days=400)
@@ -553,6 +612,8 @@ def test_clear_import_file_content_done_status(make_import, app_ctx):
     updated_file = db.session.get(ImportFile, import_file_id)
     assert updated_file is not None
     assert updated_file.content is None
+    # The size of the uploaded file is kept
+    assert updated_file.content_size == len(test_content)
 
     # Check return message
     assert "Cleared" in result
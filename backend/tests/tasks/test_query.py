@@ -1,6 +1,6 @@
 """Tests for ibutsu_server.tasks.query module"""
 
-from ibutsu_server.tasks.query import query_task
+from ibutsu_server.tasks.query import count_task, query_task
 
 
 def test_query_task_results(make_project, make_run, make_result, flask_app, fixed_time):
@@ -33,6 +33,50 @@ def test_query_task_results(make_project, make_run, make_result, flask_app, fixe
         assert len(result["results"]) == 10
 
 
+def test_query_task_cursor(make_project, make_run, make_result, flask_app, fixed_time):
+    """Test query_task pages through results with cursors, when they start at the same time."""
+    client, _ = flask_app
+
+    with client.application.app_context():
+        project = make_project(name="test-project")
+        run = make_run(project_id=project.id)
+        for i in range(5):
+            make_result(
+                run_id=run.id, project_id=project.id, test_id=f"test_{i}", start_time=fixed_time
+            )
+
+        first_page = query_task(page_size=3, tablename="results")
+        second_page = query_task(
+            page_size=3, tablename="results", cursor=first_page["pagination"]["nextCursor"]
+        )
+
+        result_ids = [result["id"] for result in first_page["results"] + second_page["results"]]
+        assert len(second_page["results"]) == 2
+        assert result_ids == sorted(result_ids, reverse=True)
+        assert len(set(result_ids)) == 5
+        assert second_page["pagination"]["nextCursor"] is None
+
+
+def test_count_task(make_project, make_run, make_result, make_user, flask_app):
+    """Test count_task counts the results that the user can see, with the filters."""
+    client, _ = flask_app
+
+    with client.application.app_context():
+        project = make_project(name="test-project")
+        other_project = make_project(name="other-project")
+        user = make_user(email="member@example.com")
+        project.users.append(user)
+        run = make_run(project_id=project.id)
+        other_run = make_run(project_id=other_project.id)
+        for status in ("passed", "passed", "failed"):
+            make_result(run_id=run.id, project_id=project.id, result=status)
+            make_result(run_id=other_run.id, project_id=other_project.id, result=status)
+
+        assert count_task(tablename="results") == {"pagination": {"totalItems": 6}}
+        result = count_task(tablename="results", filter_=["result=passed"], user_id=str(user.id))
+        assert result == {"pagination": {"totalItems": 2}}
+
+
 def test_query_task_with_filter(make_project, make_run, make_result, flask_app, fixed_time):
     """Test query_task with filter."""
     client, _ = flask_app
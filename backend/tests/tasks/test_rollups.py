@@ -0,0 +1,89 @@
+"""Tests for the daily rollups of results and runs"""
+
+from datetime import UTC, datetime, timedelta
+
+from ibutsu_server.db import db
+from ibutsu_server.db.models import ResultRollup, RunRollup
+from ibutsu_server.tasks.rollups import backfill_rollups, refresh_rollups, refresh_rollups_of_day
+from ibutsu_server.util.rollups import DIRTY_KEY, SINCE_KEY
+
+
+def test_refresh_rollups_of_day(make_project, make_run, make_result, rollup_redis):
+    """Test the results and runs of a day are counted by the rollup fields, replacing old counts"""
+    project = make_project(name="test-project")
+    day = datetime.now(UTC) - timedelta(days=3)
+    run = make_run(
+        project_id=project.id,
+        start_time=day,
+        component="frontend",
+        summary={"tests": 3, "failures": 1, "errors": 0, "skips": 1},
+    )
+    for result, metadata in [
+        ("passed", {}),
+        ("failed", {"classification": "product_failure"}),
+        ("failed", {"classification": "product_failure"}),
+    ]:
+        make_result(
+            project_id=project.id,
+            run_id=run.id,
+            start_time=day,
+            component="frontend",
+            result=result,
+            metadata=metadata,
+        )
+    # Results on other days, or of other projects, aren't counted
+    make_result(project_id=project.id, start_time=day - timedelta(days=1), component="frontend")
+    make_result(project_id=make_project().id, start_time=day, component="frontend")
+    db.session.add(ResultRollup(project_id=project.id, day=day.date(), result="stale", count=9))
+    db.session.commit()
+
+    refresh_rollups_of_day(project.id, day.date())
+    db.session.commit()
+
+    result_counts = db.session.execute(
+        db.select(ResultRollup.result, ResultRollup.classification, ResultRollup.count)
+        .where(ResultRollup.project_id == project.id)
+        .order_by(ResultRollup.result)
+    ).all()
+    assert result_counts == [("failed", "product_failure", 2), ("passed", None, 1)]
+    run_rollup = db.session.execute(db.select(RunRollup)).scalar_one()
+    assert (run_rollup.component, run_rollup.run_count) == ("frontend", 1)
+    assert (run_rollup.tests, run_rollup.failures, run_rollup.skips) == (3, 1, 1)
+
+
+def test_refresh_rollups(make_project, make_result, rollup_redis):
+    """Test the days that were marked in Redis are recounted"""
+    project = make_project(name="test-project")
+    day = datetime.now(UTC) - timedelta(days=1)
+    make_result(project_id=project.id, start_time=day, component="frontend")
+    rollup_redis.spop.side_effect = [[f"{project.id}/{day.date()}".encode()], []]
+
+    refresh_rollups()
+
+    rollup = db.session.execute(db.select(ResultRollup)).scalar_one()
+    assert (rollup.day, rollup.component, rollup.count) == (day.date(), "frontend", 1)
+    assert rollup_redis.spop.call_args.args[0] == DIRTY_KEY
+
+
+def test_backfill_rollups(make_project, make_result, rollup_redis):
+    """Test every day is recounted, and the first day of the rollups is recorded"""
+    project = make_project(name="test-project")
+    now = datetime.now(UTC)
+    for days_ago in [0, 2, 2, 5, 40]:
+        make_result(project_id=project.id, start_time=now - timedelta(days=days_ago))
+    # A day without any results left is removed from the rollup
+    db.session.add(ResultRollup(project_id=project.id, day=(now - timedelta(days=3)).date()))
+    db.session.commit()
+
+    backfill_rollups(days=30)
+
+    rollups = db.session.execute(
+        db.select(ResultRollup.day, ResultRollup.count).order_by(ResultRollup.day)
+    ).all()
+    assert rollups == [
+        ((now - timedelta(days=5)).date(), 1),
+        ((now - timedelta(days=2)).date(), 2),
+        (now.date(), 1),
+    ]
+    since = (now - timedelta(days=30)).date()
+    rollup_redis.set.assert_called_once_with(SINCE_KEY, since.isoformat())
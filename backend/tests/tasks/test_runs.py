@@ -3,12 +3,22 @@
 from datetime import UTC, datetime, timedelta
 from unittest.mock import patch
 
+import pytest
+from celery.exceptions import Retry
 from redis.exceptions import LockError
+from sqlalchemy.exc import IntegrityError
 
 from ibutsu_server.db import db
 from ibutsu_server.db.base import session
-from ibutsu_server.db.models import Run
-from ibutsu_server.tasks.runs import compute_pass_percent, sync_aborted_runs, update_run
+from ibutsu_server.db.models import JenkinsBuild, Run
+from ibutsu_server.tasks.runs import (
+    add_result_to_run,
+    backfill_jenkins_builds,
+    compute_pass_percent,
+    refresh_jenkins_build,
+    sync_aborted_runs,
+    update_run,
+)
 
 
 def test_update_run(make_project, make_run, make_result, flask_app, fixed_time):
@@ -64,6 +74,163 @@ def test_update_run(make_project, make_run, make_result, flask_app, fixed_time):
         assert updated_run.duration == 4.5
 
 
+def test_update_run_copies_first_result(make_project, make_run, make_result, flask_app, fixed_time):
+    """Test update_run copies the columns and metadata of the earliest result to the run."""
+    client, _ = flask_app
+
+    with client.application.app_context():
+        project = make_project(name="test-project")
+        run = make_run(project_id=project.id, summary={"collected": 3})
+        make_result(
+            run_id=run.id,
+            project_id=project.id,
+            result="passed",
+            start_time=fixed_time + timedelta(minutes=1),
+            env="later-env",
+            metadata={"tags": ["later"]},
+        )
+        make_result(
+            run_id=run.id,
+            project_id=project.id,
+            result="skipped",
+            start_time=fixed_time,
+            env="first-env",
+            component="first-component",
+            metadata={"tags": ["first"], "jenkins": {"job_name": "job"}},
+        )
+
+        with (
+            patch("ibutsu_server.tasks.runs.is_locked", return_value=False),
+            patch("ibutsu_server.tasks.runs.lock"),
+        ):
+            update_run(str(run.id))
+
+        session.expire_all()
+        updated_run = db.session.get(Run, run.id)
+
+        assert updated_run.env == "first-env"
+        assert updated_run.component == "first-component"
+        assert updated_run.data["tags"] == ["first"]
+        assert updated_run.data["jenkins"] == {"job_name": "job"}
+        assert updated_run.summary["tests"] == 2
+        assert updated_run.summary["skips"] == 1
+        assert updated_run.summary["not_run"] == 1
+        assert updated_run.duration == 2.0
+
+
+def test_add_result_to_run(make_project, make_run, make_result, flask_app, fixed_time):
+    """Test add_result_to_run applies each result to the run summary without a recount."""
+    client, _ = flask_app
+
+    with client.application.app_context():
+        project = make_project(name="test-project")
+        run = make_run(project_id=project.id, summary={"collected": 4})
+        first = make_result(
+            run_id=run.id,
+            project_id=project.id,
+            result="passed",
+            duration=1.5,
+            start_time=fixed_time,
+            env="first-env",
+            metadata={"tags": ["first"]},
+        )
+        second = make_result(
+            run_id=run.id,
+            project_id=project.id,
+            result="failed",
+            duration=2.0,
+            start_time=fixed_time,
+            env="second-env",
+        )
+
+        with patch("ibutsu_server.tasks.runs.lock"):
+            add_result_to_run(str(first.id))
+            add_result_to_run(str(second.id))
+
+        session.expire_all()
+        updated_run = db.session.get(Run, run.id)
+
+        assert updated_run.summary["tests"] == 2
+        assert updated_run.summary["passes"] == 1
+        assert updated_run.summary["failures"] == 1
+        assert updated_run.summary["pass_percent"] == 50
+        assert updated_run.summary["not_run"] == 2
+        assert updated_run.duration == 3.5
+        assert updated_run.env == "first-env"
+        assert updated_run.data["tags"] == ["first"]
+
+        # The incremental summary matches a full recount
+        incremental_summary = dict(updated_run.summary)
+        with (
+            patch("ibutsu_server.tasks.runs.is_locked", return_value=False),
+            patch("ibutsu_server.tasks.runs.lock"),
+        ):
+            update_run(str(run.id))
+        session.expire_all()
+        assert db.session.get(Run, run.id).summary == incremental_summary
+
+
+def test_add_result_to_run_retries_when_locked(make_project, make_run, make_result, flask_app):
+    """Test add_result_to_run requeues a result rather than discarding it when the run is locked."""
+    client, _ = flask_app
+
+    with client.application.app_context():
+        project = make_project(name="test-project")
+        run = make_run(project_id=project.id, summary={"collected": 1, "tests": 0})
+        result = make_result(run_id=run.id, project_id=project.id, result="passed")
+
+        with (
+            patch("ibutsu_server.tasks.runs.lock") as mock_lock,
+            patch.object(add_result_to_run, "retry", side_effect=Retry()) as mock_retry,
+        ):
+            mock_lock.return_value.__enter__.side_effect = LockError("locked")
+            with pytest.raises(Retry):
+                add_result_to_run(str(result.id))
+
+        mock_retry.assert_called_once_with(countdown=1)
+        session.expire_all()
+        assert db.session.get(Run, run.id).summary["tests"] == 0
+
+
+def test_add_result_to_run_recounts_when_retries_run_out(
+    make_project, make_run, make_result, flask_app
+):
+    """Test add_result_to_run falls back to recounting the run once it's out of retries."""
+    client, _ = flask_app
+
+    with client.application.app_context():
+        project = make_project(name="test-project")
+        run = make_run(project_id=project.id, summary={"collected": 1, "tests": 0})
+        result = make_result(run_id=run.id, project_id=project.id, result="passed")
+
+        with (
+            patch("ibutsu_server.tasks.runs.lock") as mock_lock,
+            patch.object(add_result_to_run, "max_retries", 0),
+            patch.object(add_result_to_run, "retry") as mock_retry,
+            patch("ibutsu_server.tasks.runs.update_run") as mock_update_run,
+        ):
+            mock_lock.return_value.__enter__.side_effect = LockError("locked")
+            add_result_to_run(str(result.id))
+
+        mock_retry.assert_not_called()
+        mock_update_run.delay.assert_called_once_with(run.id)
+
+
+def test_add_result_to_run_without_run(make_project, make_result, flask_app):
+    """Test add_result_to_run ignores results that don't belong to a run."""
+    client, _ = flask_app
+
+    with client.application.app_context():
+        project = make_project(name="test-project")
+        result = make_result(project_id=project.id, result="passed")
+
+        with patch("ibutsu_server.tasks.runs.lock") as mock_lock:
+            add_result_to_run(str(result.id))
+            add_result_to_run("00000000-0000-0000-0000-000000000000")
+
+        mock_lock.assert_not_called()
+
+
 def test_update_run_nonexistent(flask_app):
     """Test update_run with non-existent run ID.
 
@@ -163,14 +330,63 @@ def test_sync_aborted_runs(make_project, make_run, make_result, flask_app):
                 run_id=run.id, project_id=project.id, result="passed", start_time=recent_time
             )
 
-        # Mock the task's apply_async to verify it's called
-        with patch.object(update_run, "apply_async") as mock_apply:
+        # Mock the group to verify update_run is scheduled
+        with (
+            patch("ibutsu_server.tasks.runs.is_locked", return_value=False),
+            patch("ibutsu_server.tasks.runs.group") as mock_group,
+        ):
             sync_aborted_runs()
 
             # Verify update_run was scheduled for this run
-            mock_apply.assert_called_once()
-            call_args = mock_apply.call_args
-            assert call_args[0][0][0] == run.id
+            mock_group.return_value.apply_async.assert_called_once_with(countdown=5)
+            signatures = list(mock_group.call_args[0][0])
+            assert [signature.args for signature in signatures] == [(str(run.id),)]
+
+
+def test_sync_aborted_runs_only_mismatched(make_project, make_run, make_result, flask_app):
+    """Test sync_aborted_runs only schedules recent, mismatched runs that aren't being updated."""
+    client, _ = flask_app
+
+    with client.application.app_context():
+        project = make_project(name="test-project")
+        recent_time = datetime.now(UTC) - timedelta(minutes=30)
+        old_time = datetime.now(UTC) - timedelta(days=1)
+
+        matching = make_run(project_id=project.id, start_time=recent_time, summary={"tests": 2})
+        mismatched = make_run(project_id=project.id, start_time=recent_time, summary={"tests": 1})
+        no_summary = make_run(project_id=project.id, start_time=recent_time, summary={})
+        locked = make_run(project_id=project.id, start_time=recent_time, summary={"tests": 0})
+        old = make_run(project_id=project.id, start_time=old_time, summary={"tests": 5})
+        for run in (matching, matching, mismatched, mismatched, no_summary, locked, old):
+            make_result(run_id=run.id, project_id=project.id, start_time=run.start_time)
+
+        with (
+            patch(
+                "ibutsu_server.tasks.runs.is_locked",
+                side_effect=lambda name: name == f"update-run-lock-{locked.id}",
+            ),
+            patch("ibutsu_server.tasks.runs.group") as mock_group,
+        ):
+            sync_aborted_runs()
+
+        scheduled = {signature.args[0] for signature in mock_group.call_args[0][0]}
+        assert scheduled == {str(mismatched.id), str(no_summary.id)}
+
+
+def test_sync_aborted_runs_nothing_to_sync(make_project, make_run, make_result, flask_app):
+    """Test sync_aborted_runs doesn't send any tasks when all the runs match."""
+    client, _ = flask_app
+
+    with client.application.app_context():
+        project = make_project(name="test-project")
+        recent_time = datetime.now(UTC) - timedelta(minutes=30)
+        run = make_run(project_id=project.id, start_time=recent_time, summary={"tests": 1})
+        make_result(run_id=run.id, project_id=project.id, start_time=recent_time)
+
+        with patch("ibutsu_server.tasks.runs.group") as mock_group:
+            sync_aborted_runs()
+
+        mock_group.assert_not_called()
 
 
 def test_sync_aborted_runs_with_none_summary(make_project, make_run, flask_app):
@@ -432,3 +648,101 @@ def test_compute_pass_percent_clamps_above_100():
 def test_compute_pass_percent_clamps_below_0():
     """A negative derived pass count (inconsistent/malformed summary) should clamp to 0."""
     assert compute_pass_percent(passes=-2, tests=10) == 0
+
+
+def test_refresh_jenkins_build(make_project, make_run, flask_app, fixed_time):
+    """Test that a Jenkins build is recounted from its runs, by component."""
+    client, _ = flask_app
+
+    with client.application.app_context():
+        project = make_project(name="test-project")
+        jenkins = {"job_name": "nightly", "build_number": "7", "build_url": "http://jenkins/7"}
+        for component, failures in [("ui", 1), ("api", 0)]:
+            make_run(
+                project_id=project.id,
+                component=component,
+                start_time=fixed_time,
+                duration=10.0,
+                metadata={"jenkins": jenkins},
+                summary={"tests": 4, "failures": failures, "errors": 0, "skips": 0},
+            )
+        make_run(project_id=project.id, metadata={"jenkins": {**jenkins, "build_number": "8"}})
+
+        refresh_jenkins_build(project.id, "nightly", 7)
+        db.session.commit()
+
+        build = db.session.execute(db.select(JenkinsBuild)).scalar_one()
+        assert (build.jenkins_job_name, build.jenkins_build_number) == ("nightly", 7)
+        assert build.build_url == "http://jenkins/7"
+        assert (build.run_count, build.tests, build.failures) == (2, 8, 1)
+        assert build.total_execution_time == 20.0
+        assert build.components == {
+            "api": {"tests": 4, "passes": 4, "pass_percent": 100},
+            "ui": {"tests": 4, "passes": 3, "pass_percent": 75},
+        }
+
+        # A build without runs is removed from the rollup
+        db.session.execute(db.delete(Run).where(Run.jenkins_build_number == 7))
+        refresh_jenkins_build(project.id, "nightly", 7)
+        db.session.commit()
+        assert db.session.execute(db.select(JenkinsBuild)).scalar_one_or_none() is None
+
+
+def test_jenkins_build_unique_without_project(flask_app):
+    """Test that a Jenkins build without a project can't be added to the rollup twice."""
+    client, _ = flask_app
+
+    with client.application.app_context():
+        for _ in range(2):
+            db.session.add(JenkinsBuild(jenkins_job_name="nightly", jenkins_build_number=1))
+        with pytest.raises(IntegrityError):
+            db.session.commit()
+
+
+def test_update_run_refreshes_jenkins_build(make_project, make_run, make_result, flask_app):
+    """Test that updating a run recounts its Jenkins build."""
+    client, _ = flask_app
+
+    with client.application.app_context():
+        project = make_project(name="test-project")
+        run = make_run(
+            project_id=project.id, metadata={"jenkins": {"job_name": "nightly", "build_number": 3}}
+        )
+        make_result(run_id=run.id, project_id=project.id, result="failed")
+
+        with (
+            patch("ibutsu_server.tasks.runs.is_locked", return_value=False),
+            patch("ibutsu_server.tasks.runs.lock"),
+        ):
+            update_run(str(run.id))
+
+        build = db.session.execute(db.select(JenkinsBuild)).scalar_one()
+        assert (build.jenkins_build_number, build.tests, build.failures) == (3, 1, 1)
+
+
+def test_backfill_jenkins_builds(make_project, make_run, flask_app):
+    """Test that every Jenkins build is recounted, and builds without runs are removed."""
+    client, _ = flask_app
+
+    with client.application.app_context():
+        project = make_project(name="test-project")
+        for build_number in range(3):
+            make_run(
+                project_id=project.id,
+                metadata={"jenkins": {"job_name": "nightly", "build_number": build_number}},
+                summary={"tests": build_number},
+            )
+        make_run(project_id=project.id, metadata={"jenkins": {"job_name": "nightly"}})
+        db.session.add(
+            JenkinsBuild(project_id=project.id, jenkins_job_name="gone", jenkins_build_number=1)
+        )
+        db.session.commit()
+
+        backfill_jenkins_builds(batch_size=2)
+
+        builds = db.session.execute(
+            db.select(JenkinsBuild.jenkins_job_name, JenkinsBuild.jenkins_build_number).order_by(
+                JenkinsBuild.jenkins_build_number
+            )
+        ).all()
+        assert builds == [("nightly", 0), ("nightly", 1), ("nightly", 2)]
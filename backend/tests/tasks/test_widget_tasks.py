@@ -0,0 +1,133 @@
+"""Tests for the widget tasks"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from ibutsu_server.tasks.widgets import compute_widget, refresh_widget, warm_widget_cache
+
+
+def test_refresh_widget(app_context):
+    """Test a stale widget is computed and cached again, and its refresh released"""
+    mock_generate = MagicMock(return_value={"data": "new data"})
+    with (
+        patch.dict("ibutsu_server.tasks.widgets.WIDGET_METHODS", {"test-widget": mock_generate}),
+        patch("ibutsu_server.tasks.widgets.get_widget_generation", return_value=4),
+        patch("ibutsu_server.tasks.widgets.cache_widget") as mock_cache,
+        patch("ibutsu_server.tasks.widgets.release_widget_refresh") as mock_release,
+    ):
+        refresh_widget("test-widget", {"param1": "value"})
+
+        mock_generate.assert_called_once_with(param1="value")
+        mock_cache.assert_called_once_with(
+            "test-widget", {"param1": "value"}, {"data": "new data"}, 4
+        )
+        mock_release.assert_called_once_with("test-widget", {"param1": "value"})
+
+
+def test_refresh_widget_error(app_context):
+    """Test a widget that can't be computed isn't retried, and its refresh is released"""
+    mock_generate = MagicMock(side_effect=ValueError("Test error"))
+    with (
+        patch.dict("ibutsu_server.tasks.widgets.WIDGET_METHODS", {"test-widget": mock_generate}),
+        patch("ibutsu_server.tasks.widgets.get_widget_generation", return_value=4),
+        patch("ibutsu_server.tasks.widgets.cache_widget") as mock_cache,
+        patch("ibutsu_server.tasks.widgets.release_widget_refresh") as mock_release,
+    ):
+        refresh_widget("test-widget", {})
+
+        mock_cache.assert_not_called()
+        mock_release.assert_called_once_with("test-widget", {})
+
+
+def test_compute_widget(app_context):
+    """Test a widget is computed and cached, and its data is the result of the task"""
+    mock_generate = MagicMock(return_value={"data": "new data"})
+    with (
+        patch.dict("ibutsu_server.tasks.widgets.WIDGET_METHODS", {"test-widget": mock_generate}),
+        patch("ibutsu_server.tasks.widgets.get_widget_generation", return_value=4),
+        patch("ibutsu_server.tasks.widgets.cache_widget") as mock_cache,
+        patch("ibutsu_server.tasks.widgets.release_widget_task") as mock_release,
+    ):
+        result = compute_widget("test-widget", {"param1": "value"})
+
+        assert result == {"data": {"data": "new data"}}
+        mock_cache.assert_called_once_with(
+            "test-widget", {"param1": "value"}, {"data": "new data"}, 4
+        )
+        mock_release.assert_called_once_with("test-widget", {"param1": "value"})
+
+
+@pytest.fixture
+def warmup(flask_app, app_context, make_project, make_dashboard, make_widget_config, db_session):
+    """A project with a default dashboard of two widgets, and a widget cache to warm"""
+    client, _ = flask_app
+    client.application.config["WIDGET_CACHE_TTL"] = 60
+    project = make_project(name="test-project")
+    dashboard = make_dashboard(project_id=project.id)
+    project.default_dashboard_id = dashboard.id
+    db_session.commit()
+    for widget, weight in [("result-summary", 0), ("run-aggregator", 1)]:
+        make_widget_config(
+            dashboard_id=dashboard.id,
+            project_id=project.id,
+            widget=widget,
+            params={"weeks": 4, "group_field": "env"} if widget == "run-aggregator" else {},
+            weight=weight,
+        )
+    # Widgets of other dashboards aren't precomputed, unless they're viewed
+    make_widget_config(dashboard_id=make_dashboard().id, widget="result-summary")
+
+    methods = {"result-summary": MagicMock(), "run-aggregator": MagicMock()}
+    with (
+        patch.dict("ibutsu_server.tasks.widgets.WIDGET_METHODS", methods),
+        patch("ibutsu_server.tasks.widgets.get_cached_widget", return_value=None),
+        patch("ibutsu_server.tasks.widgets.get_most_viewed_widgets") as mock_viewed,
+        patch("ibutsu_server.tasks.widgets.get_widget_generation", return_value=1),
+        patch("ibutsu_server.tasks.widgets.cache_widget") as mock_cache,
+        patch("ibutsu_server.util.widget_cache.get_client"),
+    ):
+        mock_viewed.return_value = [
+            ("result-summary", {"project": str(project.id)}),
+            ("result-summary", {"env": "prod"}),
+        ]
+        yield project, methods, mock_cache
+
+
+def test_warm_widget_cache(warmup):
+    """Test the default dashboards and the most viewed widgets are precomputed, once each"""
+    project, methods, mock_cache = warmup
+
+    warm_widget_cache()
+
+    assert sorted(
+        (call.args[0], sorted(call.args[1].items())) for call in mock_cache.call_args_list
+    ) == [
+        ("result-summary", [("env", "prod")]),
+        ("result-summary", [("project", str(project.id))]),
+        ("run-aggregator", [("group_field", "env"), ("project", str(project.id)), ("weeks", 4)]),
+    ]
+    assert methods["result-summary"].call_count == 2
+
+
+def test_warm_widget_cache_fresh(warmup):
+    """Test widgets that are fresh in the cache aren't computed again"""
+    _, methods, mock_cache = warmup
+
+    with patch("ibutsu_server.tasks.widgets.get_cached_widget", return_value=({}, True)):
+        warm_widget_cache()
+
+    mock_cache.assert_not_called()
+    methods["run-aggregator"].assert_not_called()
+
+
+def test_warm_widget_cache_out_of_time(flask_app, warmup):
+    """Test no more widgets are computed once the time budget is spent"""
+    client, _ = flask_app
+    _, methods, mock_cache = warmup
+    client.application.config["WIDGET_WARMUP_BUDGET"] = -1
+
+    warm_widget_cache()
+
+    mock_cache.assert_not_called()
+    methods["result-summary"].assert_not_called()
@@ -179,6 +179,17 @@ class TestCreateFlaskCeleryApp:
         assert "prune-old-runs" in app.conf.beat_schedule
         assert "sync-aborted-runs" in app.conf.beat_schedule
 
+    def test_create_flask_celery_app_widget_warmup_hour(self, flask_app):
+        """Test that the widgets are precomputed at the configured hour."""
+        client, _ = flask_app
+        client.application.config["WIDGET_WARMUP_HOUR"] = 3
+
+        app = create_flask_celery_app(client.application)
+
+        schedule = app.conf.beat_schedule["warm-widget-cache"]["schedule"]
+        assert schedule.hour == {3}
+        assert schedule.minute == {0}
+
     def test_create_flask_celery_app_task_class(self, flask_app):
         """Test that IbutsuTask is set as the Task class."""
         client, _ = flask_app
@@ -7,9 +7,11 @@ from sqlalchemy import Integer, String
 
 from ibutsu_server.constants import ARRAY_FIELDS, NUMERIC_FIELDS
 from ibutsu_server.db import db
-from ibutsu_server.db.models import Result, Run
+from ibutsu_server.db.models import PromotedMetadataMixin, Result, Run
 from ibutsu_server.filters import (
+    _PROMOTED_FIELDS,
     _array_compare,
+    _convert_model_filter,
     _null_compare,
     _to_int_or_float,
     apply_filters,
@@ -700,3 +702,140 @@ class TestHasProjectFilter:
         assert has_project_filter(["my_project_id=abc"]) is False
         assert has_project_filter(["data.myproject=abc"]) is False
         assert has_project_filter(["project=abc"]) is False
+
+
+class TestConvertFilterCache:
+    """Tests for the cache of converted filters."""
+
+    def test_convert_filter_cached(self, app_ctx):
+        """Test the clause for a filter on a model is converted once, and reused."""
+        clause = convert_filter("metadata.component=frontend", Result)
+
+        assert convert_filter("metadata.component=frontend", Result) is clause
+        assert convert_filter("metadata.component=frontend", Run) is not clause
+        assert convert_filter("metadata.component=backend", Result) is not clause
+
+    def test_convert_filter_subquery_not_cached(self, app_ctx):
+        """Test the clauses for filters on subqueries aren't cached."""
+        subquery = db.select(Result.id, Result.result).subquery()
+
+        clause = convert_filter("result=passed", subquery)
+
+        assert clause is not None
+        assert convert_filter("result=passed", subquery) is not clause
+
+    def test_cached_clause_reused_in_queries(self, app_ctx, make_project, make_run, make_result):
+        """Test a cached clause filters every query it's used in, with its own bound values."""
+        project = make_project(name="test-project")
+        run = make_run(project_id=project.id)
+        make_result(run_id=run.id, project_id=project.id, result="passed", duration=5.0)
+        make_result(run_id=run.id, project_id=project.id, result="failed", duration=15.0)
+
+        for _ in range(2):
+            passed = apply_filters(db.select(Result.result), ["result=passed"], Result)
+            assert db.session.scalars(passed).all() == ["passed"]
+            slow = apply_filters(
+                db.select(Result.result), ["duration>10", "result*failed;error"], Result
+            )
+            assert db.session.scalars(slow).all() == ["failed"]
+
+    def test_convert_filter_cache_hits(self, app_ctx):
+        """Test the filters of a widget are only converted the first time they're used."""
+        filters = ["result=passed", "metadata.component=frontend", "duration>10.5"]
+        _convert_model_filter.cache_clear()
+
+        for _ in range(3):
+            for filter_string in filters:
+                convert_filter(filter_string, Result)
+
+        cache_info = _convert_model_filter.cache_info()
+        assert (cache_info.misses, cache_info.hits) == (3, 6)
+        assert cache_info.currsize == 3
+
+
+class TestPromotedFields:
+    """Tests for metadata fields that are promoted to real columns."""
+
+    def test_promoted_fields_match_columns(self):
+        """Test that the promoted fields are routed to exactly the columns that are promoted."""
+        assert sorted(_PROMOTED_FIELDS.values()) == sorted(PromotedMetadataMixin.derived_columns)
+
+    @pytest.mark.parametrize("model", [Result, Run])
+    @pytest.mark.parametrize(
+        ("field", "column_name"),
+        [
+            ("metadata.jenkins.job_name", "jenkins_job_name"),
+            ("data.jenkins.job_name", "jenkins_job_name"),
+            ("metadata.jenkins.build_number", "jenkins_build_number"),
+        ],
+    )
+    def test_string_to_column_routes_to_promoted_column(self, app_ctx, model, field, column_name):
+        """Test that promoted fields use the promoted column, unless told not to."""
+        assert string_to_column(field, model) is getattr(model, column_name)
+        assert string_to_column(field, model, promoted=False) is not getattr(model, column_name)
+
+    def test_string_to_column_routes_subquery_to_promoted_column(self, app_ctx):
+        """Test that promoted fields use the promoted column of a subquery that selects it."""
+        subquery = db.select(Run).subquery()
+        column = string_to_column("metadata.jenkins.build_number", subquery)
+        assert column is subquery.c.jenkins_build_number
+
+    @pytest.mark.parametrize(
+        ("filter_string", "value"),
+        [
+            ("metadata.jenkins.build_number=123", 123),
+            ("metadata.jenkins.build_number)100", 100),
+            ("metadata.jenkins.build_number*1;2;3", [1, 2, 3]),
+        ],
+    )
+    def test_convert_filter_integer_value_uses_promoted_column(self, app_ctx, filter_string, value):
+        """Test that integer build numbers are compared with the promoted integer column."""
+        clause = convert_filter(filter_string, Run)
+        assert "jenkins_build_number" in str(clause)
+        assert list(clause.compile().params.values()) == [value]
+
+    @pytest.mark.parametrize(
+        "filter_string",
+        [
+            "metadata.jenkins.build_number=12a",
+            "metadata.jenkins.build_number=1234567890",
+            "metadata.jenkins.build_number*1;x",
+            "metadata.jenkins.build_number~12",
+            "metadata.jenkins.build_number@y",
+        ],
+    )
+    def test_convert_filter_other_value_uses_metadata(self, app_ctx, filter_string):
+        """Test that other build number filters fall back to the metadata."""
+        clause = convert_filter(filter_string, Run)
+        assert "jenkins_build_number" not in str(clause)
+        assert "data" in str(clause)
+
+    def test_promoted_columns_follow_metadata(self, app_ctx, make_run):
+        """Test that the promoted columns are kept in sync with the metadata."""
+        run = make_run(metadata={"jenkins": {"job_name": "nightly", "build_number": "9"}})
+        other = make_run(metadata={"jenkins": {"job_name": "nightly", "build_number": "9-rc"}})
+        db.session.expire_all()
+        assert (run.jenkins_job_name, run.jenkins_build_number) == ("nightly", 9)
+        assert (other.jenkins_job_name, other.jenkins_build_number) == ("nightly", None)
+        assert "jenkins_build_number" not in run.to_dict()
+
+        run.update({"metadata": {"jenkins": {"build_number": 10}}})
+        db.session.commit()
+        db.session.expire_all()
+        assert (run.jenkins_job_name, run.jenkins_build_number) == ("nightly", 10)
+
+    def test_filter_promoted_build_number(self, app_ctx, make_run):
+        """Test that build numbers are filtered as integers, or as strings in the metadata."""
+        for build_number in ["9", "10", "10-rc"]:
+            make_run(metadata={"jenkins": {"job_name": "nightly", "build_number": build_number}})
+
+        def build_numbers(filter_string):
+            query = apply_filters(
+                db.select(Run), ["metadata.jenkins.job_name=nightly", filter_string], Run
+            )
+            return sorted(run.data["jenkins"]["build_number"] for run in db.session.scalars(query))
+
+        assert build_numbers("metadata.jenkins.build_number>9") == ["10"]
+        assert build_numbers("metadata.jenkins.build_number*9;10") == ["10", "9"]
+        assert build_numbers("metadata.jenkins.build_number=10-rc") == ["10-rc"]
+        assert build_numbers("metadata.jenkins.build_number@y") == ["10", "10-rc", "9"]
@@ -3,20 +3,27 @@
 import json
 import tarfile
 from datetime import UTC, datetime
+from hashlib import sha256
 from io import BytesIO
 from unittest.mock import patch
 from uuid import uuid4
 
+import pytest
 from lxml import objectify
 
 from ibutsu_server.db import db
 from ibutsu_server.db.base import session
-from ibutsu_server.db.models import Artifact, Import, ImportFile, Result, Run
+from ibutsu_server.db.models import Artifact, Import, ImportFile, JenkinsBuild, Result, Run
+from ibutsu_server.tasks import importers
 from ibutsu_server.tasks.importers import (
     _add_artifacts,
+    _finish_archive_import,
     _get_properties,
     _get_test_name_path,
     _get_ts_element,
+    _import_archive_chunk,
+    _iter_junit_tree,
+    _iterparse_junit,
     _parse_timestamp,
     _populate_created_times,
     _populate_metadata,
@@ -26,6 +33,8 @@ from ibutsu_server.tasks.importers import (
     run_archive_import,
     run_junit_import,
 )
+from ibutsu_server.util.storage import store_content
+from ibutsu_server.widgets.jenkins_heatmap import get_jenkins_heatmap
 
 
 class TestGetProperties:
@@ -183,6 +192,99 @@ class TestGetTsElement:
         assert result.tag == "testsuite"
 
 
+class TestIterparseJunit:
+    """Tests for the streaming _iterparse_junit parser"""
+
+    @staticmethod
+    def _describe(events):
+        """Reduce an event stream to comparable tuples, while the elements are still attached"""
+        described = []
+        for event, element in events:
+            properties = _get_properties(element) if event != "testcase" else {}
+            described.append((event, element.tag, element.get("name"), properties))
+        return described
+
+    def test_iterparse_matches_tree_testsuites(self):
+        """Test the streaming parser yields the same events as walking the full tree"""
+        xml_string = b"""<?xml version="1.0" encoding="UTF-8"?>
+        <testsuites name="all">
+            <properties><property key="env" value="prod"/></properties>
+            <testsuite name="suite1">
+                <properties><property key="build" value="1"/></properties>
+                <testcase name="test_a" classname="tests.test_mod"/>
+                <testcase name="test_b" classname="tests.test_mod"/>
+            </testsuite>
+            <testsuite name="empty"/>
+            <testsuite name="suite2">
+                <testcase name="test_c" classname="tests.test_other"/>
+            </testsuite>
+        </testsuites>
+        """
+        tree_events = self._describe(_iter_junit_tree(objectify.fromstring(xml_string)))
+        stream_events = self._describe(_iterparse_junit(BytesIO(xml_string)))
+
+        assert stream_events == tree_events
+        assert [event for event, *_ in stream_events] == [
+            "run",
+            "testsuite",
+            "testcase",
+            "testcase",
+            "testsuite",
+            "testsuite",
+            "testcase",
+        ]
+
+    def test_iterparse_matches_tree_single_testsuite(self):
+        """Test the streaming parser with a testsuite as the root element"""
+        xml_string = b"""
+        <testsuite name="only">
+            <properties><property key="env" value="stage"/></properties>
+            <testcase name="test_a"><failure>boom</failure></testcase>
+        </testsuite>
+        """
+        tree_events = self._describe(_iter_junit_tree(objectify.fromstring(xml_string)))
+        stream_events = self._describe(_iterparse_junit(BytesIO(xml_string)))
+
+        assert stream_events == tree_events
+
+    def test_iterparse_testcase_helpers(self):
+        """Test the streamed testcases work with the existing helper functions"""
+        xml_string = b"""
+        <testsuite name="suite">
+            <testcase name="test_a" classname="tests.test_mod">
+                <failure message="failed">Traceback here</failure>
+                <system-out>Console output</system-out>
+            </testcase>
+        </testsuite>
+        """
+        for event, element in _iterparse_junit(BytesIO(xml_string)):
+            if event != "testcase":
+                continue
+            result_dict, traceback = _process_result({"metadata": {}}, element)
+            assert result_dict["result"] == "failed"
+            assert b"Traceback here" in traceback
+            assert str(element["system-out"]) == "Console output"
+            assert _get_test_name_path(element) == ("test_mod.test_a", "tests")
+
+    def test_iterparse_detaches_processed_elements(self):
+        """Test that processed testcases and testsuites don't accumulate in the tree"""
+        testcases = "".join(f'<testcase name="test_{i}"/>' for i in range(100))
+        xml_string = (
+            f'<testsuites><testsuite name="s1">{testcases}</testsuite>'
+            f'<testsuite name="s2">{testcases}</testsuite></testsuites>'
+        ).encode()
+        root = None
+        max_children = 0
+        for event, element in _iterparse_junit(BytesIO(xml_string)):
+            if event == "run":
+                root = element
+            elif event == "testcase":
+                max_children = max(max_children, len(element.getparent()))
+
+        assert max_children <= 2
+        assert len(root) <= 1
+
+
 class TestParseTimestamp:
     """Tests for _parse_timestamp helper function"""
 
@@ -505,7 +607,9 @@ class TestAddArtifacts:
             artifacts = Artifact.query.filter_by(result_id=result.id).all()
             assert len(artifacts) == 1
             assert artifacts[0].filename == "traceback.log"
-            assert artifacts[0].content == traceback
+            assert artifacts[0].read_content() == traceback
+            assert artifacts[0].content_size == len(traceback)
+            assert artifacts[0].content_hash == sha256(traceback).hexdigest()
 
     def test_add_artifacts_with_system_out(self, make_result, flask_app):
         """Test adding artifacts with system-out"""
@@ -525,7 +629,7 @@ class TestAddArtifacts:
             artifacts = Artifact.query.filter_by(result_id=result.id).all()
             assert len(artifacts) == 1
             assert artifacts[0].filename == "system-out.log"
-            assert b"Console output here" in artifacts[0].content
+            assert b"Console output here" in artifacts[0].read_content()
 
     def test_add_artifacts_with_system_err(self, make_result, flask_app):
         """Test adding artifacts with system-err"""
@@ -677,6 +781,212 @@ class TestRunJunitImport:
             assert run.data.get("env") == "production"
             assert run.data.get("build") == "123"
 
+    def test_run_junit_import_streaming_matches_tree(self, make_import, flask_app):
+        """Test the streaming JUnit import creates the same rows as the in-memory import"""
+        client, _ = flask_app
+        junit_xml = b"""<?xml version="1.0" encoding="UTF-8"?>
+        <testsuites>
+            <properties><property key="env" value="production"/></properties>
+            <testsuite name="suite-1" tests="2" failures="1" time="1.5">
+                <properties><property key="build" value="123"/></properties>
+                <testcase name="test_pass" classname="tests.test_module" time="0.5">
+                    <system-out>Console output</system-out>
+                </testcase>
+                <testcase name="test_fail" classname="tests.test_module" time="1.0">
+                    <failure message="Test failed">Assertion error</failure>
+                </testcase>
+            </testsuite>
+            <testsuite name="suite-2" tests="1" skipped="1">
+                <testcase name="test_skip" classname="tests.test_other">
+                    <skipped>Not today</skipped>
+                </testcase>
+            </testsuite>
+        </testsuites>
+        """
+
+        def _import(threshold):
+            import_record = make_import(filename="test.xml", format="junit", status="pending")
+            session.add(ImportFile(import_id=import_record.id, content=junit_xml))
+            session.commit()
+            with (
+                patch("ibutsu_server.tasks.importers.JUNIT_STREAM_THRESHOLD", threshold),
+                patch("ibutsu_server.tasks.importers.clear_import_file_content"),
+            ):
+                run_junit_import({"id": str(import_record.id)})
+            run = db.session.get(Run, db.session.get(Import, import_record.id).run_id)
+            results = Result.query.filter_by(run_id=run.id).order_by(Result.test_id).all()
+            return (
+                run.summary,
+                run.duration,
+                run.data,
+                [
+                    (
+                        r.test_id,
+                        r.result,
+                        r.source,
+                        {k: v for k, v in r.data.items() if k != "run"},
+                        sorted(
+                            (a.filename, a.read_content())
+                            for a in Artifact.query.filter_by(result_id=r.id).all()
+                        ),
+                    )
+                    for r in results
+                ],
+            )
+
+        with client.application.app_context():
+            tree_import = _import(threshold=len(junit_xml) + 1)
+            stream_import = _import(threshold=0)
+
+        assert stream_import == tree_import
+        assert [result[:2] for result in stream_import[3]] == [
+            ("test_module.test_fail", "failed"),
+            ("test_module.test_pass", "passed"),
+            ("test_other.test_skip", "skipped"),
+        ]
+
+    def test_run_junit_import_batches(self, make_import, flask_app):
+        """Test JUnit import writes results and artifacts in batches of IMPORT_BATCH_SIZE"""
+        client, _ = flask_app
+        testcases = "".join(
+            f'<testcase name="test_{i}" classname="tests.test_module">'
+            f"<failure>boom {i}</failure><system-out>out {i}</system-out></testcase>"
+            for i in range(5)
+        )
+        junit_xml = f'<testsuite name="suite" tests="5">{testcases}</testsuite>'.encode()
+
+        with client.application.app_context():
+            client.application.config["IMPORT_BATCH_SIZE"] = 2
+            import_record = make_import(filename="test.xml", format="junit", status="pending")
+            session.add(ImportFile(import_id=import_record.id, content=junit_xml))
+            session.commit()
+
+            with (
+                patch(
+                    "ibutsu_server.tasks.importers._flush_import_batch",
+                    wraps=importers._flush_import_batch,
+                ) as flush_mock,
+                patch("ibutsu_server.tasks.importers.clear_import_file_content"),
+            ):
+                run_junit_import({"id": str(import_record.id)})
+
+            # two full batches, and one final batch with the remaining result
+            assert flush_mock.call_count == 3
+            run_id = db.session.get(Import, import_record.id).run_id
+            results = Result.query.filter_by(run_id=run_id).all()
+            assert len(results) == 5
+            for result in results:
+                artifacts = Artifact.query.filter_by(result_id=result.id).all()
+                assert sorted(a.filename for a in artifacts) == ["system-out.log", "traceback.log"]
+                assert all(a.data["resultId"] == result.id for a in artifacts)
+                assert result.data["run"] == run_id
+
+    @pytest.mark.parametrize("threshold", [0, 10**9])
+    def test_run_junit_import_from_storage(self, make_import, flask_app, tmp_path, threshold):
+        """Test JUnit import reads the file from, and writes artifacts to, a storage backend"""
+        client, _ = flask_app
+        junit_xml = (
+            b'<testsuite name="suite" tests="1"><testcase name="test_fail" classname="tests.t">'
+            b"<failure>boom</failure></testcase></testsuite>"
+        )
+
+        with client.application.app_context():
+            client.application.config["ARTIFACT_STORAGE"] = "filesystem"
+            client.application.config["ARTIFACT_STORAGE_PATH"] = str(tmp_path)
+            import_record = make_import(filename="test.xml", format="junit", status="pending")
+            session.add(
+                ImportFile(import_id=import_record.id, **store_content(junit_xml, "import_files"))
+            )
+            session.commit()
+
+            with (
+                patch("ibutsu_server.tasks.importers.JUNIT_STREAM_THRESHOLD", threshold),
+                patch("ibutsu_server.tasks.importers.clear_import_file_content"),
+            ):
+                run_junit_import({"id": str(import_record.id)})
+
+            run_id = db.session.get(Import, import_record.id).run_id
+            result = Result.query.filter_by(run_id=run_id).one()
+            assert result.result == "failed"
+            artifact = Artifact.query.filter_by(result_id=result.id).one()
+            assert artifact.content is None
+            assert artifact.storage_key.startswith("artifacts/")
+            assert artifact.read_content() == b"boom"
+
+    @pytest.mark.parametrize("threshold", [0, 10**9])
+    def test_run_junit_import_compressed(self, make_import, flask_app, threshold):
+        """Test JUnit import reads a compressed import file, and compresses its artifacts"""
+        client, _ = flask_app
+        output = b"some log output\n" * 100
+        junit_xml = (
+            b'<testsuite name="suite" tests="1"><testcase name="test_pass" classname="tests.t">'
+            b"<system-out>" + output + b"</system-out></testcase></testsuite>"
+        )
+
+        with client.application.app_context():
+            client.application.config["ARTIFACT_COMPRESSION"] = "gzip"
+            import_record = make_import(filename="test.xml", format="junit", status="pending")
+            import_file = ImportFile(import_id=import_record.id)
+            import_file.set_content(store_content(junit_xml, "import_files"))
+            session.add(import_file)
+            session.commit()
+            assert import_file.content_encoding == "gzip"
+            assert import_file.content_size == len(junit_xml)
+
+            with (
+                patch("ibutsu_server.tasks.importers.JUNIT_STREAM_THRESHOLD", threshold),
+                patch("ibutsu_server.tasks.importers.clear_import_file_content"),
+            ):
+                run_junit_import({"id": str(import_record.id)})
+
+            run_id = db.session.get(Import, import_record.id).run_id
+            result = Result.query.filter_by(run_id=run_id).one()
+            artifact = Artifact.query.filter_by(result_id=result.id).one()
+            assert artifact.content_encoding == "gzip"
+            assert len(artifact.open_stored_content().read()) < len(output)
+            assert artifact.content_size == len(output)
+            assert artifact.read_content() == output
+
+    def test_run_junit_import_jenkins_build(self, make_import, make_project, flask_app):
+        """Test a JUnit import refreshes the rollup of its Jenkins build, for the Jenkins widgets"""
+        client, _ = flask_app
+        junit_xml = (
+            b'<testsuite name="suite" tests="1"><testcase name="test_pass" classname="tests.t"/>'
+            b"</testsuite>"
+        )
+
+        with client.application.app_context():
+            project = make_project(name="jenkins-project")
+            # The rollup already has a build of the job, so the widgets only read from the rollup
+            session.add(
+                JenkinsBuild(
+                    project_id=project.id,
+                    jenkins_job_name="test-job",
+                    jenkins_build_number=1,
+                    min_start_time=datetime(2024, 1, 1, tzinfo=UTC),
+                    max_start_time=datetime(2024, 1, 1, tzinfo=UTC),
+                )
+            )
+            metadata = {
+                "project": project.name,
+                "component": "component1",
+                "jenkins": {"job_name": "test-job", "build_number": "2"},
+            }
+            import_record = make_import(
+                filename="test.xml", format="junit", data={"metadata": metadata}
+            )
+            session.add(ImportFile(import_id=import_record.id, content=junit_xml))
+            session.commit()
+
+            with patch("ibutsu_server.tasks.importers.clear_import_file_content"):
+                run_junit_import({"id": str(import_record.id)})
+
+            build = JenkinsBuild.query.filter_by(jenkins_build_number=2).one()
+            assert build.run_count == 1
+            heatmap = get_jenkins_heatmap("test-job", 5, "component", project=str(project.id))
+            # The build that's only in the rollup has no results, but is still one of the builds
+            assert [cell[3] for cell in heatmap["heatmap"]["component1"][1:]] == ["1", "2"]
+
     def test_run_junit_import_missing_file(self, make_import, flask_app):
         """Test JUnit import with missing import file"""
         client, _ = flask_app
@@ -775,6 +1085,240 @@ class TestRunArchiveImport:
             updated = db.session.get(Import, import_record.id)
             assert updated.status == "done"
 
+    @staticmethod
+    def _make_archive(run_id, results, artifacts=None):
+        """Build an Ibutsu archive with the given results, and artifacts keyed by result ID"""
+        tar_buffer = BytesIO()
+        with tarfile.open(fileobj=tar_buffer, mode="w:gz") as tar:
+            files = {f"{run_id}/run.json": json.dumps({"id": run_id}).encode()}
+            for result in results:
+                files[f"{run_id}/{result['id']}/result.json"] = json.dumps(result).encode()
+            for result_id, result_files in (artifacts or {}).items():
+                for file_name, content in result_files.items():
+                    files[f"{run_id}/{result_id}/{file_name}"] = content
+            for name, content in files.items():
+                info = tarfile.TarInfo(name=name)
+                info.size = len(content)
+                tar.addfile(info, BytesIO(content))
+        return tar_buffer.getvalue()
+
+    def test_run_archive_import_artifacts_and_existing_results(
+        self, make_import, make_project, make_run, make_result, flask_app
+    ):
+        """Test archive import moves existing results and attaches artifacts to new results"""
+        client, _ = flask_app
+
+        with client.application.app_context():
+            project = make_project()
+            existing = make_result(run_id=make_run(project_id=project.id).id, test_id="old")
+            run_id = str(uuid4())
+            new_id = str(uuid4())
+            start_time = datetime.now(UTC).isoformat()
+            results = [
+                {"id": existing.id, "test_id": "old", "start_time": start_time},
+                {"id": new_id, "test_id": "new", "result": "failed", "start_time": start_time},
+            ]
+            content = self._make_archive(
+                run_id, results, {new_id: {"traceback.log": b"Traceback", "out.log": b"out"}}
+            )
+            import_record = make_import(filename="archive.tar.gz", format="ibutsu")
+            session.add(ImportFile(import_id=import_record.id, content=content))
+            session.commit()
+
+            with (
+                patch("ibutsu_server.tasks.importers.chord") as chord_mock,
+                patch("ibutsu_server.tasks.importers.update_run") as update_run_mock,
+                patch("ibutsu_server.tasks.importers.clear_import_file_content") as clear_mock,
+            ):
+                run_archive_import({"id": str(import_record.id)})
+
+            # A single chunk is imported in the same task
+            chord_mock.assert_not_called()
+            update_run_mock.delay.assert_called_once_with(run_id)
+            clear_mock.delay.assert_called_once_with(import_record.id)
+
+            assert db.session.get(Result, existing.id).run_id == run_id
+            new_result = db.session.execute(
+                db.select(Result).filter_by(test_id="new", run_id=run_id)
+            ).scalar_one()
+            assert new_result.id != new_id
+            artifacts = Artifact.query.filter_by(result_id=new_result.id).all()
+            assert sorted((a.filename, a.read_content()) for a in artifacts) == [
+                ("out.log", b"out"),
+                ("traceback.log", b"Traceback"),
+            ]
+            assert db.session.get(Import, import_record.id).status == "done"
+
+    def test_run_archive_import_chunks(self, make_import, flask_app):
+        """Test large archives are split into chunks and imported by a Celery chord"""
+        client, _ = flask_app
+
+        with client.application.app_context():
+            client.application.config["ARCHIVE_IMPORT_CHUNK_SIZE"] = 2
+            run_id = str(uuid4())
+            start_time = datetime.now(UTC).isoformat()
+            results = [
+                {"id": str(uuid4()), "test_id": f"test_{i}", "start_time": start_time}
+                for i in range(5)
+            ]
+            artifacts = {results[3]["id"]: {"log.txt": b"log"}}
+            content = self._make_archive(run_id, results, artifacts)
+            import_record = make_import(filename="archive.tar.gz", format="ibutsu")
+            session.add(ImportFile(import_id=import_record.id, content=content))
+            session.commit()
+
+            with (
+                patch("ibutsu_server.tasks.importers.chord") as chord_mock,
+                patch("ibutsu_server.tasks.importers.update_run") as update_run_mock,
+                patch("ibutsu_server.tasks.importers.clear_import_file_content") as clear_mock,
+            ):
+                run_archive_import({"id": str(import_record.id)})
+
+            # The chunks and the final callback are left to the chord
+            update_run_mock.delay.assert_not_called()
+            clear_mock.delay.assert_not_called()
+            assert db.session.get(Import, import_record.id).status == "running"
+            assert db.session.get(Run, run_id) is not None
+
+            # The chunks are only sent the names of their members, which they read themselves
+            header = list(chord_mock.call_args.args[0])
+            log_name = f"{run_id}/{results[3]['id']}/log.txt"
+            assert [sig.args[2] for sig in header] == [
+                [f"{run_id}/{result['id']}/result.json" for result in results[:2]],
+                [
+                    f"{run_id}/{results[2]['id']}/result.json",
+                    f"{run_id}/{results[3]['id']}/result.json",
+                    log_name,
+                ],
+                [f"{run_id}/{results[4]['id']}/result.json"],
+            ]
+            assert all(sig.args[:2] == (import_record.id, run_id) for sig in header)
+            callback = chord_mock.return_value.call_args.args[0]
+            assert callback.args == (import_record.id, run_id)
+            assert [tuple(errback["args"]) for errback in callback.options["link_error"]] == [
+                (import_record.id, run_id)
+            ]
+
+            # Run the chunks and the callback the way the chord would
+            with (
+                patch("ibutsu_server.tasks.importers.update_run") as update_run_mock,
+                patch("ibutsu_server.tasks.importers.clear_import_file_content") as clear_mock,
+                patch("ibutsu_server.tasks.importers.invalidate_widgets") as invalidate_mock,
+            ):
+                counts = [_import_archive_chunk(*sig.args) for sig in header]
+                _finish_archive_import(counts, *callback.args)
+
+            assert counts == [2, 2, 1]
+            update_run_mock.delay.assert_called_once_with(run_id)
+            clear_mock.delay.assert_called_once_with(import_record.id)
+            invalidate_mock.assert_called_once()
+            assert Result.query.filter_by(run_id=run_id).count() == 5
+            log_result = Result.query.filter_by(run_id=run_id, test_id="test_3").one()
+            assert log_result.id != results[3]["id"]
+            assert Artifact.query.filter_by(result_id=log_result.id).one().read_content() == b"log"
+            assert db.session.get(Import, import_record.id).status == "done"
+
+    def test_run_archive_import_streamed(self, make_import, flask_app):
+        """Test the archive is streamed, with artifacts of the run and before their results"""
+        client, _ = flask_app
+
+        with client.application.app_context():
+            run_id = str(uuid4())
+            result_id = str(uuid4())
+            result = {
+                "id": result_id,
+                "test_id": "test",
+                "start_time": datetime.now(UTC).isoformat(),
+            }
+            tar_buffer = BytesIO()
+            with tarfile.open(fileobj=tar_buffer, mode="w:gz") as tar:
+                for name, content in [
+                    (f"{run_id}/{result_id}/screenshot.png", b"png"),
+                    (f"{run_id}/{result_id}/result.json", json.dumps(result).encode()),
+                    (f"{run_id}/run.log", b"run log"),
+                    (f"{run_id}/run.json", json.dumps({"id": run_id}).encode()),
+                ]:
+                    info = tarfile.TarInfo(name=name)
+                    info.size = len(content)
+                    tar.addfile(info, BytesIO(content))
+            import_record = make_import(filename="archive.tar.gz", format="ibutsu")
+            session.add(ImportFile(import_id=import_record.id, content=tar_buffer.getvalue()))
+            session.commit()
+
+            with (
+                patch.object(ImportFile, "read_content", side_effect=AssertionError("read")),
+                patch("ibutsu_server.tasks.importers.update_run"),
+                patch("ibutsu_server.tasks.importers.clear_import_file_content"),
+            ):
+                run_archive_import({"id": str(import_record.id)})
+
+            assert db.session.get(Import, import_record.id).status == "done"
+            new_result = Result.query.filter_by(run_id=run_id).one()
+            assert Artifact.query.filter_by(result_id=new_result.id).one().read_content() == b"png"
+            assert Artifact.query.filter_by(run_id=run_id).one().read_content() == b"run log"
+
+    def test_run_archive_import_chunk_fails(self, make_import, flask_app):
+        """Test the import is marked as failed, rather than left running, when a chunk fails"""
+        client, _ = flask_app
+
+        with client.application.app_context():
+            client.application.config["ARCHIVE_IMPORT_CHUNK_SIZE"] = 2
+            run_id = str(uuid4())
+            start_time = datetime.now(UTC).isoformat()
+            results = [
+                {"id": str(uuid4()), "test_id": f"test_{i}", "start_time": start_time}
+                for i in range(3)
+            ]
+            content = self._make_archive(run_id, results)
+            import_record = make_import(filename="archive.tar.gz", format="ibutsu")
+            session.add(ImportFile(import_id=import_record.id, content=content))
+            session.commit()
+
+            with patch("ibutsu_server.tasks.importers.chord") as chord_mock:
+                run_archive_import({"id": str(import_record.id)})
+            callback = chord_mock.return_value.call_args.args[0]
+            errback = callback.options["link_error"][0]
+            assert errback["task"] == importers._fail_archive_import.name
+
+            # Run the error callback the way the chord would, when a chunk raised
+            with (
+                patch("ibutsu_server.tasks.importers.update_run") as update_run_mock,
+                patch("ibutsu_server.tasks.importers.clear_import_file_content") as clear_mock,
+            ):
+                importers._fail_archive_import(*errback["args"])
+
+            assert db.session.get(Import, import_record.id).status == "error"
+            update_run_mock.delay.assert_called_once_with(run_id)
+            clear_mock.delay.assert_called_once_with(import_record.id)
+
+    def test_run_archive_import_single_chunk_fails(self, make_import, flask_app):
+        """Test an archive import that's imported in one task is marked as failed if it fails"""
+        client, _ = flask_app
+
+        with client.application.app_context():
+            run_id = str(uuid4())
+            start_time = datetime.now(UTC).isoformat()
+            content = self._make_archive(
+                run_id, [{"id": str(uuid4()), "test_id": "test", "start_time": start_time}]
+            )
+            import_record = make_import(filename="archive.tar.gz", format="ibutsu")
+            session.add(ImportFile(import_id=import_record.id, content=content))
+            session.commit()
+
+            with (
+                patch(
+                    "ibutsu_server.tasks.importers._build_archive_result",
+                    side_effect=ValueError("bad result"),
+                ),
+                patch("ibutsu_server.tasks.importers.update_run"),
+                patch("ibutsu_server.tasks.importers.clear_import_file_content") as clear_mock,
+                pytest.raises(ValueError, match="bad result"),
+            ):
+                run_archive_import({"id": str(import_record.id)})
+
+            assert db.session.get(Import, import_record.id).status == "error"
+            clear_mock.delay.assert_called_once_with(import_record.id)
+
     def test_run_archive_import_missing_file(self, make_import, flask_app):
         """Test archive import with missing file"""
         client, _ = flask_app
@@ -46,10 +46,13 @@ from ibutsu_server.util import (
 from ibutsu_server.util.admin import validate_admin
 from ibutsu_server.util.celery_task import IbutsuTask
 from ibutsu_server.util.jwt import decode_token, generate_token
+from ibutsu_server.util.pagination import encode_cursor
 from ibutsu_server.util.projects import (
     add_user_filter,
     get_project,
     get_project_id,
+    get_user_permissions,
+    invalidate_user_permissions,
     project_has_user,
 )
 from ibutsu_server.util.query import query_as_task
@@ -61,6 +64,8 @@ from ibutsu_server.util.widget import (
     create_jenkins_columns,
     create_summary_columns,
     create_time_columns,
+    share_queries,
+    shared_query,
 )
 
 # Export the DB models as Mock* classes for backwards compatibility
@@ -616,6 +621,90 @@ def test_add_user_filter_with_string_user_id(make_project, make_user):
     assert len(results) >= 1
 
 
+def test_add_user_filter_excludes_owned_projects(make_project, make_user):
+    """Test add_user_filter only includes the projects the user is a member of, like before."""
+    owner = make_user(email="owner@test.com")
+    make_project(name="owned-project", owner_id=owner.id)
+
+    filtered = add_user_filter(db.select(Project), owner, model=Project)
+
+    assert db.session.scalars(filtered).all() == []
+
+
+def test_get_user_permissions(make_project, make_user):
+    """Test the permissions of a user are the projects they're a member or the owner of."""
+    user = make_user(email="user@test.com")
+    owned = make_project(name="owned-project", owner_id=user.id)
+    member_of = make_project(name="member-project")
+    make_project(name="other-project")
+    member_of.users.append(user)
+    db.session.commit()
+
+    assert get_user_permissions(str(user.id)) == {
+        "superadmin": False,
+        "project_ids": {str(member_of.id)},
+        "owned_project_ids": {str(owned.id)},
+    }
+    assert get_user_permissions(str(uuid.uuid4()))["superadmin"] is False
+
+
+def test_user_permissions_cached_per_request(flask_app, make_project, make_user):
+    """Test the permissions of a user are cached for the request, until they're invalidated."""
+    client, _ = flask_app
+    project = make_project(name="test-project")
+    member = make_user(email="member@test.com")
+
+    with client.application.test_request_context():
+        assert not project_has_user(project, member)
+        project.users.append(member)
+        db.session.commit()
+        # The membership is only seen once the permissions of the user are invalidated
+        assert not project_has_user(project, member)
+        invalidate_user_permissions(member)
+        assert project_has_user(project, member)
+
+    # Without a request, nothing is cached
+    project.users.remove(member)
+    db.session.commit()
+    assert not project_has_user(project, member)
+
+
+def test_user_permissions_cached_in_redis(flask_app, make_project, make_user):
+    """Test the permissions of a user are cached in Redis, if PERMISSIONS_CACHE_TTL is set."""
+    client, _ = flask_app
+    client.application.config["PERMISSIONS_CACHE_TTL"] = 30
+    project = make_project(name="test-project")
+    member = make_user(email="member@test.com")
+    project.users.append(member)
+    db.session.commit()
+    cache_key = f"ibutsu:permissions:{member.id}"
+
+    with (
+        patch("ibutsu_server.util.projects.get_cached", return_value=None) as mock_get,
+        patch("ibutsu_server.util.projects.set_cached") as mock_set,
+    ):
+        assert project_has_user(project, member)
+        mock_get.assert_called_once_with(cache_key)
+        mock_set.assert_called_once_with(
+            cache_key,
+            {"superadmin": False, "project_ids": [str(project.id)], "owned_project_ids": []},
+            30,
+        )
+
+    # The cached permissions are used without querying the database
+    cached = {"superadmin": False, "project_ids": [], "owned_project_ids": []}
+    with (
+        patch("ibutsu_server.util.projects.get_cached", return_value=cached),
+        patch("ibutsu_server.util.projects.db") as mock_db,
+    ):
+        assert not project_has_user(str(project.id), str(member.id))
+        mock_db.session.execute.assert_not_called()
+
+    with patch("ibutsu_server.util.projects.delete_cached") as mock_delete:
+        invalidate_user_permissions(member, None)
+        mock_delete.assert_called_once_with(cache_key)
+
+
 # Tests for util/admin.py
 
 
@@ -768,6 +857,31 @@ class TestQueryAsTask:
                 f"Expected tablename 'runs' derived from 'get_run_list', got '{tablename}'"
             )
 
+    def test_query_as_task_cursor(self, flask_app):
+        """Test query_as_task passes the cursor to the task, after checking it's valid."""
+
+        client, _ = flask_app
+
+        with (
+            client.application.app_context(),
+            patch("ibutsu_server.util.query.query_task") as mock_query_task,
+        ):
+            mock_query_task.apply_async.return_value = MagicMock(id="test-task-id")
+
+            @query_as_task
+            def get_result_list(**kwargs):
+                return {"results": []}
+
+            _response, status = get_result_list(page_size=600, cursor="not-a-cursor")
+            assert status == HTTPStatus.BAD_REQUEST
+            mock_query_task.apply_async.assert_not_called()
+
+            cursor = encode_cursor(
+                MagicMock(start_time=datetime.datetime(2026, 1, 1), id=uuid.uuid4())
+            )
+            get_result_list(page_size=600, cursor=cursor)
+            assert mock_query_task.apply_async.call_args[0][1] == {"cursor": cursor}
+
 
 # Tests for util/redis_lock.py
 
@@ -1013,6 +1127,34 @@ class TestWidgetUtils:
             assert "annotations" in columns
             assert "env" in columns
 
+    def test_shared_query(self):
+        """Test a shared query is computed once for the same arguments, in a shared context"""
+        query = MagicMock(side_effect=lambda job_name, builds: [job_name] * builds)
+        query.__qualname__ = "query"
+        shared = shared_query(query)
+
+        context = share_queries()
+        assert context.copy().run(shared, "job", 2) == ["job", "job"]
+        assert context.copy().run(shared, "job", 2) == ["job", "job"]
+        assert context.run(shared, "job", builds=3) == ["job", "job", "job"]
+        assert query.call_count == 2
+
+        # Outside of the shared context, the query is computed each time
+        shared("job", 2)
+        assert query.call_count == 3
+
+    def test_shared_query_error(self):
+        """Test an error of a shared query is raised for each widget that shares it"""
+        query = MagicMock(side_effect=ValueError("Test error"))
+        query.__qualname__ = "query"
+        shared = shared_query(query)
+
+        context = share_queries()
+        for _ in range(2):
+            with pytest.raises(ValueError, match="Test error"):
+                context.copy().run(shared, "job")
+        query.assert_called_once()
+
 
 # Tests for util/login.py additional coverage
 
@@ -112,3 +112,115 @@ def test_get_widget_exception_on_generate(flask_app, mock_widget_types):
         response, status = get_widget("test-widget")
         assert status == 500
         assert "Error processing widget" in response
+
+
+def test_get_widget_cached(flask_app, mock_widget_types):
+    """Test cached widgets aren't computed, and stale ones are refreshed in a worker once"""
+    client, _ = flask_app
+    client.application.config["WIDGET_CACHE_TTL"] = 60
+    mock_generate = MagicMock(return_value={"data": "new data"})
+    with (
+        client.application.test_request_context(),
+        patch("ibutsu_server.controllers.widget_controller.WIDGET_TYPES", mock_widget_types),
+        patch(
+            "ibutsu_server.controllers.widget_controller.WIDGET_METHODS",
+            {"test-widget": mock_generate},
+        ),
+        patch("ibutsu_server.controllers.widget_controller.get_cached_widget") as mock_cached,
+        patch("ibutsu_server.controllers.widget_controller.claim_widget_refresh") as mock_claim,
+        patch("ibutsu_server.controllers.widget_controller.refresh_widget") as mock_refresh,
+        patch("ibutsu_server.util.widget_cache.get_client"),
+    ):
+        mock_cached.return_value = ({"data": "cached data"}, True)
+        assert get_widget("test-widget") == {"data": "cached data"}
+        mock_refresh.delay.assert_not_called()
+
+        # Stale data is returned while it's refreshed, unless a refresh is already claimed
+        mock_cached.return_value = ({"data": "stale data"}, False)
+        mock_claim.side_effect = [True, False]
+        assert get_widget("test-widget") == {"data": "stale data"}
+        assert get_widget("test-widget") == {"data": "stale data"}
+        mock_refresh.delay.assert_called_once_with("test-widget", {})
+        mock_generate.assert_not_called()
+
+
+def test_get_widget_not_cached(flask_app, mock_widget_types):
+    """Test a widget that isn't cached is computed, and cached for its generation"""
+    client, _ = flask_app
+    client.application.config["WIDGET_CACHE_TTL"] = 60
+    with (
+        client.application.test_request_context(),
+        patch("ibutsu_server.controllers.widget_controller.WIDGET_TYPES", mock_widget_types),
+        patch(
+            "ibutsu_server.controllers.widget_controller.WIDGET_METHODS",
+            {"test-widget": mock_widget_types["test-widget"]["generate"]},
+        ),
+        patch("ibutsu_server.controllers.widget_controller.get_cached_widget", return_value=None),
+        patch("ibutsu_server.controllers.widget_controller.get_widget_generation", return_value=2),
+        patch("ibutsu_server.controllers.widget_controller.cache_widget") as mock_cache,
+        patch("ibutsu_server.util.widget_cache.get_client"),
+    ):
+        assert get_widget("test-widget") == {"data": "widget data"}
+        mock_cache.assert_called_once_with("test-widget", {}, {"data": "widget data"}, 2)
+
+
+@pytest.mark.parametrize("running_task_id", [None, "running-task-id"])
+def test_get_widget_async(flask_app, mock_widget_types, running_task_id):
+    """Test a widget is computed in a task with async, or shares the task that computes it"""
+    client, _ = flask_app
+    mock_generate = MagicMock(return_value={"data": "widget data"})
+    with (
+        client.application.test_request_context("/?param1=value&async=true"),
+        patch("ibutsu_server.controllers.widget_controller.WIDGET_TYPES", mock_widget_types),
+        patch("ibutsu_server.controllers.widget_config_controller.WIDGET_TYPES", mock_widget_types),
+        patch(
+            "ibutsu_server.controllers.widget_controller.WIDGET_METHODS",
+            {"test-widget": mock_generate},
+        ),
+        patch(
+            "ibutsu_server.controllers.widget_controller.register_widget_task",
+            side_effect=lambda _id, _params, task_id: running_task_id or task_id,
+        ),
+        patch("ibutsu_server.controllers.widget_controller.compute_widget") as mock_compute,
+    ):
+        response, status = get_widget("test-widget", async_=True)
+
+        assert status == 202
+        mock_generate.assert_not_called()
+        if running_task_id:
+            assert response["task_id"] == running_task_id
+            mock_compute.apply_async.assert_not_called()
+        else:
+            mock_compute.apply_async.assert_called_once_with(
+                ("test-widget", {"param1": "value"}), task_id=response["task_id"]
+            )
+        assert response["query_endpoint"] == f"/task/{response['task_id']}"
+
+
+@pytest.mark.parametrize(("builds", "in_task"), [(20, False), (40, True)])
+def test_get_widget_expensive(flask_app, builds, in_task):
+    """Test widgets that are estimated to be expensive are computed in a task"""
+    client, _ = flask_app
+    mock_generate = MagicMock(return_value={"heatmap": {}})
+    with (
+        client.application.test_request_context(
+            f"/?job_name=job&builds={builds}&group_field=component"
+        ),
+        patch(
+            "ibutsu_server.controllers.widget_controller.WIDGET_METHODS",
+            {"jenkins-heatmap": mock_generate},
+        ),
+        patch(
+            "ibutsu_server.controllers.widget_controller.register_widget_task",
+            side_effect=lambda _id, _params, task_id: task_id,
+        ),
+        patch("ibutsu_server.controllers.widget_controller.compute_widget") as mock_compute,
+    ):
+        response = get_widget("jenkins-heatmap")
+
+        if in_task:
+            assert response[1] == 202
+            mock_compute.apply_async.assert_called_once()
+        else:
+            assert response == {"heatmap": {}}
+            mock_compute.apply_async.assert_not_called()
@@ -0,0 +1,63 @@
+"""Tests for ibutsu_server.util.cache module"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+from flask import Flask
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from ibutsu_server.util.cache import bump_generation, get_cached, get_generation, set_cached
+
+
+@pytest.fixture
+def redis_client():
+    """A bare Flask app context, with a mocked Redis client"""
+    app = Flask(__name__)
+    client = MagicMock()
+    with (
+        app.app_context(),
+        patch("ibutsu_server.util.cache.get_redis_client", return_value=client) as mock_get,
+    ):
+        yield client
+    # The client is created once per app, and reused
+    assert mock_get.call_count <= 1
+
+
+def test_get_and_set_cached(redis_client):
+    """Test values are serialized to JSON in the cache"""
+    set_cached("some-key", {"count": 5}, ttl=60)
+    redis_client.set.assert_called_once_with("some-key", '{"count": 5}', ex=60)
+
+    redis_client.get.return_value = b'{"count": 5}'
+    assert get_cached("some-key") == {"count": 5}
+    redis_client.get.return_value = None
+    assert get_cached("some-key") is None
+
+
+def test_generation(redis_client):
+    """Test the generation numbers are incremented in a single round trip"""
+    redis_client.get.return_value = None
+    assert get_generation("results") == 0
+    redis_client.get.return_value = b"3"
+    assert get_generation("results") == 3
+    redis_client.get.assert_called_with("ibutsu:generation:results")
+
+    bump_generation("results", "runs")
+    pipeline = redis_client.pipeline.return_value.__enter__.return_value
+    assert [call.args for call in pipeline.incr.call_args_list] == [
+        ("ibutsu:generation:results",),
+        ("ibutsu:generation:runs",),
+    ]
+    pipeline.execute.assert_called_once()
+
+
+def test_redis_errors_are_not_raised(redis_client):
+    """Test the cache is skipped, rather than failing, when Redis can't be reached"""
+    redis_client.get.side_effect = RedisConnectionError("unreachable")
+    redis_client.set.side_effect = RedisConnectionError("unreachable")
+    redis_client.pipeline.side_effect = RedisConnectionError("unreachable")
+
+    assert get_cached("some-key") is None
+    assert get_generation("results") == 0
+    set_cached("some-key", 1, ttl=60)
+    bump_generation("results")
@@ -10,7 +10,10 @@ from ibutsu_server.db import db
 from ibutsu_server.db.models import Result
 from ibutsu_server.util.count import (
     _get_count_from_explain,
+    get_count_cache_key,
     get_count_estimate,
+    get_total_count,
+    invalidate_counts,
     time_limited_db_operation,
 )
 
@@ -228,3 +231,77 @@ def test_get_count_estimate_no_filter_with_various_tables(tablename):
         # Verify correct tablename was passed
         call_args = mock_session.execute.call_args
         assert call_args[0][1] == {"tablename": tablename}
+
+
+def test_get_count_cache_key(flask_app, make_project, make_user):
+    """Test the count cache key depends on the filters and the user's projects, not their order"""
+    client, _ = flask_app
+
+    with (
+        client.application.app_context(),
+        patch("ibutsu_server.util.count.get_generation", return_value=7),
+    ):
+        project_a = make_project(name="project-a")
+        project_b = make_project(name="project-b")
+        user = make_user(email="user@test.com")
+        other_user = make_user(email="other@test.com")
+        superadmin = make_user(email="admin@test.com", is_superadmin=True)
+        project_b.users.append(user)
+        project_a.users.extend([user, other_user])
+        db.session.commit()
+
+        key = get_count_cache_key("results", ["result=passed", "env=prod"], user)
+
+        assert key.startswith("ibutsu:count:results:7:")
+        assert key == get_count_cache_key("results", ["env=prod", "result=passed"], user)
+        assert key != get_count_cache_key("results", ["env=prod"], user)
+        assert key != get_count_cache_key("results", ["result=passed", "env=prod"], other_user)
+        assert key != get_count_cache_key("runs", ["result=passed", "env=prod"], user)
+        assert get_count_cache_key("results", None, superadmin) == get_count_cache_key("results")
+
+
+def test_get_total_count_cached(flask_app, make_project, make_run, make_result):
+    """Test the count is cached, and a cached count is returned without counting"""
+    client, _ = flask_app
+
+    with client.application.app_context():
+        project = make_project(name="test-project")
+        run = make_run(project_id=project.id)
+        for _ in range(3):
+            make_result(run_id=run.id, project_id=project.id)
+        query = db.select(Result)
+        client.application.config["COUNT_CACHE_TTL"] = 30
+
+        with (
+            patch("ibutsu_server.util.count.get_generation", return_value=0),
+            patch("ibutsu_server.util.count.get_cached", return_value=None) as mock_get,
+            patch("ibutsu_server.util.count.set_cached") as mock_set,
+        ):
+            assert get_total_count(query, "results") == 3
+            mock_set.assert_called_once_with(mock_get.call_args.args[0], 3, 30)
+
+            mock_get.return_value = 10
+            assert get_total_count(query, "results") == 10
+            # Refreshing the count ignores the cached count
+            assert get_total_count(query, "results", refresh=True) == 3
+
+            client.application.config["COUNT_CACHE_TTL"] = 0
+            mock_get.reset_mock()
+            assert get_total_count(query, "results") == 3
+            mock_get.assert_not_called()
+
+
+def test_invalidate_counts(flask_app):
+    """Test invalidating counts bumps the generation of the tables, if counts are cached"""
+    client, _ = flask_app
+
+    with (
+        client.application.app_context(),
+        patch("ibutsu_server.util.count.bump_generation") as mock_bump,
+    ):
+        invalidate_counts("results")
+        mock_bump.assert_not_called()
+
+        client.application.config["COUNT_CACHE_TTL"] = 30
+        invalidate_counts("results", "runs")
+        mock_bump.assert_called_once_with("results", "runs")
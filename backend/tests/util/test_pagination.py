@@ -0,0 +1,38 @@
+"""Tests for ibutsu_server.util.pagination module"""
+
+from base64 import urlsafe_b64encode
+from datetime import datetime
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+
+from ibutsu_server.util.pagination import decode_cursor, encode_cursor
+
+
+def test_encode_decode_cursor():
+    """Test a cursor decodes to the start time and ID of the item it was encoded from"""
+    item = SimpleNamespace(start_time=datetime(2026, 1, 2, 3, 4, 5, 678), id=uuid4())
+
+    cursor = encode_cursor(item)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (item.start_time, str(item.id))
+
+
+@pytest.mark.parametrize(
+    "position",
+    [
+        b"not json",
+        b'["2026-01-02T03:04:05"]',
+        b'["not a date", "64c2ab9e-cd64-4815-bf73-83b00c2e650f"]',
+        b'["2026-01-02T03:04:05", "not-a-uuid"]',
+        b'["2026-01-02T03:04:05", 1]',
+    ],
+)
+def test_decode_invalid_cursor(position):
+    """Test that decoding a cursor that isn't valid raises a ValueError"""
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(urlsafe_b64encode(position).decode())
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor("!!!")
@@ -0,0 +1,310 @@
+"""Tests for ibutsu_server.util.storage module"""
+
+import gzip
+from hashlib import sha256
+from io import BytesIO
+from unittest.mock import MagicMock, patch
+
+import pytest
+from flask import Flask
+
+from ibutsu_server.db.models import Artifact, ContentBlob
+from ibutsu_server.util.storage import (
+    FilesystemStorage,
+    S3Storage,
+    compress_content,
+    delete_stored_content,
+    get_content_type,
+    get_storage,
+    open_decompressed,
+    release_content,
+    store_content,
+)
+
+
+@pytest.fixture
+def app_context():
+    """A bare Flask app context, with the config for the storage backends"""
+    app = Flask(__name__)
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture
+def database_storage(flask_app):
+    """An app context with the database, that stores files in the database"""
+    client, _ = flask_app
+    with client.application.app_context():
+        yield client.application
+
+
+@pytest.fixture
+def filesystem_storage(flask_app, tmp_path):
+    """An app context with the database, that stores files in a temporary directory"""
+    client, _ = flask_app
+    app = client.application
+    with (
+        patch.dict(
+            app.config, {"ARTIFACT_STORAGE": "filesystem", "ARTIFACT_STORAGE_PATH": str(tmp_path)}
+        ),
+        app.app_context(),
+    ):
+        yield app
+
+
+def test_filesystem_storage(tmp_path):
+    """Test storing, reading and deleting files in a directory"""
+    storage = FilesystemStorage(tmp_path)
+
+    storage.put("artifacts/ab/abcdef", b"some content")
+
+    assert (tmp_path / "artifacts" / "ab" / "abcdef").read_bytes() == b"some content"
+    assert storage.get("artifacts/ab/abcdef") == b"some content"
+    with storage.open("artifacts/ab/abcdef") as file_object:
+        assert file_object.read(4) == b"some"
+
+    storage.delete("artifacts/ab/abcdef")
+    assert not (tmp_path / "artifacts" / "ab" / "abcdef").exists()
+    # Deleting a file that doesn't exist is fine
+    storage.delete("artifacts/ab/abcdef")
+
+
+def test_filesystem_storage_rejects_keys_outside_root(tmp_path):
+    """Test that a storage key can't point outside of the storage directory"""
+    storage = FilesystemStorage(tmp_path / "storage")
+
+    with pytest.raises(ValueError, match="outside of the storage directory"):
+        storage.put("../escaped", b"content")
+
+
+def test_s3_storage():
+    """Test storing, reading and deleting files in an S3 bucket"""
+    boto3 = pytest.importorskip("boto3")
+    moto = pytest.importorskip("moto")
+
+    with moto.mock_aws():
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket="ibutsu")
+        storage = S3Storage("ibutsu", region="us-east-1")
+
+        storage.put("artifacts/ab/abcdef", b"some content")
+        assert storage.get("artifacts/ab/abcdef") == b"some content"
+
+        storage.delete("artifacts/ab/abcdef")
+        with pytest.raises(storage.client.exceptions.NoSuchKey):
+            storage.get("artifacts/ab/abcdef")
+
+
+def test_get_storage(app_context, tmp_path):
+    """Test the storage backend is created from the config"""
+    assert get_storage() is None
+
+    app_context.config["ARTIFACT_STORAGE"] = "filesystem"
+    app_context.config["ARTIFACT_STORAGE_PATH"] = str(tmp_path)
+    storage = get_storage()
+    assert isinstance(storage, FilesystemStorage)
+    assert storage.root == tmp_path
+    # The backend is reused while the config stays the same
+    assert get_storage() is storage
+
+    app_context.config["ARTIFACT_STORAGE"] = "unknown"
+    with pytest.raises(ValueError, match="Unknown ARTIFACT_STORAGE backend"):
+        get_storage()
+
+
+def test_get_content_type():
+    """Test the content type is detected from the start of the content"""
+    png_header = b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x06"
+    assert get_content_type(b"some log output\n" * 10000) == "text/plain"
+    assert get_content_type(png_header + b"\x00" * 100) == "image/png"
+
+
+def test_compress_content_gzip():
+    """Test content is compressed with gzip, but only if that makes it smaller"""
+    content = b"some log output\n" * 1000
+    compressed, encoding = compress_content(content, "gzip")
+
+    assert encoding == "gzip"
+    assert gzip.decompress(compressed) == content
+    assert compress_content(content, "none") == (content, None)
+    # Small content isn't worth compressing, and compressed content doesn't get any smaller
+    assert compress_content(b"short", "gzip") == (b"short", None)
+    assert compress_content(compressed * 2, "gzip") == (compressed * 2, None)
+    with pytest.raises(ValueError, match="Unknown ARTIFACT_COMPRESSION codec"):
+        compress_content(content, "lzma")
+
+
+def test_compress_content_zstd():
+    """Test content is compressed and decompressed with zstd"""
+    pytest.importorskip("zstandard")
+    content = b"some log output\n" * 1000
+    compressed, encoding = compress_content(content, "zstd")
+
+    assert encoding == "zstd"
+    assert len(compressed) < len(content)
+    with open_decompressed(BytesIO(compressed), encoding) as file_object:
+        assert file_object.read() == content
+
+
+def test_open_decompressed_gzip():
+    """Test gzipped content is decompressed as it's read, and the source is closed with it"""
+    content = b"some log output\n" * 1000
+    source = BytesIO(gzip.compress(content))
+
+    with open_decompressed(source, "gzip") as file_object:
+        assert file_object.read(4) == b"some"
+        assert file_object.read() == content[4:]
+    assert source.closed
+    assert open_decompressed(source, None) is source
+
+
+def test_store_content_compressed(filesystem_storage):
+    """Test that compressed content is stored under a key with its codec"""
+    filesystem_storage.config["ARTIFACT_COMPRESSION"] = "gzip"
+    content = b"some log output\n" * 1000
+
+    values = store_content(content, "artifacts")
+
+    assert values["content_encoding"] == "gzip"
+    assert values["content_size"] == len(content)
+    assert values["content_hash"] == sha256(content).hexdigest()
+    assert values["storage_key"].endswith(".gzip")
+    assert gzip.decompress(get_storage().get(values["storage_key"])) == content
+
+
+def test_store_content_in_database(database_storage):
+    """Test that the content is kept on a shared row when there's no storage backend"""
+    values = store_content(b"some content", "artifacts")
+    store_content(b"some content", "artifacts")
+
+    content_hash = sha256(b"some content").hexdigest()
+    assert values == {
+        "content_size": 12,
+        "content_hash": content_hash,
+        "storage_key": f"artifacts/{content_hash[:2]}/{content_hash}",
+    }
+    blob = ContentBlob.query.one()
+    assert blob.key == values["storage_key"]
+    assert blob.content == b"some content"
+    assert blob.reference_count == 2
+    artifact = Artifact(filename="test.log")
+    artifact.set_content(values)
+    assert artifact.read_content() == b"some content"
+    assert artifact.open_content().read() == b"some content"
+
+
+def test_release_content_in_database(database_storage):
+    """Test that content in the database is deleted with its last reference"""
+    key = store_content(b"some content", "artifacts")["storage_key"]
+    store_content(b"some content", "artifacts")
+
+    assert release_content([key]) == []
+    assert ContentBlob.query.one().reference_count == 1
+    # The content is deleted along with the row, so there's nothing to delete from a backend
+    assert release_content([key]) == []
+    assert ContentBlob.query.count() == 0
+
+
+def test_store_content_in_database_after_storage(database_storage, tmp_path):
+    """Test that content which was put in a storage backend is kept in the database as well"""
+    database_storage.config.update(
+        {"ARTIFACT_STORAGE": "filesystem", "ARTIFACT_STORAGE_PATH": str(tmp_path)}
+    )
+    key = store_content(b"some content", "artifacts")["storage_key"]
+    database_storage.config["ARTIFACT_STORAGE"] = "database"
+    store_content(b"some content", "artifacts")
+
+    blob = ContentBlob.query.one()
+    assert blob.content == b"some content"
+    assert blob.reference_count == 2
+    # The file is in the database now, so it's not deleted from the storage backend
+    assert release_content([key, key]) == []
+
+
+def test_set_content_compressed(database_storage):
+    """Test compressed content is set with the metadata of the uncompressed content"""
+    database_storage.config["ARTIFACT_COMPRESSION"] = "gzip"
+    content = b"some log output\n" * 1000
+    values = store_content(content, "artifacts")
+    # The metadata is right whatever order the values are in
+    reordered = dict(reversed(values.items()))
+
+    for stored in (values, reordered):
+        artifact = Artifact(filename="test.log")
+        artifact.set_content(stored)
+
+        assert artifact.content_encoding == "gzip"
+        assert artifact.content_size == len(content)
+        assert artifact.content_hash == sha256(content).hexdigest()
+        assert artifact.read_content() == content
+
+    # Content that's assigned directly replaces the compressed content, and isn't compressed
+    artifact.content = b"other content"
+    assert artifact.content_encoding is None
+    assert artifact.content_size == len(b"other content")
+    assert artifact.content_hash == sha256(b"other content").hexdigest()
+    assert artifact.read_content() == b"other content"
+
+
+def test_store_content_in_storage(filesystem_storage, tmp_path):
+    """Test that the content is put in the storage backend, and only the key is kept in the row"""
+    values = store_content(b"some content", "artifacts")
+
+    content_hash = sha256(b"some content").hexdigest()
+    assert "content" not in values
+    assert values["content_size"] == 12
+    assert values["content_hash"] == content_hash
+    assert values["storage_key"] == f"artifacts/{content_hash[:2]}/{content_hash}"
+    assert get_storage().get(values["storage_key"]) == b"some content"
+
+
+def test_store_content_deduplicates(filesystem_storage):
+    """Test that content which is already stored is only referenced again"""
+    with patch.object(FilesystemStorage, "put", autospec=True) as mock_put:
+        first = store_content(b"some content", "artifacts")
+        second = store_content(b"some content", "artifacts")
+        other = store_content(b"other content", "artifacts")
+
+    assert first["storage_key"] == second["storage_key"] != other["storage_key"]
+    assert mock_put.call_count == 2
+    blobs = {blob.key: blob.reference_count for blob in ContentBlob.query.all()}
+    assert blobs == {first["storage_key"]: 2, other["storage_key"]: 1}
+
+
+def test_release_content(filesystem_storage):
+    """Test that stored files are only unreferenced once every reference is released"""
+    key = store_content(b"some content", "artifacts")["storage_key"]
+    store_content(b"some content", "artifacts")
+    store_content(b"some content", "artifacts")
+
+    assert release_content([key, None]) == []
+    assert ContentBlob.query.one().reference_count == 2
+    assert release_content([key, key]) == [key]
+    assert ContentBlob.query.count() == 0
+    # Files that were stored before references were counted are unreferenced straight away
+    assert release_content(["artifacts/legacy"]) == ["artifacts/legacy"]
+
+
+def test_delete_stored_content_keeps_referenced_files(filesystem_storage):
+    """Test that a file that was stored again after it was released isn't deleted"""
+    key = store_content(b"some content", "artifacts")["storage_key"]
+    unreferenced_keys = release_content([key])
+    store_content(b"some content", "artifacts")
+
+    delete_stored_content(unreferenced_keys)
+
+    assert get_storage().get(key) == b"some content"
+
+
+def test_delete_stored_content_logs_errors(filesystem_storage):
+    """Test that failing to delete one file doesn't stop the others from being deleted"""
+    storage = MagicMock()
+    storage.delete.side_effect = [OSError("failed"), None]
+
+    with (
+        patch("ibutsu_server.util.storage.get_storage", return_value=storage),
+        patch("ibutsu_server.util.storage.logger") as mock_logger,
+    ):
+        delete_stored_content(["first", None, "second"])
+
+    assert [call.args[0] for call in storage.delete.call_args_list] == ["first", "second"]
+    mock_logger.exception.assert_called_once()
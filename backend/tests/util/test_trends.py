@@ -0,0 +1,80 @@
+"""Tests for ibutsu_server.util.trends module"""
+
+import pytest
+
+from ibutsu_server.util.trends import (
+    STABLE_SLOPE,
+    analyze_trends,
+    calculate_slope,
+    calculate_slopes,
+    get_heatmap_trends,
+)
+
+
+@pytest.mark.parametrize(
+    ("x_data", "expected_slope"),
+    [
+        ([100, 100, 100], STABLE_SLOPE),
+        ([90, 80, 70], -10.0),  # Decreasing by 10 percentage points per build
+        ([70, 80, 90], 10.0),  # Increasing by 10 percentage points per build
+        ([80, 80, 80], 0),
+        ([50, 100], 50.0),
+        ([100], 0),
+        ([], 0),
+    ],
+)
+def test_calculate_slope(x_data, expected_slope):
+    """Test the slope is the change of the pass percentage per build"""
+    assert calculate_slope(x_data) == expected_slope
+
+
+def test_calculate_slopes():
+    """Test the slopes of series of different lengths are calculated at once"""
+    assert calculate_slopes([[90, 80, 70], [], [0, 10, 20, 30, 40]]) == [-10.0, 0, 10.0]
+
+
+def test_calculate_slopes_missing_builds():
+    """Test the builds without a pass percentage are left out of the regression"""
+    assert calculate_slopes([[90, "Build failed", 70], [None, 50, 60]]) == [-10.0, 10.0]
+
+
+def test_analyze_trends():
+    """Test the moving averages, volatility and changepoint of the series are found at once"""
+    trends = analyze_trends(
+        [[100, 100, 40, 40, 40], [90, None, 70], [100, 0, 100, 0], [80]],
+        window=2,
+        min_shift=20,
+    )
+
+    assert trends[0] == {
+        "slope": -18.0,
+        "moving_average": [100.0, 100.0, 70.0, 40.0, 40.0],
+        "volatility": 15.0,
+        "changepoint": 2,
+        "changepoint_shift": -60.0,
+    }
+    # The build without a pass percentage has no moving average, and is left out of the changes
+    assert trends[1]["moving_average"] == [90.0, None, 70.0]
+    assert trends[1]["volatility"] == 0
+    # A flaky series is volatile
+    assert trends[2]["volatility"] == 100.0
+    assert trends[3] == {
+        "slope": 0,
+        "moving_average": [80.0],
+        "volatility": 0,
+        "changepoint": None,
+        "changepoint_shift": None,
+    }
+
+
+def test_get_heatmap_trends():
+    """Test the trends of the groups of a heatmap are aligned with their builds"""
+    heatmap = {
+        "group1": [[-10.0, 0], [90, "run1", None, "1"], ["Build failed", "None", None, "2"]],
+        "group2": [[0, 0], [50, "run2", None, "2"]],
+    }
+
+    trends = get_heatmap_trends(heatmap)
+
+    assert trends["group1"]["moving_average"] == [90.0, None]
+    assert trends["group2"]["moving_average"] == [50.0]
@@ -0,0 +1,150 @@
+"""Tests for ibutsu_server.util.widget_cache module"""
+
+import json
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from flask import Flask
+
+from ibutsu_server.util.widget_cache import (
+    cache_widget,
+    claim_widget_refresh,
+    get_cached_widget,
+    get_most_viewed_widgets,
+    get_widget_cache_key,
+    get_widget_compute_times,
+    get_widget_ttl,
+    invalidate_widgets,
+    record_compute_time,
+    record_widget_view,
+    register_widget_task,
+)
+
+PROJECT_ID = "44941c55-9736-42f6-acce-ca3c4739d0f4"
+
+
+@pytest.fixture
+def redis_client():
+    """A bare Flask app context with widget caching, and a mocked Redis client"""
+    app = Flask(__name__)
+    app.config["WIDGET_CACHE_TTL"] = 60
+    client = MagicMock()
+    with (
+        app.app_context(),
+        patch("ibutsu_server.util.cache.get_redis_client", return_value=client),
+    ):
+        yield client
+
+
+def _cached(generation, computed):
+    return json.dumps({"data": {"count": 5}, "generation": generation, "computed": computed})
+
+
+def test_widget_ttl(redis_client):
+    """Test some types of widgets are fresh for longer, and caching can be turned off"""
+    assert get_widget_ttl("result-aggregator") == 60
+    assert get_widget_ttl("jenkins-heatmap") == 900
+    with patch.dict("flask.current_app.config", {"WIDGET_CACHE_TTL": 0}):
+        assert get_widget_ttl("jenkins-heatmap") == 0
+
+
+def test_widget_cache_key():
+    """Test the key doesn't depend on the order of the parameters"""
+    key = get_widget_cache_key("result-aggregator", {"project": PROJECT_ID, "days": 7})
+    assert key == get_widget_cache_key("result-aggregator", {"days": 7, "project": PROJECT_ID})
+    assert key != get_widget_cache_key("result-aggregator", {"days": 8, "project": PROJECT_ID})
+
+
+def test_cache_widget(redis_client):
+    """Test the data is cached with the generation it was computed for, until it expires"""
+    cache_widget("result-aggregator", {"project": PROJECT_ID}, {"count": 5}, generation=3)
+
+    key, value = redis_client.set.call_args.args
+    assert key == get_widget_cache_key("result-aggregator", {"project": PROJECT_ID})
+    assert json.loads(value)["data"] == {"count": 5}
+    assert json.loads(value)["generation"] == 3
+    assert redis_client.set.call_args.kwargs == {"ex": 24 * 60 * 60}
+
+
+@pytest.mark.parametrize(
+    ("generation", "age", "is_fresh"),
+    [(b"3", 0, True), (b"4", 0, False), (b"3", 120, False)],
+)
+def test_get_cached_widget(redis_client, generation, age, is_fresh):
+    """Test cached data is stale once its project's generation changes, or its TTL passes"""
+    pipeline = redis_client.pipeline.return_value.__enter__.return_value
+    pipeline.execute.return_value = [_cached(3, time.time() - age), generation]
+
+    data = get_cached_widget("result-aggregator", {"project": PROJECT_ID})
+
+    assert data == ({"count": 5}, is_fresh)
+    assert pipeline.get.call_args.args == (f"ibutsu:generation:widgets:{PROJECT_ID}",)
+
+
+def test_get_cached_widget_not_cached(redis_client):
+    """Test None is returned when the widget isn't cached"""
+    pipeline = redis_client.pipeline.return_value.__enter__.return_value
+    pipeline.execute.return_value = [None, None]
+    assert get_cached_widget("result-aggregator", {"project": PROJECT_ID}) is None
+
+
+def test_claim_widget_refresh(redis_client):
+    """Test a refresh can only be claimed once, until it's released or times out"""
+    redis_client.set.return_value = None
+    assert not claim_widget_refresh("result-aggregator", {"project": PROJECT_ID})
+    redis_client.set.return_value = True
+    assert claim_widget_refresh("result-aggregator", {"project": PROJECT_ID})
+    assert redis_client.set.call_args.kwargs == {"ex": 300, "nx": True}
+
+
+def test_register_widget_task(redis_client):
+    """Test a widget's task is registered, unless another task is computing the widget"""
+    redis_client.set.return_value = True
+    assert register_widget_task("importance-component", {"builds": 5}, "task-id") == "task-id"
+    assert redis_client.set.call_args.kwargs == {"ex": 600, "nx": True}
+
+    redis_client.set.return_value = None
+    redis_client.get.return_value = b"running-task-id"
+    assert register_widget_task("importance-component", {"builds": 5}, "task-id") == (
+        "running-task-id"
+    )
+
+
+def test_invalidate_widgets(redis_client):
+    """Test the generations of the projects, and of widgets without a project, are bumped"""
+    invalidate_widgets(PROJECT_ID, None)
+
+    pipeline = redis_client.pipeline.return_value.__enter__.return_value
+    assert sorted(call.args[0] for call in pipeline.incr.call_args_list) == [
+        "ibutsu:generation:widgets",
+        f"ibutsu:generation:widgets:{PROJECT_ID}",
+    ]
+
+
+def test_widget_views(redis_client):
+    """Test views are counted for the type and parameters of a widget, which are read back"""
+    record_widget_view("result-aggregator", {"project": PROJECT_ID, "days": 7})
+
+    key, amount, member = redis_client.zincrby.call_args.args
+    assert amount == 1
+    redis_client.zrevrange.return_value = [member.encode()]
+    assert get_most_viewed_widgets(10) == [
+        ("result-aggregator", {"project": PROJECT_ID, "days": 7})
+    ]
+    assert redis_client.zrevrange.call_args.args == (key, 0, 9)
+
+
+def test_record_compute_time(redis_client):
+    """Test the compute time is only recorded for widgets that are computed successfully"""
+    pipeline = redis_client.pipeline.return_value.__enter__.return_value
+    with record_compute_time("jenkins-heatmap", {"job_name": "job"}):
+        pass
+    ((member, seconds),) = pipeline.zadd.call_args.args[1].items()
+    assert seconds >= 0
+    with pytest.raises(ValueError, match="failed"), record_compute_time("jenkins-heatmap", {}):
+        raise ValueError("failed")
+    pipeline.zadd.assert_called_once()
+
+    redis_client.zrevrange.return_value = [(member.encode(), 2.5)]
+    assert get_widget_compute_times(1) == [("jenkins-heatmap", {"job_name": "job"}, 2.5)]
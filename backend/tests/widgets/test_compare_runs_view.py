@@ -198,3 +198,102 @@ def test_get_comparison_data_matching_results(db_session, make_project, make_run
     assert result_stag["test_id"] == "test::path"
     assert result_prod["result"] == "passed"
     assert result_stag["result"] == "failed"
+
+
+def _make_run_results(make_run, make_result, project, env, hours_ago, results):
+    """Create a run with the results of some tests, from their test IDs"""
+    start_time = datetime.now(UTC) - timedelta(hours=hours_ago)
+    run = make_run(project_id=project.id, start_time=start_time)
+    for test_id, result in results.items():
+        make_result(
+            run_id=run.id,
+            project_id=project.id,
+            test_id=test_id,
+            result=result,
+            env=env,
+            metadata={"fspath": f"/path/to/{test_id}.py"},
+            start_time=start_time,
+        )
+    return run
+
+
+def test_get_comparison_data_categories(db_session, make_project, make_run, make_result):
+    """Test the differences between several runs are categorized against the first run"""
+    project = make_project()
+    tests = {
+        "same": ("passed", "passed", "passed"),
+        "new_failure": ("passed", "passed", "failed"),
+        "fixed": ("error", "passed", "error"),
+        "newly_skipped": ("passed", "skipped", "passed"),
+        "missing": ("passed", None, "passed"),
+        "added": (None, "passed", "passed"),
+        "changed": ("passed", "xpassed", "passed"),
+    }
+    for index, env in enumerate(["first", "second", "third"]):
+        results = {test_id: results[index] for test_id, results in tests.items()}
+        _make_run_results(
+            make_run,
+            make_result,
+            project,
+            env,
+            hours_ago=index + 1,
+            results={test_id: result for test_id, result in results.items() if result},
+        )
+
+    data = get_comparison_data(["env=first", "env=second", "env=third"])
+
+    # The differences are ordered by their fspath
+    assert [[r and r["result"] for r in results] for results in data["results"]] == [
+        [None, "passed", "passed"],
+        ["passed", "xpassed", "passed"],
+        ["error", "passed", "error"],
+        ["passed", None, "passed"],
+        ["passed", "passed", "failed"],
+        ["passed", "skipped", "passed"],
+    ]
+    assert data["categories"] == [
+        ["missing"],
+        ["changed"],
+        ["fixed"],
+        ["missing"],
+        ["new_failure"],
+        ["newly_skipped"],
+    ]
+    assert data["summary"] == {
+        "new_failure": 1,
+        "fixed": 1,
+        "newly_skipped": 1,
+        "missing": 2,
+        "changed": 1,
+    }
+    assert data["pagination"]["totalItems"] == 6
+
+
+def test_get_comparison_data_pagination(db_session, make_project, make_run, make_result):
+    """Test the differences are paginated, and can be limited to a category"""
+    project = make_project()
+    _make_run_results(
+        make_run,
+        make_result,
+        project,
+        "production",
+        hours_ago=1,
+        results={f"test{i}": "passed" for i in range(5)},
+    )
+    _make_run_results(
+        make_run,
+        make_result,
+        project,
+        "staging",
+        hours_ago=2,
+        results={"test0": "passed", **{f"test{i}": "failed" for i in range(1, 4)}},
+    )
+
+    data = get_comparison_data(["env=production", "env=staging"], page=2, page_size=2)
+    assert [results[0]["test_id"] for results in data["results"]] == ["test3", "test4"]
+    assert data["pagination"] == {"page": 2, "pageSize": 2, "totalItems": 4, "totalPages": 2}
+
+    data = get_comparison_data(["env=production", "env=staging"], category="missing")
+    assert [results[0]["test_id"] for results in data["results"]] == ["test4"]
+    assert data["results"][0][1] is None
+    assert data["summary"]["new_failure"] == 3
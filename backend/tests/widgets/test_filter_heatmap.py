@@ -1,5 +1,7 @@
 """Tests for filter_heatmap widget"""
 
+from datetime import timedelta
+
 from ibutsu_server.widgets.filter_heatmap import get_filter_heatmap
 
 MOCK_FILTERS = "component=filter-component"
@@ -171,6 +173,68 @@ def test_get_filter_heatmap_calculates_slope(make_project, bulk_run_creator, fix
     assert isinstance(result["heatmap"]["test-component"][0], list)
 
 
+def test_get_filter_heatmap_last_builds_of_groups(make_project, bulk_run_creator, fixed_time):
+    """Test each group has its last builds in chronological order, with the slope of them"""
+    project = make_project(name="test-project")
+    for component, base_hours in [("improving", 0), ("stable", 10)]:
+        bulk_run_creator(
+            count=5,
+            project_id=project.id,
+            base_time=fixed_time - timedelta(hours=base_hours, minutes=30),
+            component=component,
+            summary_pattern=lambda i, component=component: {
+                "tests": 100,
+                "failures": i * 5 if component == "improving" else 0,
+                "errors": 0,
+                "skips": 0,
+                "xfailures": 0,
+                "xpasses": 0,
+            },
+        )
+
+    heatmap = get_filter_heatmap(
+        "component*improving;stable", 3, MOCK_GROUP_FIELD, str(project.id)
+    )["heatmap"]
+
+    assert heatmap["improving"][0] == [5.0, 0]
+    assert [run[0] for run in heatmap["improving"][1:]] == [90, 95, 100]
+    # The runs are labeled by their position among the runs of every group, from the newest
+    assert [run[3] for run in heatmap["improving"][1:]] == ["3", "2", "1"]
+    assert heatmap["stable"][0] == [100, 0]
+    assert [run[3] for run in heatmap["stable"][1:]] == ["8", "7", "6"]
+
+
+def test_get_filter_heatmap_trends(make_project, bulk_run_creator, fixed_time):
+    """Test the trends of the groups are only included on demand"""
+    project = make_project(name="test-project")
+    bulk_run_creator(
+        count=4,
+        project_id=project.id,
+        base_time=fixed_time,
+        component="test-component",
+        summary_pattern=lambda i: {
+            "tests": 100,
+            "failures": 50 if i < 2 else 0,
+            "errors": 0,
+            "skips": 0,
+            "xfailures": 0,
+            "xpasses": 0,
+        },
+    )
+
+    assert "trends" not in get_filter_heatmap(
+        "component=test-component", MOCK_BUILDS, MOCK_GROUP_FIELD, str(project.id)
+    )
+    result = get_filter_heatmap(
+        "component=test-component", MOCK_BUILDS, MOCK_GROUP_FIELD, str(project.id), trends=True
+    )
+
+    trends = result["trends"]["test-component"]
+    assert trends["slope"] == result["heatmap"]["test-component"][0][0]
+    assert trends["moving_average"] == [100.0, 100.0, 83.33, 66.67]
+    assert (trends["changepoint"], trends["changepoint_shift"]) == (2, -50.0)
+
+
 def test_get_filter_heatmap_with_project_filter(make_project, make_run, fixed_time):
     """Test that get_filter_heatmap filters by project."""
     project1 = make_project(name="project1")
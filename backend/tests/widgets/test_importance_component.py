@@ -188,7 +188,11 @@ def test_get_importance_component_with_various_results(make_project, make_run, m
         )
 
     result = get_importance_component(
-        job_name="test-job", builds=5, components="component1", project=str(project.id)
+        job_name="test-job",
+        builds=5,
+        components="component1",
+        project=str(project.id),
+        include_results=True,
     )
 
     assert result is not None
@@ -200,6 +204,48 @@ def test_get_importance_component_with_various_results(make_project, make_run, m
     assert "percentage" in high_data
     assert "result_list" in high_data
     assert len(high_data["result_list"]) == 5  # 5 results
+    assert table_entry["data"]["100"]["low"]["result_list"] == []
+
+
+def test_get_importance_component_counts(make_project, make_run, make_result):
+    """Test the results are counted by component, build, importance and result"""
+    project = make_project(name="test-project")
+    jenkins = {"job_name": "test-job", "build_number": "100"}
+    run = make_run(project_id=project.id, metadata={"jenkins": jenkins})
+    for importance, result_status in [
+        ("high", "passed"),
+        ("high", "passed"),
+        ("high", "passed"),
+        ("high", "failed"),
+        ("medium", "skipped"),
+        ("medium", "passed"),
+    ]:
+        make_result(
+            run_id=run.id,
+            project_id=project.id,
+            component="component1",
+            result=result_status,
+            metadata={"importance": importance, "jenkins": jenkins},
+        )
+
+    results = _get_results("test-job", 5, "component1", str(project.id))
+    assert sorted((r.importance, r.result, r.count) for r in results) == [
+        ("high", "failed", 1),
+        ("high", "passed", 3),
+        ("medium", "passed", 1),
+        ("medium", "skipped", 1),
+    ]
+
+    data = get_importance_component(
+        job_name="test-job", builds=5, components="component1", project=str(project.id)
+    )["table_data"][0]["data"]["100"]
+    # The IDs of the results are only returned on demand
+    assert data == {
+        "critical": {"percentage": "N/A", "count": 0},
+        "high": {"percentage": 0.75, "count": 4},
+        "medium": {"percentage": 1.0, "count": 2},
+        "low": {"percentage": "N/A", "count": 0},
+    }
 
 
 def test_get_importance_component_count_skips_flag(make_project, make_run, make_result):
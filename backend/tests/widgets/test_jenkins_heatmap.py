@@ -1,11 +1,14 @@
 """Tests for jenkins_heatmap widget"""
 
-import pytest
+from datetime import timedelta
+from unittest.mock import patch
 
+from ibutsu_server.db.models import JenkinsBuild
+from ibutsu_server.tasks.runs import backfill_jenkins_builds
 from ibutsu_server.widgets.jenkins_heatmap import (
-    _calculate_slope,
     _pad_heatmap,
     get_jenkins_heatmap,
+    get_jenkins_summary,
 )
 
 MOCK_JOB_NAME = "test-job"
@@ -18,20 +21,6 @@ MOCK_GROUP_FIELD = "component"
 # ============================================================================
 
 
-@pytest.mark.parametrize(
-    ("x_data", "expected_slope"),
-    [
-        ([100, 100, 100], 100),
-        ([90, 80, 70], -10.0),  # Decreasing by 10 percentage points per build
-        ([70, 80, 90], 10.0),  # Increasing by 10 percentage points per build
-        ([80, 80, 80], 0),
-    ],
-)
-def test_calculate_slope(x_data, expected_slope):
-    """Test the _calculate_slope function."""
-    assert _calculate_slope(x_data) == expected_slope
-
-
 def test_pad_heatmap():
     """Test the _pad_heatmap function."""
     heatmap = {"component1": [[-10.0, 0], [90, "run1", None, "1"], [70, "run3", None, "3"]]}
@@ -315,3 +304,79 @@ def test_get_jenkins_heatmap_with_count_skips_false(
     # Verify the heatmap structure exists
     component_data = result["heatmap"]["component1"]
     assert len(component_data) >= 2  # At least slope + 1 build
+
+
+def test_get_jenkins_heatmap_reads_builds_from_rollup(
+    db_session, make_project, jenkins_run_factory, fixed_time
+):
+    """Test that the most recent builds are read from the rollup of the Jenkins builds."""
+    project = make_project(name="test-project")
+    for i in range(1, 4):
+        jenkins_run_factory(
+            job_name=MOCK_JOB_NAME,
+            build_number=str(i),
+            project_id=project.id,
+            start_time=fixed_time + timedelta(hours=i),
+            component="component1",
+            summary={"tests": 10, "failures": i, "errors": 0, "skips": 0},
+        )
+    backfill_jenkins_builds()
+    # A build that's only in the rollup is one of the most recent builds
+    db_session.add(
+        JenkinsBuild(
+            project_id=project.id,
+            jenkins_job_name=MOCK_JOB_NAME,
+            jenkins_build_number=4,
+            min_start_time=fixed_time + timedelta(hours=4),
+            max_start_time=fixed_time + timedelta(hours=4),
+        )
+    )
+    db_session.commit()
+
+    result = get_jenkins_heatmap(MOCK_JOB_NAME, 2, MOCK_GROUP_FIELD, project=str(project.id))
+    assert [cell[3] for cell in result["heatmap"]["component1"][1:]] == ["3", "4"]
+
+    summary = get_jenkins_summary(MOCK_JOB_NAME, 5, project=str(project.id))["summary"]
+    assert [(build["build_number"], build["failures"]) for build in summary[1:]] == [
+        ("3", 3),
+        ("2", 2),
+        ("1", 1),
+    ]
+
+
+def test_get_jenkins_heatmap_rollup_matches_runs(
+    db_session, make_project, jenkins_run_factory, fixed_time, caplog
+):
+    """Test that the heatmap and summary read from the rollup match an aggregation of the runs."""
+    project = make_project(name="test-project")
+    for i, (build_number, component) in enumerate(
+        [("1", "component1"), ("1", "component2"), ("2", "component1"), ("3", "component2")]
+    ):
+        jenkins_run_factory(
+            job_name=MOCK_JOB_NAME,
+            build_number=build_number,
+            project_id=project.id,
+            start_time=fixed_time + timedelta(hours=i),
+            duration=10.0 * (i + 1),
+            component=component,
+            env="production",
+            metadata={"jenkins": {"build_url": f"http://jenkins/{build_number}"}},
+            summary={"tests": 10, "failures": i, "errors": 1, "skips": 2, "xfailures": 0},
+        )
+
+    # The rollup isn't filled in, so the runs are aggregated, which is logged
+    runs_heatmap = get_jenkins_heatmap(MOCK_JOB_NAME, 5, MOCK_GROUP_FIELD, project=str(project.id))
+    runs_summary = get_jenkins_summary(MOCK_JOB_NAME, 5, project=str(project.id))
+    assert "rollup of the Jenkins builds has no builds" in caplog.text
+
+    backfill_jenkins_builds()
+    with patch("ibutsu_server.widgets.jenkins_heatmap._aggregate_builds") as mock_aggregate:
+        rollup_heatmap = get_jenkins_heatmap(
+            MOCK_JOB_NAME, 5, MOCK_GROUP_FIELD, project=str(project.id)
+        )
+        mock_aggregate.assert_not_called()
+    with patch("ibutsu_server.widgets.jenkins_heatmap._summarize_builds") as mock_summarize:
+        rollup_summary = get_jenkins_summary(MOCK_JOB_NAME, 5, project=str(project.id))
+        mock_summarize.assert_not_called()
+    assert rollup_heatmap == runs_heatmap
+    assert rollup_summary == runs_summary
@@ -1,7 +1,12 @@
 """Tests for jenkins_job_view widget"""
 
+from datetime import timedelta
+from unittest.mock import patch
 from uuid import uuid4
 
+from ibutsu_server.db import db
+from ibutsu_server.db.models import Run
+from ibutsu_server.tasks.runs import backfill_jenkins_builds
 from ibutsu_server.widgets.jenkins_job_view import get_jenkins_job_view
 
 
@@ -423,3 +428,72 @@ def test_get_jenkins_job_view_invalid_parameters(db_session, make_project):
 
     assert result is not None
     assert "pagination" in result
+
+
+def test_get_jenkins_job_view_reads_builds_from_rollup(
+    db_session, make_project, jenkins_run_factory, fixed_time
+):
+    """Test that jenkins_job_view reads the builds from the rollup, when the filters allow it"""
+    project = make_project(name="test-project")
+    for component, build_number in [("component1", "100"), ("component2", "100"), (None, "101")]:
+        jenkins_run_factory(
+            job_name="test-job",
+            build_number=build_number,
+            project_id=project.id,
+            start_time=fixed_time,
+            component=component,
+            env="production",
+            summary={"errors": 0, "failures": 1, "skips": 0, "tests": 10},
+        )
+    backfill_jenkins_builds()
+    expected = get_jenkins_job_view(project=str(project.id))
+    assert [job["build_number"] for job in expected["jobs"]] == ["100", "101"]
+    assert expected["jobs"][0]["summary"]["tests"] == 20
+
+    # The rollup is read rather than the runs, even without any runs left
+    db_session.execute(db.delete(Run))
+    result = get_jenkins_job_view(
+        additional_filters="job_name=test-job,build_number*100;101", project=str(project.id)
+    )
+    assert sorted(result["jobs"], key=lambda job: job["build_number"]) == sorted(
+        expected["jobs"], key=lambda job: job["build_number"]
+    )
+    assert result["pagination"]["totalItems"] == 2
+
+    # The runs are aggregated for filters that can't be applied to the rollup
+    result = get_jenkins_job_view(additional_filters="env=production", project=str(project.id))
+    assert result["jobs"] == []
+
+
+def test_get_jenkins_job_view_rollup_matches_runs(
+    db_session, make_project, jenkins_run_factory, fixed_time
+):
+    """Test that the builds read from the rollup match an aggregation of the runs"""
+    project = make_project(name="test-project")
+    for i, (job_name, build_number, component) in enumerate(
+        [
+            ("job1", "1", "component1"),
+            ("job1", "1", "component2"),
+            ("job1", "2", "component1"),
+            ("job2", "1", None),
+        ]
+    ):
+        jenkins_run_factory(
+            job_name=job_name,
+            build_number=build_number,
+            project_id=project.id,
+            start_time=fixed_time + timedelta(hours=i),
+            duration=10.0 * (i + 1),
+            component=component,
+            env="production",
+            metadata={"jenkins": {"build_url": f"http://jenkins/{job_name}/{build_number}"}},
+            summary={"tests": 10, "failures": i, "errors": 1, "skips": 2, "xpasses": 1},
+        )
+    runs_view = get_jenkins_job_view(project=str(project.id))
+    assert runs_view["pagination"]["totalItems"] == 3
+
+    backfill_jenkins_builds()
+    with patch("ibutsu_server.widgets.jenkins_job_view._aggregate_runs") as mock_aggregate:
+        rollup_view = get_jenkins_job_view(project=str(project.id))
+        mock_aggregate.assert_not_called()
+    assert rollup_view == runs_view
@@ -1,7 +1,8 @@
 """Tests for result_aggregator widget"""
 
-from datetime import timedelta
+from datetime import UTC, datetime, timedelta
 
+from ibutsu_server.tasks.rollups import backfill_rollups
 from ibutsu_server.widgets.result_aggregator import get_recent_result_data
 
 MOCK_DAYS = 7
@@ -460,3 +461,30 @@ def test_get_recent_result_data_for_filter_false_returns_counts(
     assert len(result) == 1
     assert result[0]["_id"] == "component1"
     assert result[0]["count"] == 10
+
+
+def test_get_recent_result_data_from_rollups(make_project, make_result, rollup_redis):
+    """Test the whole days are counted from the rollups, and the partial days from the results"""
+    project = make_project(name="test-project")
+    now = datetime.now(UTC)
+    for days_ago, component, count in [(0, "frontend", 1), (3, "frontend", 2), (3, "backend", 4)]:
+        for _ in range(count):
+            make_result(
+                project_id=project.id, component=component, start_time=now - timedelta(days_ago)
+            )
+    backfill_rollups(days=30)
+
+    expected = [{"_id": "backend", "count": 4}, {"_id": "frontend", "count": 3}]
+    assert get_recent_result_data(MOCK_GROUP_FIELD, 10, str(project.id)) == expected
+
+    # A result on a whole day isn't counted until its day is recounted, unlike one from today
+    make_result(project_id=project.id, component="frontend", start_time=now - timedelta(3))
+    make_result(project_id=project.id, component="backend", start_time=now)
+    expected = [{"_id": "backend", "count": 5}, {"_id": "frontend", "count": 3}]
+    assert get_recent_result_data(MOCK_GROUP_FIELD, 10, str(project.id)) == expected
+
+    # Filters on fields that aren't rolled up are applied to the results instead
+    result = get_recent_result_data(
+        MOCK_GROUP_FIELD, 10, str(project.id), additional_filters="duration>0"
+    )
+    assert result == [{"_id": "backend", "count": 5}, {"_id": "frontend", "count": 4}]
@@ -1,5 +1,6 @@
 from datetime import UTC, datetime, timedelta
 
+from ibutsu_server.tasks.rollups import backfill_rollups
 from ibutsu_server.widgets.run_aggregator import get_recent_run_data
 
 MOCK_WEEKS = 4
@@ -59,3 +60,29 @@ def test_get_recent_run_data(make_project, make_run):
     assert result["skipped"]["component1"] == 2
     # component2: 100% passed # noqa: ERA001
     assert result["passed"]["component2"] == 100
+
+
+def test_get_recent_run_data_from_rollups(make_project, make_run, rollup_redis):
+    """Test the runs of whole days are summed up from the rollups, and those of today added"""
+    project = make_project(name="test-project")
+    now = datetime.now(UTC)
+    for days_ago, failures in [(7, 10), (7, 30), (0, 20)]:
+        make_run(
+            project_id=project.id,
+            start_time=now - timedelta(days=days_ago),
+            component="component1",
+            summary={"tests": 100, "failures": failures, "errors": 0, "skips": 0},
+        )
+    backfill_rollups(days=60)
+    # A run on a whole day isn't summed up until its day is recounted
+    make_run(
+        project_id=project.id,
+        start_time=now - timedelta(days=7),
+        component="component1",
+        summary={"tests": 100, "failures": 100, "errors": 0, "skips": 0},
+    )
+
+    result = get_recent_run_data(MOCK_WEEKS, MOCK_GROUP_FIELD, str(project.id))
+
+    assert result["failed"] == {"component1": 20}
+    assert result["passed"] == {"component1": 80}
@@ -1,4 +1,8 @@
 import { AuthService } from './auth';
+import { Settings } from '../pages/settings';
+
+// ms between polls of a task that computes a response
+const TASK_POLL_INTERVAL = 1000;
 
 const trim = (string) => {
   if (string.startsWith('/')) {
@@ -58,6 +62,23 @@ export const buildUrl = (url, params) => {
   }
 };
 
+const pollTask = async (taskId) => {
+  // Tasks respond with 206 until they're complete, then their result is in 'data'
+  for (;;) {
+    await new Promise((resolve) => setTimeout(resolve, TASK_POLL_INTERVAL));
+    const response = await HttpClient.get([
+      Settings.serverUrl,
+      'task',
+      taskId,
+    ]);
+    if (response.status === 200) {
+      return (await response.json()).data;
+    } else if (response.status !== 206) {
+      throw new Error(`Task ${taskId} failed: HTTP ${response.status}`);
+    }
+  }
+};
+
 export class HttpClient {
   static async get(url, params = {}, options = {}) {
     url = prepareUrl(url, params);
@@ -123,7 +144,10 @@ export class HttpClient {
 
   static handleResponse(response, retType = 'json') {
     if (response.ok) {
-      if (retType === 'json') {
+      if (retType === 'json' && response.status === 202) {
+        // The response is being computed in a task, e.g. an expensive widget
+        return response.json().then((task) => pollTask(task.task_id));
+      } else if (retType === 'json') {
         return response.json();
       } else {
         return response;
@@ -371,6 +371,36 @@ describe('HTTP Utilities', () => {
       expect(result).toBe(response);
     });
 
+    it('should poll the task of an accepted response', async () => {
+      vi.useFakeTimers();
+      global.fetch
+        .mockResolvedValueOnce({
+          ok: true,
+          status: 206,
+          json: async () => ({}),
+        })
+        .mockResolvedValueOnce({
+          ok: true,
+          status: 200,
+          json: async () => ({ state: 'SUCCESS', data: { heatmap: {} } }),
+        });
+      const response = {
+        ok: true,
+        status: 202,
+        json: async () => ({ task_id: 'task-id' }),
+      };
+
+      const result = HttpClient.handleResponse(response);
+      await vi.advanceTimersByTimeAsync(2000);
+
+      await expect(result).resolves.toEqual({ heatmap: {} });
+      expect(global.fetch).toHaveBeenCalledTimes(2);
+      expect(global.fetch.mock.calls[0][0]).toBe(
+        'http://localhost:8080/api/task/task-id',
+      );
+      vi.useRealTimers();
+    });
+
     it('should redirect to login on 401', () => {
       const originalLocation = window.location;
       delete window.location;
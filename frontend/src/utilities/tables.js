@@ -177,9 +177,18 @@ export const resultToComparisonRow = (result) => {
   if (!Array.isArray(result)) {
     return { cells: [] };
   }
+  // A test that's missing from a run has no result for it
+  const firstResult = result.find((resultItem) => resultItem);
+  if (!firstResult) {
+    return { cells: [] };
+  }
   let resultIcons = [];
   let markers = [];
   result.forEach((result) => {
+    if (!result) {
+      resultIcons.push(null);
+      return;
+    }
     resultIcons.push(ICON_RESULT_MAP(result.result));
     if (result.metadata && result.metadata.markers) {
       for (const marker of result.metadata.markers) {
@@ -195,10 +204,10 @@ export const resultToComparisonRow = (result) => {
     }
   });
 
-  if (result[0].metadata && result[0].metadata.component) {
+  if (firstResult.metadata && firstResult.metadata.component) {
     markers.push(
-      <Badge key={result[0].metadata.component}>
-        {result[0].metadata.component}
+      <Badge key={firstResult.metadata.component}>
+        {firstResult.metadata.component}
       </Badge>,
     );
   }
@@ -206,22 +215,26 @@ export const resultToComparisonRow = (result) => {
   let cells = [];
   cells.push(
     <Fragment key="test">
-      <Link to={`../results/${result[0].id}#summary`} relative="Path">
-        {result[0].test_id}
+      <Link to={`../results/${firstResult.id}#summary`} relative="Path">
+        {firstResult.test_id}
       </Link>{' '}
       {markers}
     </Fragment>,
   );
   result.forEach((resultItem, index) => {
     cells.push(
-      <span key={resultItem.id} className={resultItem.result}>
-        {resultIcons[index]} {toTitleCase(resultItem.result)}
-      </span>,
+      resultItem ? (
+        <span key={resultItem.id} className={resultItem.result}>
+          {resultIcons[index]} {toTitleCase(resultItem.result)}
+        </span>
+      ) : (
+        <span key={`missing-${index}`}>Missing</span>
+      ),
     );
   });
 
   return {
-    id: result[0].id,
+    id: firstResult.id,
     result: result,
     cells: cells,
   };
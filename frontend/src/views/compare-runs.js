@@ -72,8 +72,9 @@ const CompareRunsView = () => {
           val: checked ? FEPSX : FEP,
         },
       });
+      setPage(1);
     },
-    [filters],
+    [filters, setPage],
   );
 
   const clearFilters = useCallback(() => {
@@ -101,7 +102,11 @@ const CompareRunsView = () => {
         };
         const response = await HttpClient.get(
           [Settings.serverUrl, 'widget', 'compare-runs-view'],
-          { filters: toAPIFilter(filtersWithProject) },
+          {
+            filters: toAPIFilter(filtersWithProject),
+            page: page,
+            page_size: pageSize,
+          },
         );
         const data = await HttpClient.handleResponse(response);
         setResults(data.results);
@@ -117,7 +122,15 @@ const CompareRunsView = () => {
     };
 
     fetchResults();
-  }, [filters, primaryObject, setPage, setPageSize, setTotalItems]);
+  }, [
+    filters,
+    page,
+    pageSize,
+    primaryObject,
+    setPage,
+    setPageSize,
+    setTotalItems,
+  ]);
 
   const rows = useMemo(
     () => results.map((result, index) => resultToComparisonRow(result, index)),
@@ -191,6 +191,21 @@ describe('CompareRunsView Component', () => {
       consoleWarnSpy.mockRestore();
     });
 
+    it('should request the current page of comparison results', async () => {
+      renderCompareRunsView();
+
+      await act(async () => {
+        fireEvent.click(screen.getByLabelText('include-skips-checkbox'));
+      });
+
+      await waitFor(() => {
+        expect(HttpClient.get).toHaveBeenCalledWith(
+          ['http://localhost:8080/api', 'widget', 'compare-runs-view'],
+          expect.objectContaining({ page: 1, page_size: 20 }),
+        );
+      });
+    });
+
     it('should clear filters when Clear Filters button is clicked', async () => {
       renderCompareRunsView();
 
@@ -8,6 +8,7 @@ import { Link } from 'react-router';
 
 import { HttpClient } from '../utilities/http';
 import { Settings } from '../pages/settings';
+import { filtersToSearchParams } from '../utilities/filters';
 import WidgetHeader from '../components/widget-header';
 import ParamDropdown from '../components/param-dropdown';
 
@@ -56,6 +57,23 @@ const ImportanceComponentWidget = ({
     getData();
   };
 
+  // The results of a cell are found by filtering the results, not by their IDs
+  const toResultsLink = (component, buildnum, importance) =>
+    `/project/${params.project}/results?${filtersToSearchParams([
+      { field: 'component', operator: 'eq', value: component },
+      {
+        field: 'metadata.jenkins.job_name',
+        operator: 'eq',
+        value: params.job_name,
+      },
+      {
+        field: 'metadata.jenkins.build_number',
+        operator: 'eq',
+        value: buildnum,
+      },
+      { field: 'metadata.importance', operator: 'eq', value: importance },
+    ])}`;
+
   const toPercent = (num) => {
     if (typeof num === 'number') {
       return Math.round(num * 100);
@@ -102,11 +120,11 @@ const ImportanceComponentWidget = ({
                         {tdat.bnums.map((buildnum) => (
                           <Td key={buildnum}>
                             <Link
-                              to={
-                                '/project/' +
-                                params.project +
-                                `/results?id[in]=${tdat.data[buildnum][importance]['result_list'].join(';')}`
-                              }
+                              to={toResultsLink(
+                                tdat.component,
+                                buildnum,
+                                importance,
+                              )}
                             >
                               {toPercent(
                                 tdat.data[buildnum][importance]['percentage'],
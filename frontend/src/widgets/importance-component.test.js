@@ -243,7 +243,10 @@ describe('ImportanceComponentWidget', () => {
     it('should create correct result links', async () => {
       render(
         <MemoryRouter>
-          <ImportanceComponentWidget {...defaultProps} />
+          <ImportanceComponentWidget
+            {...defaultProps}
+            params={{ project: 'test-project', job_name: 'test-job' }}
+          />
         </MemoryRouter>,
       );
 
@@ -251,7 +254,10 @@ describe('ImportanceComponentWidget', () => {
         const link = screen.getByText('95').closest('a');
         expect(link).toHaveAttribute(
           'href',
-          '/project/test-project/results?id[in]=d4e5f6a7-4567-8901-2def-345678901234;e5f6a7b8-5678-9012-3ef0-456789012345',
+          '/project/test-project/results?component=%5Beq%5Dfrontend' +
+            '&metadata.jenkins.job_name=%5Beq%5Dtest-job' +
+            '&metadata.jenkins.build_number=%5Beq%5D1001' +
+            '&metadata.importance=%5Beq%5Dhigh',
         );
       });
     });